@@ -1,6 +1,10 @@
 import os
 import time
 from typing import List
+from execution.tracing import span
+
+SEGMENT_WORKERS = int(os.getenv("SEGMENT_WORKERS", "3"))  # Parallel FFmpeg segment encodes
+
 # Conditional import to handle environments where moviepy might not be installed yet
 # Strict MoviePy v2 imports - verified via dir(moviepy)
 try:
@@ -12,28 +16,24 @@ except ImportError as e:
     print(f"CRITICAL IMPORT ERROR: {e}")
     raise e
 
-# ElevenLabs Import
-try:
-    from elevenlabs.client import ElevenLabs
-except ImportError as e:
-    print(f"Warning: elevenlabs import failed: {e}. Captions/TTS might fail.")
-
 def generate_captions_elevenlabs(audio_path: str):
     """
     Transcribes audio using ElevenLabs Scribe and returns a list of (word, start, end) tuples.
     """
     print(f"--- Transcribing Audio via ElevenLabs Scribe: {audio_path} ---")
+    from execution.client_registry import client_registry
     try:
-        client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+        client = client_registry.get("elevenlabs")
         
         with open(audio_path, "rb") as audio_file:
             # Correct Method: speech_to_text.convert
             # Model: scribe_v1
             
-            transcript = client.speech_to_text.convert(
-                file=audio_file,
-                model_id="scribe_v1"
-            )
+            with span("stt.transcribe", model="scribe_v1", provider="elevenlabs"):
+                transcript = client.speech_to_text.convert(
+                    file=audio_file,
+                    model_id="scribe_v1"
+                )
             
             # Debug: Print structure if needed
             # print(f"DEBUG: Transcript Type: {type(transcript)}")
@@ -67,9 +67,11 @@ def generate_captions_elevenlabs(audio_path: str):
                 
                 word_list.append((word, start_time, end_time))
                 
+        client_registry.record_success("elevenlabs")
         return word_list
     except Exception as e:
         print(f"ElevenLabs Scribe Failed: {e}")
+        client_registry.record_failure("elevenlabs", e)
         return []
 
 def generate_animated_caption(word_list, video_size, duration):
@@ -285,9 +287,47 @@ def transition_white_flash(clip, duration=0.8):
         print(f"Failed to add white transition: {e}")
         return clip
 
-def assemble_video(scene_paths: List[str], audio_path: str, bgm_path: str = None, output_dir: str = "output", config: dict = {}, end_card_path: str = None) -> str:
+def _prepare_segments(paths: List[str], trims: List, output_dir: str) -> dict:
+    """
+    Renders each clip as a normalized 1080x1920 segment with its white-flash transition
+    (FFmpeg, in parallel) and returns {clip index: segment path}. Segments are cached in
+    output_dir/segments by source file and trim, so unchanged scenes are reused as-is.
+    Clips that fail are left to the MoviePy path.
+    """
+    from execution.ffmpeg_rendering import render_segment, segment_cache_key, check_ffmpeg_available
+    from execution.run_logging import ContextThreadPoolExecutor
+
+    if not check_ffmpeg_available():
+        return {}
+    segment_dir = os.path.join(output_dir, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+
+    def render(i, path):
+        trim = trims[i] if trims and i < len(trims) else None
+        segment_path = os.path.join(segment_dir, f"seg_{segment_cache_key(path, trim)}.mp4")
+        if os.path.exists(segment_path) and os.path.getsize(segment_path) > 0:
+            print(f"♻️ Reusing encoded segment for clip {i+1}")
+            return segment_path
+        tmp_path = segment_path.replace(".mp4", ".part.mp4")
+        render_segment(path, tmp_path, trim=trim)
+        os.replace(tmp_path, segment_path)
+        return segment_path
+
+    segments = {}
+    with ContextThreadPoolExecutor(max_workers=SEGMENT_WORKERS) as ex:
+        futures = {ex.submit(render, i, p): i for i, p in enumerate(paths) if os.path.exists(p)}
+        for future, i in futures.items():
+            try:
+                segments[i] = future.result()
+            except Exception as e:
+                print(f"Segment render failed for clip {i+1}: {e}")
+    return segments
+
+def assemble_video(scene_paths: List[str], audio_path: str, bgm_path: str = None, output_dir: str = "output", config: dict = {}, end_card_path: str = None, trims: List = None) -> str:
     """
     Assembles the final video from scene clips, voiceover, and background music.
+    `trims` holds an optional [start, end] per clip (from the timeline planner); clips are
+    cut to it with FFmpeg before loading.
     """
     print("--- Assembling Final Ad ---")
     
@@ -337,54 +377,99 @@ def assemble_video(scene_paths: List[str], audio_path: str, bgm_path: str = None
     print("Loading video clips...")
     valid_scenes = []
     scenes_count = len(scene_paths)
-    import requests
+    from execution.download_manager import download_manager
     
     remote_assets = config.get("remote_assets", {})
     
+    # Resolve every clip (and the end card) to a local path first, then pull all
+    # remote assets concurrently instead of one blocking download per scene.
+    def remote_fallback(source_path):
+        """(url, local path) of the scene's copy in remote_assets, if any."""
+        # Extract scene ID from path (likely scene_ID_...)
+        basename = os.path.basename(str(source_path).split("?")[0])
+        scene_id_key = basename.split("_")[1] if "_" in basename else None # e.g. scene_Hook_... -> Hook
+        remote_url = remote_assets.get(f"{scene_id_key}_video") if scene_id_key else None
+        if not remote_url:
+            return None
+        print(f"Local file missing. Falling back to remote asset for {scene_id_key}: {remote_url}")
+        return remote_url, os.path.join(output_dir, f"restored_{basename}")
+
+    resolved_paths = []
+    downloads = {}
     for i, path in enumerate(scene_paths):
-        print(f"Processing clip {i+1}/{scenes_count}: {path}")
-        
         local_path = path
         # 1. Handle URL directly
         if str(path).startswith("http"):
-             try:
-                  print(f"Downloading remote scene: {path}")
-                  filename = os.path.basename(path).split("?")[0]
-                  local_path = os.path.join(output_dir, f"dl_{i}_{filename}")
-                  if not os.path.exists(local_path):
-                      resp = requests.get(path, timeout=30)
-                      with open(local_path, "wb") as f:
-                          f.write(resp.content)
-             except Exception as de:
-                  print(f"Failed to download URL {path}: {de}")
-                  continue
+             filename = os.path.basename(path).split("?")[0]
+             local_path = os.path.join(output_dir, f"dl_{i}_{filename}")
+             if not os.path.exists(local_path):
+                  downloads[path] = local_path
         
         # 2. Handle missing local file by checking remote_assets
-        if not os.path.exists(local_path):
-             # Extract scene ID from path (likely scene_ID_...)
-             basename = os.path.basename(local_path)
-             scene_id_key = None
-             if "_" in basename:
-                  scene_id_key = basename.split("_")[1] # e.g. scene_Hook_... -> Hook
-             
-             remote_url = None
-             if scene_id_key:
-                  remote_url = remote_assets.get(f"{scene_id_key}_video")
-             
-             if remote_url:
-                  try:
-                       print(f"Local file missing. Falling back to remote asset for {scene_id_key}: {remote_url}")
-                       local_path = os.path.join(output_dir, f"restored_{basename}")
-                       if not os.path.exists(local_path):
-                            resp = requests.get(remote_url, timeout=30)
-                            with open(local_path, "wb") as f:
-                                 f.write(resp.content)
-                  except Exception as re:
-                       print(f"Failed to restore scene from cloud: {re}")
+        elif not os.path.exists(local_path):
+             fallback = remote_fallback(local_path)
+             if fallback:
+                  remote_url, local_path = fallback
+                  if not os.path.exists(local_path):
+                       downloads[remote_url] = local_path
              else:
                   print(f"Warning: Scene file {local_path} not found and no remote fallback available.")
+        resolved_paths.append(local_path)
+
+    if end_card_path and not os.path.exists(end_card_path):
+         print(f"End card missing locally: {end_card_path}. Checking remote assets.")
+         remote_url = remote_assets.get("end_card")
+         if remote_url:
+              local_ec = os.path.join(output_dir, f"restored_end_card.png")
+              if not os.path.exists(local_ec):
+                   downloads[remote_url] = local_ec
+              end_card_path = local_ec
+
+    if downloads:
+         download_manager.prefetch(downloads, link=True)  # Clips are only read
+
+    # A direct URL that failed to download falls back to the scene's copy in remote_assets
+    retries = {}
+    for i, path in enumerate(scene_paths):
+        if str(path).startswith("http") and not os.path.exists(resolved_paths[i]):
+             print(f"Failed to download URL {path}. Checking remote assets.")
+             fallback = remote_fallback(path)
+             if fallback and fallback[0] != path:
+                  resolved_paths[i] = fallback[1]
+                  if not os.path.exists(fallback[1]):
+                       retries[fallback[0]] = fallback[1]
+    if retries:
+         download_manager.prefetch(retries, link=True)
+
+    # Encoded, normalized segments (cached per source clip: a regeneration re-encodes only its scene).
+    # Only regenerations pre-encode: on a full run every clip is new, so the extra encode
+    # before the MoviePy render would never be reused.
+    use_segments = config.get("segment_cache", bool(config.get("regenerate_scene_id")))
+    segments = _prepare_segments(resolved_paths, trims, output_dir) if use_segments else {}
+    
+    for i, local_path in enumerate(resolved_paths):
+        print(f"Processing clip {i+1}/{scenes_count}: {local_path}")
+
+        if segments.get(i):
+            try:
+                segment_clip = VideoFileClip(segments[i])
+                if segment_clip.audio:
+                    segment_clip.audio = segment_clip.audio.with_fps(44100)
+                valid_scenes.append(segment_clip)
+                continue
+            except Exception as e:
+                print(f"Cached segment unusable for clip {i+1} ({e}). Rendering in MoviePy.")
 
         if os.path.exists(local_path):
+            trim = trims[i] if trims and i < len(trims) else None
+            if trim:
+                # Cut to the planned length (stream copy when the cut starts at 0)
+                try:
+                    from execution.ffmpeg_rendering import trim_video_ffmpeg
+                    trimmed_path = os.path.join(output_dir, f"trim_{i}_{os.path.basename(local_path)}")
+                    local_path = trim_video_ffmpeg(local_path, trimmed_path, start=trim[0], end=trim[1])
+                except Exception as e:
+                    print(f"Trim failed for clip {i+1} ({e}). Using full clip.")
 
             try:
                 loaded_clip = VideoFileClip(local_path)
@@ -415,20 +500,6 @@ def assemble_video(scene_paths: List[str], audio_path: str, bgm_path: str = None
 
 
     # Append End Card if provided
-    if end_card_path and not os.path.exists(end_card_path):
-         print(f"End card missing locally: {end_card_path}. Checking remote assets.")
-         remote_url = remote_assets.get("end_card")
-         if remote_url:
-              try:
-                   local_ec = os.path.join(output_dir, f"restored_end_card.png")
-                   if not os.path.exists(local_ec):
-                        resp = requests.get(remote_url, timeout=30)
-                        with open(local_ec, "wb") as f:
-                             f.write(resp.content)
-                   end_card_path = local_ec
-              except Exception as e:
-                   print(f"Failed to restore end card from cloud: {e}")
-
     if end_card_path and os.path.exists(end_card_path):
         print(f"Appending End Card: {end_card_path}")
         try:
@@ -0,0 +1,183 @@
+"""
+Process-wide registry of provider SDK clients.
+
+SDK clients (genai.Client, OpenAI, ElevenLabs) own an HTTP connection pool, so
+building one per call pays a fresh TLS handshake and client setup every time.
+The registry creates each client lazily on first use, once per (provider, API key),
+and hands the same instance to every thread in the worker. It also keeps simple
+per-client health counters so failing clients can be rebuilt and inspected. Rate-limit
+responses (429 / RESOURCE_EXHAUSTED, throttled or cancelled calls) are counted as
+throttles: the client is fine, so they never trigger a rebuild.
+With SIMULATION_MODE set it hands out local simulated clients (execution/simulation.py).
+
+Usage:
+    from execution.client_registry import client_registry
+
+    client = client_registry.get("genai")               # key from GEMINI_API_KEY
+    client = client_registry.get("elevenlabs", api_key)  # explicit key
+
+    client_registry.record_success("genai")
+    client_registry.record_failure("genai", error)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from execution.exceptions import GenerationCancelledException, ProviderThrottledException, QuotaExceededException
+from execution.provider_control import is_throttle_error
+from execution.simulation import SIMULATION_MODE, simulated_client
+
+# Default env var holding the API key for each provider
+PROVIDER_KEY_ENV = {
+    "genai": "GEMINI_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "elevenlabs": "ELEVENLABS_API_KEY",
+}
+
+# After this many consecutive failures the cached client is dropped and rebuilt on
+# the next `get` (recovers from a poisoned connection pool without a restart).
+REBUILD_AFTER_FAILURES = 5
+
+# Errors that say nothing about the client's connection pool
+_NOT_CLIENT_FAILURES = (GenerationCancelledException, ProviderThrottledException, QuotaExceededException)
+
+
+def _build_genai(api_key: str):
+    from google import genai
+    return genai.Client(api_key=api_key)
+
+
+def _build_openai(api_key: str):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+
+def _build_elevenlabs(api_key: str):
+    from elevenlabs.client import ElevenLabs
+    return ElevenLabs(api_key=api_key)
+
+
+PROVIDER_BUILDERS: Dict[str, Callable[[str], Any]] = {
+    "genai": _build_genai,
+    "openai": _build_openai,
+    "elevenlabs": _build_elevenlabs,
+}
+
+
+def key_id(api_key: Optional[str]) -> str:
+    """Short, non-reversible identifier for an API key (safe to log)."""
+    if not api_key:
+        return "none"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+
+
+class ClientHealth:
+    """Success/failure counters for one cached client."""
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.throttles = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_throttle_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "created_at": self.created_at,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "throttles": self.throttles,
+            "last_error": self.last_error,
+            "last_success_at": self.last_success_at,
+            "last_failure_at": self.last_failure_at,
+            "last_throttle_at": self.last_throttle_at,
+            "healthy": self.consecutive_failures < REBUILD_AFTER_FAILURES,
+        }
+
+
+class ClientRegistry:
+    """Thread-safe, lazily populated cache of SDK clients keyed by (provider, key id)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._health: Dict[Tuple[str, str], ClientHealth] = {}
+
+    def _resolve(self, provider: str, api_key: Optional[str]) -> Tuple[Tuple[str, str], Optional[str]]:
+        if provider not in PROVIDER_BUILDERS:
+            raise ValueError(f"Unknown client provider: {provider}")
+        if api_key is None:
+            api_key = os.getenv(PROVIDER_KEY_ENV[provider])
+        return (provider, key_id(api_key)), api_key
+
+    def get(self, provider: str, api_key: Optional[str] = None):
+        """Returns the shared client for `provider` (and key), creating it on first use."""
+        key, api_key = self._resolve(provider, api_key)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                if SIMULATION_MODE:
+                    print(f"🧪 Creating simulated {provider} client (key {key[1]})")
+                    client = simulated_client(provider)
+                else:
+                    print(f"🔌 Creating {provider} client (key {key[1]})")
+                    client = PROVIDER_BUILDERS[provider](api_key)
+                self._clients[key] = client
+                self._health.setdefault(key, ClientHealth())
+            return client
+
+    def record_success(self, provider: str, api_key: Optional[str] = None):
+        key, _ = self._resolve(provider, api_key)
+        with self._lock:
+            health = self._health.setdefault(key, ClientHealth())
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.last_success_at = time.time()
+
+    def record_failure(self, provider: str, error: Exception = None, api_key: Optional[str] = None):
+        key, _ = self._resolve(provider, api_key)
+        with self._lock:
+            health = self._health.setdefault(key, ClientHealth())
+            if error is not None and (isinstance(error, _NOT_CLIENT_FAILURES) or is_throttle_error(error)):
+                health.throttles += 1
+                health.last_throttle_at = time.time()
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = str(error)[:300] if error else None
+            health.last_failure_at = time.time()
+
+            if health.consecutive_failures >= REBUILD_AFTER_FAILURES and key in self._clients:
+                print(f"♻️ {provider} client (key {key[1]}) failed {health.consecutive_failures}x in a row. Rebuilding on next use.")
+                self._clients.pop(key, None)
+                health.consecutive_failures = 0
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of client health, keyed as 'provider:key_id'."""
+        with self._lock:
+            return {
+                f"{provider}:{kid}": {**h.to_dict(), "active": (provider, kid) in self._clients}
+                for (provider, kid), h in self._health.items()
+            }
+
+    def reset(self, provider: Optional[str] = None):
+        """Drops cached clients (all, or just one provider's)."""
+        with self._lock:
+            for key in list(self._clients):
+                if provider is None or key[0] == provider:
+                    self._clients.pop(key, None)
+
+
+client_registry = ClientRegistry()
@@ -0,0 +1,284 @@
+"""
+Managed process pool for CPU-bound pipeline work.
+
+Scene threads, the assembly node and FastAPI's threadpool all share one GIL. PIL
+watermarking, end-card compositing, rendition encoding and the OpenCV/NumPy person
+check held it for seconds at a time, so Veo polling, uploads and HTTP handlers stalled
+behind image processing. Those steps now run in worker processes:
+- The pool is sized to the container's CPU quota (cgroup v2 `cpu.max`, or v1
+  `cpu.cfs_quota_us` / `cpu.cfs_period_us`), capped by the CPU affinity mask. Without a
+  quota it uses the visible CPUs.
+- Workers are started with the "spawn" context. Forking a process that runs scene
+  threads, gRPC channels and the log writer copies locks in whatever state they are in.
+- Tasks must be picklable: module-level functions with bytes, paths and plain dicts in
+  and out. Objects that cannot cross a process boundary (PIL images tied to caches) stay
+  inside the task; callers pass the encoded bytes or paths instead.
+- Tasks are short and pure CPU. Network I/O (downloads, uploads, provider calls) stays
+  in the calling process, where the client registry, key pool, controllers and trace
+  histograms live. Assembly is not a pool task: it mixes downloads and STT with a
+  multi-minute render that would hold a quota-sized pool (often 1-2 workers) and queue
+  every other run's image work behind it; its encodes already run in FFmpeg processes.
+- Lines a task prints are forwarded to the submitting thread's context, so they land in
+  the right run.log (and progress stream) while the task runs.
+- Inside a worker, on a broken pool (a worker was killed) or for arguments that cannot
+  be pickled, the task runs inline in the calling thread instead of failing.
+
+Config (env):
+    CPU_POOL_WORKERS             - Worker processes (default: the container's CPU quota)
+    CPU_POOL_ENABLED             - "false" runs every task inline (default true)
+    CPU_POOL_MAX_TASKS_PER_CHILD - Tasks before a worker is recycled (default 50; frees PIL/NumPy memory)
+
+Usage:
+    from execution.cpu_pool import cpu_pool
+
+    renditions = cpu_pool.run(render_derivatives, png_bytes)          # Blocks this thread, not the GIL
+    result = await cpu_pool.run_async(pre_flight_check, text, path)   # From the event loop
+"""
+
+import asyncio
+import atexit
+import contextvars
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+CPU_POOL_ENABLED = os.getenv("CPU_POOL_ENABLED", "true").lower() != "false"
+MAX_TASKS_PER_CHILD = int(os.getenv("CPU_POOL_MAX_TASKS_PER_CHILD", "50"))
+LOG_DRAIN_SECONDS = 2.0    # Wait for a finished task's last forwarded lines
+
+
+def container_cpus(cgroup_root: str = "/sys/fs/cgroup") -> int:
+    """CPUs this container may use: the cgroup quota (rounded up), capped by the affinity mask."""
+    try:
+        visible = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        visible = os.cpu_count() or 1
+
+    quota = period = None
+    try:
+        with open(os.path.join(cgroup_root, "cpu.max")) as f:  # cgroup v2: "<quota|max> <period>"
+            fields = f.read().split()
+        if fields and fields[0] != "max":
+            quota, period = int(fields[0]), int(fields[1])
+    except (OSError, ValueError, IndexError):
+        for cpu_dir in ("cpu", "cpu,cpuacct"):  # cgroup v1
+            try:
+                with open(os.path.join(cgroup_root, cpu_dir, "cpu.cfs_quota_us")) as f:
+                    quota = int(f.read())
+                with open(os.path.join(cgroup_root, cpu_dir, "cpu.cfs_period_us")) as f:
+                    period = int(f.read())
+                break
+            except (OSError, ValueError):
+                quota = period = None
+
+    if quota and period and quota > 0:
+        return max(1, min(visible, math.ceil(quota / period)))
+    return max(1, visible)
+
+
+# --- Worker side ---
+
+_in_worker = False
+_log_queue = None
+_task_id: Optional[int] = None
+
+
+class _ForwardedStream:
+    """Worker stdout/stderr: complete lines go back to the submitting thread."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.buffer = ""
+
+    def write(self, data: str):
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            self.queue.put((_task_id, line + "\n"))
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.queue.put((_task_id, self.buffer + "\n"))
+            self.buffer = ""
+
+    def isatty(self):
+        return False
+
+
+def _init_worker(log_queue):
+    global _in_worker, _log_queue
+    _in_worker = True
+    _log_queue = log_queue
+    sys.stdout = sys.stderr = _ForwardedStream(log_queue)
+
+
+def _invoke(task_id: int, fn: Callable, args: tuple, kwargs: dict):
+    global _task_id
+    _task_id = task_id
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.stdout.flush()
+        _log_queue.put((task_id, None))  # End of this task's output
+        _task_id = None
+
+
+def in_worker() -> bool:
+    """True inside a pool worker (nested submissions run inline)."""
+    return _in_worker
+
+
+def _is_pickling_error(e: BaseException) -> bool:
+    return isinstance(e, pickle.PicklingError) or (isinstance(e, (TypeError, AttributeError)) and "pickle" in str(e))
+
+
+# --- Parent side ---
+
+class _Task:
+    def __init__(self, context: contextvars.Context):
+        self.context = context
+        self.drained = threading.Event()
+
+
+class CPUPool:
+    def __init__(self, workers: Optional[int] = None, enabled: Optional[bool] = None,
+                 max_tasks_per_child: int = MAX_TASKS_PER_CHILD):
+        configured = os.getenv("CPU_POOL_WORKERS")
+        self.workers = workers or (int(configured) if configured else container_cpus())
+        self.enabled = CPU_POOL_ENABLED if enabled is None else enabled
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._log_queue = None
+        self._pump: Optional[threading.Thread] = None
+        self._tasks: Dict[int, _Task] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "inline": 0, "broken": 0, "busy_seconds": 0.0}
+
+    def _ensure(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                ctx = multiprocessing.get_context("spawn")
+                if self._log_queue is None:
+                    self._log_queue = ctx.Queue()
+                kwargs = {}
+                if sys.version_info >= (3, 11) and self.max_tasks_per_child:
+                    kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                     initializer=_init_worker, initargs=(self._log_queue,), **kwargs)
+                print(f"⚙️ CPU pool started: {self.workers} worker processes")
+            if self._pump is None or not self._pump.is_alive():
+                self._pump = threading.Thread(target=self._forward_logs, name="cpu-pool-logs", daemon=True)
+                self._pump.start()
+            return self._executor
+
+    def _forward_logs(self):
+        while True:
+            try:
+                task_id, line = self._log_queue.get()
+            except (EOFError, OSError):
+                return  # Queue closed on shutdown
+            with self._lock:
+                task = self._tasks.get(task_id)
+                if line is None:
+                    self._tasks.pop(task_id, None)
+            if line is None:
+                if task:
+                    task.drained.set()
+            elif task:
+                task.context.run(sys.stdout.write, line)
+            else:
+                sys.stdout.write(line)
+
+    def _reset(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._stats["broken"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_inline(self, fn: Callable, args: tuple, kwargs: dict):
+        with self._lock:
+            self._stats["inline"] += 1
+        return fn(*args, **kwargs)
+
+    def _submit(self, fn: Callable, args: tuple, kwargs: dict):
+        executor = self._ensure()
+        task_id = next(self._ids)
+        task = _Task(contextvars.copy_context())
+        with self._lock:
+            self._tasks[task_id] = task
+            self._stats["submitted"] += 1
+        started = time.time()
+        future = executor.submit(_invoke, task_id, fn, args, kwargs)
+
+        def record(f: Future):
+            with self._lock:
+                self._stats["busy_seconds"] += time.time() - started
+                self._stats["failed" if f.cancelled() or f.exception() else "completed"] += 1
+                error = None if f.cancelled() else f.exception()
+                if f.cancelled() or isinstance(error, BrokenProcessPool) or (error and _is_pickling_error(error)):
+                    self._tasks.pop(task_id, None)  # Never ran: no end marker will come
+        future.add_done_callback(record)
+        return executor, task, future
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Runs `fn(*args, **kwargs)` in a worker process and returns its result (or raises its error)."""
+        if not self.enabled or _in_worker:
+            return self._run_inline(fn, args, kwargs)
+        executor, task, future = self._submit(fn, args, kwargs)
+        try:
+            result = future.result(timeout)
+        except BrokenProcessPool:
+            print(f"⚠️ CPU pool broken (worker died); running {getattr(fn, '__name__', fn)} inline")
+            self._reset(executor)
+            return self._run_inline(fn, args, kwargs)
+        except Exception as e:
+            if not _is_pickling_error(e):
+                task.drained.wait(LOG_DRAIN_SECONDS)
+                raise
+            print(f"⚠️ {getattr(fn, '__name__', fn)} arguments are not picklable; running inline: {e}")
+            return self._run_inline(fn, args, kwargs)
+        task.drained.wait(LOG_DRAIN_SECONDS)
+        return result
+
+    async def run_async(self, fn: Callable, *args, **kwargs) -> Any:
+        """Awaitable `run` for the event loop (no threadpool thread is held while the task runs)."""
+        if not self.enabled or _in_worker:
+            return await asyncio.get_running_loop().run_in_executor(None, lambda: self._run_inline(fn, args, kwargs))
+        executor, _, future = self._submit(fn, args, kwargs)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            print(f"⚠️ CPU pool broken (worker died); running {getattr(fn, '__name__', fn)} inline")
+            self._reset(executor)
+            return await asyncio.get_running_loop().run_in_executor(None, lambda: self._run_inline(fn, args, kwargs))
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "enabled": self.enabled,
+                "started": self._executor is not None,
+                "in_flight": len(self._tasks),
+                **{k: round(v, 1) if isinstance(v, float) else v for k, v in self._stats.items()},
+            }
+
+
+cpu_pool = CPUPool()
+atexit.register(cpu_pool.shutdown, False)
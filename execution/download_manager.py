@@ -0,0 +1,328 @@
+"""
+Shared download manager for remote pipeline assets.
+
+All asset downloads (remote scenes, restored end cards, reference images, brand logos,
+provider-hosted image results) go through one pooled keep-alive session instead of
+bare `requests.get` calls. Downloads stream to disk in chunks, are checksum-verified,
+and land in a local cache keyed by URL so repeated fetches within a process only cost
+a conditional GET (If-None-Match on the cached ETag).
+
+The cache is bounded: after each new download, least recently used entries are evicted
+until it fits in DOWNLOAD_CACHE_MAX_MB. A destination gets its own copy of the cached
+file, so writing to it in place (watermarks, overlays) cannot corrupt the cache for
+later runs. Callers that only read a destination can pass `link=True` to hard-link it
+instead (large clips in assembly).
+
+Config (env):
+    DOWNLOAD_CACHE_DIR         - Cache directory (default <system temp>/ignite_download_cache)
+    DOWNLOAD_CACHE_MAX_MB      - Cache size before LRU eviction (default 2048)
+    DOWNLOAD_PREFETCH_WORKERS  - Concurrent prefetch downloads (default 8)
+
+Usage:
+    from execution.download_manager import download_manager
+
+    # Pull everything assembly needs concurrently, up front (read-only: hard links are fine)
+    paths = download_manager.prefetch({url_a: dest_a, url_b: dest_b}, link=True)
+
+    # Single asset to a specific destination
+    download_manager.fetch(url, dest="tmp/run_123/restored_end_card.png")
+
+    # Small assets (logos, reference images) straight to memory
+    logo_bytes = download_manager.fetch_bytes(logo_url)
+
+    # Large one-off media (generated videos): stream to disk, bypassing the cache
+    download_manager.stream_to_file(video_uri, output_path, headers={"x-goog-api-key": key})
+"""
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib3.util.retry import Retry
+except ImportError:
+    Retry = None
+
+CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ignite_download_cache"))
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+DEFAULT_TIMEOUT = 30
+PREFETCH_WORKERS = int(os.getenv("DOWNLOAD_PREFETCH_WORKERS", "8"))
+CACHE_MAX_BYTES = int(float(os.getenv("DOWNLOAD_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+EVICT_GRACE_SECONDS = 60.0  # Entries used this recently are never evicted (a caller may be reading them)
+
+
+class ChecksumMismatchError(Exception):
+    """Raised when a downloaded file does not match its expected checksum."""
+    pass
+
+
+class DownloadManager:
+    """
+    Pooled, caching downloader. A single instance is shared by the whole process;
+    `requests.Session` with a pooled adapter is safe to share across threads for GETs.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, pool_size: int = 32, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.session = requests.Session()
+        adapter_kwargs = {"pool_connections": pool_size, "pool_maxsize": pool_size}
+        if Retry is not None:
+            adapter_kwargs["max_retries"] = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"])
+            )
+        adapter = HTTPAdapter(**adapter_kwargs)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+
+    # --- Cache helpers ---
+
+    def _cache_paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            lock = self._url_locks.get(url)
+            if lock is None:
+                lock = threading.Lock()
+                self._url_locks[url] = lock
+            return lock
+
+    @staticmethod
+    def _read_meta(meta_path: str) -> dict:
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    # --- Public API ---
+
+    def fetch(self, url: str, dest: Optional[str] = None, expected_sha256: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT, headers: Optional[Dict[str, str]] = None, link: bool = False) -> str:
+        """
+        Downloads `url` (streaming to disk) and returns the local path.
+        If `dest` is given the cached file is copied there (hard-linked with `link=True`,
+        for destinations that are never written to). Without `dest` the cached path is
+        returned; read it right away, since the cache may evict it later.
+        """
+        if url.startswith("file://"):
+            # Local storage (simulation mode): nothing to download or cache
+            cached_path = url[len("file://"):]
+            if dest:
+                self._place(cached_path, dest, link)
+            return dest or cached_path
+
+        with self._url_lock(url):
+            cached_path, downloaded = self._fetch_to_cache(url, expected_sha256, timeout, headers)
+            if dest:
+                try:
+                    self._place(cached_path, dest, link)
+                except FileNotFoundError:
+                    # Evicted by another process sharing the cache directory: download again
+                    cached_path, downloaded = self._fetch_to_cache(url, expected_sha256, timeout, headers)
+                    self._place(cached_path, dest, link)
+        if downloaded:
+            self._evict()
+        return dest or cached_path
+
+    def fetch_bytes(self, url: str, timeout: float = DEFAULT_TIMEOUT) -> bytes:
+        """Downloads `url` via the cache and returns its content (for small assets)."""
+        path = self.fetch(url, timeout=timeout)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def stream_to_file(self, url: str, dest: str, headers: Optional[Dict[str, str]] = None, timeout: float = DEFAULT_TIMEOUT) -> str:
+        """
+        Streams `url` straight to `dest` in chunks without caching it. For large,
+        single-use media where holding the body in memory (or in the cache) is wasteful.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        if url.startswith("file://"):
+            shutil.copyfile(url[len("file://"):], dest)
+            return dest
+        tmp_path = f"{dest}.part"
+        with self.session.get(url, stream=True, timeout=timeout, headers=headers or {}) as resp:
+            resp.raise_for_status()
+            try:
+                size, sha256_hex, md5_digest = self._stream_response(resp, tmp_path)
+                self._verify(url, resp.headers, size, sha256_hex, md5_digest, None)
+                os.replace(tmp_path, dest)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return dest
+
+    def prefetch(self, urls, max_workers: int = PREFETCH_WORKERS, link: bool = False) -> Dict[str, Optional[str]]:
+        """
+        Downloads all `urls` concurrently. `urls` is either an iterable of URLs or a
+        {url: dest} mapping. Returns {url: local_path or None on failure}. `link` as in fetch().
+        """
+        targets = dict(urls) if isinstance(urls, dict) else dict.fromkeys(urls)
+        targets = {u: d for u, d in targets.items() if u}
+        if not targets:
+            return {}
+
+        print(f"⬇️  Prefetching {len(targets)} remote asset(s)...")
+
+        def _safe_fetch(item):
+            u, dest = item
+            try:
+                return u, self.fetch(u, dest=dest, link=link)
+            except Exception as e:
+                print(f"Failed to prefetch {u}: {e}")
+                return u, None
+
+        from execution.run_logging import ContextThreadPoolExecutor
+        with ContextThreadPoolExecutor(max_workers=min(max_workers, len(targets))) as executor:
+            return dict(executor.map(_safe_fetch, targets.items()))
+
+    # --- Internals ---
+
+    @staticmethod
+    def _place(cached_path: str, dest: str, link: bool):
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        if os.path.exists(dest):
+            os.remove(dest)
+        if link:
+            try:
+                os.link(cached_path, dest)
+                return
+            except FileNotFoundError:
+                raise
+            except OSError:
+                pass  # Other filesystem, or links unsupported
+        shutil.copyfile(cached_path, dest)
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits in `max_bytes`."""
+        entries, total = [], 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json") or name.endswith(".part"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+
+        now, evicted = time.time(), 0
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes or now - mtime < EVICT_GRACE_SECONDS:
+                break
+            meta_path = f"{path}.json"
+            url = self._read_meta(meta_path).get("url")
+            lock = self._url_lock(url) if url else None
+            if lock is not None and not lock.acquire(blocking=False):
+                continue  # Being fetched or copied right now
+            try:
+                for stale in (path, meta_path):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                total -= size
+                evicted += 1
+            finally:
+                if lock is not None:
+                    lock.release()
+        if evicted:
+            print(f"🧹 Download cache: evicted {evicted} entr{'y' if evicted == 1 else 'ies'} ({total / 1e6:.0f} MB kept)")
+
+    def _fetch_to_cache(self, url: str, expected_sha256: Optional[str], timeout: float, headers: Optional[Dict[str, str]]):
+        """Returns (cached path, True if the body was downloaded rather than revalidated)."""
+        cached_path, meta_path = self._cache_paths(url)
+        meta = self._read_meta(meta_path) if os.path.exists(cached_path) else {}
+
+        request_headers = dict(headers or {})
+        if meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+
+        with self.session.get(url, stream=True, timeout=timeout, headers=request_headers) as resp:
+            if resp.status_code == 304 and meta:
+                if expected_sha256 and meta.get("sha256") != expected_sha256:
+                    raise ChecksumMismatchError(f"Cached copy of {url} does not match expected sha256")
+                os.utime(cached_path)  # Recently used: last in line for eviction
+                return cached_path, False
+
+            resp.raise_for_status()
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            os.close(fd)
+            try:
+                size, sha256_hex, md5_digest = self._stream_response(resp, tmp_path)
+                self._verify(url, resp.headers, size, sha256_hex, md5_digest, expected_sha256)
+                os.replace(tmp_path, cached_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            with open(meta_path, "w") as f:
+                json.dump({
+                    "url": url,
+                    "etag": resp.headers.get("ETag"),
+                    "sha256": sha256_hex,
+                    "size": size
+                }, f)
+
+        return cached_path, True
+
+    @staticmethod
+    def _stream_response(resp, path: str):
+        """Writes a streaming response to `path` chunk by chunk, hashing as it goes."""
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        size = 0
+        with open(path, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                sha256.update(chunk)
+                md5.update(chunk)
+                size += len(chunk)
+        return size, sha256.hexdigest(), md5.digest()
+
+    @staticmethod
+    def _verify(url: str, resp_headers, size: int, sha256_hex: str, md5_digest: bytes, expected_sha256: Optional[str]):
+        # Truncated transfer (only meaningful when the body is not content-encoded)
+        content_length = resp_headers.get("Content-Length")
+        if content_length and not resp_headers.get("Content-Encoding") and int(content_length) != size:
+            raise ChecksumMismatchError(f"Truncated download for {url}: {size}/{content_length} bytes")
+
+        if expected_sha256 and sha256_hex != expected_sha256:
+            raise ChecksumMismatchError(f"sha256 mismatch for {url}")
+
+        # Cloud Storage (Firebase) advertises an MD5 of the object
+        goog_hash = resp_headers.get("x-goog-hash", "")
+        for part in goog_hash.split(","):
+            part = part.strip()
+            if part.startswith("md5=") and not resp_headers.get("Content-Encoding"):
+                if base64.b64decode(part[4:]) != md5_digest:
+                    raise ChecksumMismatchError(f"md5 mismatch for {url}")
+
+
+download_manager = DownloadManager()
@@ -0,0 +1,216 @@
+"""
+End card compositor with a cached, per-brand layer.
+
+The end card is three layers:
+1. Background: the per-run hero shot, or the brand's gradient fallback
+2. Brand layer: dark text band + brand logo (identical for every run of a brand)
+3. Text layer: CTA + website (the only per-run drawing)
+
+Gradients are built with NumPy broadcasting instead of one rectangle per row, and the
+brand layer (gradient background included, for the fallback path) is cached per
+brand version, so the logo is fetched, decoded and resized once per brand rather
+than on every run. A brand version changes whenever the logo, colors or the brand
+document's `updated_at` change. A layer rendered without the brand's logo (the fetch or
+decode failed) is used for that card but not cached, so the next run tries the logo again.
+
+Everything here is pure PIL/NumPy without shared mutable state outside the locked
+cache, so the end card renders concurrently with the scene branch. The pipeline calls
+`render_end_card_png` through the CPU process pool (execution/cpu_pool.py); each worker
+process keeps its own brand-layer cache. The logo is fetched by the caller (`fetch_logo`,
+served from the download cache) so workers do no network I/O.
+
+Usage:
+    from execution.end_card import compose_end_card, render_end_card_png
+
+    card = compose_end_card(hero_image_or_None, "Shop Now", "www.example.com", brand=config.get("brand", {}))
+    card.save(output_path)
+
+    png = cpu_pool.run(render_end_card_png, hero_bytes_or_None, "Shop Now", "www.example.com", brand,
+                       logo=fetch_logo(brand))
+"""
+
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from execution.image_pipeline import get_font
+
+CARD_SIZE = (1080, 1920)            # Vertical video
+GRADIENT_COLORS = ((20, 30, 60), (60, 20, 80))  # Dark blue to deep purple
+BAND_TOP = 1300                     # Text readability band at the bottom
+BAND_ALPHA = 150
+LOGO_WIDTH = 400
+LOGO_TOP = 200
+CTA_Y, URL_Y = 1500, 1650
+CTA_FONT_SIZE, URL_FONT_SIZE = 90, 65
+URL_COLOR = "#FFD700"               # Gold
+BLUR_RADIUS = 20                    # Product-photo fallback background
+MAX_CACHED_BRANDS = 32
+
+
+def vertical_gradient(size: Tuple[int, int] = CARD_SIZE, top=GRADIENT_COLORS[0], bottom=GRADIENT_COLORS[1]) -> Image.Image:
+    """Top-to-bottom linear gradient as an RGBA image (one NumPy expression)."""
+    width, height = size
+    ratio = (np.arange(height, dtype=np.float32) / height)[:, None]        # (H, 1)
+    top_c = np.asarray(top, dtype=np.float32)[None, :]                    # (1, 3)
+    bottom_c = np.asarray(bottom, dtype=np.float32)[None, :]
+    rows = (top_c + (bottom_c - top_c) * ratio).astype(np.uint8)          # (H, 3)
+    pixels = np.broadcast_to(rows[:, None, :], (height, width, 3))        # (H, W, 3)
+    return Image.fromarray(np.ascontiguousarray(pixels)).convert("RGBA")
+
+
+def brand_version(brand: Dict[str, Any]) -> str:
+    """Stable identifier of the brand fields that affect the end card."""
+    fields = {k: brand.get(k) for k in ("logo_url", "colors", "updated_at")}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def fetch_logo(brand: Dict[str, Any]) -> Optional[bytes]:
+    """The brand's encoded logo (download cache), or None without a logo / on failure."""
+    logo_url = (brand or {}).get("logo_url")
+    if not logo_url:
+        return None
+    try:
+        from execution.download_manager import download_manager
+        return download_manager.fetch_bytes(logo_url, timeout=10) or None
+    except Exception as e:
+        print(f"Failed to load brand logo: {e}")
+        return None
+
+
+def _load_logo(logo_url: str, logo_bytes: Optional[bytes] = None) -> Optional[Image.Image]:
+    try:
+        if logo_bytes is None:
+            logo_bytes = fetch_logo({"logo_url": logo_url})
+        if not logo_bytes:
+            return None
+        logo_img = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
+        logo_size = (LOGO_WIDTH, int(logo_img.height * LOGO_WIDTH / logo_img.width))
+        return logo_img.resize(logo_size, Image.Resampling.LANCZOS)
+    except Exception as e:
+        print(f"Failed to load brand logo: {e}")
+        return None
+
+
+class BrandLayerCache:
+    """LRU of rendered brand layers keyed by (brand version, with gradient background)."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_BRANDS):
+        self.max_entries = max_entries
+        self._layers: "OrderedDict[Tuple[str, bool], Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def get(self, brand: Dict[str, Any], with_background: bool, logo: Optional[bytes] = None) -> Image.Image:
+        """`logo`: the already-fetched logo bytes (fetched here from `logo_url` when omitted)."""
+        key = (brand_version(brand), with_background)
+        with self._lock:
+            layer = self._layers.get(key)
+            if layer is not None:
+                self._layers.move_to_end(key)
+                return layer
+
+        layer, complete = self._render(brand, with_background, logo)
+        with self._lock:
+            self.renders += 1
+            if not complete:
+                return layer  # Logo missing by accident: don't pin that for the brand version
+            self._layers[key] = layer
+            while len(self._layers) > self.max_entries:
+                self._layers.popitem(last=False)
+        return layer
+
+    def _render(self, brand: Dict[str, Any], with_background: bool,
+                logo: Optional[bytes] = None) -> Tuple[Image.Image, bool]:
+        """The brand layer, and whether it is complete (has the logo if the brand has one)."""
+        if with_background:
+            layer = vertical_gradient(CARD_SIZE)
+        else:
+            layer = Image.new("RGBA", CARD_SIZE, (0, 0, 0, 0))
+
+        band = Image.new("RGBA", CARD_SIZE, (0, 0, 0, 0))
+        ImageDraw.Draw(band).rectangle([(0, BAND_TOP), CARD_SIZE], fill=(0, 0, 0, BAND_ALPHA))
+        layer = Image.alpha_composite(layer, band)
+
+        logo_url = brand.get("logo_url")
+        if logo_url:
+            print(f"Rendering brand layer with logo from {logo_url}")
+            logo_img = _load_logo(logo_url, logo)
+            if logo_img is None:
+                return layer, False
+            lx = (CARD_SIZE[0] - logo_img.width) // 2
+            layer.alpha_composite(logo_img, (lx, LOGO_TOP))
+        return layer, True
+
+    def clear(self):
+        with self._lock:
+            self._layers.clear()
+
+
+brand_layers = BrandLayerCache()
+
+
+def fit_background(img: Image.Image, size: Tuple[int, int] = CARD_SIZE) -> Image.Image:
+    """Resize/crop to fill `size` (RGBA)."""
+    img = img.convert("RGBA")
+    if img.size == size:
+        return img
+    ratio = max(size[0] / img.width, size[1] / img.height)
+    new_size = (int(img.width * ratio), int(img.height * ratio))
+    img = img.resize(new_size, Image.Resampling.LANCZOS)
+    left = (img.width - size[0]) // 2
+    top = (img.height - size[1]) // 2
+    return img.crop((left, top, left + size[0], top + size[1]))
+
+
+def compose_end_card(background: Optional[Image.Image], cta_text: str, website: str,
+                     brand: Optional[Dict[str, Any]] = None, logo: Optional[bytes] = None) -> Image.Image:
+    """Background (or cached gradient) + cached brand layer + per-run text. Returns RGB."""
+    brand = brand or {}
+    if background is None:
+        card = brand_layers.get(brand, with_background=True, logo=logo).copy()
+    else:
+        card = Image.alpha_composite(fit_background(background),
+                                     brand_layers.get(brand, with_background=False, logo=logo))
+
+    draw = ImageDraw.Draw(card)
+
+    def draw_centered(text, y, font, fill):
+        length = draw.textlength(text, font=font)
+        x = (CARD_SIZE[0] - length) // 2
+        draw.text((x, y), text, font=font, fill=fill)
+
+    draw_centered(cta_text or "Shop Now. Link in Bio!", CTA_Y, get_font(CTA_FONT_SIZE), "white")
+    if website:
+        draw_centered(website, URL_Y, get_font(URL_FONT_SIZE), URL_COLOR)
+
+    return card.convert("RGB")
+
+
+def render_end_card_png(background: Optional[bytes], cta_text: str, website: str,
+                        brand: Optional[Dict[str, Any]] = None, blur: bool = False,
+                        logo: Optional[bytes] = None) -> bytes:
+    """
+    CPU-pool task: encoded background (or None for the gradient) and logo in, encoded PNG out.
+    `blur` turns a raw product photo into a soft full-frame background first.
+    """
+    bg = None
+    if background is not None:
+        try:
+            bg = Image.open(io.BytesIO(background)).convert("RGBA")
+            if blur:
+                bg = bg.resize(CARD_SIZE, Image.Resampling.LANCZOS).filter(ImageFilter.GaussianBlur(BLUR_RADIUS))
+        except Exception as e:
+            print(f"Failed to decode end card background: {e}. Using gradient background.")
+            bg = None
+
+    buf = io.BytesIO()
+    # b"": never fetch from the worker; the caller's fetch failed or the brand has no logo
+    compose_end_card(bg, cta_text, website, brand=brand, logo=logo or b"").save(buf, format="PNG")
+    return buf.getvalue()
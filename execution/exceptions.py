@@ -38,3 +38,28 @@ class QuotaExceededException(Exception):
     cannot be recovered by waiting.
     """
     pass
+
+
+class GenerationCancelledException(Exception):
+    """
+    Raised when an in-flight generation is abandoned by the caller
+    (e.g. a hedged scene already fell back to Ken Burns).
+    """
+    pass
+
+
+class ProviderThrottledException(Exception):
+    """
+    Raised when a provider's circuit breaker is open after repeated throttling.
+    Like QuotaExceededException, callers should fall back immediately rather than retry.
+    """
+    pass
+
+
+class RunAbortedException(Exception):
+    """
+    Raised inside a run that this process must stop (see execution/run_control.py),
+    e.g. its render worker lost the job lease and another worker took the run over.
+    The run's terminal writes belong to the new owner and are skipped.
+    """
+    pass
@@ -23,12 +23,16 @@ Usage:
     srt_content = generate_srt_from_words(word_list)
     with open("captions.srt", "w") as f:
         f.write(srt_content)
+
+    # Normalized, transition-ready timeline segment (cached per source clip by assembly)
+    render_segment("scene_Hook.mp4", "segments/seg_ab12.mp4", trim=[0.0, 3.2])
 """
 
 import os
 import subprocess
 import hashlib
 from typing import List, Dict, Optional, Tuple
+from execution.tracing import span
 
 
 def render_ken_burns_ffmpeg(
@@ -115,12 +119,13 @@ def render_ken_burns_ffmpeg(
     print(f"   Zoom: {zoom_start} → {zoom_end}, Duration: {duration}s, FPS: {fps}")
     
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with span("ffmpeg.ken_burns", duration=duration):
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                check=True
+            )
         print(f"✅ Ken Burns rendered successfully")
         return output_path
     except subprocess.CalledProcessError as e:
@@ -349,12 +354,13 @@ Dialogue: 0,{start_ass},{end_ass},Default,,0,0,0,,{caption_text}
     print(f"   Font: {font_name} {font_size}px, Color: {font_color}")
     
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        with span("ffmpeg.burn_subtitles"):
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                text=True,
+                check=True
+            )
         print(f"✅ Subtitles burned successfully")
         return output_path
     except subprocess.CalledProcessError as e:
@@ -364,6 +370,140 @@ Dialogue: 0,{start_ass},{end_ass},Default,,0,0,0,,{caption_text}
         raise RuntimeError(f"FFmpeg subtitle burning failed: {e.stderr}")
 
 
+def trim_video_ffmpeg(
+    video_path: str,
+    output_path: str,
+    start: float = 0.0,
+    end: Optional[float] = None
+) -> str:
+    """
+    Cut a clip to [start, end] seconds.
+
+    Cuts that start at 0 use stream copy (no decode/encode, ~instant): the first frame is
+    a keyframe, so only the tail is dropped. Cuts that start mid-clip (e.g. the second half
+    of a packed Veo clip) must re-encode that segment to be frame-accurate.
+
+    Args:
+        video_path: Input video file
+        output_path: Output video file
+        start: Start of the kept segment in seconds
+        end: End of the kept segment in seconds (None = end of clip)
+
+    Returns:
+        Path to output video file
+    """
+    cmd = ["ffmpeg", "-y"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", video_path]
+    if end is not None:
+        cmd += ["-t", f"{max(0.0, end - start):.3f}"]
+    if start > 0:
+        cmd += ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-c:a", "aac"]
+    else:
+        cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+    cmd.append(output_path)
+
+    mode = "re-encode" if start > 0 else "stream copy"
+    print(f"✂️  FFmpeg Trim ({mode}): {os.path.basename(video_path)} [{start:.2f}s → {end if end is not None else 'end'}]")
+
+    try:
+        with span("ffmpeg.trim", mode=mode):
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return output_path
+    except subprocess.CalledProcessError as e:
+        print(f"❌ FFmpeg trim failed:")
+        print(f"   Command: {' '.join(cmd)}")
+        print(f"   STDERR: {e.stderr}")
+        raise RuntimeError(f"FFmpeg trim failed: {e.stderr}")
+
+
+def probe_duration(video_path: str) -> Optional[float]:
+    """Container duration in seconds (ffprobe), or None if it cannot be read."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", video_path],
+            capture_output=True, text=True, check=True
+        )
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+        return None
+
+
+def render_segment(
+    video_path: str,
+    output_path: str,
+    trim: Optional[Tuple[float, Optional[float]]] = None,
+    width: int = 1080,
+    height: int = 1920,
+    flash: float = 0.6
+) -> str:
+    """
+    Encode one timeline segment in a single FFmpeg pass: cut to `trim`, scale to fill
+    width x height and center-crop (same framing as assembly's normalize_to_9_16),
+    then fade to white over the last `flash` seconds (the scene transition).
+
+    The result can be concatenated as-is, so an unchanged scene is encoded once and
+    reused by later assemblies of the same run (e.g. a scene regeneration).
+
+    Args:
+        video_path: Input clip
+        output_path: Output segment
+        trim: Optional [start, end] in seconds (end None = end of clip)
+        width, height: Output frame size
+        flash: White fade-out length in seconds (0 = none)
+
+    Returns:
+        Path to output segment
+    """
+    start, end = (trim[0], trim[1]) if trim else (0.0, None)
+    duration = (end - start) if end is not None else None
+    if duration is None:
+        full = probe_duration(video_path)
+        duration = (full - start) if full else None
+
+    filters = [
+        f"scale={width}:{height}:force_original_aspect_ratio=increase",
+        f"crop={width}:{height}",
+        "setsar=1",
+    ]
+    if flash and duration and duration > flash:
+        filters.append(f"fade=t=out:st={duration - flash:.3f}:d={flash:.3f}:color=white")
+
+    cmd = ["ffmpeg", "-y"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", video_path]
+    if duration is not None:
+        cmd += ["-t", f"{max(0.0, duration):.3f}"]
+    cmd += [
+        "-map", "0:v:0", "-map", "0:a?",
+        "-vf", ",".join(filters),
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-ar", "44100",
+        output_path
+    ]
+
+    print(f"🧩 FFmpeg Segment: {os.path.basename(video_path)} → {os.path.basename(output_path)}")
+    try:
+        with span("ffmpeg.segment", duration=duration):
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return output_path
+    except subprocess.CalledProcessError as e:
+        print(f"❌ FFmpeg segment render failed:")
+        print(f"   Command: {' '.join(cmd)}")
+        print(f"   STDERR: {e.stderr}")
+        raise RuntimeError(f"FFmpeg segment rendering failed: {e.stderr}")
+
+
+def segment_cache_key(video_path: str, trim=None, width: int = 1080, height: int = 1920, flash: float = 0.6) -> str:
+    """Identifies an encoded segment by its source file (path, size, mtime) and render settings."""
+    stat = os.stat(video_path)
+    raw = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}|{trim}|{width}x{height}|{flash}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
 def check_ffmpeg_available() -> bool:
     """
     Check if FFmpeg is available on the system.
@@ -0,0 +1,148 @@
+"""
+Compact delivery renditions (WebP/AVIF/JPEG at several widths) for finalized images.
+
+Scene images, the character anchor and the end card are produced as lossless PNG
+because models consume them (Veo, multimodal references, assembly). Browsers do not
+need that: feed thumbnails, the library and the editor only show them at 270-1080px.
+When an image is finalized, the source is decoded once and one rendition per
+(width, format) is encoded (in a CPU-pool worker) and uploaded with long cache headers. The
+uploads run concurrently, and the scene thread overlaps them with the original's upload.
+The renditions are exposed in `remote_assets` next to the original:
+
+    "Hook_image"               -> original PNG (kept for models / regeneration)
+    "Hook_image_540w_webp"     -> 540px wide WebP
+    "Hook_image_1080w_jpeg"    -> 1080px wide JPEG (fallback for old clients)
+
+Widths never upscale: a 768px source gets 270w, 540w and a 768px "1080w" rendition
+(the key stays stable so clients can rely on it).
+
+Config / env:
+    image_derivatives (config, default True)      - Enable/disable renditions
+    IMAGE_DERIVATIVE_WIDTHS (default "270,540,1080")
+    IMAGE_DERIVATIVE_FORMATS (default "webp,jpeg"; "avif" needs Pillow with AVIF support)
+    IMAGE_DERIVATIVE_UPLOAD_WORKERS (default 6)   - Concurrent rendition uploads per image
+
+Usage:
+    from execution.image_derivatives import render_derivatives, derivative_key
+
+    for (width, fmt), (data, mime) in render_derivatives(png_path).items():
+        key = derivative_key("Hook_image", width, fmt)
+"""
+
+import io
+import os
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, features
+
+DERIVATIVE_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_DERIVATIVE_WIDTHS", "270,540,1080").split(",") if w.strip())
+DERIVATIVE_FORMATS = tuple(f.strip().lower() for f in os.getenv("IMAGE_DERIVATIVE_FORMATS", "webp,jpeg").split(",") if f.strip())
+UPLOAD_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_UPLOAD_WORKERS", "6"))
+
+_PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "avif": "AVIF"}
+_MIME_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "avif": "image/avif"}
+_QUALITY = {"webp": 80, "jpeg": 82, "avif": 60}
+
+_KEY_PATTERN = re.compile(r"_\d+w_(webp|jpeg|avif)$")
+
+
+def derivative_key(asset_key: str, width: int, fmt: str) -> str:
+    """remote_assets key of a rendition, e.g. "Hook_image_540w_webp"."""
+    return f"{asset_key}_{width}w_{fmt}"
+
+
+def is_derivative_key(key: str) -> bool:
+    return bool(_KEY_PATTERN.search(key))
+
+
+def supported_formats(formats: Iterable[str] = DERIVATIVE_FORMATS) -> Tuple[str, ...]:
+    """Requested formats this Pillow build can encode (AVIF is optional)."""
+    out = []
+    for fmt in formats:
+        if fmt not in _PIL_FORMATS:
+            continue
+        if fmt == "avif" and not features.check("avif"):
+            continue
+        if fmt == "webp" and not features.check("webp"):
+            continue
+        out.append(fmt)
+    return tuple(out)
+
+
+def render_derivatives(source, widths: Iterable[int] = DERIVATIVE_WIDTHS,
+                       formats: Iterable[str] = DERIVATIVE_FORMATS) -> Dict[Tuple[int, str], Tuple[bytes, str]]:
+    """
+    Encodes every (width, format) rendition of `source` (a path or encoded bytes).
+    The source is decoded once; each width is resized once and shared by all formats.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        from execution.image_pipeline import encoded_bytes
+        data, _ = encoded_bytes(source)
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        base = img.convert("RGB")
+
+    fmts = supported_formats(formats)
+    out: Dict[Tuple[int, str], Tuple[bytes, str]] = {}
+    for width in sorted(set(widths)):
+        target_w = min(width, base.width)
+        if target_w == base.width:
+            resized = base
+        else:
+            target_h = max(1, round(base.height * target_w / base.width))
+            resized = base.resize((target_w, target_h), Image.Resampling.LANCZOS)
+        for fmt in fmts:
+            buf = io.BytesIO()
+            resized.save(buf, format=_PIL_FORMATS[fmt], quality=_QUALITY[fmt], optimize=fmt == "jpeg")
+            out[(width, fmt)] = (buf.getvalue(), _MIME_TYPES[fmt])
+    return out
+
+
+def derivative_destination(destination: str, width: int, fmt: str) -> str:
+    """Bucket path of a rendition next to the original: runs/x/Hook.png -> runs/x/Hook_540w.webp"""
+    root, _ = os.path.splitext(destination)
+    ext = "jpg" if fmt == "jpeg" else fmt
+    return f"{root}_{width}w.{ext}"
+
+
+def publish_derivatives(local_path: str, asset_key: str, destination: str, config: Optional[Dict] = None) -> Dict[str, str]:
+    """
+    Renders and uploads the renditions of a finalized image (uploads run concurrently).
+    Returns the `remote_assets` entries ({derivative_key: url}); best effort.
+    """
+    if not (config or {}).get("image_derivatives", True):
+        return {}
+    try:
+        from projects.backend.services.storage_service import storage_service
+        from execution.cpu_pool import cpu_pool
+        from execution.image_pipeline import encoded_bytes
+        from execution.run_logging import ContextThreadPoolExecutor
+
+        source, _ = encoded_bytes(local_path)  # Read here: the pipeline cache lives in this process
+        renditions = cpu_pool.run(render_derivatives, source)
+
+        def upload(item):
+            (width, fmt), (data, mime) = item
+            try:
+                return derivative_key(asset_key, width, fmt), storage_service.upload_bytes(
+                    data, derivative_destination(destination, width, fmt), mime), len(data)
+            except Exception as e:
+                print(f"⚠️ Rendition {width}w {fmt} of {asset_key} not uploaded: {e}")
+                return None, None, 0
+
+        urls = {}
+        total = 0
+        with ContextThreadPoolExecutor(max_workers=max(1, min(UPLOAD_WORKERS, len(renditions)))) as executor:
+            for key, url, size in executor.map(upload, renditions.items()):
+                if url:
+                    urls[key] = url
+                    total += size
+        print(f"🖼️ Renditions for {asset_key}: {len(urls)} uploaded ({total // 1024} KB total)")
+        return urls
+    except Exception as e:
+        print(f"⚠️ Renditions skipped for {asset_key}: {e}")
+        return {}
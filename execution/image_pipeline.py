@@ -0,0 +1,218 @@
+"""
+Single-encode, in-memory pipeline for generated scene images.
+
+A generated image used to be encoded/decoded several times: saved as PNG, reopened
+for the watermark and saved again, then read back from disk for Veo and once more
+by the uploader. The pipeline decodes the provider output once, applies all
+post-processing (watermark, aspect crop) in memory and encodes exactly once per
+output format. When nothing changes the pixels, the provider's own bytes are kept
+as-is (zero re-encodes).
+
+The encoded bytes are kept in a small LRU keyed by output path so the video provider
+and the uploader share them instead of reading the file back.
+
+The decode/watermark/encode step itself runs in the CPU process pool
+(execution/cpu_pool.py) via `process_image_file`: bytes go in, encoded bytes come
+back, and the file write and the LRU stay in the calling process.
+
+Usage:
+    from execution.image_pipeline import process_image_file, encoded_bytes
+
+    process_image_file(raw_png_bytes, output_path, watermark_text="IGNITE AI", aspect_ratio="9:16")
+
+    processed = process_image(raw_png_bytes, watermark_text="IGNITE AI")  # In-process variant
+    processed.save(output_path)              # Writes + caches the PNG bytes
+
+    data, mime = encoded_bytes(output_path)  # Cache hit, or one disk read
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+ENCODED_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_MB", "64")) * 1024 * 1024
+ASPECT_TOLERANCE = 0.01  # Relative aspect error tolerated before cropping
+
+FORMAT_MIME = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@lru_cache(maxsize=32)
+def get_font(size: int):
+    """Helper to find a usable font across different OS environments (cached per size)."""
+    possible_fonts = [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/System/Library/Fonts/Supplemental/Arial.ttf",
+        "/System/Library/Fonts/Helvetica.ttc",
+        "Arial.ttf",
+        "DejaVuSans.ttf"
+    ]
+    for p in possible_fonts:
+        try:
+            if os.path.exists(p) or "/" not in p: # Try path or just name
+                return ImageFont.truetype(p, size)
+        except:
+            continue
+    return ImageFont.load_default()
+
+
+# --- In-memory post-processing ---
+
+def watermark(img: Image.Image, text: str = "IGNITE AI") -> Image.Image:
+    """Returns `img` with a semi-transparent text watermark (bottom right)."""
+    base = img.convert("RGBA")
+    txt_layer = Image.new("RGBA", base.size, (255, 255, 255, 0))
+    draw = ImageDraw.Draw(txt_layer)
+
+    font_size = int(base.width * 0.05) # 5% of width
+    font = get_font(font_size)
+
+    x = base.width - (len(text) * font_size * 0.6) - 20
+    y = base.height - font_size - 20
+    draw.text((x, y), text, font=font, fill=(255, 255, 255, 128)) # 50% opacity
+
+    return Image.alpha_composite(base, txt_layer).convert("RGB")
+
+
+def crop_to_aspect(img: Image.Image, aspect_ratio: str) -> Image.Image:
+    """Center-crops to "W:H" if the image is off by more than ASPECT_TOLERANCE."""
+    try:
+        w, h = (float(v) for v in aspect_ratio.split(":"))
+    except (ValueError, AttributeError):
+        return img
+    target = w / h
+    current = img.width / img.height
+    if abs(current - target) / target <= ASPECT_TOLERANCE:
+        return img
+    if current > target:
+        new_w = int(round(img.height * target))
+        left = (img.width - new_w) // 2
+        return img.crop((left, 0, left + new_w, img.height))
+    new_h = int(round(img.width / target))
+    top = (img.height - new_h) // 2
+    return img.crop((0, top, img.width, top + new_h))
+
+
+class ProcessedImage:
+    """A decoded image plus its encodings (each format encoded at most once)."""
+
+    def __init__(self, image: Image.Image, source_bytes: Optional[bytes] = None, source_format: Optional[str] = None):
+        self.image = image
+        self._encoded: Dict[str, bytes] = {}
+        if source_bytes is not None and source_format:
+            # Pixels unchanged: the provider's bytes are the encoding
+            self._encoded[source_format.upper()] = source_bytes
+
+    def encode(self, fmt: str = "PNG") -> bytes:
+        fmt = fmt.upper()
+        data = self._encoded.get(fmt)
+        if data is None:
+            buf = io.BytesIO()
+            img = self.image.convert("RGB") if fmt == "JPEG" else self.image
+            save_kwargs = {"quality": 90, "optimize": True} if fmt in ("JPEG", "WEBP") else {}
+            img.save(buf, format=fmt, **save_kwargs)
+            data = buf.getvalue()
+            self._encoded[fmt] = data
+        return data
+
+    def save(self, output_path: str, fmt: str = "PNG") -> str:
+        return save_encoded(output_path, self.encode(fmt), FORMAT_MIME.get(fmt.upper(), "application/octet-stream"))
+
+
+def process_image(raw: bytes, watermark_text: Optional[str] = None, aspect_ratio: Optional[str] = None) -> ProcessedImage:
+    """Decodes provider output once and applies post-processing in memory."""
+    img = Image.open(io.BytesIO(raw))
+    source_format = img.format
+    img.load()
+
+    changed = False
+    if aspect_ratio:
+        cropped = crop_to_aspect(img, aspect_ratio)
+        changed = cropped is not img
+        img = cropped
+    if watermark_text:
+        img = watermark(img, watermark_text)
+        changed = True
+
+    return ProcessedImage(img, source_bytes=None if changed else raw, source_format=source_format)
+
+
+def render_image(raw: bytes, watermark_text: Optional[str] = None, aspect_ratio: Optional[str] = None,
+                 fmt: str = "PNG") -> Tuple[bytes, str]:
+    """CPU-pool task: provider bytes in, (encoded bytes, mime type) out."""
+    data = process_image(raw, watermark_text=watermark_text, aspect_ratio=aspect_ratio).encode(fmt)
+    return data, FORMAT_MIME.get(fmt.upper(), "application/octet-stream")
+
+
+def process_image_file(raw: bytes, output_path: str, watermark_text: Optional[str] = None,
+                       aspect_ratio: Optional[str] = None, fmt: str = "PNG") -> str:
+    """`process_image(...).save(output_path)` with the pixel work in a CPU-pool worker."""
+    from execution.cpu_pool import cpu_pool
+    data, mime = cpu_pool.run(render_image, raw, watermark_text, aspect_ratio, fmt)
+    return save_encoded(output_path, data, mime)
+
+
+def save_encoded(output_path: str, data: bytes, mime_type: str) -> str:
+    """Writes encoded bytes to `output_path` and caches them for the video provider / uploader."""
+    with open(output_path, "wb") as f:
+        f.write(data)
+    remember(output_path, data, mime_type)
+    return output_path
+
+
+# --- Shared encoded bytes (video provider, uploader) ---
+
+_cache: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_cache_size = 0
+_cache_lock = threading.Lock()
+
+
+def remember(path: str, data: bytes, mime_type: str):
+    """Caches the encoded bytes written to `path` (LRU, bounded by ENCODED_CACHE_BYTES)."""
+    global _cache_size
+    key = os.path.abspath(path)
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old:
+            _cache_size -= len(old[0])
+        _cache[key] = (data, mime_type)
+        _cache_size += len(data)
+        while _cache_size > ENCODED_CACHE_BYTES and len(_cache) > 1:
+            _, (evicted, _) = _cache.popitem(last=False)
+            _cache_size -= len(evicted)
+
+
+def cached_bytes(path: str) -> Optional[Tuple[bytes, str]]:
+    """(bytes, mime_type) if `path` was written by the pipeline and is still cached."""
+    key = os.path.abspath(path)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+        return entry
+
+
+def encoded_bytes(path: str) -> Tuple[bytes, str]:
+    """Encoded bytes for `path`: from the cache, or a single disk read."""
+    entry = cached_bytes(path)
+    if entry is not None:
+        return entry
+    with open(path, "rb") as f:
+        data = f.read()
+    ext = os.path.splitext(path)[1].lower()
+    mime = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp"}.get(ext, "application/octet-stream")
+    return data, mime
+
+
+def forget(path: str):
+    global _cache_size
+    with _cache_lock:
+        entry = _cache.pop(os.path.abspath(path), None)
+        if entry:
+            _cache_size -= len(entry[0])
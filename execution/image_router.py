@@ -0,0 +1,202 @@
+"""
+Latency-aware routing between image models.
+
+Keeps per-model health for every image model we can call (Gemini multimodal, Imagen,
+DALL-E 3):
+- EWMA latency of successful calls
+- EWMA error rate
+- p95 over the recent latency window
+
+Each request goes to the user's selected model unless it is unhealthy, among the
+candidates that satisfy its constraints (e.g. a product reference image can only go to a
+multimodal model). A model whose error rate or p95 degrades drops to the back of the list
+before it starts failing requests, and a failed call fails over to the next candidate.
+The model that actually ran is written to config["image_route"] (a dict, if the caller
+passes one) so usage and cost are reported against it.
+
+Routing modes (config["image_routing"], env IMAGE_ROUTING):
+- "provider" (default): the selected model stays first; failover stays on its provider
+- "pinned": as "provider", but failover may cross providers
+- "fastest": the selected model competes with every candidate on latency (customer
+  requests probe other providers' models; opt-in)
+- "off": only the selected model, no failover
+
+Usage:
+    from execution.image_router import image_router
+
+    route = {}
+    image_router.generate({**config, "image_route": route}, lambda model: provider_call(model),
+                          preferred="gemini-2.5-flash-image", needs_reference=True)
+    billed_model = route["model"]
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from execution.exceptions import GenerationCancelledException
+from execution.tracing import span
+
+# model -> capabilities
+IMAGE_ROUTES = {
+    "gemini-2.5-flash-image": {"provider": "google", "reference": True},
+    "gemini-3-pro-image-preview": {"provider": "google", "reference": True},
+    "imagen-4.0-generate-001": {"provider": "google", "reference": False},
+    "imagen-4.0-fast-generate-001": {"provider": "google", "reference": False},
+    "dall-e-3": {"provider": "openai", "reference": False},
+}
+
+# Models eligible as alternatives to the selected one (premium models only run when selected)
+ROUTE_CANDIDATES = [
+    m.strip() for m in os.getenv("IMAGE_ROUTE_CANDIDATES", "gemini-2.5-flash-image,imagen-4.0-generate-001,dall-e-3").split(",")
+    if m.strip()
+]
+
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 50           # Samples kept for p95
+P95_BUDGET = float(os.getenv("IMAGE_P95_BUDGET_SECONDS", "45"))
+DEFAULT_MODE = os.getenv("IMAGE_ROUTING", "provider").lower()
+ERROR_RATE_LIMIT = 0.5
+MIN_SAMPLES = 3               # Before error rate / p95 can mark a model unhealthy
+STALE_AFTER = 300.0           # Seconds without samples before a model is re-probed
+
+
+def route_provider(model: str) -> str:
+    """MediaFactory provider name for an image model."""
+    route = IMAGE_ROUTES.get(model)
+    if route:
+        return route["provider"]
+    return "openai" if "dall-e" in model or "openai" in model else "google"
+
+
+def supports_reference(model: str) -> bool:
+    route = IMAGE_ROUTES.get(model)
+    if route:
+        return route["reference"]
+    return "gemini" in model
+
+
+class ModelHealth:
+    """Rolling latency/error statistics for one image model."""
+
+    def __init__(self):
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.samples = 0
+        self.last_seen = 0.0
+
+    def record(self, seconds: float, ok: bool):
+        self.samples += 1
+        self.last_seen = time.time()
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if ok:
+            self.latencies.append(seconds)
+            if self.ewma_latency is None:
+                self.ewma_latency = seconds
+            else:
+                self.ewma_latency = (1 - EWMA_ALPHA) * self.ewma_latency + EWMA_ALPHA * seconds
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def is_stale(self) -> bool:
+        return time.time() - self.last_seen > STALE_AFTER
+
+    def is_healthy(self) -> bool:
+        if self.samples < MIN_SAMPLES or self.is_stale():
+            return True
+        if self.error_rate > ERROR_RATE_LIMIT:
+            return False
+        p95 = self.p95()
+        return p95 is None or len(self.latencies) < MIN_SAMPLES or p95 <= P95_BUDGET
+
+
+class ImageRouter:
+    """Routes image requests to a healthy model, failing over down the ranking."""
+
+    def __init__(self, candidates: Optional[List[str]] = None):
+        self.candidates = list(candidates if candidates is not None else ROUTE_CANDIDATES)
+        self._health: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float, ok: bool):
+        with self._lock:
+            self._health.setdefault(model, ModelHealth()).record(seconds, ok)
+
+    def rank(self, preferred: str, needs_reference: bool = False, mode: str = DEFAULT_MODE) -> List[str]:
+        """Candidate models in the order they should be tried."""
+        if mode == "off":
+            return [preferred]
+
+        models = [preferred] + [m for m in self.candidates if m != preferred]
+        if needs_reference:
+            models = [m for m in models if m == preferred or supports_reference(m)]
+        else:
+            models = [m for m in models if m == preferred or not IMAGE_ROUTES.get(m, {}).get("reference")]
+        if mode == "provider":
+            models = [m for m in models if route_provider(m) == route_provider(preferred)]
+
+        with self._lock:
+            def key(item):
+                position, model = item
+                health = self._health.get(model)
+                healthy = health is None or health.is_healthy()
+                if mode != "fastest":
+                    return (not healthy, position)
+                # Models without fresh samples are probed (optimistic), preferred first
+                if health is None or health.ewma_latency is None or health.is_stale():
+                    return (not healthy, 0.0, position)
+                return (not healthy, health.ewma_latency, position)
+
+            return [m for _, m in sorted(enumerate(models), key=key)]
+
+    def generate(self, config: Dict[str, Any], attempt: Callable[[str], Any], preferred: str, needs_reference: bool = False):
+        """
+        Calls `attempt(model)` on the best candidate, failing over down the ranking.
+        Raises the last error if every candidate fails.
+        """
+        mode = config.get("image_routing", DEFAULT_MODE).lower()
+        order = self.rank(preferred, needs_reference=needs_reference, mode=mode)
+        if order and order[0] != preferred:
+            print(f"🧭 Image router: {order[0]} is currently faster/healthier than {preferred}")
+
+        last_error = None
+        for model in order:
+            started = time.time()
+            try:
+                with span("image.generate", model=model, provider=route_provider(model), reference=needs_reference):
+                    result = attempt(model)
+                self.record(model, time.time() - started, ok=True)
+                if config.get("image_route") is not None:
+                    config["image_route"]["model"] = model
+                return result
+            except GenerationCancelledException:
+                raise
+            except Exception as e:
+                self.record(model, time.time() - started, ok=False)
+                last_error = e
+                if model != order[-1]:
+                    print(f"⚠️ Image model {model} failed ({e}). Failing over.")
+        raise last_error
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {
+                model: {
+                    "ewma_latency": round(h.ewma_latency, 2) if h.ewma_latency is not None else None,
+                    "p95": round(h.p95(), 2) if h.p95() is not None else None,
+                    "error_rate": round(h.error_rate, 3),
+                    "samples": h.samples,
+                    "healthy": h.is_healthy(),
+                }
+                for model, h in self._health.items()
+            }
+
+
+image_router = ImageRouter()
@@ -0,0 +1,235 @@
+"""
+API key pool for Google media models (Veo, Imagen, Gemini image).
+
+Throughput on a single GEMINI_API_KEY is capped by that project's RPM/RPD. The pool
+holds several keys (GEMINI_API_KEYS="key1,key2,..."; falls back to GEMINI_API_KEY),
+each with its own quota bucket in RateLimitService ("model@key_id") and its own
+client in the client registry. Requests are routed to the key with the most
+headroom, and a key that exhausts its daily quota drains out of rotation until the
+quota resets. Capacity therefore scales with the number of keys.
+
+Usage:
+    from execution.key_pool import key_pool
+
+    pooled = key_pool.reserve("veo-3.1-fast-generate-preview")  # picks key + records the request
+    client = client_registry.get("genai", pooled.api_key)
+
+    # Or pick first and record once the request can actually be sent (e.g. inside a slot)
+    pooled = key_pool.select(model_name)
+    with controller.slot():
+        if not key_pool.record(pooled, model_name):  # Key out of daily quota (drained)
+            ...
+
+    # On a daily-quota error from the API itself
+    key_pool.drain(pooled, model_name)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from execution.client_registry import key_id as make_key_id
+from execution.exceptions import QuotaExceededException
+
+
+class PooledKey:
+    """One API key (credential/project) in the pool."""
+
+    def __init__(self, api_key: str, index: int):
+        self.api_key = api_key
+        self.key_id = make_key_id(api_key)
+        self.label = f"key{index}:{self.key_id}"
+
+    def __repr__(self):
+        return f"PooledKey({self.label})"
+
+
+def next_quota_reset(now: Optional[datetime] = None) -> float:
+    """Daily quotas reset at midnight Pacific (approximated as 08:00 UTC, as in RateLimitService)."""
+    now = now or datetime.now(timezone.utc)
+    reset = datetime(now.year, now.month, now.day, 8, 0, 0, tzinfo=timezone.utc)
+    if now >= reset:
+        reset += timedelta(days=1)
+    return reset.timestamp()
+
+
+def is_daily_quota_error(error: Exception) -> bool:
+    """True when the API itself reports a per-day quota (not a transient RPM 429)."""
+    error_str = str(error).lower()
+    return "perday" in error_str or "per day" in error_str or "per_day" in error_str
+
+
+class RateLimiterQuotaBackend:
+    """Quota state backed by the shared RateLimitService (file-locked, cross-process)."""
+
+    def __init__(self):
+        from projects.backend.services.rate_limiter import rate_limiter
+        self.rate_limiter = rate_limiter
+
+    def get_headroom(self, model: str, key_id: str) -> Optional[Tuple[int, int]]:
+        return self.rate_limiter.get_headroom(model, key_id=key_id)
+
+    def check_and_wait(self, model: str, key_id: str):
+        self.rate_limiter.check_and_wait(model, key_id=key_id)
+
+
+class InMemoryQuotaBackend:
+    """
+    Local fake quota backend (no files, no network) for tests and simulations.
+    Waiting for an RPM slot advances a fake clock instead of sleeping.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, int]]):
+        self.limits = limits  # model -> {"rpm": int, "rpd": int}
+        self.now = 0.0
+        self.waited = 0.0
+        self.daily: Dict[Tuple[str, str], int] = {}
+        self.timestamps: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def get_headroom(self, model: str, key_id: str) -> Optional[Tuple[int, int]]:
+        limits = self.limits.get(model)
+        if not limits:
+            return None
+        with self._lock:
+            recent = [t for t in self.timestamps.get((model, key_id), []) if self.now - t < 60]
+            return max(0, limits["rpm"] - len(recent)), max(0, limits["rpd"] - self.daily.get((model, key_id), 0))
+
+    def check_and_wait(self, model: str, key_id: str):
+        limits = self.limits.get(model)
+        if not limits:
+            return
+        with self._lock:
+            bucket = (model, key_id)
+            if self.daily.get(bucket, 0) >= limits["rpd"]:
+                raise QuotaExceededException(f"Daily Rate Limit Exceeded for {model}@{key_id}")
+            recent = [t for t in self.timestamps.get(bucket, []) if self.now - t < 60]
+            if len(recent) >= limits["rpm"]:
+                wait = 60 - (self.now - recent[0])
+                self.now += wait
+                self.waited += wait
+                recent = [t for t in recent if self.now - t < 60]
+            recent.append(self.now)
+            self.timestamps[bucket] = recent
+            self.daily[bucket] = self.daily.get(bucket, 0) + 1
+
+
+def _default_backend():
+    try:
+        return RateLimiterQuotaBackend()
+    except Exception as e:
+        print(f"ℹ️  Rate limiter unavailable for key pool ({type(e).__name__}). Routing without quota state.")
+        return None
+
+
+def _keys_from_env() -> List[str]:
+    raw = os.getenv("GEMINI_API_KEYS", "")
+    keys = [k.strip() for k in raw.split(",") if k.strip()]
+    if not keys and os.getenv("GEMINI_API_KEY"):
+        keys = [os.getenv("GEMINI_API_KEY")]
+    return keys
+
+
+class KeyPool:
+    """Routes requests across API keys by remaining quota headroom."""
+
+    def __init__(self, api_keys: Optional[List[str]] = None, backend=None):
+        keys = api_keys if api_keys is not None else _keys_from_env()
+        # De-duplicate while keeping order
+        self.keys = [PooledKey(k, i) for i, k in enumerate(dict.fromkeys(keys))]
+        self._backend = backend
+        self._backend_loaded = backend is not None
+        self._lock = threading.Lock()
+        self._drained: Dict[Tuple[str, str], float] = {}  # (model, key_id) -> drained until
+        self._last_used: Dict[str, float] = {}
+        self._sequence = 0
+
+    @property
+    def backend(self):
+        if not self._backend_loaded:
+            self._backend = _default_backend()
+            self._backend_loaded = True
+        return self._backend
+
+    def __len__(self):
+        return len(self.keys)
+
+    # --- Rotation ---
+
+    def is_drained(self, key: PooledKey, model: str) -> bool:
+        until = self._drained.get((model, key.key_id))
+        if until is None:
+            return False
+        if time.time() >= until:
+            self._drained.pop((model, key.key_id), None)
+            return False
+        return True
+
+    def drain(self, key: PooledKey, model: str, until: Optional[float] = None):
+        """Takes `key` out of rotation for `model` until its daily quota resets."""
+        with self._lock:
+            self._drained[(model, key.key_id)] = until or next_quota_reset()
+        active = len(self.keys) - sum(1 for k in self.keys if self.is_drained(k, model))
+        print(f"🔑 Key {key.label} drained for {model} (daily quota). {active}/{len(self.keys)} keys still active.")
+
+    def select(self, model: str, exclude: Iterable[str] = ()) -> PooledKey:
+        """
+        Returns the active key with the most headroom for `model`: keys with a free RPM
+        slot first, then most daily quota left, then most RPM left, then least recently used.
+        """
+        excluded = set(exclude)
+        candidates = [k for k in self.keys if k.key_id not in excluded and not self.is_drained(k, model)]
+        if not candidates:
+            raise QuotaExceededException(f"All {len(self.keys)} API key(s) exhausted or unavailable for {model}")
+
+        backend = self.backend
+
+        def rank(key: PooledKey):
+            headroom = backend.get_headroom(model, key.key_id) if backend else None
+            rpm_left, rpd_left = headroom if headroom is not None else (float("inf"), float("inf"))
+            return (rpm_left > 0, rpd_left, rpm_left, -self._last_used.get(key.key_id, 0))
+
+        with self._lock:
+            best = max(candidates, key=rank)
+            self._sequence += 1
+            self._last_used[best.key_id] = self._sequence
+        return best
+
+    def reserve(self, model: str, exclude: Iterable[str] = ()) -> PooledKey:
+        """
+        Selects a key and records the request against its quota (waiting for an RPM slot
+        if needed). Keys that turn out to be out of daily quota are drained and skipped.
+        """
+        excluded = set(exclude)
+        while True:
+            key = self.select(model, exclude=excluded)
+            if self.record(key, model):
+                return key
+            excluded.add(key.key_id)
+
+    def record(self, key: PooledKey, model: str) -> bool:
+        """
+        Records a request against `key`'s quota (waiting for an RPM slot if needed).
+        Returns False, with the key drained, when it is out of daily quota.
+        """
+        backend = self.backend
+        if not backend:
+            return True
+        try:
+            backend.check_and_wait(model, key.key_id)
+            return True
+        except QuotaExceededException:
+            self.drain(key, model)
+            return False
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        out = {}
+        for key in self.keys:
+            drained_models = [m for (m, kid) in list(self._drained) if kid == key.key_id and self.is_drained(key, m)]
+            out[key.label] = {"drained_models": drained_models}
+        return out
+
+
+key_pool = KeyPool()
@@ -3,6 +3,12 @@ import json
 from typing import Dict, Any, Union, List
 from litellm import completion
 
+from execution.tracing import span
+from execution.simulation import SIMULATION_MODE
+
+if SIMULATION_MODE:
+    from execution.simulation import simulated_completion as completion
+
 def get_llm_provider():
     return os.getenv("LLM_PROVIDER", "gemini").lower()
 
@@ -60,7 +66,8 @@ def generate_content_json(system_prompt: str, user_prompt: Union[str, List[Dict[
         kwargs["response_format"] = {"type": "json_object"}
 
     try:
-        response = completion(**kwargs)
+        with span("llm.completion", model=model, provider=provider, use_case=use_case):
+            response = completion(**kwargs)
         
         content = response.choices[0].message.content
         
@@ -113,15 +120,16 @@ def generate_content_json_with_fallback(system_prompt: str, user_prompt: Union[s
             
             print(f"--- LLM Factory: Attempting Model '{model}' (tier: {tier}) ---")
             
-            response = completion(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.8
-            )
+            with span("llm.completion", model=model, tier=tier, use_case=use_case):
+                response = completion(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.8
+                )
             
             content = response.choices[0].message.content
             
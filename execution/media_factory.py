@@ -5,18 +5,35 @@ from typing import Dict, Any, Optional, Tuple
 import threading
 
 try:
-    from google import genai
     from google.genai import types
 except ImportError:
     pass
 
-from openai import OpenAI
-import requests
+from execution.client_registry import client_registry
+from execution.provider_control import get_controller, is_throttle_error, parse_retry_after
+from execution.key_pool import key_pool, is_daily_quota_error
+from execution.exceptions import ProviderThrottledException
+from execution.tracing import span
+
+VEO_POLL_SECONDS = 10.0       # Operation poll interval
+VEO_OBSERVE_SECONDS = 900.0   # An abandoned operation is still polled this long for its true latency
+
+
+def _observe_abandoned(client, operation, model_name: str, submitted_at: float, observer):
+    """
+    Keeps polling an operation the caller stopped waiting for (nothing is downloaded) and
+    reports its completion time, so latency samples are not cut off at the hedge deadline.
+    """
+    try:
+        while not operation.done and time.time() - submitted_at < VEO_OBSERVE_SECONDS:
+            time.sleep(VEO_POLL_SECONDS)
+            operation = client.operations.get(operation)
+        if operation.done and operation.response and operation.response.generated_videos:
+            observer(model_name, time.time() - submitted_at)
+            print(f"⏱️ Abandoned Veo operation {operation.name} finished after {time.time() - submitted_at:.0f}s")
+    except Exception as e:
+        print(f"⚠️ Stopped observing Veo operation {operation.name}: {e}")
 
-# GLOBAL LOCK: Ensures only one thread calls Veo API at a time
-# This prevents race conditions where multiple threads pass rate limit check
-# but then all hit the API simultaneously, causing cascading 429 errors
-VEO_API_LOCK = threading.Lock()
 
 # Factory Base Class
 class MediaProvider(ABC):
@@ -32,7 +49,11 @@ class MediaProvider(ABC):
 class OpenAIMediaProvider(MediaProvider):
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key)
+
+    @property
+    def client(self):
+        # Shared, warm client from the process-wide registry
+        return client_registry.get("openai", self.api_key)
 
     def generate_image(self, prompt: str, output_path: str, config: Dict[str, Any]) -> str:
         print(f"--- MediaFactory: Generating Image via OpenAI (DALL-E 3) ---")
@@ -45,12 +66,13 @@ class OpenAIMediaProvider(MediaProvider):
                 n=1,
             )
             image_url = response.data[0].url
-            img_data = requests.get(image_url).content
-            with open(output_path, "wb") as f:
-                f.write(img_data)
+            from execution.download_manager import download_manager
+            download_manager.fetch(image_url, dest=output_path, timeout=60)
+            client_registry.record_success("openai", self.api_key)
             return output_path
         except Exception as e:
             print(f"OpenAI Image Gen Failed: {e}")
+            client_registry.record_failure("openai", e, self.api_key)
             raise e
 
     def generate_video(self, prompt: str, output_path: str, image_path: Optional[str], config: Dict[str, Any]) -> Tuple[str, float, str]:
@@ -59,34 +81,80 @@ class OpenAIMediaProvider(MediaProvider):
 
 class GoogleMediaProvider(MediaProvider):
     def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        # Requests are spread over a pool of keys (GEMINI_API_KEYS / GEMINI_API_KEY)
+        if not len(key_pool):
             raise ValueError("GEMINI_API_KEY not found.")
-        self.client = genai.Client(api_key=self.api_key)
+
+    @staticmethod
+    def _client(pooled):
+        # Shared, warm client for this key from the process-wide registry
+        return client_registry.get("genai", pooled.api_key)
+
+    @staticmethod
+    def _controller(model_name: str, pooled, kind: str = "video"):
+        # Each key (project) has its own quota, so congestion is tracked per key
+        return get_controller("google", f"{model_name}@{pooled.key_id}", kind=kind)
+
+    def _save_generated_video(self, video, output_path: str, pooled):
+        """
+        Streams a generated video to disk in chunks (constant memory per scene).
+        Falls back to the SDK download, which buffers the whole file, if streaming fails.
+        """
+        if getattr(video, "video_bytes", None):
+            # Already inlined in the operation response
+            with open(output_path, "wb") as f:
+                f.write(video.video_bytes)
+            return
+
+        uri = getattr(video, "uri", None)
+        if uri:
+            try:
+                from execution.download_manager import download_manager
+                download_manager.stream_to_file(uri, output_path, headers={"x-goog-api-key": pooled.api_key}, timeout=120)
+                print(f"⬇️  Streamed Veo video to {output_path}")
+                return
+            except Exception as e:
+                print(f"⚠️ Streaming Veo download failed ({e}). Falling back to SDK download.")
+
+        vid_content = self._client(pooled).files.download(file=video)
+        with open(output_path, "wb") as f:
+            f.write(vid_content)
 
     def generate_image(self, prompt: str, output_path: str, config: Dict[str, Any]) -> str:
         model_name = config.get("image_model", "imagen-4.0-generate-001")
         print(f"--- MediaFactory: Generating Image via Google ({model_name}) ---")
+        pooled = key_pool.select(model_name)
+        controller = self._controller(model_name, pooled, kind="image")
         
         try:
-            response = self.client.models.generate_images(
-                model=model_name,
-                prompt=prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                    aspect_ratio="9:16",
-                    output_mime_type="image/png"
+            with controller.slot():
+                response = self._client(pooled).models.generate_images(
+                    model=model_name,
+                    prompt=prompt,
+                    config=types.GenerateImagesConfig(
+                        number_of_images=1,
+                        aspect_ratio="9:16",
+                        output_mime_type="image/png"
+                    )
                 )
-            )
             if response.generated_images:
                 image_bytes = response.generated_images[0].image.image_bytes
                 with open(output_path, "wb") as f:
                     f.write(image_bytes)
+                from execution.image_pipeline import remember
+                remember(output_path, image_bytes, "image/png")
+                controller.record_success()
+                client_registry.record_success("genai", pooled.api_key)
                 return output_path
             else:
                 raise ValueError("No images returned from Google Imagen.")
         except Exception as e:
             print(f"Google Image Gen Failed: {e}")
+            if is_daily_quota_error(e):
+                key_pool.drain(pooled, model_name)
+            elif is_throttle_error(e) and not isinstance(e, ProviderThrottledException):
+                controller.record_throttle(parse_retry_after(e))
+            client_registry.record_failure("genai", e, pooled.api_key)
             raise e
 
     def generate_video(self, prompt: str, output_path: str, image_path: Optional[str], config: Dict[str, Any]) -> Tuple[str, float, str]:
@@ -98,66 +166,103 @@ class GoogleMediaProvider(MediaProvider):
         # SMART RATE LIMITING: Use Token Bucket algorithm
         # Only waits when quota is actually full (not on every request)
         
+        # Base image bytes, shared with the image pipeline (no re-read when still cached)
+        veo_image = None
+        if image_path:
+            from execution.image_pipeline import encoded_bytes
+            img_bytes, img_mime = encoded_bytes(image_path)
+            veo_image = types.Image(image_bytes=img_bytes, mime_type=img_mime)
+
+        # Set by a hedging caller that has stopped waiting for this video
+        cancel_event = config.get("cancel_event")
+        # Set here once Veo accepted the operation (the caller's hedge deadline starts then);
+        # `veo_submission` gets the model that was submitted, for billing a hedged scene
+        submitted_event = config.get("submitted_event")
+        submission = config.get("veo_submission")
+        # Called with (model, seconds from submission to completion) for every finished operation
+        latency_observer = config.get("veo_latency_observer")
+        # Called once quota is reserved for this request (the Veo planner stops holding budget for it)
+        on_reserved = config.get("veo_reserved")
+        from execution.exceptions import GenerationCancelledException, QuotaExceededException
+
+        # ADAPTIVE CONCURRENCY: Shared per-model/per-key controller (AIMD + circuit breaker)
+        # replaces the old global lock and per-thread fixed sleeps.
+        # KEY POOLING: Each attempt goes to the key with the most quota headroom.
+        excluded_keys = set()
+
         MAX_RETRIES = 3
-        for attempt in range(MAX_RETRIES + 1):
+        attempt = 0
+        while attempt <= MAX_RETRIES:
+            if cancel_event and cancel_event.is_set():
+                raise GenerationCancelledException("Veo request abandoned before submission")
+
+            # 1. Pick a key (the request is recorded against its quota once it has a slot).
+            # Raises QuotaExceededException when every key is drained.
+            excluded_keys |= {k.key_id for k in key_pool.keys if self._controller(model_name, k).is_open()}
+            if len(excluded_keys) >= len(key_pool):
+                raise ProviderThrottledException(f"All keys for {model_name} are throttling (circuits open)")
+            pooled = key_pool.select(model_name, exclude=excluded_keys)
+            controller = self._controller(model_name, pooled)
+            client = self._client(pooled)
+
             try:
-                # CRITICAL SECTION: Acquire global lock to serialize Veo calls
-                # This ensures that rate limiter check + API call happen atomically
-                # Only one thread can execute this block at a time
-                with VEO_API_LOCK:
-                    print(f"🔒 Acquired Veo API lock (Thread {threading.current_thread().name})")
-                    
-                    # 1. Check Rate Limiter (Throttling)
-                    try:
-                        from projects.backend.services.rate_limiter import rate_limiter
-                        from execution.exceptions import QuotaExceededException
-                        rate_limiter.check_and_wait(model_name)
-                    except ImportError:
-                        print("⚠️ Rate limiter not available, proceeding without throttle")
-                    except QuotaExceededException as qe:
-                        # Daily quota exhausted - Fail immediately, no retry
-                        print(f"❌ Daily Quota Exhausted: {qe}")
-                        print("⚡ Skipping retries. Falling back to Ken Burns effect.")
-                        raise  # Propagate to trigger fallback in scene_generation.py
-                
-                    # 2. Construct Config
-                    vid_config = types.GenerateVideosConfig(
-                        number_of_videos=1,
-                        aspect_ratio=config.get("aspect_ratio", "9:16"),
-                        duration_seconds=duration
-                    )
+                # 2. Construct Config
+                vid_config = types.GenerateVideosConfig(
+                    number_of_videos=1,
+                    aspect_ratio=config.get("aspect_ratio", "9:16"),
+                    duration_seconds=duration
+                )
 
-                    if image_path:
-                        with open(image_path, "rb") as f:
-                            img_bytes = f.read()
-                        veo_image = types.Image(image_bytes=img_bytes, mime_type="image/png")
-                        source = types.GenerateVideosSource(prompt=prompt, image=veo_image)
-                    else:
-                        source = types.GenerateVideosSource(prompt=prompt)
-
-                    # 3. Call API (INSIDE LOCK)
-                    print(f"calling Veo (Attempt {attempt+1}/{MAX_RETRIES+1})...")
-                    response = self.client.models.generate_videos(
-                        model=model_name,
-                        source=source,
-                        config=vid_config
-                    )
-                    
-                    # Lock is released here, but request is already sent to Google
-                    # Polling can happen outside the lock
-                    
-                print(f"🔓 Released Veo API lock (request sent)")
+                if veo_image:
+                    source = types.GenerateVideosSource(prompt=prompt, image=veo_image)
+                else:
+                    source = types.GenerateVideosSource(prompt=prompt)
+
+                # 3. Call API (the slot bounds concurrent submissions, where 429s happen)
+                with controller.slot(cancel_event=cancel_event):
+                    # Record the request (Daily / RPM) only now: a throttled or abandoned wait
+                    # for the slot must not spend daily quota
+                    if not key_pool.record(pooled, model_name):
+                        continue  # Out of daily quota: drained (select skips it), try another key
+                    if on_reserved:
+                        on_reserved()
+                    print(f"calling Veo via {pooled.label} (Attempt {attempt+1}/{MAX_RETRIES+1})...")
+                    with span("veo.submit", model=model_name, provider="google", key=pooled.key_id, attempt=attempt + 1):
+                        response = client.models.generate_videos(
+                            model=model_name,
+                            source=source,
+                            config=vid_config
+                        )
+                controller.record_success()
+                submitted_at = time.time()
+                if submission is not None:
+                    submission.update(model=model_name, at=submitted_at)
+                if submitted_event:
+                    submitted_event.set()
                 print(f"Veo Operation Started: {response.name}. Polling...")
                 
-                # 4. Poll for completion (OUTSIDE LOCK - doesn't consume quota)
-                while not response.done:
-                    time.sleep(10)
-                    response = self.client.operations.get(response)
+                # 4. Poll for completion (outside the slot: operations in flight are bounded by quota, not slots)
+                with span("veo.poll", model=model_name, provider="google") as poll_span:
+                    polls = 0
+                    while not response.done:
+                        if cancel_event and cancel_event.wait(VEO_POLL_SECONDS):
+                            print(f"🛑 Abandoning Veo operation {response.name} (caller stopped waiting)")
+                            if latency_observer:
+                                threading.Thread(target=_observe_abandoned, name="veo-observe", daemon=True,
+                                                 args=(client, response, model_name, submitted_at, latency_observer)).start()
+                            raise GenerationCancelledException(f"Veo operation {response.name} abandoned")
+                        elif not cancel_event:
+                            time.sleep(VEO_POLL_SECONDS)
+                        response = client.operations.get(response)
+                        polls += 1
+                    poll_span.set_attribute("polls", polls)
                     
                 if response.response and response.response.generated_videos:
-                    vid_content = self.client.files.download(file=response.response.generated_videos[0].video)
-                    with open(output_path, "wb") as f:
-                        f.write(vid_content)
+                    if latency_observer:
+                        latency_observer(model_name, time.time() - submitted_at)
+                    with span("veo.download", model=model_name, provider="google"):
+                        self._save_generated_video(response.response.generated_videos[0].video, output_path, pooled)
+                    client_registry.record_success("genai", pooled.api_key)
                     return output_path, duration, model_name
                 else:
                     error_msg = str(response.error) if response.error else "Unknown error"
@@ -176,40 +281,84 @@ class GoogleMediaProvider(MediaProvider):
                         
                     raise ValueError(f"Veo Generation Failed: {error_msg} (See logs for object dump)")
 
+            except ProviderThrottledException:
+                # This key's circuit opened while waiting; try another key
+                excluded_keys.add(pooled.key_id)
+                continue
+            except (GenerationCancelledException, QuotaExceededException):
+                raise
             except Exception as e:
-                error_str = str(e)
-                is_rate_limit = "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower()
+                is_rate_limit = is_throttle_error(e)
+                
+                if is_daily_quota_error(e):
+                    # The API says this key is out for the day: rotate it out and retry immediately
+                    key_pool.drain(pooled, model_name)
+                    excluded_keys.add(pooled.key_id)
+                    client_registry.record_failure("genai", e, pooled.api_key)
+                    continue
                 
-                if is_rate_limit and attempt < MAX_RETRIES:
-                    wait_time = (attempt + 1) * 30 # 30s, 60s, 90s
-                    print(f"⚠️ Veo Rate Limit Hit (Attempt {attempt+1}): {e}")
-                    print(f"⏳ Sleeping for {wait_time}s before retry...")
-                    time.sleep(wait_time)
-                    continue # Retry
+                if is_rate_limit:
+                    retry_after = parse_retry_after(e)
+                    controller.record_throttle(retry_after)
+                    
+                    if attempt < MAX_RETRIES:
+                        wait_time = controller.backoff_delay(attempt, retry_after)
+                        print(f"⚠️ Veo Rate Limit Hit (Attempt {attempt+1}): {e}")
+                        print(f"⏳ Backing off {wait_time:.1f}s before retry{' (Retry-After honored)' if retry_after else ''}...")
+                        if cancel_event:
+                            cancel_event.wait(wait_time)
+                        else:
+                            time.sleep(wait_time)
+                        attempt += 1
+                        continue # Retry (fails fast if the circuit opened meanwhile)
+                    print(f"❌ PEAK RPM LIMIT HIT after {MAX_RETRIES} retries: {e}")
                 else:
                     # Final failure or non-retryable error
-                    if is_rate_limit:
-                         print(f"❌ PEAK RPM LIMIT HIT after {MAX_RETRIES} retries: {e}")
-                    else:
-                         print(f"Google Video Gen Failed: {e}")
-                    raise e
+                    print(f"Google Video Gen Failed: {e}")
+                client_registry.record_failure("genai", e, pooled.api_key)
+                raise e
 
 class MediaFactory:
+    # Provider instances are stateless wrappers around registry clients; build each once
+    _providers: Dict[str, MediaProvider] = {}
+    _providers_lock = threading.Lock()
+
     @staticmethod
     def get_provider(provider_name: str) -> MediaProvider:
         provider_name = provider_name.lower()
         if "openai" in provider_name:
-            return OpenAIMediaProvider()
+            provider_cls = OpenAIMediaProvider
         elif "google" in provider_name or "gemini" in provider_name or "veo" in provider_name:
-            return GoogleMediaProvider()
+            provider_cls = GoogleMediaProvider
         else:
             raise ValueError(f"Unknown Media Provider: {provider_name}")
 
+        with MediaFactory._providers_lock:
+            provider = MediaFactory._providers.get(provider_cls.__name__)
+            if provider is None:
+                provider = provider_cls()
+                MediaFactory._providers[provider_cls.__name__] = provider
+            return provider
+
     @staticmethod
     def generate_image(prompt: str, output_path: str, config: Dict[str, Any]) -> str:
         provider_name = config.get("image_provider", os.getenv("IMAGE_PROVIDER", "google"))
-        provider = MediaFactory.get_provider(provider_name)
-        return provider.generate_image(prompt, output_path, config)
+        if "openai" in provider_name.lower() or "dall-e" in provider_name.lower():
+            preferred = "dall-e-3"
+        else:
+            preferred = config.get("image_model", "imagen-4.0-generate-001")
+
+        # Text-to-image: route to a healthy model (see image_router)
+        from execution.image_router import image_router, route_provider, supports_reference
+        if supports_reference(preferred):
+            # Multimodal (generate_content) models can't serve generate_images
+            preferred = config.get("backup_image_model", "imagen-4.0-generate-001")
+
+        def attempt(model_name: str) -> str:
+            provider = MediaFactory.get_provider(route_provider(model_name))
+            return provider.generate_image(prompt, output_path, {**config, "image_model": model_name})
+
+        return image_router.generate(config, attempt, preferred=preferred)
 
     @staticmethod
     def generate_video(prompt: str, output_path: str, image_path: Optional[str], config: Dict[str, Any]) -> Tuple[str, float, str]:
@@ -1,11 +1,11 @@
 import os
 import uuid
 from typing import Dict, Any, Optional
-from elevenlabs.client import ElevenLabs
 from dotenv import load_dotenv
 
 # Integration
 from execution import llm_factory
+from execution.tracing import span
 
 load_dotenv()
 
@@ -22,7 +22,8 @@ def generate_bgm_track(visual_dna: Dict[str, Any], output_dir: str = "tmp", conf
         print("ElevenLabs API Key missing. Skipping BGM.")
         return None
         
-    client = ElevenLabs(api_key=api_key)
+    from execution.client_registry import client_registry
+    client = client_registry.get("elevenlabs", api_key)
     
     print("--- AI Composer: Generating Original Score ---")
     
@@ -88,22 +89,24 @@ def generate_bgm_track(visual_dna: Dict[str, Any], output_dir: str = "tmp", conf
         # 2. Call ElevenLabs
         # We use text_sound_effects as a proxy for music generation if music model not explicitly available
         # Max duration usually constrained, but 15-20s is enough for a loop.
-        audio_gen = client.text_to_sound_effects.convert(
-            text=f"{music_prompt} [Loopable] [Instrumental]", # Enforce instrumental loop structure
-            duration_seconds=22, # Generate a slightly longer loopable chunk
-            prompt_influence=0.5
-        )
+        with span("bgm.generate", model="text_to_sound_effects", provider="elevenlabs"):
+            audio_gen = client.text_to_sound_effects.convert(
+                text=f"{music_prompt} [Loopable] [Instrumental]", # Enforce instrumental loop structure
+                duration_seconds=22, # Generate a slightly longer loopable chunk
+                prompt_influence=0.5
+            )
         
-        os.makedirs(output_dir, exist_ok=True)
-        filename = f"bgm_{uuid.uuid4()}.mp3"
-        path = os.path.join(output_dir, filename)
+            os.makedirs(output_dir, exist_ok=True)
+            filename = f"bgm_{uuid.uuid4()}.mp3"
+            path = os.path.join(output_dir, filename)
         
-        with open(path, "wb") as f:
-            for chunk in audio_gen:
-                f.write(chunk)
+            with open(path, "wb") as f:
+                for chunk in audio_gen:
+                    f.write(chunk)
                 
         if os.path.exists(path) and os.path.getsize(path) > 1000:
             print(f"BGM Generated: {path}")
+            client_registry.record_success("elevenlabs", api_key)
             return path
         else:
             print("Generated BGM file was empty/small.")
@@ -111,6 +114,7 @@ def generate_bgm_track(visual_dna: Dict[str, Any], output_dir: str = "tmp", conf
             
     except Exception as e:
         print(f"Music Generation failed: {e}")
+        client_registry.record_failure("elevenlabs", e, api_key)
         return None
 
 # Alias for compatibility if imported as select_bgm_track
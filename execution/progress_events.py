@@ -0,0 +1,328 @@
+"""
+In-process pub/sub of structured progress events for pipeline runs.
+
+The /ws/logs websocket used to tail run.log with readline() in a 0.1s loop, once per
+viewer, and whenever the file was idle it read the run from Firestore on every loop
+to detect completion. Instead the pipeline publishes events and viewers subscribe:
+- node_started / node_finished / node_failed, scene_completed (with the scene's asset
+  URLs) / scene_failed, log (each run-log line) and status (queued / running /
+  completed / failed / ...).
+- Non-log events carry the run's percent and ETA. The ETA walks the graph's
+  dependencies with per-node estimates: the p50 of the node's recent durations
+  (tracing histograms), or a default when there is no history yet. Percent is the
+  share of the whole graph's critical path already covered.
+- Each run keeps its recent events in a ring buffer. A viewer joining late (or
+  reconnecting with its last seq) gets the replay first, then the live events.
+- A terminal status is pushed to every subscriber and ends their streams.
+- Runs executing in another process (queue-mode render workers) are fed by a single
+  tailer per run, however many viewers: it follows run.log and checks the status only
+  every few seconds while the file is idle.
+- A run that never reaches a terminal status (its process died, or a viewer asked about
+  an unknown run_id) is evicted with its buffer once it has had no events, subscribers
+  or tailer for the idle TTL.
+
+Config (env):
+    PROGRESS_BUFFER_EVENTS      - Events kept per run for replay (default 2000)
+    PROGRESS_STATUS_POLL_SECONDS - Tailer status check interval while idle (default 2)
+    PROGRESS_IDLE_TTL_SECONDS   - Unfinished runs idle this long are evicted (default 3600)
+
+Usage:
+    from execution.progress_events import progress
+
+    progress.publish(run_id, "scene_completed", scene_id="Hook", assets={...})
+
+    async for event in progress.subscribe(run_id, heartbeat=15):   # None on heartbeat
+        ...
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+BUFFER_EVENTS = int(os.getenv("PROGRESS_BUFFER_EVENTS", "2000"))
+STATUS_POLL_SECONDS = float(os.getenv("PROGRESS_STATUS_POLL_SECONDS", "2"))
+IDLE_TTL_SECONDS = float(os.getenv("PROGRESS_IDLE_TTL_SECONDS", "3600"))
+IDLE_SWEEP_SECONDS = 60    # Minimum interval between idle-channel sweeps
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+MAX_FINISHED_RUNS = 50     # Finished runs kept for late subscribers
+MIN_NODE_SAMPLES = 3       # Histogram samples before the p50 replaces the default estimate
+
+# Typical node durations (seconds) until the latency histograms have history
+DEFAULT_NODE_SECONDS = {
+    "extract_dna": 10,
+    "generate_script": 15,
+    "generate_character": 20,
+    "generate_bgm": 20,
+    "generate_end_card": 10,
+    "generate_voice": 15,
+    "plan_timeline": 2,
+    "generate_scenes": 180,
+    "assembly": 45,
+    "restore_assets": 5,
+    "generate_variants": 600,
+}
+
+
+def estimate_node_seconds(node: str) -> float:
+    from execution.tracing import latency_stats
+    stats = latency_stats().get(f"node.{node}")
+    if stats and stats.get("count", 0) >= MIN_NODE_SAMPLES:
+        return stats["p50"]
+    return float(DEFAULT_NODE_SECONDS.get(node, 30))
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue" = asyncio.Queue()
+
+    def deliver(self, event: Optional[Dict[str, Any]]):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            pass  # Loop closed; the subscriber is gone
+
+
+class _RunChannel:
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.events: deque = deque(maxlen=BUFFER_EVENTS)
+        self.seq = 0
+        self.subscribers: List[_Subscriber] = []
+        self.attached = False           # The pipeline runs in this process
+        self.tailer: Optional[threading.Thread] = None
+        self.tail_offset = 0
+        self.finished = False
+        self.dependencies: Dict[str, List[str]] = {}
+        self.estimates: Dict[str, float] = {}
+        self.running: Dict[str, float] = {}
+        self.done: set = set()
+        self.scene_fraction = 0.0
+        self.last_active = time.time()
+
+    def idle(self, now: float) -> bool:
+        if self.finished or self.subscribers or (self.tailer and self.tailer.is_alive()):
+            return False
+        return now - self.last_active >= IDLE_TTL_SECONDS
+
+    def reopen(self):
+        self.finished = False
+        self.dependencies, self.estimates = {}, {}
+        self.running, self.done = {}, set()
+        self.scene_fraction = 0.0
+
+    def eta_seconds(self, now: float, from_start: bool = False) -> float:
+        """Earliest finish of the remaining graph (dependencies run in parallel)."""
+        finish: Dict[str, float] = {}
+
+        def node_finish(node: str) -> float:
+            if node in finish or (node in self.done and not from_start):
+                return finish.get(node, 0.0)
+            finish[node] = 0.0  # Guards against cycles
+            estimate = self.estimates[node]
+            if node in self.running and not from_start:
+                remaining = estimate - (now - self.running[node])
+                if node == "generate_scenes":
+                    remaining = min(remaining, estimate * (1.0 - self.scene_fraction))
+                remaining = max(remaining, 0.1 * estimate)  # Overran its estimate: not done yet
+            else:
+                remaining = estimate
+            deps = [d for d in self.dependencies.get(node, []) if d in self.estimates]
+            finish[node] = max([node_finish(d) for d in deps] or [0.0]) + remaining
+            return finish[node]
+
+        return max([node_finish(n) for n in self.dependencies] or [0.0])
+
+    def progress(self, now: float) -> Dict[str, Any]:
+        if self.finished:
+            return {"percent": 100.0, "eta_seconds": 0.0}
+        if not self.dependencies:
+            return {"percent": 0.0, "eta_seconds": None}
+        eta = self.eta_seconds(now)
+        total = self.eta_seconds(now, from_start=True)
+        percent = 100.0 * (1.0 - eta / total) if total > 0 else 0.0
+        return {"percent": round(max(0.0, min(percent, 99.0)), 1), "eta_seconds": round(eta, 1)}
+
+
+class ProgressBus:
+    def __init__(self):
+        self._channels: "OrderedDict[str, _RunChannel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _channel(self, run_id: str) -> _RunChannel:
+        now = time.time()
+        channel = self._channels.get(run_id)
+        if channel is None:
+            channel = self._channels[run_id] = _RunChannel(run_id)
+        channel.last_active = now
+        if now - self._last_sweep >= IDLE_SWEEP_SECONDS:
+            self._last_sweep = now
+            self._evict_idle(now)
+        return channel
+
+    def _evict_idle(self, now: float):
+        for run_id in [rid for rid, c in self._channels.items() if c.idle(now)]:
+            del self._channels[run_id]
+
+    # --- Publishing (pipeline threads) ---
+
+    def attach(self, run_id: str):
+        """Marks the run as executing in this process (its own events replace tailing)."""
+        with self._lock:
+            self._channel(run_id).attached = True
+
+    def plan(self, run_id: str, dependencies: Dict[str, List[str]]):
+        """Registers the run's graph (node -> dependencies) for percent/ETA. First call wins."""
+        with self._lock:
+            channel = self._channel(run_id)
+            if not channel.dependencies:
+                channel.dependencies = {n: list(d) for n, d in dependencies.items()}
+                channel.estimates = {n: estimate_node_seconds(n) for n in dependencies}
+
+    def publish(self, run_id: Optional[str], event_type: str, **data) -> Optional[Dict[str, Any]]:
+        if not run_id:
+            return None
+        now = time.time()
+        with self._lock:
+            channel = self._channel(run_id)
+            if channel.finished and event_type == "status" and data.get("status") not in TERMINAL_STATUSES:
+                channel.reopen()  # Same run_id again (scene regeneration)
+            elif channel.finished and event_type != "log":
+                return None  # Late events after the terminal status
+            self._apply(channel, event_type, data, now)
+            channel.seq += 1
+            event = {"seq": channel.seq, "run_id": run_id, "type": event_type, "ts": now, **data}
+            if event_type != "log":
+                event.update(channel.progress(now))
+            channel.events.append(event)
+            subscribers = list(channel.subscribers)
+            if channel.finished:
+                channel.subscribers = []
+                self._channels.move_to_end(run_id)
+                self._prune()
+
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+            if channel.finished:
+                subscriber.deliver(None)  # End of stream
+        return event
+
+    def _apply(self, channel: _RunChannel, event_type: str, data: Dict[str, Any], now: float):
+        node = data.get("node")
+        if event_type == "node_started":
+            channel.running[node] = now
+        elif event_type in ("node_finished", "node_failed"):
+            channel.running.pop(node, None)
+            channel.done.add(node)
+        elif event_type in ("scene_completed", "scene_failed") and data.get("total"):
+            channel.scene_fraction = min(1.0, data.get("completed", 0) / data["total"])
+        elif event_type == "status":
+            channel.finished = data.get("status") in TERMINAL_STATUSES
+
+    def _prune(self):
+        finished = [rid for rid, c in self._channels.items() if c.finished and not c.subscribers]
+        for run_id in finished[:max(0, len(finished) - MAX_FINISHED_RUNS)]:
+            del self._channels[run_id]
+
+    # --- Subscribing (event loop) ---
+
+    async def subscribe(self, run_id: str, after_seq: int = 0, heartbeat: Optional[float] = None):
+        """
+        Async iterator over the run's events: the buffered ones after `after_seq`, then live
+        events until a terminal status. Yields None every `heartbeat` seconds of silence.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            channel = self._channel(run_id)
+            backlog = [e for e in channel.events if e["seq"] > after_seq]
+            finished = channel.finished
+            if not finished:
+                channel.subscribers.append(subscriber)
+        try:
+            for event in backlog:
+                yield event
+            if finished:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            with self._lock:
+                if subscriber in channel.subscribers:
+                    channel.subscribers.remove(subscriber)
+
+    def follow(self, run_id: str, log_path: str, get_status: Callable[[], Optional[str]]):
+        """
+        Feeds a run executing elsewhere from its log file and status (one tailer per run).
+        No-op for runs attached to this process, finished runs, or if a tailer is running.
+        """
+        with self._lock:
+            channel = self._channel(run_id)
+            if channel.attached or channel.finished or (channel.tailer and channel.tailer.is_alive()):
+                return
+            channel.tailer = threading.Thread(target=self._tail, args=(channel, log_path, get_status),
+                                              name=f"progress-tail-{run_id}", daemon=True)
+            channel.tailer.start()
+
+    def _tail(self, channel: _RunChannel, log_path: str, get_status: Callable[[], Optional[str]]):
+        handle = None
+        partial = ""
+        last_check = 0.0
+        last_status = None
+        try:
+            while True:
+                with self._lock:
+                    if channel.attached or channel.finished or not channel.subscribers:
+                        return  # Resumes from tail_offset if someone subscribes again
+                if handle is None and os.path.exists(log_path):
+                    handle = open(log_path, "r", encoding="utf-8", errors="replace")
+                    handle.seek(channel.tail_offset)
+                chunk = handle.readline() if handle else ""
+                if chunk:
+                    partial += chunk
+                    if partial.endswith("\n"):
+                        self.publish(channel.run_id, "log", line=partial)
+                        partial = ""
+                        channel.tail_offset = handle.tell()
+                    continue
+
+                if time.time() - last_check >= STATUS_POLL_SECONDS:
+                    last_check = time.time()
+                    status = get_status()
+                    if status in TERMINAL_STATUSES:
+                        rest = partial + (handle.read() if handle else "")
+                        for line in rest.splitlines(keepends=True):
+                            self.publish(channel.run_id, "log", line=line)
+                        self.publish(channel.run_id, "status", status=status)
+                        return
+                    if status and status != last_status:
+                        self.publish(channel.run_id, "status", status=status)
+                    last_status = status
+                time.sleep(0.1)
+        except Exception as e:
+            print(f"⚠️ Progress tailer for {channel.run_id} stopped: {e}")
+        finally:
+            if handle:
+                handle.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": len(self._channels),
+                "active_runs": sum(1 for c in self._channels.values() if not c.finished),
+                "subscribers": sum(len(c.subscribers) for c in self._channels.values()),
+                "tailers": sum(1 for c in self._channels.values() if c.tailer and c.tailer.is_alive()),
+            }
+
+
+progress = ProgressBus()
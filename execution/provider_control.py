@@ -0,0 +1,232 @@
+"""
+Adaptive concurrency control for media providers.
+
+One controller per (provider, model), shared by every run in the process:
+- AIMD: allowed concurrency grows by ~1 per window of successes and halves on a
+  429 / RESOURCE_EXHAUSTED response (at most once per cooldown, so a burst of
+  simultaneous 429s counts as a single congestion signal).
+- Retry-After: a server-provided delay blocks *all* callers of that model until it
+  passes, instead of each thread sleeping on its own schedule.
+- Full-jitter exponential backoff so retries from different threads don't line up.
+- Circuit breaker: after repeated throttling the circuit opens and callers fail fast
+  with ProviderThrottledException (scene generation falls back to Ken Burns). After
+  the cooldown a single probe request is let through (half-open).
+
+Usage:
+    controller = get_controller("google", "veo-3.1-fast-generate-preview")
+    with controller.slot(cancel_event=cancel_event):
+        response = client.models.generate_videos(...)
+    controller.record_success()
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from execution.exceptions import ProviderThrottledException, GenerationCancelledException
+
+# Starting/maximum concurrency per kind of request. Video slots cover the submit call
+# only (the operation is polled outside the slot), so they start at the cap and only
+# shrink on throttling; image requests start wide and grow.
+CONCURRENCY_DEFAULTS = {
+    "video": (float(os.getenv("VEO_INITIAL_CONCURRENCY", "8")), float(os.getenv("VEO_MAX_CONCURRENCY", "8"))),
+    "image": (float(os.getenv("IMAGE_INITIAL_CONCURRENCY", "8")), float(os.getenv("IMAGE_MAX_CONCURRENCY", "32"))),
+}
+MIN_CONCURRENCY = 1.0
+
+DECREASE_COOLDOWN = 10.0   # Seconds between multiplicative decreases
+BREAKER_THRESHOLD = 4      # Throttles within BREAKER_WINDOW that open the circuit
+BREAKER_WINDOW = 60.0
+BREAKER_COOLDOWN = 60.0    # Minimum time the circuit stays open
+
+BACKOFF_BASE = 5.0
+BACKOFF_CAP = 120.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """True for rate-limit responses (429 / RESOURCE_EXHAUSTED)."""
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower()
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Extracts a server-requested delay (seconds) from an API error, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    error_str = str(error)
+    # google.rpc.RetryInfo: "retryDelay": "33s"
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", error_str)
+    if not match:
+        # Gemini message text: "Please retry in 33.5s."
+        match = re.search(r"retry in (\d+(?:\.\d+)?)\s*s", error_str, re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+class ProviderController:
+    """AIMD concurrency limiter + circuit breaker for one provider model."""
+
+    def __init__(self, provider: str, model: str, initial: float, maximum: float):
+        self.provider = provider
+        self.model = model
+        self.limit = max(MIN_CONCURRENCY, min(initial, maximum))
+        self.maximum = maximum
+        self.in_flight = 0
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_for = BREAKER_COOLDOWN
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.recent_throttles = []
+
+        self.successes = 0
+        self.throttles = 0
+        self._cond = threading.Condition()
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+    # --- Admission ---
+
+    def _refresh_breaker(self, now: float):
+        if self.state == OPEN and now - self.opened_at >= self.open_for:
+            print(f"🟡 Circuit half-open for {self.name}: letting one probe request through")
+            self.state = HALF_OPEN
+
+    def _can_enter(self, now: float) -> bool:
+        if now < self.blocked_until:
+            return False
+        if self.state == HALF_OPEN:
+            return self.in_flight == 0
+        return self.in_flight < int(self.limit)
+
+    def is_open(self) -> bool:
+        """True while the circuit is open (callers would fail fast)."""
+        with self._cond:
+            self._refresh_breaker(time.time())
+            return self.state == OPEN
+
+    @contextmanager
+    def slot(self, cancel_event: threading.Event = None):
+        """Blocks until a concurrency slot is free. Fails fast while the circuit is open."""
+        with self._cond:
+            while True:
+                now = time.time()
+                self._refresh_breaker(now)
+                if self.state == OPEN:
+                    remaining = self.open_for - (now - self.opened_at)
+                    raise ProviderThrottledException(f"{self.name} is throttling (circuit open for another {remaining:.0f}s)")
+                if cancel_event and cancel_event.is_set():
+                    raise GenerationCancelledException(f"Abandoned while waiting for a {self.name} slot")
+                if self._can_enter(now):
+                    break
+                wait = 1.0
+                if now < self.blocked_until:
+                    wait = min(wait, self.blocked_until - now)
+                self._cond.wait(timeout=max(0.05, wait))
+            self.in_flight += 1
+            print(f"🎟️ {self.name} slot acquired ({self.in_flight}/{int(self.limit)} in flight)")
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    # --- Feedback ---
+
+    def record_success(self):
+        with self._cond:
+            self.successes += 1
+            if self.state != CLOSED:
+                print(f"🟢 Circuit closed for {self.name}")
+                self.state = CLOSED
+                self.recent_throttles.clear()
+            # Additive increase: about +1 per `limit` successes
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def record_throttle(self, retry_after: Optional[float] = None):
+        with self._cond:
+            now = time.time()
+            self.throttles += 1
+            self.recent_throttles = [t for t in self.recent_throttles if now - t < BREAKER_WINDOW] + [now]
+
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            # Multiplicative decrease (once per cooldown)
+            if now - self.last_decrease >= DECREASE_COOLDOWN:
+                self.limit = max(MIN_CONCURRENCY, self.limit / 2.0)
+                self.last_decrease = now
+                print(f"📉 {self.name} throttled. Concurrency limit -> {self.limit:.2f}")
+
+            if self.state == HALF_OPEN or len(self.recent_throttles) >= BREAKER_THRESHOLD:
+                self.state = OPEN
+                self.opened_at = now
+                self.open_for = max(BREAKER_COOLDOWN, retry_after or 0.0)
+                print(f"🔴 Circuit OPEN for {self.name} ({len(self.recent_throttles)} throttles in {BREAKER_WINDOW:.0f}s). "
+                      f"Failing fast for {self.open_for:.0f}s.")
+            self._cond.notify_all()
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        jittered = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+        if retry_after:
+            return retry_after + random.uniform(0, min(BACKOFF_BASE, retry_after * 0.2 + 1))
+        return max(1.0, jittered)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "state": self.state,
+                "blocked_for": max(0.0, round(self.blocked_until - time.time(), 1)),
+                "successes": self.successes,
+                "throttles": self.throttles,
+            }
+
+
+# Process-wide registry (shared by all runs)
+_controllers: Dict[Tuple[str, str], ProviderController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(provider: str, model: str, kind: str = "video") -> ProviderController:
+    key = (provider, model)
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            initial, maximum = CONCURRENCY_DEFAULTS.get(kind, CONCURRENCY_DEFAULTS["video"])
+            controller = ProviderController(provider, model, initial, maximum)
+            _controllers[key] = controller
+        return controller
+
+
+def all_controller_stats() -> Dict[str, Dict[str, object]]:
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {c.name: c.stats() for c in controllers}
+
+
+def open_controllers() -> List[str]:
+    """Names of the controllers whose circuit is open right now."""
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return [c.name for c in controllers if c.is_open()]
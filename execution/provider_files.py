@@ -0,0 +1,177 @@
+"""
+Upload-once reference media for provider requests.
+
+Every scene's multimodal request used to inline the same product image (and usually
+the character anchor) as bytes, so a 5-scene run uploaded the same megabytes 10+
+times. References are instead uploaded once per run and API key through the
+provider's file API, and later requests pass the returned handle (a file URI).
+
+Files belong to the project behind an API key, so handles are cached per
+(run, key, reference). Concurrent scene threads asking for the same reference wait
+for a single upload. Uploaded files are deleted when the run is released (Gemini
+also expires them after 48h).
+
+Backends:
+- GeminiFileBackend: google-genai `client.files.upload` (default)
+- LocalFileBackend: in-process stand-in for tests/simulation (PROVIDER_FILES_BACKEND=local)
+
+Usage:
+    from execution.provider_files import provider_files
+
+    handle = provider_files.get_or_upload(run_id, pooled, source, data, mime_type)
+    part = types.Part.from_uri(file_uri=handle.uri, mime_type=handle.mime_type)
+
+    # When the run finishes
+    provider_files.release_run(run_id)
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# References smaller than this are cheaper to inline than to upload (one extra round trip)
+MIN_UPLOAD_BYTES = int(os.getenv("PROVIDER_FILES_MIN_BYTES", str(64 * 1024)))
+FILE_TTL = 47 * 3600        # Gemini keeps uploaded files for 48h
+REFRESH_MARGIN = 3600       # Re-upload handles that expire within the hour
+
+
+class FileHandle:
+    """A provider-side copy of a reference asset."""
+
+    def __init__(self, uri: str, mime_type: str, name: str, key_id: str, expires_at: float):
+        self.uri = uri
+        self.mime_type = mime_type
+        self.name = name
+        self.key_id = key_id
+        self.expires_at = expires_at
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at - REFRESH_MARGIN
+
+    def __repr__(self):
+        return f"FileHandle({self.name} @ {self.key_id})"
+
+
+class GeminiFileBackend:
+    """Uploads through the Gemini Files API of the key's project."""
+
+    def upload(self, pooled, data: bytes, mime_type: str, display_name: str) -> FileHandle:
+        from google.genai import types
+        from execution.client_registry import client_registry
+
+        client = client_registry.get("genai", pooled.api_key)
+        uploaded = client.files.upload(
+            file=io.BytesIO(data),
+            config=types.UploadFileConfig(mime_type=mime_type, display_name=display_name)
+        )
+        # Images are usually ACTIVE immediately; wait briefly if still processing
+        deadline = time.time() + 30
+        while "PROCESSING" in str(getattr(uploaded, "state", "")) and time.time() < deadline:
+            time.sleep(0.5)
+            uploaded = client.files.get(name=uploaded.name)
+        if "FAILED" in str(getattr(uploaded, "state", "")):
+            raise RuntimeError(f"File upload failed for {display_name}")
+
+        return FileHandle(uploaded.uri, uploaded.mime_type or mime_type, uploaded.name, pooled.key_id, time.time() + FILE_TTL)
+
+    def delete(self, pooled_api_key: str, handle: FileHandle):
+        from execution.client_registry import client_registry
+        client_registry.get("genai", pooled_api_key).files.delete(name=handle.name)
+
+
+class LocalFileBackend:
+    """In-process stand-in (no network): keeps uploaded bytes and counts uploads."""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.uploads = 0
+        self.deletes = 0
+        self._lock = threading.Lock()
+
+    def upload(self, pooled, data: bytes, mime_type: str, display_name: str) -> FileHandle:
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        name = f"files/{pooled.key_id}-{digest}"
+        with self._lock:
+            self.files[name] = data
+            self.uploads += 1
+        return FileHandle(f"local://{name}", mime_type, name, pooled.key_id, time.time() + FILE_TTL)
+
+    def delete(self, pooled_api_key: str, handle: FileHandle):
+        with self._lock:
+            self.files.pop(handle.name, None)
+            self.deletes += 1
+
+
+def _default_backend():
+    if os.getenv("PROVIDER_FILES_BACKEND", "gemini").lower() == "local":
+        return LocalFileBackend()
+    return GeminiFileBackend()
+
+
+class ProviderFileCache:
+    """Per-run cache of provider file handles, one upload per (run, key, reference)."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or _default_backend()
+        self._handles: Dict[Tuple[str, str, str], FileHandle] = {}
+        self._api_keys: Dict[str, str] = {}  # key_id -> api_key (for cleanup)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def get_or_upload(self, run_id: Optional[str], pooled, source: str, data: bytes, mime_type: str) -> FileHandle:
+        """Returns the handle for this reference on this key, uploading it on first use."""
+        run_key = run_id or "standalone"
+        digest = hashlib.sha256(data).hexdigest()
+        key = (run_key, pooled.key_id, digest)
+
+        handle = self._handles.get(key)
+        if handle is not None and handle.is_fresh():
+            return handle
+
+        with self._key_lock(key):
+            handle = self._handles.get(key)
+            if handle is not None and handle.is_fresh():
+                return handle
+
+            started = time.time()
+            display_name = f"{run_key}-{os.path.basename(source.split('?')[0])}"
+            handle = self.backend.upload(pooled, data, mime_type, display_name)
+            with self._lock:
+                self._handles[key] = handle
+                self._api_keys[pooled.key_id] = pooled.api_key
+            print(f"📤 Reference uploaded once for run {run_key} on {pooled.label}: "
+                  f"{os.path.basename(source.split('?')[0])} ({len(data) // 1024} KB, {time.time() - started:.1f}s)")
+            return handle
+
+    def release_run(self, run_id: Optional[str]):
+        """Deletes the provider files uploaded for a finished run (best effort)."""
+        run_key = run_id or "standalone"
+        with self._lock:
+            keys = [k for k in self._handles if k[0] == run_key]
+            handles = [self._handles.pop(k) for k in keys]
+            for k in keys:
+                self._key_locks.pop(k, None)
+        for handle in handles:
+            try:
+                self.backend.delete(self._api_keys.get(handle.key_id), handle)
+            except Exception as e:
+                print(f"⚠️ Could not delete provider file {handle.name}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            runs = {k[0] for k in self._handles}
+            return {"handles": len(self._handles), "runs": len(runs)}
+
+
+provider_files = ProviderFileCache()
@@ -0,0 +1,221 @@
+"""
+Per-run reference asset store.
+
+Every scene in a run conditions on the same reference images (the uploaded product
+shot and the character anchor). Before this store existed each scene thread
+re-downloaded and re-decoded the full-resolution PNG for every request. The store
+fetches and decodes each reference exactly once per run, downscales it to the
+largest edge the target model can actually use, and re-encodes it compactly so
+that all scene threads share the same immutable bytes.
+
+Calls without a run_id (scripts, tests, standalone generate_scene) share one
+"standalone" store that is never released, so every store keeps at most
+MAX_ORIGINALS decoded originals and MAX_ASSETS prepared references (least recently
+used first out). A run only uses a handful, so the bounds never bite inside a run.
+
+Usage:
+    store = get_reference_store(run_id)
+    jpeg_bytes = store.get_bytes(product_image_path, model_name="gemini-2.5-flash-image")
+    pil_image = store.get_image(product_image_path, model_name="gemini-2.5-flash-image")
+
+    # When the run finishes
+    release_reference_store(run_id)
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Largest edge (px) worth sending to each model. Anything above this is downscaled
+# server-side anyway, so we only pay for the extra upload bytes and latency.
+MODEL_MAX_INPUT_EDGE = {
+    "gemini-2.5-flash-image": 1536,
+    "gemini-3-pro-image-preview": 2048,
+    "gemini-2.5-flash": 1024,
+    "veo": 1920,
+}
+DEFAULT_MAX_INPUT_EDGE = 1536
+
+# JPEG keeps payloads ~5-10x smaller than PNG for photographic references.
+# References with transparency are re-encoded as WebP to preserve the alpha channel.
+JPEG_QUALITY = 90
+WEBP_QUALITY = 90
+
+MAX_ORIGINALS = 8   # Full-resolution decodes kept per store
+MAX_ASSETS = 32     # Prepared (downscaled, re-encoded) references kept per store
+
+
+def max_edge_for_model(model_name: Optional[str]) -> int:
+    """Returns the largest useful input edge for a model name (prefix match)."""
+    if not model_name:
+        return DEFAULT_MAX_INPUT_EDGE
+    name = model_name.lower()
+    for prefix, edge in MODEL_MAX_INPUT_EDGE.items():
+        if name.startswith(prefix):
+            return edge
+    return DEFAULT_MAX_INPUT_EDGE
+
+
+class ReferenceAsset:
+    """A decoded, downscaled and re-encoded reference image. Treat as read-only."""
+
+    def __init__(self, source: str, image, data: bytes, mime_type: str):
+        self.source = source
+        self._image = image
+        self.data = data
+        self.mime_type = mime_type
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._image.size
+
+    def image(self):
+        """Returns a private copy of the decoded image (PIL objects are not thread-safe)."""
+        return self._image.copy()
+
+
+class ReferenceAssetStore:
+    """
+    Fetches, decodes and re-encodes each reference once, then hands out shared bytes.
+    Thread-safe: concurrent scene threads asking for the same reference block on a
+    per-key lock instead of downloading it in parallel.
+    """
+
+    def __init__(self, run_id: str = None, max_originals: int = MAX_ORIGINALS, max_assets: int = MAX_ASSETS):
+        self.run_id = run_id
+        self.max_originals = max_originals
+        self.max_assets = max_assets
+        self._raw: "OrderedDict[str, object]" = OrderedDict()
+        self._assets: "OrderedDict[Tuple[str, int], ReferenceAsset]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[object, threading.Lock] = {}
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def _cached(self, cache: OrderedDict, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _remember(self, cache: OrderedDict, key, value, limit: int):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                evicted, _ = cache.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+
+    def _load_original(self, source: str):
+        """Fetches and decodes the full-resolution original once."""
+        img = self._cached(self._raw, source)
+        if img is not None:
+            return img
+
+        with self._key_lock(source):
+            img = self._cached(self._raw, source)
+            if img is not None:
+                return img
+
+            from PIL import Image
+
+            if source.startswith("http"):
+                print(f"Downloading reference image from: {source}")
+                from execution.download_manager import download_manager
+                img = Image.open(io.BytesIO(download_manager.fetch_bytes(source, timeout=15)))
+            else:
+                img = Image.open(source)
+            img.load()  # Decode now, not lazily in every scene thread
+
+            self._remember(self._raw, source, img, self.max_originals)
+            return img
+
+    def get(self, source: str, model_name: Optional[str] = None) -> ReferenceAsset:
+        """Returns the shared reference prepared for `model_name`."""
+        max_edge = max_edge_for_model(model_name)
+        key = (source, max_edge)
+        asset = self._cached(self._assets, key)
+        if asset is not None:
+            return asset
+
+        with self._key_lock(key):
+            asset = self._cached(self._assets, key)
+            if asset is not None:
+                return asset
+
+            original = self._load_original(source)
+            asset = _prepare_asset(source, original, max_edge)
+            self._remember(self._assets, key, asset, self.max_assets)
+            print(f"📦 Reference prepared: {os.path.basename(source.split('?')[0])} "
+                  f"{original.size[0]}x{original.size[1]} -> {asset.size[0]}x{asset.size[1]} "
+                  f"({len(asset.data) // 1024} KB {asset.mime_type})")
+            return asset
+
+    def get_bytes(self, source: str, model_name: Optional[str] = None) -> bytes:
+        return self.get(source, model_name).data
+
+    def get_image(self, source: str, model_name: Optional[str] = None):
+        return self.get(source, model_name).image()
+
+    def clear(self):
+        with self._lock:
+            self._raw.clear()
+            self._assets.clear()
+            self._key_locks.clear()
+
+
+def _prepare_asset(source: str, original, max_edge: int) -> ReferenceAsset:
+    from PIL import Image
+
+    img = original
+    if max(img.size) > max_edge:
+        ratio = max_edge / max(img.size)
+        new_size = (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+        img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    buf = io.BytesIO()
+    if has_alpha:
+        img = img.convert("RGBA")
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY)
+        mime_type = "image/webp"
+    else:
+        img = img.convert("RGB")
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        mime_type = "image/jpeg"
+
+    return ReferenceAsset(source, img, buf.getvalue(), mime_type)
+
+
+# Process-wide registry of per-run stores
+_stores: Dict[str, ReferenceAssetStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_reference_store(run_id: Optional[str] = None) -> ReferenceAssetStore:
+    """Returns the store for `run_id`, creating it on first use."""
+    key = run_id or "standalone"
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ReferenceAssetStore(key)
+            _stores[key] = store
+        return store
+
+
+def release_reference_store(run_id: Optional[str] = None):
+    """Drops the decoded references for a finished run."""
+    key = run_id or "standalone"
+    with _stores_lock:
+        store = _stores.pop(key, None)
+    if store:
+        store.clear()
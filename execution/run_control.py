@@ -0,0 +1,50 @@
+"""
+Cooperative abort for runs executing in this process.
+
+A render worker that loses its lease on a job (heartbeats stopped landing and the lease
+expired) is no longer the run's owner: another worker has leased the job and is rendering
+the same run. The worker aborts the run here; the pipeline checks at every node boundary
+and before each scene, raising RunAbortedException, and run_pipeline_task skips the
+run's terminal writes (status, refunds, notifications), which belong to the new owner.
+
+Usage:
+    from execution.run_control import abort_run, check_run, release_run
+
+    abort_run(run_id, "lease lost")   # worker heartbeat
+    check_run(run_id)                 # raises RunAbortedException once aborted
+    release_run(run_id)               # when the worker is done with the run
+"""
+
+import threading
+from typing import Dict, Optional
+
+from execution.exceptions import RunAbortedException
+
+_aborted: Dict[str, str] = {}  # run_id -> reason
+_lock = threading.Lock()
+
+
+def abort_run(run_id: str, reason: str):
+    """Marks `run_id` aborted; its next check raises RunAbortedException."""
+    with _lock:
+        _aborted[run_id] = reason
+    print(f"🛑 Aborting run {run_id}: {reason}")
+
+
+def aborted_reason(run_id: Optional[str]) -> Optional[str]:
+    if not run_id:
+        return None
+    with _lock:
+        return _aborted.get(run_id)
+
+
+def check_run(run_id: Optional[str]):
+    """Raises RunAbortedException if `run_id` was aborted."""
+    reason = aborted_reason(run_id)
+    if reason is not None:
+        raise RunAbortedException(f"Run {run_id} aborted: {reason}")
+
+
+def release_run(run_id: str):
+    with _lock:
+        _aborted.pop(run_id, None)
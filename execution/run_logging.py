@@ -0,0 +1,248 @@
+"""
+Per-run, context-local logging for pipeline runs.
+
+`run_pipeline_task` used to swap `sys.stdout`/`sys.stderr` for a FileLogger. Those are
+process globals: two concurrent runs overwrote each other's redirect, lines landed in
+the wrong run.log, and every print flushed the file synchronously.
+
+Instead, the streams are wrapped once by a router that looks up the current run in a
+`contextvars.ContextVar`:
+- Lines printed while a run is active go to that run's sink. This covers threads
+  started through `ContextThreadPoolExecutor` and LangGraph node threads, which
+  copy the context.
+- Sinks are buffered and written by a single background writer thread, so a print
+  never waits for disk.
+- Lines that reach the run log are also published as "log" progress events
+  (execution/progress_events.py) for live viewers.
+- Each line gets a level from its content ("DEBUG" prefixes, ⚠️/Warning, ❌/Error/Failed).
+  Lines below RUN_LOG_LEVEL are dropped from both the run log and the console.
+- Output outside any run passes straight through, unfiltered.
+
+Config (env):
+    RUN_LOG_LEVEL - DEBUG / INFO (default) / WARNING / ERROR
+
+Usage:
+    from execution.run_logging import open_run_log, close_run_log, ContextThreadPoolExecutor
+
+    sink = open_run_log(run_id, "tmp/run_1/run.log")   # Current context now logs to run_1
+    print("--- Starting Run ---")
+    with ContextThreadPoolExecutor(max_workers=4) as ex: # Worker threads inherit the run
+        ex.submit(print, "from a scene thread")
+    sink.flush()                                         # Before uploading the log
+    close_run_log(sink)
+"""
+
+import contextvars
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from execution.progress_events import progress
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+RUN_LOG_LEVEL = LEVEL_NAMES.get(os.getenv("RUN_LOG_LEVEL", "INFO").upper(), INFO)
+
+current_run_id: contextvars.ContextVar = contextvars.ContextVar("current_run_id", default=None)
+
+_DEBUG_MARKERS = ("DEBUG", "[DEBUG]", "====== DEBUG", "🎯 DEBUG")
+_WARNING_MARKERS = ("⚠️", "Warning", "WARNING", "⏳")
+_ERROR_MARKERS = ("❌", "Error", "ERROR", "Failed", "Traceback", "Exception")
+
+
+def classify(line: str) -> int:
+    """Level of a printed line, from the conventions the pipeline's prints follow."""
+    text = line.lstrip()
+    if text.startswith(_DEBUG_MARKERS):
+        return DEBUG
+    if text.startswith(_ERROR_MARKERS) or "❌" in text:
+        return ERROR
+    if text.startswith(_WARNING_MARKERS) or "⚠️" in text:
+        return WARNING
+    return INFO
+
+
+class _Writer:
+    """Single background thread that batches sink writes to disk."""
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="run-log-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, sink: "RunLogSink", text: str):
+        self._ensure_started()
+        self._queue.put((sink, text))
+
+    def barrier(self, timeout: float = 10.0):
+        """Blocks until everything submitted so far is on disk."""
+        done = threading.Event()
+        self._ensure_started()
+        self._queue.put((None, done))
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < 1000:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            pending: Dict["RunLogSink", List[str]] = {}
+            barriers = []
+            for sink, item in batch:
+                if sink is None:
+                    barriers.append(item)
+                else:
+                    pending.setdefault(sink, []).append(item)
+            for sink, chunks in pending.items():
+                sink._write_now("".join(chunks))
+            for done in barriers:
+                done.set()
+
+
+_writer = _Writer()
+
+
+class RunLogSink:
+    """A run's log file, fed asynchronously by the writer thread."""
+
+    def __init__(self, run_id: str, path: str, level: int = RUN_LOG_LEVEL):
+        self.run_id = run_id
+        self.path = path
+        self.level = level
+        self.token = None
+        self._file = open(path, "a", encoding="utf-8")
+        self._closed = False
+
+    def emit(self, line: str):
+        if not self._closed:
+            _writer.submit(self, line)
+            progress.publish(self.run_id, "log", line=line)
+
+    def _write_now(self, text: str):
+        if self._closed:
+            return
+        try:
+            self._file.write(text)
+            self._file.flush()
+        except ValueError:
+            pass  # Closed concurrently
+
+    def flush(self):
+        """Waits until every line emitted so far is written (e.g. before uploading the log)."""
+        _writer.barrier()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        try:
+            self._file.close()
+        except Exception:
+            pass
+
+
+_sinks: Dict[str, RunLogSink] = {}
+_sinks_lock = threading.Lock()
+
+
+class RunStreamRouter:
+    """File-like wrapper for stdout/stderr that routes complete lines to the current run."""
+
+    def __init__(self, stream, min_level: int = DEBUG):
+        self.stream = stream
+        self.min_level = min_level   # stderr lines are at least WARNING
+        self._local = threading.local()
+
+    def write(self, data: str):
+        run_id = current_run_id.get()
+        sink = _sinks.get(run_id) if run_id else None
+        if sink is None:
+            return self.stream.write(data)
+
+        buffered = getattr(self._local, "buffer", "") + data
+        *lines, rest = buffered.split("\n")
+        self._local.buffer = rest
+        for line in lines:
+            level = max(classify(line), self.min_level)
+            if level < sink.level:
+                continue
+            sink.emit(line + "\n")
+            self.stream.write(line + "\n")
+        return len(data)
+
+    def flush(self):
+        run_id = current_run_id.get()
+        if run_id and _sinks.get(run_id) is not None:
+            rest = getattr(self._local, "buffer", "")
+            if rest:
+                self._local.buffer = ""
+                self.write(rest + "\n")
+        self.stream.flush()
+
+    def isatty(self):
+        return getattr(self.stream, "isatty", lambda: False)()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def install():
+    """Wraps sys.stdout/sys.stderr once (idempotent)."""
+    if not isinstance(sys.stdout, RunStreamRouter):
+        sys.stdout = RunStreamRouter(sys.stdout)
+    if not isinstance(sys.stderr, RunStreamRouter):
+        sys.stderr = RunStreamRouter(sys.stderr, min_level=WARNING)
+
+
+def open_run_log(run_id: str, path: str, level: Optional[int] = None) -> RunLogSink:
+    """Starts routing this context's output (and threads it spawns) to `path`."""
+    install()
+    progress.attach(run_id)
+    sink = RunLogSink(run_id, path, level if level is not None else RUN_LOG_LEVEL)
+    with _sinks_lock:
+        _sinks[run_id] = sink
+    sink.token = current_run_id.set(run_id)
+    return sink
+
+
+def close_run_log(sink: Optional[RunLogSink]):
+    """Flushes and closes the run's log and detaches it from the current context."""
+    if sink is None:
+        return
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    with _sinks_lock:
+        if _sinks.get(sink.run_id) is sink:
+            del _sinks[sink.run_id]
+    sink.close()
+    if sink.token is not None:
+        try:
+            current_run_id.reset(sink.token)
+        except ValueError:
+            current_run_id.set(None)  # Closed from another context
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitter's context (run ID, spans)."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        ctx = contextvars.copy_context()
+        return super().submit(ctx.run, fn, *args, **kwargs)
@@ -1,8 +1,11 @@
 import time
 import os
 import uuid
-import requests
 import base64
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from execution.run_logging import ContextThreadPoolExecutor
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
@@ -27,59 +30,15 @@ except ImportError:
         ImageClip = None
         vfx = None
 
-from PIL import Image, ImageDraw, ImageFont
-
-def _get_font(size: int):
-    """Helper to find a usable font across different OS environments."""
-    possible_fonts = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-        "/System/Library/Fonts/Supplemental/Arial.ttf",
-        "/System/Library/Fonts/Helvetica.ttc",
-        "Arial.ttf",
-        "DejaVuSans.ttf"
-    ]
-    for p in possible_fonts:
-        try:
-            if os.path.exists(p) or "/" not in p: # Try path or just name
-                return ImageFont.truetype(p, size)
-        except:
-            continue
-    return ImageFont.load_default()
-
 # Helper for Image Watermarking
 def _apply_watermark(image_path: str, text: str = "IGNITE AI"):
-    """Applies a text watermark to an image file in place."""
+    """Applies a text watermark to an image file in place (single decode/encode)."""
     try:
-        with Image.open(image_path) as img:
-            img = img.convert("RGBA")
-            
-            # Setup Draw
-            txt_layer = Image.new("RGBA", img.size, (255, 255, 255, 0))
-            draw = ImageDraw.Draw(txt_layer)
-            
-            # Font (Standard or Default)
-            font_size = int(img.width * 0.05) # 5% of width
-            font = _get_font(font_size)
-            
-            # Text Size
-            # v10: draw.textbbox, v<10: draw.textsize
-            # We'll stick to a simple placement (Bottom Right)
-            # Just approximate for safety or use text
-            
-            x = img.width - (len(text) * font_size * 0.6) - 20
-            y = img.height - font_size - 20
-            
-            # Draw Text (White with alpha)
-            draw.text((x, y), text, font=font, fill=(255, 255, 255, 128)) # 50% opacity
-            
-            # Composite
-            watermarked = Image.alpha_composite(img, txt_layer)
-            watermarked = watermarked.convert("RGB") # Remove alpha for saving as JPG/PNG
-            watermarked.save(image_path)
-            print(f"Watermark applied to {image_path}")
-            
+        from execution.image_pipeline import process_image_file
+        with open(image_path, "rb") as f:
+            raw = f.read()
+        process_image_file(raw, image_path, watermark_text=text)
+        print(f"Watermark applied to {image_path}")
     except Exception as e:
         print(f"Failed to apply image watermark: {e}")
 
@@ -193,6 +152,9 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
     # PRIORITIZE CONFIG > ENV
     image_provider = config.get("image_provider", os.getenv("IMAGE_PROVIDER", "gemini")).lower()
     print(f"Selected Image Provider: {image_provider}")
+    # The image router records which model actually ran; usage is billed against it
+    image_route = {}
+    config = {**config, "image_route": image_route}
     
     # 1. Construct Prompt
     # Extract details
@@ -247,14 +209,21 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
                   image_model = image_provider
                   print(f"✨ Generating New Image via {image_model} (Multimodal)... Prompt: {final_prompt[:150]}...")
                   
-                  _generate_multimodal_image(
-                      final_prompt, 
-                      product_image_path, 
-                      base_image_path, 
-                      previous_image_path=previous_scene_image, 
-                      model_name=image_model,
-                      aspect_ratio=aspect_ratio_str,
-                      config=config
+                  # Route to a healthy multimodal model (see image_router)
+                  from execution.image_router import image_router
+                  image_router.generate(
+                      config,
+                      lambda model: _generate_multimodal_image(
+                          final_prompt, 
+                          product_image_path, 
+                          base_image_path, 
+                          previous_image_path=previous_scene_image, 
+                          model_name=model,
+                          aspect_ratio=aspect_ratio_str,
+                          config=config
+                      ),
+                      preferred=image_model,
+                      needs_reference=True
                   )
                   
                   use_original = True
@@ -271,7 +240,16 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
     from execution.media_factory import MediaFactory
     
     # Check if Veo is selected (Direct Video)
-    if "veo" in image_provider or "veo" in config.get("video_model", "").lower():
+    use_veo = "veo" in image_provider or "veo" in config.get("video_model", "").lower()
+    if use_veo and config.get("veo_planning", True):
+        # Skip Veo attempts the remaining daily quota can't cover (see veo_planner)
+        from execution.veo_planner import veo_planner
+        planned_model = config.get("video_model", "veo-3.1-fast-generate-preview")
+        run_id = config.get("run_id") or scene_data.get("run_id_ref")
+        use_veo = veo_planner.should_use_veo(run_id, scene_id, planned_model)
+        # The grant holds budget until media_factory reserves the request's quota
+        config = {**config, "veo_reserved": lambda: veo_planner.mark_scene_reserved(run_id, scene_id)}
+    if use_veo:
         video_path = base_image_path.replace(".png", ".mp4")
         
         # REGENERATION OPTIMIZATION: Skip image generation if flagged
@@ -280,13 +258,9 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
             # Use the previous scene image as the base image
             # Download it if it's a remote URL
             if previous_scene_image.startswith("http"):
-                import requests
-                from io import BytesIO
+                from execution.download_manager import download_manager
                 print(f"Downloading existing image: {previous_scene_image}")
-                resp = requests.get(previous_scene_image, timeout=15)
-                resp.raise_for_status()
-                with open(base_image_path, 'wb') as f:
-                    f.write(resp.content)
+                download_manager.fetch(previous_scene_image, dest=base_image_path, timeout=15)
             else:
                 # Copy local file
                 import shutil
@@ -309,32 +283,58 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
         
         import math
         veo_request_duration = math.ceil(min(max(gen_duration, MIN_DURATION), MAX_DURATION))
+        planned_veo = (scene_data.get("timeline") or {}).get("veo_duration")
+        if planned_veo:
+            # Shortest accepted length that covers the planned cut (timeline_planner)
+            veo_request_duration = int(planned_veo)
 
         # Video Model Selection
         video_model = config.get("video_model", "veo-3.1-fast-generate-preview")
 
         print(f"Generating Video via Veo ({video_model})... Requested: {veo_request_duration}s")
         
+        # HEDGING: Render the Ken Burns fallback speculatively while Veo runs, and stop
+        # waiting on Veo once it exceeds the per-scene deadline.
+        hedging = config.get("veo_hedging", True) and os.path.exists(base_image_path)
+        cancel_event = threading.Event()
+        submitted_event = threading.Event()
+        submission = {}  # Model and time of the Veo operation in flight (media_factory fills it)
+        executor = ContextThreadPoolExecutor(max_workers=2, thread_name_prefix=f"hedge_{scene_id}")
+        
+        kb_future = None
+        kb_path = base_image_path.replace(".png", "_kb.mp4")
+        if hedging:
+            print(f"🛡️ Hedging Scene {scene_id}: rendering speculative Ken Burns clip in background")
+            kb_future = executor.submit(_render_ken_burns, base_image_path, kb_path, gen_duration, config)
+        
+        veo_future = executor.submit(
+            _generate_veo_with_backup,
+            full_prompt, video_path, base_image_path, config, veo_request_duration, video_model,
+            cancel_event, submitted_event, submission
+        )
+        veo_future.add_done_callback(lambda _: submitted_event.set())
+        executor.shutdown(wait=False)
+        deadline = _hedge_deadline(config, video_model) if hedging else None
+        hedged = False
+        
         try:
-             # Unified Video Gen
-             # We pass local config updated with duration
-             vid_config = config.copy()
-             vid_config["duration"] = veo_request_duration
-             
-             _, actual_dur, actual_model = MediaFactory.generate_video(
-                 full_prompt, 
-                 video_path, 
-                 image_path=base_image_path, 
-                 config=vid_config
-             )
+             # The deadline runs from submission: waiting for a key or slot does not count
+             # against it (the wait before submission is bounded by one more deadline).
+             if deadline is not None and not submitted_event.wait(deadline):
+                 raise FutureTimeoutError()
+             # Latency is recorded by media_factory for every finished operation (see veo_latency_observer)
+             _, actual_dur, actual_model = veo_future.result(timeout=deadline)
              
              print(f"Scene {scene_id} Video Generated. File: {video_path}")
              
+             if kb_future:
+                 # Speculative clip not needed
+                 kb_future.add_done_callback(lambda _: os.path.exists(kb_path) and os.remove(kb_path))
+             
              # Upload Veo Assets
              remote_assets = {}
              if os.path.exists(base_image_path):
-                 url = _upload_asset(base_image_path, run_id=scene_data.get("run_id_ref"))
-                 if url: remote_assets[f"{scene_id}_image"] = url
+                 remote_assets.update(_upload_image_asset(base_image_path, f"{scene_id}_image", scene_data.get("run_id_ref"), config))
              if os.path.exists(video_path):
                  url = _upload_asset(video_path, run_id=scene_data.get("run_id_ref"))
                  if url: remote_assets[f"{scene_id}_video"] = url
@@ -342,61 +342,45 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
              usage_stats = {
                  "video_model": actual_model,
                  "video_duration": int(actual_dur),
-                 "image_model": config.get("image_model") if not use_original else None 
+                 "image_model": image_route.get("model", config.get("image_model")) if not use_original else None 
              }
              return video_path, base_image_path, remote_assets, usage_stats
              
+        except FutureTimeoutError:
+             # Veo is in the slow tail. Google has no cancel for video operations, so the
+             # poll loop is told to stop and the result (if any) is ignored.
+             cancel_event.set()
+             hedged = True
+             print(f"⏱️ Veo exceeded hedge deadline ({deadline:.0f}s) for Scene {scene_id}. Using speculative Ken Burns clip.")
         except Exception as e:
-             from execution.exceptions import QuotaExceededException
-             
-             # Check if this is a quota error - skip retries if so
-             if isinstance(e, QuotaExceededException):
-                 print(f"❌ Daily Quota Exceeded: {e}")
-                 print("⚡ Skipping backup model retry. Falling back to Ken Burns immediately.")
-                 # Continue to Ken Burns block below
-             else:
-                 print(f"MediaFactory Video Generation Failed: {e}")
-                 
-                 # Backup Model Retry Logic (only for non-quota errors)
-                 backup_model = config.get("backup_video_model")
-                 if backup_model and backup_model != video_model:
-                      print(f"⚠️ Retrying with Backup Video Model: {backup_model}...")
-                      try:
-                           vid_config = config.copy()
-                           vid_config["duration"] = veo_request_duration
-                           # Force override of video_model in config
-                           vid_config["video_model"] = backup_model
-                           
-                           _, actual_dur, actual_model = MediaFactory.generate_video(
-                               full_prompt, 
-                               video_path, 
-                               image_path=base_image_path, 
-                               config=vid_config
-                           )
-                           print(f"Scene {scene_id} Video Generated via Backup ({backup_model}).")
-                           
-                           # Upload Veo Assets (Backup)
-                           remote_assets = {}
-                           if os.path.exists(base_image_path):
-                               url = _upload_asset(base_image_path, run_id=scene_data.get("run_id_ref"))
-                               if url: remote_assets[f"{scene_id}_image"] = url
-                           if os.path.exists(video_path):
-                               url = _upload_asset(video_path, run_id=scene_data.get("run_id_ref"))
-                               if url: remote_assets[f"{scene_id}_video"] = url
-                               
-                            # Return Stats (Backup)
-                           usage_stats = {
-                               "video_model": actual_model,
-                               "video_duration": int(actual_dur),
-                               "image_model": config.get("image_model") if not use_original else None
-                           }
-                           return video_path, base_image_path, remote_assets, usage_stats
-                      except Exception as e2:
-                           print(f"Backup MediaFactory Gen also failed: {e2}")
-                           print("⚠️ Falling back to Ken Burns effect on base image.")
-                 else:
-                      print("Veo failed and no backup model configured/different from primary. Falling back to Ken Burns effect.")
-             # Continue to Ken Burns block below...
+             print(f"⚠️ Veo generation failed for Scene {scene_id}: {e}. Falling back to Ken Burns effect.")
+        
+        if kb_future:
+             try:
+                  kb_future.result()
+                  print(f"Scene {scene_id} Complete (Ken Burns{' hedge' if hedged else ''}). File: {kb_path}")
+                  
+                  remote_assets = {}
+                  if os.path.exists(base_image_path):
+                      remote_assets.update(_upload_image_asset(base_image_path, f"{scene_id}_image", scene_data.get("run_id_ref"), config))
+                  if os.path.exists(kb_path):
+                      url = _upload_asset(kb_path, run_id=scene_data.get("run_id_ref"))
+                      if url: remote_assets[f"{scene_id}_video"] = url
+                  
+                  usage_stats = {
+                      "video_model": "ken-burns",
+                      "video_duration": 0,
+                      "image_model": image_route.get("model", config.get("image_model")) if not use_original else None,
+                      "hedged": hedged
+                  }
+                  if hedged and submission.get("model"):
+                      # The abandoned Veo operation keeps running and is billed
+                      usage_stats["hedged_video_model"] = submission["model"]
+                      usage_stats["hedged_video_duration"] = veo_request_duration
+                  return kb_path, base_image_path, remote_assets, usage_stats
+             except Exception as kbe:
+                  print(f"Speculative Ken Burns render failed: {kbe}. Retrying inline.")
+        # Continue to Ken Burns block below...
 
 
     # Standard Image Path (if not Veo Video or if Veo failed)
@@ -407,10 +391,130 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
     print(f"Image saved to: {base_image_path}")
     
     # 3. Video Generation (Ken Burns Effect)
-    # PERFORMANCE OPTIMIZATION: Use FFmpeg for 5-10x faster rendering
     print(f"Creating Dynamic Video Clip (Ken Burns) for Scene {scene_id}...")
     video_path = base_image_path.replace(".png", ".mp4")
+    _render_ken_burns(base_image_path, video_path, gen_duration, config)
+
+    # If we reach here, either FFmpeg succeeded or MoviePy succeeded
+    # Skip to upload and stats section
+    print(f"Scene {scene_id} Complete. File: {video_path}")
+    
+    remote_assets = {}
+    if os.path.exists(base_image_path):
+        remote_assets.update(_upload_image_asset(base_image_path, f"{scene_id}_image", scene_data.get("run_id_ref"), config))
+        
+    if os.path.exists(video_path):
+        url = _upload_asset(video_path, run_id=scene_data.get("run_id_ref"))
+        if url: remote_assets[f"{scene_id}_video"] = url
+
+    usage_stats = {
+        "video_model": "ken-burns",  # Fixed typo: "kenn-burns" → "ken-burns"
+        "video_duration": 0,
+        "image_model": image_route.get("model", config.get("image_model"))
+    }
+    return video_path, base_image_path, remote_assets, usage_stats
+
+
+
+
+
+
+
+
+def _generate_veo_with_backup(full_prompt: str, video_path: str, base_image_path: str, config: Dict[str, Any], veo_request_duration: int, video_model: str, cancel_event: threading.Event = None, submitted_event: threading.Event = None, submission: Dict[str, Any] = None):
+    """
+    Calls Veo with the primary video model, retrying once with `backup_video_model` on
+    non-quota failures. Returns (video_path, actual_duration, actual_model) or raises.
+    """
+    from execution.media_factory import MediaFactory
+    from execution.exceptions import QuotaExceededException, ProviderThrottledException, GenerationCancelledException
+    
+    # Unified Video Gen
+    # We pass local config updated with duration
+    vid_config = config.copy()
+    vid_config["duration"] = veo_request_duration
+    vid_config["cancel_event"] = cancel_event
+    vid_config["submitted_event"] = submitted_event
+    vid_config["veo_submission"] = submission
+    vid_config["veo_latency_observer"] = _record_veo_latency
+    
+    try:
+         return MediaFactory.generate_video(
+             full_prompt, 
+             video_path, 
+             image_path=base_image_path, 
+             config=vid_config
+         )
+    except (QuotaExceededException, ProviderThrottledException, GenerationCancelledException) as e:
+         # Check if this is a quota/throttling error - skip retries if so
+         if isinstance(e, QuotaExceededException):
+             print(f"❌ Daily Quota Exceeded: {e}")
+             print("⚡ Skipping backup model retry. Falling back to Ken Burns immediately.")
+         elif isinstance(e, ProviderThrottledException):
+             print(f"❌ Provider Throttling (circuit open): {e}")
+             print("⚡ Skipping backup model retry. Falling back to Ken Burns immediately.")
+         raise
+    except Exception as e:
+         print(f"MediaFactory Video Generation Failed: {e}")
+         
+         # Backup Model Retry Logic (only for non-quota errors)
+         backup_model = config.get("backup_video_model")
+         if not backup_model or backup_model == video_model:
+              print("Veo failed and no backup model configured/different from primary. Falling back to Ken Burns effect.")
+              raise
+         if cancel_event and cancel_event.is_set():
+              raise
+         
+         print(f"⚠️ Retrying with Backup Video Model: {backup_model}...")
+         # Force override of video_model in config
+         vid_config["video_model"] = backup_model
+         try:
+              result = MediaFactory.generate_video(
+                  full_prompt, 
+                  video_path, 
+                  image_path=base_image_path, 
+                  config=vid_config
+              )
+              print(f"Video Generated via Backup ({backup_model}).")
+              return result
+         except Exception as e2:
+              print(f"Backup MediaFactory Gen also failed: {e2}")
+              raise
+
+
+# Recent Veo operation latencies per model (seconds from submission to completion), used
+# to derive the hedge deadline when none is configured. Every finished operation is
+# recorded under the model that produced it, including operations that finish after
+# their scene hedged, so the p90 is not biased toward the fast samples.
+_VEO_LATENCIES: Dict[str, deque] = defaultdict(lambda: deque(maxlen=50))
+_VEO_LATENCIES_LOCK = threading.Lock()
+HEDGE_DEFAULT_DEADLINE = 300.0  # Until enough samples exist
+HEDGE_MIN_DEADLINE = 60.0       # Never hedge earlier than a healthy Veo job can finish
+HEDGE_MIN_SAMPLES = 5
+
+def _record_veo_latency(model_name: str, seconds: float):
+    with _VEO_LATENCIES_LOCK:
+        _VEO_LATENCIES[model_name].append(seconds)
+
+def _hedge_deadline(config: Dict[str, Any], model_name: str) -> float:
+    """Per-scene deadline: config override, else p90 of recent latencies, else default."""
+    configured = config.get("veo_hedge_deadline_seconds")
+    if configured:
+        return float(configured)
     
+    with _VEO_LATENCIES_LOCK:
+        samples = sorted(_VEO_LATENCIES[model_name])
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DEADLINE
+    
+    p90 = samples[min(len(samples) - 1, int(round(0.9 * (len(samples) - 1))))]
+    return max(HEDGE_MIN_DEADLINE, p90)
+
+def _render_ken_burns(image_path: str, video_path: str, duration: float, config: Dict[str, Any] = {}) -> str:
+    """
+    Renders a Ken Burns (slow zoom) clip from a still image.
+    PERFORMANCE OPTIMIZATION: Uses FFmpeg for 5-10x faster rendering, MoviePy as fallback.
+    """
     # Check if FFmpeg rendering is enabled (feature flag)
     use_ffmpeg = config.get("use_ffmpeg_rendering", True)  # Default: enabled
     ffmpeg_success = False
@@ -422,9 +526,9 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
             if check_ffmpeg_available():
                 print("🚀 Using FFmpeg for Ken Burns (5-10x faster)")
                 render_ken_burns_ffmpeg(
-                    image_path=base_image_path,
+                    image_path=image_path,
                     output_path=video_path,
-                    duration=gen_duration,
+                    duration=duration,
                     zoom_start=1.0,
                     zoom_end=1.1,  # 10% zoom (matches MoviePy intent but safer)
                     width=1080,
@@ -448,11 +552,11 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
             TARGET_HEIGHT = 1920
             
             # Create a clip with dynamic duration
-            clip = ImageClip(base_image_path)
+            clip = ImageClip(image_path)
             if hasattr(clip, 'with_duration'):
-                clip = clip.with_duration(gen_duration)
+                clip = clip.with_duration(duration)
             else:
-                clip = clip.set_duration(gen_duration)
+                clip = clip.set_duration(duration)
 
             # Normalize to 9:16 before applying Ken Burns effect
             original_w, original_h = clip.size
@@ -513,46 +617,25 @@ def generate_scene(scene_data: Dict[str, Any], visual_dna: Dict[str, Any], confi
         print("MoviePy not available (ImageClip is None).")
         raise ImportError("MoviePy ImageClip not available")
 
-    # If we reach here, either FFmpeg succeeded or MoviePy succeeded
-    # Skip to upload and stats section
-    print(f"Scene {scene_id} Complete. File: {video_path}")
-    
-    remote_assets = {}
-    if os.path.exists(base_image_path):
-        url = _upload_asset(base_image_path, run_id=scene_data.get("run_id_ref"))
-        if url: remote_assets[f"{scene_id}_image"] = url
-        
-    if os.path.exists(video_path):
-        url = _upload_asset(video_path, run_id=scene_data.get("run_id_ref"))
-        if url: remote_assets[f"{scene_id}_video"] = url
-
-    usage_stats = {
-        "video_model": "ken-burns",  # Fixed typo: "kenn-burns" → "ken-burns"
-        "video_duration": 0,
-        "image_model": config.get("image_model")
-    }
-    return video_path, base_image_path, remote_assets, usage_stats
-
-
-
-
-
-
+    return video_path
 
+def _reference_part(path: str, model_name: str, config: Dict[str, Any] = {}, pooled=None):
+    """
+    Returns a reference image as a Part, fetched/decoded/downscaled once per run via the
+    shared ReferenceAssetStore. With an API key (`pooled`), the image is uploaded once per
+    run through the Files API and passed by URI instead of inlining the bytes per scene.
+    """
+    from execution.reference_assets import get_reference_store
+    from execution.provider_files import provider_files, MIN_UPLOAD_BYTES
 
-def _load_image_robust(path: str):
-    """Loads an image from a local path or a remote URL."""
-    from PIL import Image
-    import requests
-    from io import BytesIO
-    
-    if path.startswith("http"):
-        print(f"Downloading reference image from: {path}")
-        resp = requests.get(path, timeout=15)
-        resp.raise_for_status()
-        return Image.open(BytesIO(resp.content))
-    else:
-        return Image.open(path)
+    asset = get_reference_store(config.get("run_id")).get(path, model_name=model_name)
+    if pooled is not None and config.get("provider_file_refs", True) and len(asset.data) >= MIN_UPLOAD_BYTES:
+        try:
+            handle = provider_files.get_or_upload(config.get("run_id"), pooled, path, asset.data, asset.mime_type)
+            return types.Part.from_uri(file_uri=handle.uri, mime_type=handle.mime_type)
+        except Exception as e:
+            print(f"⚠️ Reference upload failed ({e}). Sending inline bytes.")
+    return types.Part.from_bytes(data=asset.data, mime_type=asset.mime_type)
 
 def _generate_multimodal_image(prompt: str, reference_image_path: str, output_path: str, previous_image_path: str = None, model_name: str = "gemini-2.5-flash-image", aspect_ratio: str = "9:16", config: Dict[str, Any] = {}):
 
@@ -560,17 +643,19 @@ def _generate_multimodal_image(prompt: str, reference_image_path: str, output_pa
     Uses Gemini 2.5 Flash Image to generate a new image based on a prompt and reference image.
     If previous_image_path is provided, it is included to enforce character consistency.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+    from execution.client_registry import client_registry
+    from execution.key_pool import key_pool, is_daily_quota_error
+    pooled = key_pool.select(model_name)
+    client = client_registry.get("genai", pooled.api_key)
     
-    reference_image = _load_image_robust(reference_image_path)
+    reference_image = _reference_part(reference_image_path, model_name, config, pooled=pooled)
     
     contents = [prompt, reference_image]
     
     # Add consistency image if available
     if previous_image_path and (os.path.exists(previous_image_path) or previous_image_path.startswith("http")):
         print(f"Using previous scene image for consistency: {previous_image_path}")
-        prev_image = _load_image_robust(previous_image_path)
+        prev_image = _reference_part(previous_image_path, model_name, config, pooled=pooled)
         contents.append(prev_image)
 
         # Update prompt to reference it
@@ -592,30 +677,34 @@ def _generate_multimodal_image(prompt: str, reference_image_path: str, output_pa
 
     # Model: gemini-2.5-flash-image
     print(f"Calling Gemini 2.5-Flash-Image with prompt: {prompt[:200]}...")
+    from execution.provider_control import get_controller, is_throttle_error, parse_retry_after
+    from execution.exceptions import ProviderThrottledException
+    controller = get_controller("google", f"{model_name}@{pooled.key_id}", kind="image")
     try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents
-        )
+        with controller.slot():
+            response = client.models.generate_content(
+                model=model_name,
+                contents=contents
+            )
         
         if response.parts:
             for part in response.parts:
                 if part.inline_data:
-                    # Decode and save
+                    # Decode once, post-process in memory, encode once (CPU-pool worker)
                     try:
-                         if hasattr(part, 'as_image'):
-                             img_out = part.as_image()
-                         else:
-                            import io
-                            from PIL import Image as PILImage
-                            img_out = PILImage.open(io.BytesIO(part.inline_data.data))
-                            
-                         img_out.save(output_path)
-                         print(f"Multimodal Image Saved to: {output_path}")
-
-                         # Apply Watermark
+                         from execution.image_pipeline import process_image_file
+                         watermark_text = None
                          if config and config.get("watermark_enabled", True):
-                             _apply_watermark(output_path, text=config.get("watermark_text", "IGNITE AI"))
+                             watermark_text = config.get("watermark_text", "IGNITE AI")
+                         process_image_file(
+                             part.inline_data.data,
+                             output_path,
+                             watermark_text=watermark_text,
+                             aspect_ratio=aspect_ratio if (config or {}).get("aspect_crop", True) else None
+                         )
+                         print(f"Multimodal Image Saved to: {output_path}")
+                         controller.record_success()
+                         client_registry.record_success("genai", pooled.api_key)
 
                          return output_path, model_name
                     except Exception as e:
@@ -627,38 +716,64 @@ def _generate_multimodal_image(prompt: str, reference_image_path: str, output_pa
         
     except Exception as e:
         print(f"Gemini 2.5 Generation Failed: {e}")
+        if is_daily_quota_error(e):
+            key_pool.drain(pooled, model_name)
+        elif is_throttle_error(e) and not isinstance(e, ProviderThrottledException):
+            controller.record_throttle(parse_retry_after(e))
+        client_registry.record_failure("genai", e, pooled.api_key)
         raise e
 
+def _asset_destination(local_path: str, run_id: str = None) -> str:
+    """Bucket path for a local asset: tmp/run_123/file.mp4 -> runs/run_123/file.mp4"""
+    normalized = local_path.replace("\\", "/")
+    if "tmp/" in normalized:
+        parts = normalized.split("tmp/")
+        relative_path = parts[-1]
+        # Ensure no leading slash
+        if relative_path.startswith("/"): relative_path = relative_path[1:]
+        return f"runs/{relative_path}"
+    elif run_id:
+        # Fallback if path doesn't contain tmp (unlikely)
+        return f"runs/{run_id}/{os.path.basename(local_path)}"
+    # Last resort
+    return f"runs/misc/{os.path.basename(local_path)}"
+
 def _upload_asset(local_path: str, run_id: str = None) -> Optional[str]:
     """Helper to upload asset to Firebase Storage immediately."""
     try:
         # Dynamic import to avoid circular dependency issues at toplevel
         from projects.backend.services.storage_service import storage_service
         
-        # Determine destination
-        # local: tmp/run_123/file.mp4 -> runs/run_123/file.mp4
-        normalized = local_path.replace("\\", "/")
-        if "tmp/" in normalized:
-            parts = normalized.split("tmp/")
-            relative_path = parts[-1]
-            # Ensure no leading slash
-            if relative_path.startswith("/"): relative_path = relative_path[1:]
-            destination = f"runs/{relative_path}"
-        elif run_id:
-            # Fallback if path doesn't contain tmp (unlikely)
-            filename = os.path.basename(local_path)
-            destination = f"runs/{run_id}/{filename}"
-        else:
-             # Last resort
-             destination = f"runs/misc/{os.path.basename(local_path)}"
+        destination = _asset_destination(local_path, run_id)
 
-        url = storage_service.upload_file(local_path, destination)
+        # Images from the in-memory pipeline are uploaded from their encoded bytes
+        from execution.image_pipeline import cached_bytes
+        cached = cached_bytes(local_path)
+        if cached is not None:
+            url = storage_service.upload_bytes(cached[0], destination, cached[1])
+        else:
+            url = storage_service.upload_file(local_path, destination)
         print(f"☁️ Uploaded: {destination}")
         return url
     except Exception as e:
         print(f"⚠️ Upload Skipped: {e}")
         return None
 
+def image_renditions(local_path: str, asset_key: str, run_id: str = None, config: Dict[str, Any] = {}) -> Dict[str, str]:
+    """Uploads compact WebP/JPEG renditions of a finalized image (remote_assets entries)."""
+    from execution.image_derivatives import publish_derivatives
+    return publish_derivatives(local_path, asset_key, _asset_destination(local_path, run_id), config)
+
+def _upload_image_asset(local_path: str, asset_key: str, run_id: str = None, config: Dict[str, Any] = {}) -> Dict[str, str]:
+    """Uploads the lossless original plus its delivery renditions (the original uploads while they render)."""
+    with ContextThreadPoolExecutor(max_workers=1, thread_name_prefix=f"upload_{asset_key}") as executor:
+        original = executor.submit(_upload_asset, local_path, run_id)
+        renditions = image_renditions(local_path, asset_key, run_id, config)
+        url = original.result()
+    if not url:
+        return {}
+    return {asset_key: url, **renditions}
+
 def generate_end_card(product_image_path: str, cta_text: str, website: str, output_path: str, visual_dna: Dict[str, Any] = {}, config: Dict[str, Any] = {}):
     """
     Generates a static End Card image by:
@@ -670,8 +785,6 @@ def generate_end_card(product_image_path: str, cta_text: str, website: str, outp
     remote_url = None
     
     try:
-        from PIL import Image, ImageDraw, ImageFont, ImageFilter
-        
         # Check if product image exists
         product_image_exists = product_image_path and os.path.exists(product_image_path)
         
@@ -680,7 +793,8 @@ def generate_end_card(product_image_path: str, cta_text: str, website: str, outp
         
         prod_desc = visual_dna.get("product", {}).get("visual_description", "product")
         
-        bg = None
+        bg = None   # Encoded background bytes; decoded in the CPU-pool worker
+        blur = False
         
         if product_image_exists:
             # Prompt for a clean, refreshing look
@@ -696,106 +810,30 @@ def generate_end_card(product_image_path: str, cta_text: str, website: str, outp
             # We reuse the output_path first to save the generated image
             try:
                 _generate_multimodal_image(end_card_prompt, product_image_path, output_path, config=config)
-                # Now output_path contains the generated hero shot
-                bg = Image.open(output_path).convert("RGBA")
+                # Now output_path contains the generated hero shot (bytes still in the pipeline cache)
+                from execution.image_pipeline import encoded_bytes
+                bg = encoded_bytes(output_path)[0]
             except Exception as e:
                 print(f"End Card Gen failed: {e}. Falling back to blurred original.")
                 try:
-                    img = Image.open(product_image_path).convert("RGBA")
-                    bg = img.resize((1080, 1920), Image.Resampling.LANCZOS)
-                    bg = bg.filter(ImageFilter.GaussianBlur(20))
+                    with open(product_image_path, "rb") as f:
+                        bg = f.read()
+                    blur = True
                 except Exception as img_err:
                     print(f"Failed to load product image for blur: {img_err}. Using gradient background.")
                     bg = None
         else:
             print("Product image not found. Using professional gradient background.")
         
-        # Final fallback: Create professional gradient background
+        # Compose: background (or cached brand gradient) + cached brand layer + per-run text
+        from execution.cpu_pool import cpu_pool
+        from execution.end_card import render_end_card_png, fetch_logo
+        from execution.image_pipeline import save_encoded
         if bg is None:
-            print("Creating gradient background for end card...")
-            target_size = (1080, 1920)
-            
-            # Create a beautiful gradient (dark blue to purple)
-            bg = Image.new('RGBA', target_size, (0, 0, 0, 255))
-            draw_grad = ImageDraw.Draw(bg)
-            
-            # Gradient from top to bottom
-            for y in range(target_size[1]):
-                # Interpolate between two colors
-                ratio = y / target_size[1]
-                # Dark blue (20, 30, 60) to deep purple (60, 20, 80)
-                r = int(20 + (60 - 20) * ratio)
-                g = int(30 + (20 - 30) * ratio)
-                b = int(60 + (80 - 60) * ratio)
-                draw_grad.rectangle([(0, y), (target_size[0], y + 1)], fill=(r, g, b, 255))
-            
-            bg = bg.convert("RGBA")
-             
-        # Ensure BG is 1080x1920 (Vertical Video)
-        target_size = (1080, 1920)
-        if bg.size != target_size:
-            # Resize/Crop to fill
-            ratio = max(target_size[0] / bg.width, target_size[1] / bg.height)
-            new_size = (int(bg.width * ratio), int(bg.height * ratio))
-            bg = bg.resize(new_size, Image.Resampling.LANCZOS)
-            left = (bg.width - target_size[0]) / 2
-            top = (bg.height - target_size[1]) / 2
-            bg = bg.crop((left, top, left + target_size[0], top + target_size[1]))
-
-        # 2. Add Subtle Dark Gradient for Text Readability at Bottom
-        # Instead of full overlay, just gradient at bottom
-        overlay = Image.new('RGBA', target_size, (0, 0, 0, 0))
-        draw_overlay = ImageDraw.Draw(overlay)
-        
-        # Simple gradient simulation: semi-transparent box at bottom
-        draw_overlay.rectangle([(0, 1300), (1080, 1920)], fill=(0, 0, 0, 150))
-        
-        bg = Image.alpha_composite(bg, overlay)
-        
-        # Fonts
-        font_cta = _get_font(90)
-        font_url = _get_font(65)
-        
-        # 3. Add Text
-        draw = ImageDraw.Draw(bg)
-            
-        # Draw CTA (Shop Now / Get Parsley ...)
-        if not cta_text: cta_text = "Shop Now. Link in Bio!"
-        
-        # Centered Text Logic
-        def draw_centered(text, y, font, fill):
-             length = draw.textlength(text, font=font)
-             x = (target_size[0] - length) // 2
-             draw.text((x, y), text, font=font, fill=fill)
-             
-        draw_centered(cta_text, 1500, font_cta, "white")
-        draw_centered(website, 1650, font_url, "#FFD700") # Gold color
-        
-        # 4. Brand Logo Overlay
+            print("Using cached gradient brand layer for end card...")
         brand = config.get("brand", {})
-        logo_url = brand.get("logo_url")
-        if logo_url:
-            print(f"Overlaying Brand Logo from {logo_url}")
-            try:
-                import requests
-                from io import BytesIO
-                resp = requests.get(logo_url, timeout=10)
-                if resp.status_code == 200:
-                    logo_img = Image.open(BytesIO(resp.content)).convert("RGBA")
-                    # Resize logo (e.g. max width 400px)
-                    logo_ratio = 400 / logo_img.width
-                    logo_size = (400, int(logo_img.height * logo_ratio))
-                    logo_img = logo_img.resize(logo_size, Image.Resampling.LANCZOS)
-                    
-                    # Position at Top Center
-                    lx = (target_size[0] - logo_img.width) // 2
-                    ly = 200
-                    bg.paste(logo_img, (lx, ly), logo_img)
-            except Exception as le:
-                print(f"Failed to overlay brand logo: {le}")
-
-        bg = bg.convert("RGB")
-        bg.save(output_path)
+        card = cpu_pool.run(render_end_card_png, bg, cta_text, website, brand, blur, logo=fetch_logo(brand))
+        save_encoded(output_path, card, "image/png")
 
         print("End Card Generated.")
         
@@ -0,0 +1,592 @@
+"""
+Local simulation providers for capacity planning and load tests.
+
+With SIMULATION_MODE=1 no provider is called and nothing is billed:
+- client_registry hands out simulated genai / OpenAI / ElevenLabs clients that mirror
+  the SDK calls the pipeline makes. MediaFactory, the scene generator, voice, BGM and
+  captions keep their real code paths (key pool, adaptive controllers, Veo polling,
+  retries) and only the provider behind them is simulated.
+- llm_factory's LiteLLM `completion` returns JSON shaped for the prompt (Visual DNA,
+  script scenes, music prompt).
+- StorageService "uploads" into a local directory and returns file:// URLs.
+
+Outputs are synthetic: solid-colour PNGs (pure Python), and colour-field videos and
+tone audio rendered once per (duration, size) with FFmpeg, then copied.
+
+Each operation (llm, image, video, tts, bgm, stt, upload, files) draws its latency,
+failure and 429 outcomes from a profile: built-in defaults, overridden per operation
+by SIMULATION_PROFILE. With SIMULATION_TRACE, latencies are replayed from a recorded
+trace instead: a TRACE_FILE export (execution/tracing.py) from production, where each
+operation samples the durations of its span (TRACE_SPANS).
+
+Config (env):
+    SIMULATION_MODE        - 1/true to enable
+    SIMULATION_PROFILE     - JSON file, e.g. {"video": {"latency": {"dist": "lognormal",
+                             "median": 70, "sigma": 0.3}, "failure_rate": 0.02, "throttle_rate": 0.05}}
+    SIMULATION_TRACE       - OTLP/JSON span file (one span per line) to replay latencies from
+    SIMULATION_TIME_SCALE  - Multiplies every latency (default 1.0; e.g. 0.1 for quick runs)
+    SIMULATION_SEED        - Seed for reproducible outcome sequences
+    SIMULATION_API_KEYS    - Number of placeholder Gemini keys in the key pool (default 1)
+    SIMULATION_STORAGE_DIR - Where uploads land (default tmp/simulated_storage)
+
+Usage:
+    SIMULATION_MODE=1 SIMULATION_TIME_SCALE=0.2 python -m uvicorn projects.backend.main:app
+
+    from execution.simulation import get_simulator
+    get_simulator().stats()   # Calls, failures, throttles and simulated seconds per operation
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import shutil
+import struct
+import subprocess
+import threading
+import time
+import uuid
+import zlib
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SIMULATION_MODE = os.getenv("SIMULATION_MODE", "").lower() in ("1", "true", "yes")
+STORAGE_DIR = os.getenv("SIMULATION_STORAGE_DIR", os.path.join("tmp", "simulated_storage"))
+CACHE_DIR = os.path.join("tmp", "simulation_cache")
+WORDS_PER_SECOND = 2.6     # Narration pace used for simulated TTS timing
+
+# Built-in profile: rough production medians (seconds) and error rates per operation
+DEFAULT_PROFILE: Dict[str, Dict[str, Any]] = {
+    "llm": {"latency": {"dist": "lognormal", "median": 4.0, "sigma": 0.35}, "failure_rate": 0.01, "throttle_rate": 0.01},
+    "image": {"latency": {"dist": "lognormal", "median": 9.0, "sigma": 0.3}, "failure_rate": 0.02, "throttle_rate": 0.03},
+    "video": {"latency": {"dist": "lognormal", "median": 75.0, "sigma": 0.25}, "failure_rate": 0.03, "throttle_rate": 0.05, "retry_after": 30},
+    "tts": {"latency": {"dist": "lognormal", "median": 3.0, "sigma": 0.3}, "failure_rate": 0.01, "throttle_rate": 0.01},
+    "bgm": {"latency": {"dist": "lognormal", "median": 9.0, "sigma": 0.3}, "failure_rate": 0.02, "throttle_rate": 0.01},
+    "stt": {"latency": {"dist": "lognormal", "median": 2.5, "sigma": 0.3}, "failure_rate": 0.01, "throttle_rate": 0.0},
+    "upload": {"latency": {"dist": "lognormal", "median": 0.6, "sigma": 0.5}, "failure_rate": 0.005, "throttle_rate": 0.0},
+    "files": {"latency": {"dist": "lognormal", "median": 0.8, "sigma": 0.4}, "failure_rate": 0.0, "throttle_rate": 0.0},
+}
+
+# Span (execution/tracing.py) whose recorded durations an operation replays
+TRACE_SPANS = {
+    "llm": "llm.completion",
+    "image": "image.generate",
+    "video": "veo.poll",
+    "tts": "tts.convert",
+    "bgm": "bgm.generate",
+    "stt": "stt.transcribe",
+    "upload": "storage.upload",
+}
+
+FRAME_SIZES = {"9:16": (720, 1280), "16:9": (1280, 720), "1:1": (1024, 1024), "4:5": (864, 1080)}
+PALETTE = [(230, 57, 70), (241, 250, 238), (168, 218, 220), (69, 123, 157), (29, 53, 87),
+           (244, 162, 97), (42, 157, 143), (233, 196, 106), (38, 70, 83), (231, 111, 81)]
+
+
+class SimulatedProviderError(RuntimeError):
+    """Raised by simulated providers; 429s match provider_control.is_throttle_error."""
+
+
+def sample_distribution(spec: Dict[str, Any], rng: random.Random) -> float:
+    dist = spec.get("dist", "constant")
+    if dist == "constant":
+        return float(spec["value"])
+    if dist == "uniform":
+        return rng.uniform(spec["min"], spec["max"])
+    if dist == "normal":
+        return max(0.0, rng.gauss(spec["mean"], spec["stddev"]))
+    if dist == "lognormal":
+        return rng.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.3))
+    if dist == "exponential":
+        return rng.expovariate(1.0 / spec["mean"])
+    raise ValueError(f"Unknown latency distribution: {dist}")
+
+
+def load_trace_latencies(path: str) -> Dict[str, List[float]]:
+    """Successful span durations (seconds) per operation from an OTLP/JSON span file."""
+    by_span = {span_name: op for op, span_name in TRACE_SPANS.items()}
+    samples: Dict[str, List[float]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            op = by_span.get(span.get("name"))
+            if not op:
+                continue
+            attrs = {a["key"]: list(a["value"].values())[0] for a in span.get("attributes", [])}
+            if attrs.get("outcome", "ok") != "ok":
+                continue
+            seconds = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9
+            samples.setdefault(op, []).append(seconds)
+    return samples
+
+
+class Simulator:
+    """Draws latency and outcome per simulated call and keeps per-operation counters."""
+
+    def __init__(self, profile: Optional[Dict[str, Dict[str, Any]]] = None, trace_path: Optional[str] = None,
+                 time_scale: float = 1.0, seed: Optional[int] = None, sleep: Callable[[float], None] = time.sleep):
+        self.profile = {op: dict(spec) for op, spec in DEFAULT_PROFILE.items()}
+        for op, spec in (profile or {}).items():
+            self.profile[op] = {**self.profile.get(op, {}), **spec}
+        self.traces = load_trace_latencies(trace_path) if trace_path else {}
+        self.time_scale = time_scale
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_env(cls) -> "Simulator":
+        profile = None
+        if os.getenv("SIMULATION_PROFILE"):
+            with open(os.getenv("SIMULATION_PROFILE"), "r") as f:
+                profile = json.load(f)
+        seed = os.getenv("SIMULATION_SEED")
+        return cls(profile=profile, trace_path=os.getenv("SIMULATION_TRACE") or None,
+                   time_scale=float(os.getenv("SIMULATION_TIME_SCALE", "1.0")),
+                   seed=int(seed) if seed else None)
+
+    def draw(self, op: str) -> Tuple[str, float]:
+        """(outcome, latency seconds) for one call: outcome is "ok", "throttle" or "failure"."""
+        spec = self.profile.get(op) or {"latency": {"dist": "constant", "value": 0.0}}
+        with self._lock:
+            roll = self._rng.random()
+            if roll < spec.get("throttle_rate", 0.0):
+                outcome = "throttle"
+            elif roll < spec.get("throttle_rate", 0.0) + spec.get("failure_rate", 0.0):
+                outcome = "failure"
+            else:
+                outcome = "ok"
+            if self.traces.get(op):
+                latency = self._rng.choice(self.traces[op])
+            else:
+                latency = sample_distribution(spec["latency"], self._rng)
+            latency *= self.time_scale
+            if outcome == "throttle":
+                latency = min(latency, 0.5 * self.time_scale)  # 429s come back fast
+
+            stats = self._stats.setdefault(op, {"calls": 0, "failures": 0, "throttles": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats["seconds"] += latency
+            if outcome == "failure":
+                stats["failures"] += 1
+            elif outcome == "throttle":
+                stats["throttles"] += 1
+        return outcome, latency
+
+    def error(self, op: str, outcome: str, model: Optional[str] = None) -> SimulatedProviderError:
+        if outcome == "throttle":
+            retry_after = self.profile.get(op, {}).get("retry_after", 10)
+            return SimulatedProviderError(
+                f"429 RESOURCE_EXHAUSTED: simulated rate limit for {model or op} (retryDelay: {retry_after}s)")
+        return SimulatedProviderError(f"500 INTERNAL: simulated {op} failure ({model or op})")
+
+    def call(self, op: str, model: Optional[str] = None) -> float:
+        """Blocks for the operation's latency; raises a simulated 429 or failure at the drawn rates."""
+        outcome, latency = self.draw(op)
+        self.sleep(latency)
+        if outcome != "ok":
+            raise self.error(op, outcome, model)
+        return latency
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {op: {k: round(v, 3) if isinstance(v, float) else v for k, v in s.items()}
+                    for op, s in self._stats.items()}
+
+
+_simulator: Optional[Simulator] = None
+_simulator_lock = threading.Lock()
+
+
+def get_simulator() -> Simulator:
+    global _simulator
+    if _simulator is None:
+        with _simulator_lock:
+            if _simulator is None:
+                _simulator = Simulator.from_env()
+    return _simulator
+
+
+# --- Synthetic media ---
+
+def frame_size(aspect_ratio: Optional[str]) -> Tuple[int, int]:
+    return FRAME_SIZES.get(aspect_ratio or "9:16", FRAME_SIZES["9:16"])
+
+
+def _colour(seed_text: str) -> Tuple[int, int, int]:
+    return PALETTE[int(hashlib.sha1(seed_text.encode("utf-8")).hexdigest(), 16) % len(PALETTE)]
+
+
+_png_cache: Dict[Tuple[int, int, Tuple[int, int, int]], bytes] = {}
+
+
+def synthetic_png(width: int, height: int, seed_text: str = "") -> bytes:
+    """Solid-colour PNG (colour picked from the prompt), encoded without PIL."""
+    rgb = _colour(seed_text)
+    key = (width, height, rgb)
+    if key not in _png_cache:
+        def chunk(tag: bytes, data: bytes) -> bytes:
+            return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+        row = b"\x00" + bytes(rgb) * width
+        _png_cache[key] = (b"\x89PNG\r\n\x1a\n"
+                           + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                           + chunk(b"IDAT", zlib.compress(row * height, 6))
+                           + chunk(b"IEND", b""))
+    return _png_cache[key]
+
+
+_render_lock = threading.Lock()
+
+
+def _rendered(name: str, args: List[str]) -> bytes:
+    """Renders a template once with FFmpeg (cached on disk) and returns its bytes."""
+    path = os.path.join(CACHE_DIR, name)
+    with _render_lock:
+        if not os.path.exists(path):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.part{os.path.splitext(path)[1]}"
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args, tmp_path], check=True, capture_output=True)
+            os.replace(tmp_path, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def synthetic_video(duration: float, width: int, height: int, seed_text: str = "") -> bytes:
+    """Silent colour-field H.264 clip (like a Veo result without native audio)."""
+    duration = round(float(duration), 1)
+    r, g, b = _colour(seed_text)
+    colour = f"0x{r:02x}{g:02x}{b:02x}"
+    return _rendered(f"video_{width}x{height}_{duration}_{colour}.mp4", [
+        "-f", "lavfi", "-i", f"color=c={colour}:s={width}x{height}:r=24:d={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+    ])
+
+
+def synthetic_audio(duration: float, frequency: int = 220) -> bytes:
+    """Low tone MP3 of the given length (stands in for narration or music)."""
+    duration = round(float(duration), 1)
+    return _rendered(f"audio_{frequency}_{duration}.mp3", [
+        "-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={duration}",
+        "-c:a", "libmp3lame", "-b:a", "64k",
+    ])
+
+
+def simulated_alignment(text: str) -> Tuple[Dict[str, List[Any]], float]:
+    """ElevenLabs-style character alignment at WORDS_PER_SECOND; returns (alignment, duration)."""
+    chars: List[str] = []
+    starts: List[float] = []
+    ends: List[float] = []
+    t = 0.1
+    word_seconds = 1.0 / WORDS_PER_SECOND
+    for i, word in enumerate(text.split()):
+        if i:
+            chars.append(" ")
+            starts.append(t)
+            ends.append(t)
+        step = word_seconds / max(1, len(word))
+        for ch in word:
+            chars.append(ch)
+            starts.append(round(t, 3))
+            t += step
+            ends.append(round(t, 3))
+    return ({"characters": chars, "character_start_times_seconds": starts,
+             "character_end_times_seconds": ends}, max(1.0, t + 0.3))
+
+
+# --- Simulated JSON (LLM) ---
+
+SIMULATED_DNA = {
+    "character": {
+        "description": "Energetic Gen-Z creator filming a handheld review",
+        "hair": "Shoulder-length dark hair, loose",
+        "clothing": "Oversized cream hoodie",
+        "vibe": "energetic, friendly",
+    },
+    "product": {
+        "name": "Simulated Product",
+        "visual_description": "Matte teal bottle with a white wraparound label",
+        "text_on_product": "SIMULATED",
+        "liquid_color": "clear",
+    },
+    "visual_style": {
+        "lighting": "Soft window light, golden hour",
+        "camera_angle": "Handheld selfie, eye-level",
+    },
+}
+
+
+def simulated_json(system_prompt: str, user_prompt: Any = "") -> Dict[str, Any]:
+    """A response shaped like what the prompt asks for."""
+    if '"scenes"' in system_prompt:
+        ids = re.findall(r'"id":\s*"(\w+)"', system_prompt) or ["Hook", "Feature", "CTA"]
+        durations = [float(d) for d in re.findall(r'"duration_seconds":\s*([\d.]+)', system_prompt)]
+        scenes = []
+        for i, scene_id in enumerate(ids):
+            duration = durations[i] if i < len(durations) else 5.0
+            words = max(3, int(duration * WORDS_PER_SECOND * 0.8))
+            line = " ".join(["Simulated", scene_id.lower(), "line"] + ["and"] * (words - 3))
+            scenes.append({
+                "id": scene_id,
+                "description": f"{scene_id}: creator holds the product to camera, handheld, natural light.",
+                "duration_seconds": duration,
+                "scene_script": line + ".",
+            })
+        return {"scenes": scenes}
+    if '"music_prompt"' in system_prompt:
+        return {"music_prompt": "Upbeat lofi hip hop beat with jazzy chords"}
+    if '"visual_style"' in system_prompt or '"character"' in system_prompt:
+        return json.loads(json.dumps(SIMULATED_DNA))
+    return {"content": "Simulated response."}
+
+
+def simulated_completion(model: str, messages: List[Dict[str, Any]], **kwargs):
+    """Drop-in for litellm.completion (the fields llm_factory reads)."""
+    get_simulator().call("llm", model)
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in messages if m.get("role") == "user"), "")
+    content = json.dumps(simulated_json(system if isinstance(system, str) else "", user))
+    prompt_tokens = len(json.dumps(messages, default=str)) // 4
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4),
+    )
+
+
+# --- Simulated SDK clients ---
+
+class _VideoOperation:
+    """Long-running Veo operation: done once its drawn latency has passed."""
+
+    def __init__(self, model: str, ready_at: float, failed: bool, duration: float, aspect_ratio: str, seed_text: str):
+        self.name = f"models/{model}/operations/sim-{uuid.uuid4().hex[:12]}"
+        self.model = model
+        self.ready_at = ready_at
+        self.failed = failed
+        self.duration = duration
+        self.aspect_ratio = aspect_ratio
+        self.seed_text = seed_text
+        self.response = None
+        self.error = None
+        self.state = "RUNNING"
+
+    @property
+    def done(self) -> bool:
+        if self.state == "RUNNING" and time.time() >= self.ready_at:
+            if self.failed:
+                self.error = {"code": 13, "message": f"Simulated {self.model} generation failure"}
+                self.state = "FAILED"
+            else:
+                width, height = frame_size(self.aspect_ratio)
+                video = SimpleNamespace(video_bytes=synthetic_video(self.duration, width, height, self.seed_text),
+                                        uri=None, mime_type="video/mp4")
+                self.response = SimpleNamespace(generated_videos=[SimpleNamespace(video=video)])
+                self.state = "SUCCEEDED"
+        return self.state != "RUNNING"
+
+
+class _GenaiModels:
+    def __init__(self, sim: Simulator):
+        self.sim = sim
+
+    def generate_images(self, model: str, prompt: str, config: Any = None, **kwargs):
+        self.sim.call("image", model)
+        width, height = frame_size(getattr(config, "aspect_ratio", None))
+        image = SimpleNamespace(image_bytes=synthetic_png(width, height, prompt), mime_type="image/png")
+        return SimpleNamespace(generated_images=[SimpleNamespace(image=image)])
+
+    def generate_content(self, model: str, contents: Any = None, config: Any = None, **kwargs):
+        if "image" in model:
+            self.sim.call("image", model)
+            prompt = contents[0] if isinstance(contents, list) and contents and isinstance(contents[0], str) else ""
+            width, height = frame_size("9:16")
+            data = synthetic_png(width, height, prompt)
+            part = SimpleNamespace(inline_data=SimpleNamespace(data=data, mime_type="image/png"), text=None)
+            return SimpleNamespace(parts=[part], text=None)
+        self.sim.call("llm", model)
+        text = json.dumps(simulated_json(str(getattr(config, "system_instruction", "") or ""), contents))
+        return SimpleNamespace(parts=[SimpleNamespace(inline_data=None, text=text)], text=text)
+
+    def generate_videos(self, model: str, prompt: str = None, image: Any = None, source: Any = None,
+                        config: Any = None, **kwargs):
+        outcome, latency = self.sim.draw("video")
+        if outcome == "throttle":
+            self.sim.sleep(latency)
+            raise self.sim.error("video", outcome, model)
+        prompt = prompt or getattr(source, "prompt", "") or ""
+        duration = float(getattr(config, "duration_seconds", None) or 6.0)
+        return _VideoOperation(model, time.time() + latency, outcome == "failure", duration,
+                               getattr(config, "aspect_ratio", None) or "9:16", prompt)
+
+
+class _GenaiOperations:
+    def get(self, operation: _VideoOperation, **kwargs) -> _VideoOperation:
+        operation.done  # Resolves it once ready
+        return operation
+
+
+class _GenaiFiles:
+    def __init__(self, sim: Simulator):
+        self.sim = sim
+        self._files: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, file: Any = None, config: Any = None, **kwargs):
+        self.sim.call("files")
+        data = file.read() if hasattr(file, "read") else b""
+        name = f"files/sim-{hashlib.sha1(data).hexdigest()[:12]}-{uuid.uuid4().hex[:6]}"
+        handle = SimpleNamespace(name=name, uri=f"https://generativelanguage.googleapis.com/v1beta/{name}",
+                                 mime_type=getattr(config, "mime_type", None), state="ACTIVE")
+        with self._lock:
+            self._files[name] = handle
+        return handle
+
+    def get(self, name: str, **kwargs):
+        with self._lock:
+            return self._files[name]
+
+    def delete(self, name: str, **kwargs):
+        with self._lock:
+            self._files.pop(name, None)
+
+    def download(self, file: Any = None, **kwargs) -> bytes:
+        return getattr(file, "video_bytes", None) or b""
+
+
+class SimulatedGenaiClient:
+    def __init__(self, sim: Simulator):
+        self.models = _GenaiModels(sim)
+        self.operations = _GenaiOperations()
+        self.files = _GenaiFiles(sim)
+
+
+class _OpenAIImages:
+    def __init__(self, sim: Simulator):
+        self.sim = sim
+
+    def generate(self, model: str = "dall-e-3", prompt: str = "", size: str = "1024x1792", **kwargs):
+        self.sim.call("image", model)
+        width, height = (int(v) for v in size.split("x"))
+        path = os.path.abspath(os.path.join(STORAGE_DIR, "openai", f"{uuid.uuid4().hex}.png"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(synthetic_png(width, height, prompt))
+        return SimpleNamespace(data=[SimpleNamespace(url=f"file://{path}", b64_json=None)])
+
+
+class SimulatedOpenAIClient:
+    def __init__(self, sim: Simulator):
+        self.images = _OpenAIImages(sim)
+
+
+class _TextToSpeech:
+    def __init__(self, sim: Simulator):
+        self.sim = sim
+
+    def convert(self, text: str, voice_id: str = None, model_id: str = None, **kwargs):
+        self.sim.call("tts", model_id)
+        _, duration = simulated_alignment(text)
+        return iter([synthetic_audio(duration, frequency=220)])
+
+    def convert_with_timestamps(self, text: str, voice_id: str = None, model_id: str = None, **kwargs):
+        self.sim.call("tts", model_id)
+        alignment, duration = simulated_alignment(text)
+        audio = base64.b64encode(synthetic_audio(duration, frequency=220)).decode("ascii")
+        return {"audio_base64": audio, "alignment": alignment}
+
+
+class _SoundEffects:
+    def __init__(self, sim: Simulator):
+        self.sim = sim
+
+    def convert(self, text: str, duration_seconds: float = 22, **kwargs):
+        self.sim.call("bgm")
+        return iter([synthetic_audio(duration_seconds, frequency=330)])
+
+
+class _SpeechToText:
+    def __init__(self, sim: Simulator):
+        self.sim = sim
+
+    def convert(self, file: Any = None, model_id: str = None, **kwargs):
+        self.sim.call("stt", model_id)
+        from execution.ffmpeg_rendering import probe_duration
+        duration = (probe_duration(getattr(file, "name", "")) if file is not None else None) or 10.0
+        step = 1.0 / WORDS_PER_SECOND
+        words = [SimpleNamespace(text="simulated", start_time=round(i * step, 3), end_time=round((i + 0.8) * step, 3))
+                 for i in range(int(duration / step))]
+        return SimpleNamespace(words=words, text=" ".join(w.text for w in words))
+
+
+class SimulatedElevenLabsClient:
+    def __init__(self, sim: Simulator):
+        self.text_to_speech = _TextToSpeech(sim)
+        self.text_to_sound_effects = _SoundEffects(sim)
+        self.speech_to_text = _SpeechToText(sim)
+
+
+SIMULATED_CLIENTS = {
+    "genai": SimulatedGenaiClient,
+    "openai": SimulatedOpenAIClient,
+    "elevenlabs": SimulatedElevenLabsClient,
+}
+
+
+def simulated_client(provider: str):
+    return SIMULATED_CLIENTS[provider](get_simulator())
+
+
+# --- Simulated storage ---
+
+class _LocalBlob:
+    def __init__(self, root: str, name: str, sim: Simulator):
+        self.name = name
+        self.path = os.path.abspath(os.path.join(root, name))
+        self.sim = sim
+        self.cache_control = None
+        self.chunk_size = None
+
+    def upload_from_filename(self, filename: str, content_type: str = None):
+        self.sim.call("upload")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        shutil.copyfile(filename, self.path)
+
+    def upload_from_string(self, data: bytes, content_type: str = None):
+        self.sim.call("upload")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+
+    def make_public(self):
+        pass
+
+    @property
+    def public_url(self) -> str:
+        return f"file://{self.path}"
+
+
+class SimulatedBucket:
+    """Stand-in for the Firebase Storage bucket: blobs are files under SIMULATION_STORAGE_DIR."""
+
+    def __init__(self, root: str = STORAGE_DIR, sim: Optional[Simulator] = None):
+        self.root = root
+        self.sim = sim or get_simulator()
+
+    def blob(self, name: str) -> _LocalBlob:
+        return _LocalBlob(self.root, name, self.sim)
+
+
+if SIMULATION_MODE:
+    # Placeholder keys so key-gated code paths (key pool, BGM, voice) run
+    if os.getenv("SIMULATION_API_KEYS") or not (os.getenv("GEMINI_API_KEYS") or os.getenv("GEMINI_API_KEY")):
+        keys = max(1, int(os.getenv("SIMULATION_API_KEYS", "1")))
+        os.environ["GEMINI_API_KEYS"] = ",".join(f"simulated-{i + 1}" for i in range(keys))
+    os.environ.setdefault("ELEVENLABS_API_KEY", "simulated")
+    os.environ.setdefault("OPENAI_API_KEY", "simulated")
@@ -0,0 +1,176 @@
+"""
+Timeline planner: aligns scene durations, Veo request lengths and clip trims with the voiceover.
+
+Runs after the script and the voiceover exist, before any scene is rendered:
+1. Exact per-scene durations from the VO word timing. Each scene's share of the words
+   in its `scene_script` decides where its boundary falls, and cuts land in the pause
+   between words. Without timing, the script durations are scaled to the VO length.
+2. The minimum Veo length that covers each scene (Veo only accepts a few fixed lengths),
+   instead of always asking for 6-8s when the scene uses 3-4s.
+3. Packing: adjacent short scenes whose combined length still fits one Veo request are
+   rendered as a single clip and cut apart at the boundary (one request instead of two).
+4. Trim points per clip, so assembly cuts with stream copy instead of looping the video.
+
+The plan is stored on each scene as `scene["timeline"]`:
+    {"start": 3.2, "duration": 3.4, "veo_duration": 4, "packed_into": None, "clip_offset": 0.0}
+"""
+
+import copy
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Clip lengths the Veo API accepts (seconds)
+VEO_DURATIONS = (4, 6, 8)
+MIN_SCENE_SECONDS = 1.5
+TAIL_PAD = 0.3          # Breathing room after the last word
+NEVER_PACK = ("hook",)  # The hook keeps its own, full-quality clip
+
+
+def _spoken_words(text: str) -> List[str]:
+    """Words that are actually voiced (drops [audio tags] and (3s) timing notes)."""
+    text = re.sub(r"\[[^\]]*\]", " ", text or "")
+    text = re.sub(r"\(\s*\d+\s*(s|seconds?)\s*\)", " ", text, flags=re.IGNORECASE)
+    return [w for w in re.split(r"\s+", text) if re.search(r"\w", w)]
+
+
+def veo_request_length(duration: float, config: Dict[str, Any] = {}) -> int:
+    """Shortest accepted Veo length that covers `duration` (capped at veo_max_duration)."""
+    allowed = sorted(config.get("veo_durations") or VEO_DURATIONS)
+    max_duration = float(config.get("veo_max_duration", allowed[-1]))
+    allowed = [d for d in allowed if d <= max_duration] or [allowed[0]]
+    for length in allowed:
+        if length >= duration - 1e-6:
+            return length
+    return allowed[-1]
+
+
+def _scene_boundaries(weights: List[float], word_timings: List[Tuple[str, float, float]], vo_duration: float) -> List[float]:
+    """Boundary times between scenes (len = scenes + 1), cut in the pause between words."""
+    words = [w for w in word_timings if _spoken_words(w[0])]
+    total_weight = sum(weights)
+    end_time = max(vo_duration, words[-1][2] if words else 0.0) + TAIL_PAD
+
+    boundaries = [0.0]
+    cumulative = 0.0
+    for weight in weights[:-1]:
+        cumulative += weight
+        index = round(cumulative / total_weight * len(words)) if total_weight else 0
+        index = min(max(index, 1), len(words) - 1) if len(words) > 1 else 0
+        if words and 0 < index < len(words):
+            cut = (words[index - 1][2] + words[index][1]) / 2.0
+        else:
+            cut = end_time * cumulative / total_weight if total_weight else boundaries[-1]
+        boundaries.append(max(cut, boundaries[-1]))
+    boundaries.append(end_time)
+    return boundaries
+
+
+def plan_timeline(scenes: List[Dict[str, Any]], word_timings: Optional[List[Tuple[str, float, float]]] = None,
+                  vo_duration: Optional[float] = None, config: Dict[str, Any] = {}, allow_packing: bool = True) -> List[Dict[str, Any]]:
+    """
+    Returns a copy of `scenes` with `duration_seconds` set to the planned length and a
+    `timeline` entry per scene (see module docstring).
+    """
+    planned = copy.deepcopy(scenes)
+    if not planned:
+        return planned
+
+    script_durations = [float(s.get("duration_seconds", 5.0)) for s in planned]
+
+    if word_timings:
+        weights = [len(_spoken_words(s.get("scene_script", ""))) for s in planned]
+        if not any(weights):
+            weights = script_durations
+        boundaries = _scene_boundaries(weights, word_timings, vo_duration or 0.0)
+        durations = [b - a for a, b in zip(boundaries, boundaries[1:])]
+        source = "VO word timing"
+    elif vo_duration:
+        scale = (vo_duration + TAIL_PAD) / sum(script_durations)
+        durations = [d * scale for d in script_durations]
+        source = "VO length"
+    else:
+        durations = script_durations
+        source = "script"
+
+    start = 0.0
+    for scene, duration in zip(planned, durations):
+        duration = round(max(MIN_SCENE_SECONDS, duration), 2)
+        scene["duration_seconds"] = duration
+        scene["timeline"] = {
+            "start": round(start, 2),
+            "duration": duration,
+            "veo_duration": veo_request_length(duration, config),
+            "packed_into": None,
+            "clip_offset": 0.0,
+        }
+        start += duration
+
+    if allow_packing and config.get("timeline_packing", True):
+        _pack_short_scenes(planned, config)
+
+    summary = ", ".join(
+        f"{s.get('id')} {s['timeline']['duration']}s"
+        + (f"→{s['timeline']['packed_into']}" if s["timeline"]["packed_into"] else f" (veo {s['timeline']['veo_duration']}s)")
+        for s in planned
+    )
+    print(f"🎞️ Timeline ({source}): {summary}")
+    return planned
+
+
+def _pack_short_scenes(scenes: List[Dict[str, Any]], config: Dict[str, Any]):
+    """Greedily packs adjacent pairs that both need less than the shortest Veo clip."""
+    allowed = sorted(config.get("veo_durations") or VEO_DURATIONS)
+    shortest = allowed[0]
+    max_duration = float(config.get("veo_max_duration", allowed[-1]))
+
+    i = 0
+    while i < len(scenes) - 1:
+        lead, follow = scenes[i], scenes[i + 1]
+        lead_t, follow_t = lead["timeline"], follow["timeline"]
+        combined = lead_t["duration"] + follow_t["duration"]
+        packable = (
+            all(not str(s.get("id", "")).lower().startswith(NEVER_PACK) for s in (lead, follow))
+            and not lead.get("modifications") and not follow.get("modifications")
+            and lead_t["duration"] < shortest and follow_t["duration"] < shortest
+            and combined <= max_duration
+        )
+        if packable:
+            lead_t["pack_with"] = [follow.get("id")]
+            lead_t["veo_duration"] = veo_request_length(combined, config)
+            follow_t["packed_into"] = lead.get("id")
+            follow_t["clip_offset"] = lead_t["duration"]
+            follow_t["veo_duration"] = 0
+            i += 2
+        else:
+            i += 1
+
+
+def unpack_scene(scenes: List[Dict[str, Any]], scene_id: str, config: Dict[str, Any] = {}):
+    """Gives a scene its own clip again (e.g. when it is regenerated on its own)."""
+    for scene in scenes:
+        timeline = scene.get("timeline")
+        if not timeline:
+            continue
+        if scene.get("id") == scene_id:
+            timeline["packed_into"] = None
+            timeline["clip_offset"] = 0.0
+            timeline.pop("pack_with", None)
+            timeline["veo_duration"] = veo_request_length(timeline["duration"], config)
+
+
+def packed_scene_data(lead: Dict[str, Any], follow: Dict[str, Any]) -> Dict[str, Any]:
+    """Scene data for rendering a packed pair as one clip: the two beats back to back."""
+    merged = dict(lead)
+    merged["description"] = f"{lead.get('description', '')} Then, in the same shot: {follow.get('description', '')}"
+    merged["scene_script"] = f"{lead.get('scene_script', '')} {follow.get('scene_script', '')}".strip()
+    merged["duration_seconds"] = lead["timeline"]["duration"] + follow["timeline"]["duration"]
+    return merged
+
+
+def clip_trim(scene: Dict[str, Any]) -> Optional[List[float]]:
+    """[start, end] within the scene's clip, or None if the scene has no plan."""
+    timeline = scene.get("timeline")
+    if not timeline:
+        return None
+    offset = float(timeline.get("clip_offset", 0.0))
+    return [round(offset, 3), round(offset + float(timeline["duration"]), 3)]
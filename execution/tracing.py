@@ -0,0 +1,210 @@
+"""
+Pipeline tracing: spans around graph nodes and external calls, plus latency histograms.
+
+A span records one timed operation: a LangGraph node, an LLM completion, an image or
+Veo call, TTS/STT, an upload, or an FFmpeg subprocess. Spans nest through a
+`contextvars` parent, so the scene threads (ContextThreadPoolExecutor) and LangGraph
+node threads attach to the run that started them. The `run_id`, `scene_id` and
+`model` attributes are inherited from the parent span (or the run log context)
+unless a span sets its own.
+
+Finished spans are:
+1. Added to in-process histograms (p50/p95/p99 per stage, and per stage+model),
+   served by the admin /latency endpoint.
+2. Exported in OTLP/JSON span format (one JSON object per line) when
+   TRACE_EXPORTER is "stdout" or "file" (TRACE_FILE, default tmp/traces.jsonl).
+   Any OpenTelemetry collector with a file receiver can ingest these.
+
+Config (env):
+    TRACE_EXPORTER  - "none" (default), "stdout" or "file"
+    TRACE_FILE      - Output path for the file exporter
+
+Usage:
+    from execution.tracing import span
+
+    with span("veo.submit", model=model_name, scene_id="Hook") as s:
+        operation = client.models.generate_videos(...)
+        s.set_attribute("veo.duration", 6)
+    # Outcome is "ok", or "error" when the block raises
+"""
+
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+from typing import Any, Dict, Optional
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("tmp", "traces.jsonl"))
+RESERVOIR_SIZE = 1000       # Latest samples kept per histogram
+INHERITED = ("run_id", "scene_id", "model")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation (OTLP-compatible fields)."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.outcome = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        attributes = dict(self.attributes, outcome=self.outcome)
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [{"key": k, "value": value(v)} for k, v in attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error or ""} if self.outcome == "error" else {"code": 1},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+class LatencyHistograms:
+    """Bounded latency samples per stage and per stage+model, with percentiles on read."""
+
+    def __init__(self, reservoir: int = RESERVOIR_SIZE):
+        self.reservoir = reservoir
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float, outcome: str):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.reservoir)
+                self._counts[key] = {}
+            samples.append(seconds)
+            counts = self._counts[key]
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    @staticmethod
+    def _percentile(sorted_samples, q: float) -> float:
+        if not sorted_samples:
+            return 0.0
+        index = min(len(sorted_samples) - 1, max(0, int(round(q * (len(sorted_samples) - 1)))))
+        return sorted_samples[index]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {k: (sorted(v), dict(self._counts[k])) for k, v in self._samples.items()}
+        out = {}
+        for key, (samples, counts) in sorted(snapshot.items()):
+            out[key] = {
+                "count": sum(counts.values()),
+                "outcomes": counts,
+                "p50": round(self._percentile(samples, 0.50), 3),
+                "p95": round(self._percentile(samples, 0.95), 3),
+                "p99": round(self._percentile(samples, 0.99), 3),
+                "total_seconds": round(sum(samples), 1),
+            }
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+histograms = LatencyHistograms()
+
+_export_lock = threading.Lock()
+
+
+def _export(s: Span):
+    if TRACE_EXPORTER not in ("stdout", "file"):
+        return
+    line = json.dumps(s.to_otlp(), default=str)
+    try:
+        with _export_lock:
+            if TRACE_EXPORTER == "stdout":
+                sys.__stdout__.write(line + "\n")
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+    except Exception:
+        pass  # Tracing never breaks the pipeline
+
+
+def _inherited_attributes(parent: Optional[Span]) -> Dict[str, Any]:
+    attrs: Dict[str, Any] = {}
+    if parent is not None:
+        attrs.update({k: parent.attributes[k] for k in INHERITED if parent.attributes.get(k) is not None})
+    if "run_id" not in attrs:
+        try:
+            from execution.run_logging import current_run_id
+            run_id = current_run_id.get()
+            if run_id:
+                attrs["run_id"] = run_id
+        except Exception:
+            pass
+    return attrs
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times the block as a child of the current span; records outcome and exports it."""
+    parent = _current_span.get()
+    attrs = _inherited_attributes(parent)
+    attrs.update({k: v for k, v in attributes.items() if v is not None})
+    s = Span(name, parent, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.outcome = "cancelled" if "Cancel" in type(e).__name__ else "error"
+        s.error = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        _current_span.reset(token)
+        s.end_ns = time.time_ns()
+        histograms.record(name, s.duration, s.outcome)
+        if s.attributes.get("model"):
+            histograms.record(f"{name}[{s.attributes['model']}]", s.duration, s.outcome)
+        _export(s)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    """p50/p95/p99 per stage (and per stage[model]) for the admin endpoint."""
+    return histograms.stats()
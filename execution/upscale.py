@@ -1,6 +1,7 @@
 import os
 import subprocess
 from typing import Optional
+from execution.tracing import span
 
 def upscale_video_4k(input_path: str, output_path: str = None) -> Optional[str]:
     """
@@ -33,7 +34,8 @@ def upscale_video_4k(input_path: str, output_path: str = None) -> Optional[str]:
     
     try:
         # Run ffmpeg (capture output to hide noise unless error)
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        with span("ffmpeg.upscale"):
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         
         if result.returncode != 0:
             print(f"FFmpeg Upscale Failed: {result.stderr}")
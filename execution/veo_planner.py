@@ -0,0 +1,210 @@
+"""
+Quota-aware Veo planner.
+
+When the daily Veo quota runs low, scenes used to fall back to Ken Burns in whatever
+order threads happened to reach the rate limiter. The planner instead looks at every
+queued and running run together with the remaining daily quota (RPD, summed across
+the active keys of the key pool) and decides up front which scenes get Veo:
+
+1. Hook scenes first (the first seconds carry the ad)
+2. Paid tiers next (agency > growth > starter > free)
+3. Then runs closest to completion (running before queued, most scenes done first)
+4. Then first come, first served
+
+`generate_scene` asks `should_use_veo()` before starting a Veo job and goes straight to
+Ken Burns when the scene did not make the cut, instead of discovering the limit by trial.
+
+RPM is not part of the decision: running out of per-minute quota only delays a request
+(RateLimitService waits for a slot), while running out of daily quota denies it.
+
+A scene granted Veo counts against the budget until its request reserves quota in the
+key pool (`mark_scene_reserved`, called by media_factory through config["veo_reserved"]),
+so concurrent runs are not promised the same remaining requests twice.
+
+The registry is process-local: it sees the runs of this process only. With several
+backend processes or pods, each one plans against the shared quota on its own, and the
+rate limiter (the key pool's daily counters) stays the final word.
+
+Usage:
+    from execution.veo_planner import veo_planner
+
+    veo_planner.register_run(run_id, tier="growth")           # when queued
+    veo_planner.set_scenes(run_id, ["Hook", "Feature", "CTA"]) # when scenes are known
+    if veo_planner.should_use_veo(run_id, "Feature", model):   # in generate_scene
+        veo_planner.mark_scene_reserved(run_id, "Feature")     # once quota is reserved
+        ...
+    veo_planner.mark_scene_done(run_id, "Feature")
+    veo_planner.release_run(run_id)                            # when the run finishes
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+TIER_PRIORITY = {"agency": 3, "growth": 2, "starter": 1}
+
+# Scenes assumed for a queued run whose script has not been written yet
+# (mirrors the 4-scene layout in script_generation).
+ESTIMATED_SCENE_IDS = ["Hook", "Feature", "Lifestyle", "CTA"]
+
+PENDING, VEO, RESERVED, KEN_BURNS, DONE = "pending", "veo", "reserved", "ken_burns", "done"
+
+
+def is_hook_scene(scene_id: str) -> bool:
+    return str(scene_id).lower().startswith("hook")
+
+
+class VeoPlanner:
+    """Allocates the remaining daily Veo quota across all registered runs."""
+
+    def __init__(self, pool=None):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._runs: Dict[str, Dict[str, object]] = {}
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from execution.key_pool import key_pool
+            self._pool = key_pool
+        return self._pool
+
+    # --- Run registry ---
+
+    def register_run(self, run_id: str, tier: Optional[str] = None, status: str = "queued", scene_ids: Optional[List[str]] = None):
+        """Registers a queued (or running) run. Re-registering updates tier/status only."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                ids = scene_ids or ESTIMATED_SCENE_IDS
+                run = {
+                    "tier": None,
+                    "status": status,
+                    "registered_at": time.time(),
+                    "scenes": {sid: PENDING for sid in ids},
+                    "estimated": scene_ids is None,
+                    "grants": {},  # scene_id -> model, for Veo grants not yet reserved
+                }
+                self._runs[run_id] = run
+            run["status"] = status
+            if tier is not None:
+                run["tier"] = (tier or "").lower() or None
+
+    def set_scenes(self, run_id: str, scene_ids: List[str]):
+        """Replaces the estimated scene list with the real one and marks the run as running."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return
+            scenes = run["scenes"] if not run["estimated"] else {}
+            run["scenes"] = {sid: scenes.get(sid, PENDING) for sid in scene_ids}
+            run["estimated"] = False
+            run["status"] = "running"
+
+    def mark_scene_reserved(self, run_id: str, scene_id: str):
+        """The scene's Veo request reserved quota: it now shows in the key pool's headroom."""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["scenes"].get(scene_id) == VEO:
+                run["scenes"][scene_id] = RESERVED
+                run["grants"].pop(scene_id, None)
+
+    def mark_scene_done(self, run_id: str, scene_id: str):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and scene_id in run["scenes"]:
+                run["scenes"][scene_id] = DONE
+                run["grants"].pop(scene_id, None)
+
+    def release_run(self, run_id: str):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    # --- Planning ---
+
+    def remaining_budget(self, model: str) -> Optional[int]:
+        """Daily Veo requests left across the active keys, or None when unlimited/unknown."""
+        pool = self.pool
+        backend = pool.backend
+        if backend is None or len(pool) == 0:
+            return None
+        total = 0
+        for key in pool.keys:
+            if pool.is_drained(key, model):
+                continue
+            headroom = backend.get_headroom(model, key.key_id)
+            if headroom is None:
+                return None
+            total += headroom[1]
+        return total
+
+    def _priority(self, run: Dict[str, object], scene_id: str, order: int):
+        scenes = run["scenes"]
+        finished = sum(1 for s in scenes.values() if s != PENDING)
+        progress = finished / len(scenes) if scenes else 0.0
+        return (
+            not is_hook_scene(scene_id),
+            -TIER_PRIORITY.get(run["tier"], 0),
+            run["status"] != "running",
+            -progress,
+            run["registered_at"],
+            order,
+        )
+
+    def plan(self, model: str) -> Dict[Tuple[str, str], bool]:
+        """Returns {(run_id, scene_id): use_veo} for every scene still waiting for a decision."""
+        budget = self.remaining_budget(model)
+        with self._lock:
+            # Granted but not yet reserved: not in the headroom yet, but already promised
+            outstanding = sum(1 for run in self._runs.values() for m in run["grants"].values() if m == model)
+            pending = [
+                (self._priority(run, sid, i), run_id, sid)
+                for run_id, run in self._runs.items()
+                for i, (sid, state) in enumerate(run["scenes"].items())
+                if state == PENDING
+            ]
+        pending.sort()
+        if budget is None:
+            return {(run_id, sid): True for _, run_id, sid in pending}
+        budget -= outstanding
+        return {(run_id, sid): rank < budget for rank, (_, run_id, sid) in enumerate(pending)}
+
+    def should_use_veo(self, run_id: str, scene_id: str, model: str) -> bool:
+        """
+        Decides (once) whether this scene gets a Veo attempt. Unknown runs are always
+        allowed; the rate limiter still has the final word for them.
+        """
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return True
+            if scene_id not in run["scenes"]:
+                run["scenes"][scene_id] = PENDING
+            elif run["scenes"][scene_id] != PENDING:
+                return run["scenes"][scene_id] in (VEO, RESERVED)
+
+        try:
+            allowed = self.plan(model).get((run_id, scene_id), True)
+        except Exception as e:
+            print(f"⚠️ Veo planner unavailable ({e}). Allowing Veo for Scene {scene_id}.")
+            allowed = True
+
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run["scenes"].get(scene_id) == PENDING:
+                run["scenes"][scene_id] = VEO if allowed else KEN_BURNS
+                if allowed:
+                    run["grants"][scene_id] = model
+        if not allowed:
+            print(f"🗓️ Veo planner: quota reserved for higher-priority scenes. Scene {scene_id} of run {run_id} will use Ken Burns.")
+        return allowed
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            return {
+                run_id: {"tier": run["tier"], "status": run["status"], "scenes": dict(run["scenes"])}
+                for run_id, run in self._runs.items()
+            }
+
+
+veo_planner = VeoPlanner()
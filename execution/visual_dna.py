@@ -57,11 +57,11 @@ def extract_visual_dna(input_data: str, image_path: str = None, config: Dict[str
         if image_path:
              # Multimodal via LiteLLM (Unified)
              import base64
+             from execution.reference_assets import get_reference_store
              
-             # Read image and encode to base64
-             with open(image_path, "rb") as f:
-                 image_bytes = f.read()
-                 encoded_string = base64.b64encode(image_bytes).decode('utf-8')
+             # Downscaled, compact copy of the product image (shared with the scene threads)
+             reference = get_reference_store(config.get("run_id")).get(image_path, model_name="gemini-2.5-flash")
+             encoded_string = base64.b64encode(reference.data).decode('utf-8')
                  
              prompt_text = f"Extract Visual DNA from this input text: '{input_data}' and the attached product image.\n\n{system_prompt}"
              
@@ -71,7 +71,7 @@ def extract_visual_dna(input_data: str, image_path: str = None, config: Dict[str
                  {"type": "text", "text": prompt_text},
                  {
                      "type": "image_url",
-                     "image_url": {"url": f"data:image/jpeg;base64,{encoded_string}"} 
+                     "image_url": {"url": f"data:{reference.mime_type};base64,{encoded_string}"} 
                  }
              ]
              
@@ -5,7 +5,8 @@ import json
 import random
 from typing import Tuple, List, Dict, Any, Optional
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
+from execution.client_registry import client_registry
+from execution.tracing import span
 
 # Integration imports
 from execution import llm_factory
@@ -25,11 +26,6 @@ api_key = os.getenv("ELEVENLABS_API_KEY")
 if not api_key:
     print("WARNING: ELEVENLABS_API_KEY not found in environment.")
 
-try:
-    client = ElevenLabs(api_key=api_key)
-except Exception as e:
-    print(f"Failed to initialize ElevenLabs client: {e}")
-    client = None
 
 # Voice Registry
 VOICE_REGISTRY = {
@@ -132,10 +128,37 @@ def _sanitize_script_text(script_text: str) -> str:
     return clean_text
 
 
-def generate_voiceover_elevenlabs(script_text: str, scene_paths: List[str] = [], visual_dna: Dict[str, Any] = {}, output_dir: str = "tmp") -> Tuple[str, float]:
+def _words_from_alignment(alignment) -> List[Tuple[str, float, float]]:
+    """Turns ElevenLabs character alignment into (word, start, end) tuples."""
+    if alignment is None:
+        return []
+    get = (lambda k: alignment.get(k)) if isinstance(alignment, dict) else (lambda k: getattr(alignment, k, None))
+    chars = get("characters") or []
+    starts = get("character_start_times_seconds") or []
+    ends = get("character_end_times_seconds") or []
+
+    words = []
+    current, word_start, word_end = "", None, None
+    for ch, start, end in zip(chars, starts, ends):
+        if ch.isspace():
+            if current:
+                words.append((current, word_start, word_end))
+            current, word_start = "", None
+            continue
+        if not current:
+            word_start = start
+        current += ch
+        word_end = end
+    if current:
+        words.append((current, word_start, word_end))
+    return words
+
+
+def generate_voiceover_timed(script_text: str, scene_paths: List[str] = [], visual_dna: Dict[str, Any] = {}, output_dir: str = "tmp") -> Tuple[str, float, List[Tuple[str, float, float]]]:
     """
-    Generates voiceover from text using ElevenLabs.
+    Generates voiceover from text using ElevenLabs, with per-word timing.
     Dynamic: checks for video audio first, and selects voice based on context.
+    Returns (path, duration, [(word, start, end), ...]); timings are empty if unavailable.
     """
     os.makedirs(output_dir, exist_ok=True)
     
@@ -149,12 +172,12 @@ def generate_voiceover_elevenlabs(script_text: str, scene_paths: List[str] = [],
         # Workflow expects a tuple.
         # Let's create a silent fallback or just return a distinct flag.
         # For this prototype, we'll return an empty string path, and update Assembly to handle it.
-        return "", 0.0
+        return "", 0.0, []
 
     # 2. Sanitize Script Text
     clean_text = _sanitize_script_text(script_text)
     if not clean_text: # If _sanitize_script_text returned an empty string, skip VO
-        return "", 0.0
+        return "", 0.0, []
     
     # 3. Dynamic Casting
     voice_id = _select_voice_agent(clean_text, visual_dna)
@@ -164,36 +187,61 @@ def generate_voiceover_elevenlabs(script_text: str, scene_paths: List[str] = [],
     output_filename = f"voiceover_{uuid.uuid4()}.mp3"
     output_path = os.path.join(output_dir, output_filename)
     
-    if not client:
-        print("⚠️ ElevenLabs client not initialized. Skipping voiceover.")
-        return "", 0.0
+    try:
+        client = client_registry.get("elevenlabs", api_key)
+    except Exception as e:
+        print(f"⚠️ ElevenLabs client not initialized ({e}). Skipping voiceover.")
+        return "", 0.0, []
     
     try:
-        # returns a generator of bytes
-        audio_generator = client.text_to_speech.convert(
-            text=clean_text,
-            voice_id=voice_id,
-            model_id="eleven_v3"  # Updated for expressive audio tags support
-        )
-        
-        with open(output_path, "wb") as f:
-            for chunk in audio_generator:
-                f.write(chunk)
+        with span("tts.convert", model="eleven_v3", provider="elevenlabs", chars=len(clean_text)):
+            word_timings = []
+            if hasattr(client.text_to_speech, "convert_with_timestamps"):
+                # Same audio plus character alignment (used by the timeline planner)
+                response = client.text_to_speech.convert_with_timestamps(
+                    text=clean_text,
+                    voice_id=voice_id,
+                    model_id="eleven_v3"  # Updated for expressive audio tags support
+                )
+                import base64
+                audio_b64 = getattr(response, "audio_base_64", None) or getattr(response, "audio_base64", None)
+                if audio_b64 is None and isinstance(response, dict):
+                    audio_b64 = response.get("audio_base64") or response.get("audio_base_64")
+                alignment = response.get("alignment") if isinstance(response, dict) else getattr(response, "alignment", None)
+                with open(output_path, "wb") as f:
+                    f.write(base64.b64decode(audio_b64))
+                word_timings = _words_from_alignment(alignment)
+            else:
+                # returns a generator of bytes
+                audio_generator = client.text_to_speech.convert(
+                    text=clean_text,
+                    voice_id=voice_id,
+                    model_id="eleven_v3"  # Updated for expressive audio tags support
+                )
+            
+                with open(output_path, "wb") as f:
+                    for chunk in audio_generator:
+                        f.write(chunk)
                 
         # Calculate duration
         file_size = os.path.getsize(output_path)
         if file_size < 100:
              print(f"Warning: Generated audio file is remarkably small ({file_size} bytes).")
 
-        # Estimate duration if we can't inspect easily
-        word_count = len(clean_text.split())
-        duration = max(2.0, word_count / 2.6)
+        if word_timings:
+            duration = word_timings[-1][2]
+        else:
+            # Estimate duration if we can't inspect easily
+            word_count = len(clean_text.split())
+            duration = max(2.0, word_count / 2.6)
         
-        print(f"Voice Generation Succeeded. Saved to: {output_path}")
-        return output_path, duration
+        print(f"Voice Generation Succeeded. Saved to: {output_path} ({len(word_timings)} timed words)")
+        client_registry.record_success("elevenlabs", api_key)
+        return output_path, duration, word_timings
 
     except Exception as e:
         print(f"⚠️ ElevenLabs Generation Failed: {e}")
+        client_registry.record_failure("elevenlabs", e, api_key)
         error_str = str(e).lower()
         if "quota" in error_str or "401" in error_str:
             print("   -> Quota Exceeded. Proceeding with SILENT/NO AUDIO mode.")
@@ -201,7 +249,16 @@ def generate_voiceover_elevenlabs(script_text: str, scene_paths: List[str] = [],
             print("   -> Unknown error. Proceeding without voiceover.")
             
         # Return empty path to signal downstream to skip audio
-        return "", 0.0
+        return "", 0.0, []
+
+
+def generate_voiceover_elevenlabs(script_text: str, scene_paths: List[str] = [], visual_dna: Dict[str, Any] = {}, output_dir: str = "tmp") -> Tuple[str, float]:
+    """
+    Generates voiceover from text using ElevenLabs.
+    Dynamic: checks for video audio first, and selects voice based on context.
+    """
+    audio_path, duration, _ = generate_voiceover_timed(script_text, scene_paths, visual_dna, output_dir)
+    return audio_path, duration
 
 
 # Backward compatibility wrapper
@@ -2,16 +2,23 @@ from __future__ import annotations
 import os
 import json
 import time
-from typing import TypedDict, Optional, List, Dict, Any
+import operator
+import threading
+from typing import TypedDict, Optional, List, Dict, Any, Annotated, get_type_hints
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
+from execution.run_logging import ContextThreadPoolExecutor
+from execution.tracing import span
+from execution.progress_events import progress
+from execution.run_control import check_run
 from langgraph.graph import StateGraph, END
 
 # Imports from execution modules
 from execution.visual_dna import extract_visual_dna
 from execution.script_generation import generate_script_and_shots
-from execution.scene_generation import generate_scene, generate_end_card, generate_character
-from execution.voice_generation import generate_voice
+from execution.scene_generation import generate_scene, generate_end_card, generate_character, image_renditions, _upload_asset as upload_asset
+from execution.voice_generation import generate_voiceover_timed, _check_video_has_audio
+from execution.timeline_planner import plan_timeline, unpack_scene, packed_scene_data, clip_trim
 from execution.assembly import assemble_video
 
 # Dynamic DB Import Helper
@@ -26,6 +33,13 @@ def get_db_service():
         print(f"ℹ️  DB Service unavailable (standalone mode): {type(e).__name__}")
         return None
 
+def get_run_state():
+    """Coalescing run-state writer, or None in standalone mode (same conditions as get_db_service)."""
+    if get_db_service() is None:
+        return None
+    from projects.backend.services.run_state_writer import run_state
+    return run_state
+
 def handle_pipeline_failure(exception, state: AgentState):
     """
     Centralized handler for pipeline failures.
@@ -85,7 +99,7 @@ def handle_pipeline_failure(exception, state: AgentState):
     
     # Mark run as failed in Firestore
     try:
-        db.save_run(
+        get_run_state().save(
             run_id=run_id,
             user_id=user_id,
             status="failed",
@@ -109,6 +123,22 @@ def handle_pipeline_failure(exception, state: AgentState):
 # Load environment variables
 load_dotenv()
 
+# State Reducers
+# Independent branches of the graph run in the same step and may update the same key;
+# these reducers merge their partial updates instead of raising on concurrent writes.
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {**(left or {}), **(right or {})}
+
+def merge_usage(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Usage counters are deltas: numbers are summed, anything else is overwritten."""
+    merged = dict(left or {})
+    for key, value in (right or {}).items():
+        if isinstance(value, (int, float)) and isinstance(merged.get(key), (int, float)):
+            merged[key] = merged[key] + value
+        else:
+            merged[key] = value
+    return merged
+
 # Define the State
 class AgentState(TypedDict):
     input_data: str
@@ -120,17 +150,28 @@ class AgentState(TypedDict):
     scenes_list: Optional[List[dict]]
     scene_paths: Optional[List[str]]
     audio_path: Optional[str]
+    vo_duration: Optional[float]
+    vo_word_timings: Optional[List[Any]] # [(word, start, end)] from the TTS alignment
+    scene_trims: Optional[List[Any]] # [start, end] per entry of scene_paths (timeline planner)
+    bgm_path: Optional[str]
     end_card_path: Optional[str]
     end_card_url: Optional[str] # Remote URL
-    remote_assets: Optional[Dict[str, str]] # Map of asset_id -> cloud_url
+    remote_assets: Annotated[Dict[str, str], merge_dicts] # Map of asset_id -> cloud_url
     result: Optional[str]
     run_id: str
     session_output_dir: str
     config: Dict[str, Any]
-    cost_usd: float # Total accumulated cost
-    usage_details: Dict[str, Any] # Breakdown
+    credits_charged: int # Used for refunds on failure
+    cost_usd: Annotated[float, operator.add] # Total accumulated cost (nodes return deltas)
+    usage_details: Annotated[Dict[str, Any], merge_usage] # Breakdown (nodes return deltas)
     regenerate_scene_id: Optional[str] # If set, only this scene is processed
     history: List[Dict[str, Any]] # Version tracking for edits
+    node_timings: Annotated[Dict[str, Dict[str, float]], merge_dicts] # node -> start/end/duration
+    variants: Optional[List[Dict[str, Any]]] # Batch mode: per-variant final states
+
+# state key -> reducer, for merging updates outside the graph (background nodes)
+_STATE_REDUCERS = {key: hint.__metadata__[0] for key, hint in get_type_hints(AgentState, include_extras=True).items()
+                   if hasattr(hint, "__metadata__")}
 
 
 
@@ -173,15 +214,10 @@ def generate_script_node(state: AgentState):
         
         llm_cost = PricingService.calculate_llm_cost("gemini", in_tokens, out_tokens)
         
-        # Update State Usage
-        usage = state.get("usage_details", {})
-        usage["llm_tokens_in"] = usage.get("llm_tokens_in", 0) + in_tokens
-        usage["llm_tokens_out"] = usage.get("llm_tokens_out", 0) + out_tokens
+        # Usage Delta
+        usage = {"llm_tokens_in": in_tokens, "llm_tokens_out": out_tokens}
         
-        state["cost_usd"] = state.get("cost_usd", 0.0) + llm_cost
-        state["usage_details"] = usage
-        
-        return {"script": data["script"], "scenes_list": data["scenes"], "cost_usd": state["cost_usd"], "usage_details": usage}
+        return {"script": data["script"], "scenes_list": data["scenes"], "cost_usd": llm_cost, "usage_details": usage}
     except Exception as e:
         # Handle graceful failure
         from execution.exceptions import PipelineFailureException
@@ -191,6 +227,7 @@ def generate_script_node(state: AgentState):
 def generate_character_node(state: AgentState):
     """
     Generates the Anchor Character.
+    Runs in parallel with script generation: the anchor only depends on Visual DNA.
     Skipped if we are only regenerating a specific scene (unless that scene needs character context update, but usually anchor is static).
     """
     # Idempotency / Skip if regenerating a specific scene (anchor should persist)
@@ -208,20 +245,21 @@ def generate_character_node(state: AgentState):
     output_dir = state.get("session_output_dir", "tmp")
     product_image = state.get("product_image_path")
     
-    char_path, char_url = generate_character(visual_dna, config, output_dir, product_image)
+    image_route = {}  # Model the image router actually used
+    char_path, char_url = generate_character(visual_dna, {**config, "image_route": image_route}, output_dir, product_image)
     
     # Cost (Image Gen)
     from projects.backend.services.pricing_service import PricingService
-    cost = PricingService.calculate_image_cost(config.get("image_model", "dall-e-3"), 1)
-    
-    # Remote Assets
-    assets = state.get("remote_assets", {}) or {}
-    assets["character_anchor"] = char_url
+    cost = PricingService.calculate_image_cost(image_route.get("model", config.get("image_model", "dall-e-3")), 1)
     
+    remote_assets = {"character_anchor": char_url}
+    if char_url and char_path:
+        remote_assets.update(image_renditions(char_path, "character_anchor", config.get("run_id"), config))
+
     return {
         "character_image_path": char_path,
-        "remote_assets": assets,
-        "cost_usd": state.get("cost_usd", 0.0) + cost
+        "remote_assets": remote_assets,
+        "cost_usd": cost
     }
 
 def generate_scenes_node(state: AgentState):
@@ -250,12 +288,13 @@ def generate_scenes_node(state: AgentState):
     product_image = state.get("product_image_path")
     run_id = state.get("run_id", "unknown")
     user_id = state.get("user_id")
-    db = get_db_service()
+    run_state = get_run_state()
 
     # Shared State Accumulators
-    accumulated_remote_assets = state.get("remote_assets", {}) or {}
-    total_cost = state.get("cost_usd", 0.0)
-    usage = state.get("usage_details", {}) or {}
+    accumulated_remote_assets = dict(state.get("remote_assets", {}) or {})
+    run_cost_before = state.get("cost_usd", 0.0)
+    total_cost = 0.0 # Cost of this node only (cost_usd is summed by the reducer)
+    usage = {}
     history = state.get("history", []) or []
     
     # Prepare result container (Pre-filled with None to maintain order)
@@ -269,6 +308,12 @@ def generate_scenes_node(state: AgentState):
     # Helper function for parallel execution
     def process_single_scene(index, scene):
         scene_id = scene.get("id")
+        check_run(run_id)  # No new renders for an aborted run
+        timeline = scene.get("timeline") or {}
+        
+        # PACKED: rendered as the second half of the lead scene's clip
+        if timeline.get("packed_into") and not regen_id:
+            return {"index": index, "skipped": True, "packed_into": timeline["packed_into"], "video_path": None}
         
         # SKIP LOGIC (Regeneration)
         if regen_id and scene_id != regen_id:
@@ -327,16 +372,27 @@ def generate_scenes_node(state: AgentState):
         local_cost = 0.0
         local_usage = {}
         
+        # Lead of a packed pair renders both beats in one clip
+        scene_input = scene
+        pack_with = timeline.get("pack_with") if not regen_id else None
+        if pack_with:
+            follower = next((s for s in scenes_to_process if s.get("id") == pack_with[0]), None)
+            if follower:
+                print(f"   📦 Packing {scene_id} + {follower.get('id')} into one clip")
+                scene_input = packed_scene_data(scene, follower)
+        
         try:
-            video_path, image_path, scene_assets, stats = generate_scene(
-                scene, 
-                dna, 
-                config=config, 
-                output_dir=output_dir, 
-                product_image_path=product_image,
-                previous_scene_image=character_anchor, # STAR TOPOLOGY LINK
-                skip_image_generation=False # Always generate fresh unless specifically optimized
-            )
+            # Child spans (image, Veo, uploads) inherit the scene_id
+            with span("scene.generate", scene_id=scene_id, packed=bool(pack_with)):
+                video_path, image_path, scene_assets, stats = generate_scene(
+                    scene_input, 
+                    dna, 
+                    config=config, 
+                    output_dir=output_dir, 
+                    product_image_path=product_image,
+                    previous_scene_image=character_anchor, # STAR TOPOLOGY LINK
+                    skip_image_generation=False # Always generate fresh unless specifically optimized
+                )
             
             # Calculate Cost
             from projects.backend.services.pricing_service import PricingService
@@ -351,6 +407,14 @@ def generate_scenes_node(state: AgentState):
                 vid_cost = PricingService.calculate_video_cost(vid_model, actual_dur)
                 local_cost += vid_cost
                 local_usage["video_seconds"] = actual_dur
+            
+            if stats.get("hedged"):
+                local_usage["hedged_scenes"] = 1
+            if stats.get("hedged_video_duration"):
+                # Veo still renders (and bills) the clip the hedge stopped waiting for
+                hedged_dur = stats["hedged_video_duration"]
+                local_cost += PricingService.calculate_video_cost(stats["hedged_video_model"], hedged_dur)
+                local_usage["hedged_video_seconds"] = hedged_dur
                 
             return {
                 "index": index,
@@ -365,21 +429,33 @@ def generate_scenes_node(state: AgentState):
             print(f"❌ Scene {scene_id} Failed: {e}")
             return {"index": index, "error": str(e)}
 
+    # Tell the Veo planner which scenes this run still needs
+    from execution.veo_planner import veo_planner
+    veo_planner.set_scenes(run_id, [
+        s.get("id") for s in scenes_to_process
+        if (not regen_id or s.get("id") == regen_id) and not (s.get("timeline") or {}).get("packed_into")
+    ])
+
     # PARALLEL EXECUTION LOOP
     futures = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
+    with ContextThreadPoolExecutor(max_workers=5) as executor:
         for i, scene in enumerate(scenes_to_process):
             futures.append(executor.submit(process_single_scene, i, scene))
             
-        for future in as_completed(futures):
+        for resolved, future in enumerate(as_completed(futures), start=1):
             res = future.result()
             
             if "error" in res:
                 print(f"Parallel Task Error: {res['error']}")
+                veo_planner.mark_scene_done(run_id, scenes_to_process[res["index"]].get("id"))
+                progress.publish(run_id, "scene_failed", scene_id=scenes_to_process[res["index"]].get("id"),
+                                 error=res["error"], completed=resolved, total=len(futures))
                 continue
                 
             idx = res["index"]
             
+            if res.get("packed_into"):
+                continue
             if res.get("skipped"):
                 print(f"Skipped Scene {idx} (Regeneration Mode)")
                 if res.get("video_path"):
@@ -388,6 +464,9 @@ def generate_scenes_node(state: AgentState):
                 
             # Success Handling
             generated_videos_result[idx] = res["video_path"]
+            veo_planner.mark_scene_done(run_id, scenes_to_process[idx].get("id"))
+            progress.publish(run_id, "scene_completed", scene_id=scenes_to_process[idx].get("id"), index=idx,
+                             assets=res.get("remote_assets") or {}, completed=resolved, total=len(futures))
             
             # Aggregate Assets & Costs
             if res.get("remote_assets"):
@@ -397,49 +476,39 @@ def generate_scenes_node(state: AgentState):
             u = res.get("usage", {})
             usage["images"] = usage.get("images", 0) + u.get("images", 0)
             usage["video_seconds"] = usage.get("video_seconds", 0) + u.get("video_seconds", 0)
+            for key in ("hedged_scenes", "hedged_video_seconds"):
+                if u.get(key):
+                    usage[key] = usage.get(key, 0) + u[key]
             
-            # Real-time DB Update (Incremental)
-            if db and user_id:
+            # Real-time DB Update (Incremental, coalesced: only new asset URLs are written)
+            if run_state and user_id:
                 try:
                     # We can't update 'scene_paths' fully yet as it might have Nones
                     # But we can update assets
-                    db.save_run(run_id, user_id, "running", result={
+                    run_state.update(run_id, {"updated_at": time.time(), "result": {
                         "remote_assets": accumulated_remote_assets,
-                        "cost_usd": round(total_cost, 4)
-                    })
+                        "cost_usd": round(run_cost_before + total_cost, 4)
+                    }})
                 except:
                     pass
 
+    # Packed scenes share their lead scene's clip (cut apart in assembly)
+    scene_index = {s.get("id"): i for i, s in enumerate(scenes_to_process)}
+    for i, scene in enumerate(scenes_to_process):
+        lead_id = (scene.get("timeline") or {}).get("packed_into")
+        if lead_id and not regen_id and lead_id in scene_index:
+            generated_videos_result[i] = generated_videos_result[scene_index[lead_id]]
+            lead_video_url = accumulated_remote_assets.get(f"{lead_id}_video")
+            if lead_video_url:
+                accumulated_remote_assets[f"{scene.get('id')}_video"] = lead_video_url
+
     # Clean up Nones (if any failure occurred)
     final_paths = [p for p in generated_videos_result if p is not None]
+    scene_trims = [clip_trim(s) for s, p in zip(scenes_to_process, generated_videos_result) if p is not None]
     
-    # Update State
-    state["cost_usd"] = total_cost
-    state["usage_details"] = usage
-        
-    # Generate End Card (Can also be parallel, but fast enough to keep here or move to separate thread if needed)
-    # Keeping sequential for simplicity as it relies on final product shots potentially
-    end_card_path = state.get("end_card_path")
-    end_card_url = state.get("end_card_url")
-
-    if not regen_id or regen_id == 'CTA':
-        print("--- Checking/Generating End Card ---")
-        ec_local = os.path.join(output_dir, f"end_card_{run_id}.png")
-        cta = config.get("cta_text", "Shop Now. Link in Bio!")
-        website = config.get("website_url", "www.teatee.store") 
-        try:
-            if product_image:
-                end_card_url = generate_end_card(product_image, cta, website, ec_local, visual_dna=dna, config=config)
-                if end_card_url:
-                    end_card_path = ec_local
-                    accumulated_remote_assets["end_card"] = end_card_url
-        except Exception as e:
-            print(f"End Card Gen Error: {e}")
-        
     return {
         "scene_paths": final_paths, 
-        "end_card_path": end_card_path, 
-        "end_card_url": end_card_url,
+        "scene_trims": scene_trims,
         "remote_assets": accumulated_remote_assets,
         "cost_usd": total_cost,
         "usage_details": usage,
@@ -451,20 +520,86 @@ def generate_scenes_node(state: AgentState):
 
 
 
+def generate_end_card_node(state: AgentState):
+    """
+    Generates the End Card. Only needs the product image and Visual DNA,
+    so it runs alongside script/character generation instead of after the scenes.
+    """
+    regen_id = state.get("regenerate_scene_id")
+    end_card_path = state.get("end_card_path")
+    end_card_url = state.get("end_card_url")
+    
+    if regen_id and regen_id != 'CTA':
+        return {}
+    
+    print("--- Checking/Generating End Card ---")
+    config = state.get("config", {})
+    dna = state.get("visual_dna", {})
+    product_image = state.get("product_image_path")
+    output_dir = state.get("session_output_dir", "tmp")
+    run_id = state.get("run_id", "unknown")
+    
+    ec_local = os.path.join(output_dir, f"end_card_{run_id}.png")
+    cta = config.get("cta_text", "Shop Now. Link in Bio!")
+    website = config.get("website_url", "www.teatee.store") 
+    remote_assets = {}
+    try:
+        if product_image:
+            end_card_url = generate_end_card(product_image, cta, website, ec_local, visual_dna=dna, config=config)
+            if end_card_url:
+                end_card_path = ec_local
+                remote_assets["end_card"] = end_card_url
+                remote_assets.update(image_renditions(ec_local, "end_card", run_id, config))
+    except Exception as e:
+        print(f"End Card Gen Error: {e}")
+    
+    return {
+        "end_card_path": end_card_path,
+        "end_card_url": end_card_url,
+        "remote_assets": remote_assets
+    }
+
+
+def _voice_required(config: Dict[str, Any]) -> bool:
+    return not (config.get("voiceover_required") is False or config.get("voice_required") is False)
+
+def _expects_native_audio(config: Dict[str, Any]) -> bool:
+    """
+    True when scenes are rendered by a Veo model that records its own audio (Veo 3+):
+    assembly would drop a voiceover made up front. `config["defer_voiceover"]` overrides.
+    """
+    if "defer_voiceover" in config:
+        return bool(config["defer_voiceover"])
+    image_provider = config.get("image_provider", os.getenv("IMAGE_PROVIDER", "gemini")).lower()
+    video_model = (config.get("video_model") or "").lower()
+    if "veo" not in image_provider and "veo" not in video_model:
+        return False  # Ken Burns clips are silent
+    return not (video_model or "veo-3.1-fast-generate-preview").startswith("veo-2")
+
 def generate_voice_node(state: AgentState):
+    """
+    Generates the voiceover as soon as the script exists (in parallel with the character anchor).
+    Its word timing drives the timeline plan. When the scenes are expected to carry native
+    audio the VO is deferred: assembly synthesizes it only if no clip came back with audio
+    (e.g. every scene fell back to Ken Burns).
+    """
     print("--- Generating Voiceover ---")
     config = state.get("config", {})
-    if config.get("voiceover_required") is False or config.get("voice_required") is False:
+    if not _voice_required(config):
         print("Voiceover disabled in configuration. Skipping.")
         return {"audio_path": ""}
-        
+    if _expects_native_audio(config):
+        print("Scenes render with native audio (Veo 3). Deferring the voiceover to assembly.")
+        return {"audio_path": ""}
+    return _synthesize_voice(state)
+
+def _synthesize_voice(state: AgentState) -> Dict[str, Any]:
     script_text = state.get("script", "Experience the diverse flavors of life.")
-    scene_paths = state.get("scene_paths", [])
     visual_dna = state.get("visual_dna", {})
     output_dir = state.get("session_output_dir", "tmp")
     
-    # Pass scenes and DNA to voice generator for context-aware generation
-    audio_path, duration = generate_voice(script_text, scene_paths=scene_paths, visual_dna=visual_dna, output_dir=output_dir)
+    # Pass DNA to voice generator for context-aware casting
+    audio_path, duration, word_timings = generate_voiceover_timed(script_text, scene_paths=[], visual_dna=visual_dna, output_dir=output_dir)
     
     # Cost
     # Simple estimation: 1 word ~ 5 chars. Or load file? script_text len is safer
@@ -472,17 +607,55 @@ def generate_voice_node(state: AgentState):
     from projects.backend.services.pricing_service import PricingService
     voice_cost = PricingService.calculate_audio_cost(char_count=char_count)
     
-    state["cost_usd"] = state.get("cost_usd", 0.0) + voice_cost
-    usage = state.get("usage_details", {})
-    usage["voice_chars"] = usage.get("voice_chars", 0) + char_count
-    state["usage_details"] = usage
+    # Persist so scene regenerations reuse the VO instead of re-synthesizing it
+    remote_assets = {}
+    if audio_path:
+        vo_url = upload_asset(audio_path, run_id=state.get("run_id"))
+        if vo_url:
+            remote_assets["voiceover"] = vo_url
     
-    return {"audio_path": audio_path}
+    return {
+        "audio_path": audio_path,
+        "vo_duration": duration,
+        "vo_word_timings": word_timings,
+        "remote_assets": remote_assets,
+        "cost_usd": voice_cost,
+        "usage_details": {"voice_chars": char_count}
+    }
+
+def plan_timeline_node(state: AgentState):
+    """
+    Fixes per-scene durations from the voiceover before any scene is rendered, so Veo
+    is asked for the shortest clip that covers each scene and assembly can cut clips
+    to length (see timeline_planner).
+    """
+    config = state.get("config", {})
+    scenes = state.get("scenes_list") or []
+    if not scenes or not config.get("timeline_planning", True):
+        return {}
+
+    regen_id = state.get("regenerate_scene_id")
+    if regen_id and all(s.get("timeline") for s in scenes):
+        # Keep the existing cut; only the regenerated scene gets its own clip again
+        print(f"--- Reusing Timeline (Regenerating {regen_id}) ---")
+        scenes = [dict(s, timeline=dict(s["timeline"])) for s in scenes]
+        unpack_scene(scenes, regen_id, config)
+        return {"scenes_list": scenes}
+
+    print("--- Planning Timeline ---")
+    audio_path = state.get("audio_path")
+    planned = plan_timeline(
+        scenes,
+        word_timings=state.get("vo_word_timings") if audio_path else None,
+        vo_duration=state.get("vo_duration") if audio_path else None,
+        config=config,
+        allow_packing=not regen_id
+    )
+    return {"scenes_list": planned}
 
 def generate_bgm_node(state: AgentState):
     """
-    Generate/select BGM in parallel with voice generation.
-    Performance optimization: runs concurrently to reduce idle time.
+    Generate/select BGM. Only depends on Visual DNA, so it starts right after extraction.
     """
     config = state.get("config", {})
     if not config.get("bgm_required", True):
@@ -493,7 +666,74 @@ def generate_bgm_node(state: AgentState):
     output_dir = state.get("session_output_dir", "output")
     visual_dna = state.get("visual_dna", {})
     bgm_path = select_bgm_track(visual_dna, output_dir=output_dir, config=config)
-    return {"bgm_path": bgm_path}
+    
+    # Persisted for scene regenerations (same track, no new generation)
+    remote_assets = {}
+    if bgm_path and os.path.exists(bgm_path):
+        bgm_url = upload_asset(bgm_path, run_id=state.get("run_id"))
+        if bgm_url:
+            remote_assets["bgm"] = bgm_url
+    return {"bgm_path": bgm_path, "remote_assets": remote_assets}
+
+
+def restore_assets_node(state: AgentState):
+    """
+    Entry point of the regeneration subgraph: brings back the run's voiceover, BGM,
+    end card and character anchor (local file, else the persisted remote copy) instead
+    of regenerating them. Anything that cannot be restored is generated as in a full run.
+    """
+    print("--- Restoring Persisted Assets (Regeneration) ---")
+    config = state.get("config", {})
+    remote_assets = state.get("remote_assets") or {}
+    output_dir = state.get("session_output_dir", "tmp")
+    os.makedirs(output_dir, exist_ok=True)
+    downloads = {}
+
+    def restore(local_path, asset_key):
+        if local_path and os.path.exists(local_path):
+            return local_path
+        url = remote_assets.get(asset_key)
+        if not url:
+            return None
+        ext = os.path.splitext(url.split("?")[0])[1] or ".bin"
+        dest = os.path.join(output_dir, f"restored_{asset_key}{ext}")
+        if not os.path.exists(dest):
+            downloads[url] = dest
+        return dest
+
+    voice_required = _voice_required(config)
+    audio_path = restore(state.get("audio_path"), "voiceover") if voice_required else ""
+    bgm_path = restore(state.get("bgm_path"), "bgm") if config.get("bgm_required", True) else None
+    character = restore(state.get("character_image_path"), "character_anchor")
+    end_card = None if state.get("regenerate_scene_id") == "CTA" else restore(state.get("end_card_path"), "end_card")
+
+    if downloads:
+        from execution.download_manager import download_manager
+        download_manager.prefetch(downloads, link=True)  # Restored assets are only read
+
+    def available(path):
+        return bool(path) and os.path.exists(path)
+
+    update = {"character_image_path": character if available(character) else state.get("character_image_path")}
+    if available(end_card):
+        update["end_card_path"] = end_card
+
+    if voice_required and not available(audio_path):
+        print("⚠️ Persisted voiceover unavailable. Regenerating it.")
+        update.update(generate_voice_node(state))
+    else:
+        update["audio_path"] = audio_path
+
+    if config.get("bgm_required", True) and not available(bgm_path):
+        print("⚠️ Persisted BGM unavailable. Selecting a new track.")
+        for key, value in generate_bgm_node(state).items():
+            if key == "remote_assets":
+                update["remote_assets"] = {**update.get("remote_assets", {}), **value}
+            else:
+                update[key] = value
+    else:
+        update["bgm_path"] = bgm_path
+    return update
 
 
 def assembly_node(state: AgentState):
@@ -509,7 +749,21 @@ def assembly_node(state: AgentState):
     asm_config["remote_assets"] = state.get("remote_assets", {})
     
     end_card_path = state.get("end_card_path")
-    final_video = assemble_video(scenes, audio, bgm_path=bgm_path, output_dir=output_dir, config=asm_config, end_card_path=end_card_path)
+    
+    # Voiceover is generated before the scenes exist; drop it if the clips carry native audio.
+    # A deferred VO (native audio expected) is synthesized now if no clip has audio after all.
+    voice_update = {}
+    if audio and _check_video_has_audio(scenes):
+        print("Native audio detected in scene clips. Dropping voiceover to avoid clashing.")
+        audio = ""
+    elif not audio and _voice_required(config) and _expects_native_audio(config) and not _check_video_has_audio(scenes):
+        print("No native audio in the scene clips. Generating the deferred voiceover.")
+        voice_update = _synthesize_voice(state)
+        audio = voice_update.get("audio_path") or ""
+    
+    _print_critical_path(state.get("node_timings", {}))
+    
+    final_video = assemble_video(scenes, audio, bgm_path=bgm_path, output_dir=output_dir, config=asm_config, end_card_path=end_card_path, trims=state.get("scene_trims"))
     
     # 4K Upscaling (Premium)
     if config.get("quality") == "4k" or config.get("premium", False):
@@ -522,41 +776,250 @@ def assembly_node(state: AgentState):
         except Exception as e:
             print(f"Upscaling failed: {e}")
 
-    return {"result": f"Final Video Available: {final_video}"}
+    return {**voice_update, "result": f"Final Video Available: {final_video}"}
 
-# Define the graph
-def build_graph():
+VARIANT_WORKERS = int(os.getenv("VARIANT_WORKERS", "4"))  # Variant branches rendered at once
+VARIANT_SHARED_STATE = ("input_data", "user_id", "product_image_path", "character_image_path", "visual_dna",
+                        "bgm_path", "end_card_path", "end_card_url")
+
+def generate_variants_node(state: AgentState):
+    """
+    Batch mode: after the shared stages (DNA, anchor, BGM, end card) ran once, fans out into
+    one script → VO → timeline → scenes → assembly branch per variant. Each variant is its
+    own run (run_id, session dir, costs). Scenes are not shared: every variant gets its own
+    script and hook, so its scene prompts differ.
+    """
+    config = state.get("config", {})
+    variant_ids = config.get("variant_run_ids") or []
+    batch_id = state.get("run_id", "batch")
+    base_dir = os.path.dirname(os.path.abspath(state.get("session_output_dir", "tmp")))
+    shared_assets = dict(state.get("remote_assets") or {})
+    print(f"--- Generating {len(variant_ids)} Variants (shared DNA, anchor, BGM, end card) ---")
+
+    from execution.veo_planner import veo_planner
+    app = _compile_graph(VARIANT_DEPENDENCIES, "generate_script")
+
+    def run_variant(index: int, variant_id: str) -> Dict[str, Any]:
+        variant_dir = os.path.join(base_dir, variant_id)
+        os.makedirs(variant_dir, exist_ok=True)
+        variant_state = {k: state.get(k) for k in VARIANT_SHARED_STATE}
+        variant_state.update({
+            "input_data": f"{state.get('input_data', '')}\n\nVariant {index + 1} of {len(variant_ids)}: "
+                          f"use a hook and angle distinct from the other variants.",
+            "run_id": variant_id,
+            "session_output_dir": variant_dir,
+            "config": {**config, "run_id": variant_id, "variant_batch_id": batch_id, "variant_index": index,
+                       "variant_run_ids": None},
+            "credits_charged": 0,  # Credits were charged for the batch
+            "remote_assets": shared_assets,
+            "history": [],
+        })
+        veo_planner.register_run(variant_id, tier=config.get("subscription_tier"), status="running")
+        try:
+            with span("variant.run", run_id=variant_id, variant=index):
+                final = app.invoke(variant_state)
+            return {"run_id": variant_id, "index": index, "status": "completed", "state": final}
+        except Exception as e:
+            print(f"❌ Variant {variant_id} failed: {e}")
+            return {"run_id": variant_id, "index": index, "status": "failed", "error": str(e)}
+        finally:
+            veo_planner.release_run(variant_id)
+
+    with ContextThreadPoolExecutor(max_workers=max(1, min(VARIANT_WORKERS, len(variant_ids)))) as ex:
+        variants = list(ex.map(run_variant, range(len(variant_ids)), variant_ids))
+    return {"variants": variants}
+
+# Real data dependencies of each node (used for the graph edges and critical-path report)
+NODE_DEPENDENCIES = {
+    "extract_dna": [],
+    "generate_script": ["extract_dna"],
+    "generate_character": ["extract_dna"],
+    "generate_bgm": ["extract_dna"],
+    "generate_end_card": ["extract_dna"],
+    "generate_voice": ["generate_script"],
+    "plan_timeline": ["generate_script", "generate_voice"],
+    "generate_scenes": ["plan_timeline", "generate_character"],
+    "assembly": ["generate_scenes", "generate_voice", "generate_bgm", "generate_end_card"],
+}
+
+# Scene regeneration: script, DNA, VO, BGM and the timeline are reused; only the target
+# scene is rendered (plus the end card when the CTA scene is regenerated)
+REGEN_DEPENDENCIES = {
+    "restore_assets": [],
+    "plan_timeline": ["restore_assets"],
+    "generate_scenes": ["plan_timeline"],
+    "generate_end_card": ["restore_assets"],
+    "assembly": ["generate_scenes", "generate_end_card"],
+}
+
+# Variant batch: shared stages once, then one branch per variant (generate_variants)
+VARIANT_BATCH_DEPENDENCIES = {
+    "extract_dna": [],
+    "generate_character": ["extract_dna"],
+    "generate_bgm": ["extract_dna"],
+    "generate_end_card": ["extract_dna"],
+    "generate_variants": ["generate_character", "generate_bgm", "generate_end_card"],
+}
+
+# One variant's branch (shared outputs are already in its state)
+VARIANT_DEPENDENCIES = {
+    "generate_script": [],
+    "generate_voice": ["generate_script"],
+    "plan_timeline": ["generate_script", "generate_voice"],
+    "generate_scenes": ["plan_timeline"],
+    "assembly": ["generate_scenes"],
+}
+
+# Off the step barrier: LangGraph runs nodes in supersteps, and a step ends only when its
+# slowest node does. These nodes start in a background thread once their dependencies
+# finish (the graph node itself returns at once) and are joined by the first node that
+# reads their output, so the script -> VO -> timeline chain does not wait for the anchor,
+# BGM or end card, and scenes do not wait for BGM or the end card.
+BACKGROUND_NODES = ("generate_character", "generate_bgm", "generate_end_card")
+
+_background: Dict[tuple, Any] = {}  # (run_id, node) -> Future of the node's state update
+_background_lock = threading.Lock()
+
+NODE_FUNCTIONS = {
+    "extract_dna": extract_dna_node,
+    "generate_script": generate_script_node,
+    "generate_character": generate_character_node,
+    "generate_bgm": generate_bgm_node,
+    "generate_end_card": generate_end_card_node,
+    "generate_voice": generate_voice_node,
+    "plan_timeline": plan_timeline_node,
+    "generate_scenes": generate_scenes_node,
+    "restore_assets": restore_assets_node,
+    "generate_variants": generate_variants_node,
+    "assembly": assembly_node,
+}
+
+def _timed_node(name: str, fn, dependencies: Dict[str, List[str]]):
+    """Wraps a node to record its wall-clock start/end in `node_timings` and publish progress."""
+    def wrapper(state: AgentState):
+        run_id = state.get("run_id")
+        check_run(run_id)  # Stop at the next node once the run is aborted (e.g. lease lost)
+        progress.plan(run_id, dependencies)
+        progress.publish(run_id, "node_started", node=name)
+        started = time.time()
+        try:
+            with span(f"node.{name}", stage=name):
+                update = dict(fn(state) or {})
+        except Exception as e:
+            progress.publish(run_id, "node_failed", node=name, error=str(e))
+            raise
+        check_run(run_id)  # Another owner took over while the node ran: drop its update
+        finished = time.time()
+        progress.publish(run_id, "node_finished", node=name, duration=round(finished - started, 2))
+        print(f"⏱️ Node {name} finished in {finished - started:.1f}s")
+        update["node_timings"] = {name: {"start": started, "end": finished, "duration": round(finished - started, 2)}}
+        return update
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+def _merge_updates(*updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Combines state updates the way the graph would (reducer keys merged, others replaced)."""
+    merged: Dict[str, Any] = {}
+    for update in updates:
+        for key, value in (update or {}).items():
+            reducer = _STATE_REDUCERS.get(key)
+            merged[key] = reducer(merged[key], value) if reducer and merged.get(key) is not None else value
+    return merged
+
+def _background_launcher(name: str, node):
+    """Graph node that starts `node` in a background thread and returns without waiting."""
+    def launcher(state: AgentState):
+        executor = ContextThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        future = executor.submit(node, dict(state))
+        executor.shutdown(wait=False)
+        with _background_lock:
+            _background[(state.get("run_id"), name)] = future
+        return {}
+    launcher.__name__ = name
+    return launcher
+
+def _joining_node(node, background: List[str]):
+    """Waits for the background nodes `node` reads, then passes their updates on with its own."""
+    def wrapper(state: AgentState):
+        joined = []
+        for name in background:
+            with _background_lock:
+                future = _background.pop((state.get("run_id"), name), None)
+            if future is not None:
+                joined.append(future.result())  # A failed background node fails its consumer
+        joined = _merge_updates(*joined)
+        return _merge_updates(joined, node(_merge_updates(dict(state), joined)))
+    wrapper.__name__ = node.__name__
+    return wrapper
+
+def release_background(run_id: str):
+    """Drops background results nobody joined (the run failed before reaching the consumer)."""
+    with _background_lock:
+        for key in [k for k in _background if k[0] == run_id]:
+            _background.pop(key, None)
+
+def _print_critical_path(timings: Dict[str, Dict[str, float]]):
+    """Walks back from assembly through whichever dependency finished last (the one that gated each node)."""
+    if not timings:
+        return
+    dependencies = REGEN_DEPENDENCIES if "restore_assets" in timings else NODE_DEPENDENCIES
+    path = []
+    node = "assembly"
+    while True:
+        deps = [d for d in dependencies.get(node, []) if d in timings]
+        if not deps:
+            break
+        node = max(deps, key=lambda d: timings[d]["end"])
+        path.append(node)
+    path.reverse()
+    summary = " → ".join(f"{n} ({timings[n]['duration']:.1f}s)" for n in path)
+    print(f"🧭 Critical Path: {summary} → assembly")
+
+def _compile_graph(dependencies: Dict[str, List[str]], entry: str):
     workflow = StateGraph(AgentState)
+    for node, deps in dependencies.items():
+        timed = _timed_node(node, NODE_FUNCTIONS[node], dependencies)
+        if node in BACKGROUND_NODES:
+            workflow.add_node(node, _background_launcher(node, timed))
+            continue
+        background = [d for d in deps if d in BACKGROUND_NODES]
+        workflow.add_node(node, _joining_node(timed, background) if background else timed)
+    workflow.set_entry_point(entry)
 
-    # Add nodes
-    workflow.add_node("extract_dna", extract_dna_node)
-    workflow.add_node("generate_script", generate_script_node)
-    workflow.add_node("generate_character", generate_character_node)
-    workflow.add_node("generate_scenes", generate_scenes_node)
-    workflow.add_node("generate_voice", generate_voice_node)
-    workflow.add_node("generate_bgm", generate_bgm_node)  # Performance: parallel with voice
-    workflow.add_node("assembly", assembly_node)
+    # Edges follow the dependencies: each node starts once its real inputs exist.
+    for node, deps in dependencies.items():
+        if len(deps) == 1:
+            workflow.add_edge(deps[0], node)
+        elif len(deps) > 1:
+            workflow.add_edge(deps, node)  # Join: waits for all dependencies
+    upstream = {d for deps in dependencies.values() for d in deps}
+    for node in dependencies:
+        if node not in upstream:
+            workflow.add_edge(node, END)
+    return workflow.compile()
 
-    # Set entry point
-    workflow.set_entry_point("extract_dna")
+# Define the graph
+def build_graph():
+    # FAN-OUT after DNA: script ‖ character ‖ BGM ‖ end card (the last three in the background)
+    # VO starts right after the script; the timeline is cut to the VO before scenes render
+    return _compile_graph(NODE_DEPENDENCIES, "extract_dna")
 
-    # Add edges - Voice and BGM run in parallel after scenes
-    workflow.add_edge("extract_dna", "generate_script")
-    workflow.add_edge("generate_script", "generate_character")
-    workflow.add_edge("generate_character", "generate_scenes")
-    
-    # PARALLEL EXECUTION: Voice and BGM both start after scenes
-    workflow.add_edge("generate_scenes", "generate_voice")
-    workflow.add_edge("generate_scenes", "generate_bgm")  # Runs concurrently with voice
-    
-    # Assembly waits for both voice and BGM to complete
-    workflow.add_edge("generate_voice", "assembly")
-    workflow.add_edge("generate_bgm", "assembly")
-    workflow.add_edge("assembly", END)
+def build_variants_graph():
+    """Batch mode (config["variant_run_ids"]): shared stages once, then one branch per variant."""
+    return _compile_graph(VARIANT_BATCH_DEPENDENCIES, "extract_dna")
 
-    # Compile
-    app = workflow.compile()
-    return app
+def build_regeneration_graph(state: Dict[str, Any]):
+    """
+    Minimal graph for a scene regeneration, or None when the run lacks the persisted
+    script/DNA/shotlist it needs (the caller then falls back to build_graph()).
+    """
+    if not (state.get("regenerate_scene_id") and state.get("visual_dna") and state.get("script") and state.get("scenes_list")):
+        return None
+    dependencies = {k: list(v) for k, v in REGEN_DEPENDENCIES.items()}
+    if state.get("regenerate_scene_id") != "CTA":
+        del dependencies["generate_end_card"]
+        dependencies["assembly"].remove("generate_end_card")
+    return _compile_graph(dependencies, "restore_assets")
 
 if __name__ == "__main__":
     print("Starting Workflow Test...")
@@ -607,7 +1070,7 @@ if __name__ == "__main__":
         "product_image_path": os.getenv("PRODUCT_IMAGE_PATH"),
         "run_id": run_id,
         "session_output_dir": session_dir,
-        "config": config
+        "config": {**config, "run_id": run_id}
     }
     result = app.invoke(initial_state)
     
@@ -48,6 +48,38 @@ async def get_rate_limits(admin: dict = Depends(verify_admin)):
     from projects.backend.services.rate_limiter import rate_limiter
     return rate_limiter.get_all_stats()
 
+@router.get("/provider-health")
+async def get_provider_health(admin: dict = Depends(verify_admin)):
+    """Get health counters for the shared provider SDK clients and concurrency controllers in this worker."""
+    from execution.client_registry import client_registry
+    from execution.provider_control import all_controller_stats
+    from execution.key_pool import key_pool
+    from execution.veo_planner import veo_planner
+    from execution.image_router import image_router
+    from projects.backend.services.admission_scheduler import admission_scheduler
+    from projects.backend.services.run_state_writer import run_state
+    from execution.progress_events import progress
+    from execution.simulation import SIMULATION_MODE, get_simulator
+    from execution.cpu_pool import cpu_pool
+    return {
+        "clients": client_registry.health(),
+        "controllers": all_controller_stats(),
+        "keys": key_pool.stats(),
+        "veo_plan": veo_planner.stats(),
+        "image_routes": image_router.stats(),
+        "admission": admission_scheduler.stats(),
+        "run_state": run_state.stats(),
+        "progress": progress.stats(),
+        "cpu_pool": cpu_pool.stats(),
+        "simulation": get_simulator().stats() if SIMULATION_MODE else None
+    }
+
+@router.get("/latency")
+async def get_latency(admin: dict = Depends(verify_admin)):
+    """p50/p95/p99 latency per pipeline stage and external call (and per stage+model) in this worker."""
+    from execution.tracing import latency_stats
+    return {"stages": latency_stats()}
+
 @router.post("/bootstrap")
 async def bootstrap_admin(user: dict = Depends(get_current_user)):
     """
@@ -9,9 +9,20 @@ import time
 from projects.backend.dependencies import get_current_user
 from projects.backend.services.db_service import db_service
 from google.cloud import firestore
+from execution.image_derivatives import derivative_key
 
 router = APIRouter()
 
+THUMBNAIL_WIDTH = 540  # Feed cards; the lossless PNG is several MB
+
+def _thumbnail_url(remote_assets: dict) -> str:
+    """Compact rendition of the Hook image, or the original for runs that predate renditions."""
+    for fmt in ("webp", "jpeg"):
+        url = remote_assets.get(derivative_key("Hook_image", THUMBNAIL_WIDTH, fmt))
+        if url:
+            return url
+    return remote_assets.get("Hook_image", "")
+
 @router.post("/view/{run_id}")
 async def track_view(run_id: str):
     """Increment view count"""
@@ -121,7 +132,7 @@ async def get_community_videos(
                 "user_name": user_name,
                 "project_name": result.get("config", {}).get("project_title", "Untitled"),
                 "video_url": result.get("video_url", ""),
-                "thumbnail_url": result.get("remote_assets", {}).get("Hook_image", ""),
+                "thumbnail_url": _thumbnail_url(result.get("remote_assets", {})),
                 "likes": data.get("likes", 0),
                 "views": data.get("views", 0),
                 "shared_at": data.get("shared_at", 0),
@@ -177,7 +188,7 @@ async def get_community_video(run_id: str, user: dict = Depends(get_current_user
             "user_name": user_name,
             "project_name": result.get("config", {}).get("project_title", "Untitled"),
             "video_url": result.get("video_url", ""),
-            "thumbnail_url": result.get("remote_assets", {}).get("Hook_image", ""),
+            "thumbnail_url": _thumbnail_url(result.get("remote_assets", {})),
             "likes": data.get("likes", 0) + 1,  # Include the increment
             "views": data.get("views", 0) + 1,
             "shared_at": data.get("shared_at", 0),
@@ -5,16 +5,20 @@ import time
 import json
 import glob
 import shutil
-import asyncio
+import threading
 from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, FileResponse, RedirectResponse
+from fastapi import APIRouter, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import JSONResponse, FileResponse, RedirectResponse, StreamingResponse
 import logging
 from projects.backend.schemas import GenerateRequest, GenerateResponse, RegenerateSceneRequest
 from fastapi import Depends
 from projects.backend.dependencies import get_current_user
 from projects.backend.services.db_service import db_service
 from projects.backend.services.storage_service import storage_service
+from projects.backend.services.run_state_writer import run_state, RunStateWriteError
+from execution.progress_events import progress
+from execution.run_control import check_run
+from execution.exceptions import RunAbortedException
 from projects.backend.services.throttling_service import throttling_service
 from projects.backend.services.email_service import email_service
 
@@ -67,6 +71,75 @@ def calculate_estimated_cogs(config: dict) -> float:
     return round(base_cogs + feature_cogs, 2)
 
 
+def get_subscription_tier(user_id: str):
+    """Active subscription tier ("starter", "growth", "agency") or None for pay-as-you-go users."""
+    if not user_id:
+        return None
+    subscription = db_service.get_user_subscription(user_id)
+    if subscription and subscription.get("status") == "active":
+        return subscription.get("tier")
+    return None
+
+
+def register_veo_demand(run_id: str, tier: str = None, status: str = "queued"):
+    """Makes the run visible to the Veo planner so daily quota is allocated across runs."""
+    try:
+        sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+        from execution.veo_planner import veo_planner
+        veo_planner.register_run(run_id, tier=tier, status=status)
+    except Exception as e:
+        print(f"Veo planner registration failed: {e}")
+
+
+# "inline": run in this API process (default)
+# "queue": enqueue to the durable job queue for render workers (projects/backend/worker.py)
+PIPELINE_EXECUTION_MODE = os.getenv("PIPELINE_EXECUTION_MODE", "inline").lower()
+
+# Upper bound on variants per batch request (each variant is billed as one generation)
+MAX_VARIANTS = 10
+
+# Previous-run state a scene regeneration reuses instead of regenerating (see build_regeneration_graph)
+REGEN_REUSED_STATE = ("audio_path", "vo_duration", "vo_word_timings", "bgm_path", "end_card_path",
+                      "end_card_url", "character_image_path", "scene_trims")
+
+
+def dispatch_pipeline(run_id: str, request: GenerateRequest, user_id: str = None, credits_used: int = 0, cost: int = None) -> Dict[str, int]:
+    """
+    Inline: hands the run to this process's admission scheduler, which starts it when a
+    slot frees up. Queue: enqueues it to the durable job queue right away; workers lease
+    in weighted fair order. Returns the queue position and ETA.
+    """
+    from projects.backend.services.admission_scheduler import admission_scheduler, TIER_WEIGHTS, DEFAULT_RUN_SECONDS
+
+    tier = get_subscription_tier(user_id)
+    cost = cost or credits_used or 1
+    if PIPELINE_EXECUTION_MODE == "queue":
+        from projects.backend.services.job_queue import job_queue
+        # The job id is the run id: the status endpoint finds it without a lookup
+        job_queue.enqueue("pipeline", {
+            "run_id": run_id,
+            "request": request.dict(),
+            "user_id": user_id,
+            "credits_used": credits_used,
+        }, job_id=run_id, user_key=user_id or run_id, cost=cost,
+            weight=TIER_WEIGHTS.get(tier, TIER_WEIGHTS[None]))
+        return job_queue.ticket(run_id, DEFAULT_RUN_SECONDS)
+
+    register_veo_demand(run_id, tier)
+
+    def run():
+        try:
+            run_pipeline_task(run_id, request, user_id, credits_used)
+        except RunStateWriteError as e:
+            # Rendered and notified; only its final status is missing from Firestore
+            logger.error(f"Run {run_id}: {e}")
+
+    def start():
+        threading.Thread(target=run, name=f"pipeline-{run_id}", daemon=True).start()
+
+    return admission_scheduler.submit(run_id, user_id, tier, cost, start)
+
+
 # sys.path modification and build_graph import moved inside run_pipeline_task
 # to prevent heavy imports at startup
 
@@ -80,73 +153,79 @@ router = APIRouter()
 run_status: Dict[str, str] = {}
 run_results: Dict[str, Any] = {}
 
-class FileLogger:
-    """Redirects writes to a file and the original stream."""
-    def __init__(self, filepath, stream):
-        self.file = open(filepath, 'a', buffering=1)
-        self.stream = stream
-        self.closed = False
-
-    def write(self, data):
-        if not self.closed:
-            try:
-                self.file.write(data)
-            except ValueError:
-                # File already closed, skip file write but continue to stream
-                pass
-        self.stream.write(data)
-
-    def flush(self):
-        if not self.closed:
-            try:
-                self.file.flush()
-            except ValueError:
-                # File already closed, skip
-                pass
-        self.stream.flush()
-
-    def close(self):
-        if not self.closed:
-            self.closed = True
-            try:
-                self.file.close()
-            except:
-                pass
-
 # Removed save_run_status
 
 
 # Removed load_run_status_from_disk
 
+def publish_variants(batch_run_id: str, user_id: str, batch_result: Dict[str, Any], credits_used: int = 0) -> list:
+    """
+    Uploads each variant's final video and completes its run document (own result and
+    cost). A failed variant gets its share of the batch's credits back. Returns the
+    per-variant summary stored on the batch run.
+    """
+    summary = []
+    variants = batch_result.get("variants") or []
+    credits_per_variant = credits_used // len(variants) if variants else 0
+    for variant in variants:
+        variant_id = variant["run_id"]
+        state = variant.get("state") or {}
+        entry = {"run_id": variant_id, "index": variant.get("index"), "status": variant.get("status"),
+                 "cost_usd": round(state.get("cost_usd", 0.0) or 0.0, 4)}
+        try:
+            if variant.get("status") != "completed":
+                run_state.save(variant_id, user_id, "failed", {"error": variant.get("error"), "variant_of": batch_run_id})
+                entry["error"] = variant.get("error")
+            else:
+                variant_result = dict(state, variant_of=batch_run_id, variant_index=variant.get("index"))
+                final_video = str(state.get("result") or "").replace("Final Video Available:", "").strip()
+                if final_video and os.path.exists(final_video):
+                    video_url = storage_service.upload_file(final_video, f"runs/{variant_id}/{os.path.basename(final_video)}")
+                    variant_result["video_url"] = video_url
+                    variant_result["video_history"] = [video_url]
+                    entry["video_url"] = video_url
+                run_state.save(variant_id, user_id, "completed", variant_result, cost=entry["cost_usd"])
+        except Exception as e:
+            print(f"❌ Failed to publish variant {variant_id}: {e}")
+            entry["status"], entry["error"] = "failed", str(e)
+            run_state.save(variant_id, user_id, "failed", {"error": str(e), "variant_of": batch_run_id})
+        summary.append(entry)
+        if entry["status"] != "completed" and user_id and credits_per_variant > 0:
+            # Idempotent per variant run (refund doc "<variant_id>_refund")
+            entry["refunded"] = db_service.refund_credits(user_id, credits_per_variant,
+                                                          f"variant: {entry.get('error')}", variant_id)
+
+    shared_cost = batch_result.get("cost_usd", 0.0) or 0.0
+    print(f"🧪 Variants published: {sum(1 for v in summary if v['status'] == 'completed')}/{len(summary)} "
+          f"(shared stages ${shared_cost:.3f}, per variant {[v['cost_usd'] for v in summary]})")
+    batch_result["shared_cost_usd"] = round(shared_cost, 4)
+    return summary
+
 def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None, credits_used: int = 0):
     session_dir = f"tmp/{run_id}"
     log_file = os.path.join(session_dir, "run.log")
     
-    # Redirect stdout/stderr
-    original_stdout = sys.stdout
-    original_stderr = sys.stderr
+    # Context-local run log (safe with concurrent runs; threads spawned for the run inherit it)
+    run_log = None
+    state_error = None  # Terminal status write that failed; raised once the run is wrapped up
     
     try:
-        db_service.save_run(run_id, user_id, "running")
+        run_state.save(run_id, user_id, "running")
         
         # Ensure session directory exists for logging
         os.makedirs(session_dir, exist_ok=True)
         
-        # Setup Logger
-        file_logger = FileLogger(log_file, original_stdout)
-
-        sys.stdout = file_logger
-        sys.stderr = file_logger
-        
-        print(f"--- Starting Run {run_id} ---")
-        
         # Lazy load execution modules to prevent startup blocking
         # Add the root directory to sys.path to allow importing from execution
         sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-        from execution.workflow import build_graph
-
-        app = build_graph()
+        from execution.run_logging import open_run_log
+        from execution.tracing import span
+        run_log = open_run_log(run_id, log_file)
         
+        print(f"--- Starting Run {run_id} ---")
+        
+        from execution.workflow import build_graph, build_regeneration_graph, build_variants_graph
+
         # Check if we have an uploaded product image in the session dir
         uploaded_image_path = os.path.join(session_dir, "product.png")
         product_image = uploaded_image_path if os.path.exists(uploaded_image_path) else request.product_image_path
@@ -191,6 +270,9 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
         final_config = base_config.copy()
         if request.config:
             final_config.update(request.config)
+        final_config["run_id"] = run_id  # Scopes per-run caches (reference assets, etc.)
+        final_config["subscription_tier"] = get_subscription_tier(user_id)
+        register_veo_demand(run_id, final_config["subscription_tier"], status="running")
             
         # Merge Brand Config (Visual DNA Persistence)
         if user_id:
@@ -227,6 +309,14 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
             "remote_assets": final_config.get("remote_assets", {}),
             "history": final_config.get("history", [])
         }
+        # Regeneration: persisted VO, BGM, end card, anchor and cut from the previous run
+        initial_state.update(final_config.pop("reuse_state", None) or {})
+
+        # Scene regenerations run a minimal subgraph (falls back to the full graph for legacy runs)
+        if final_config.get("variant_run_ids"):
+            app = build_variants_graph()
+        else:
+            app = build_regeneration_graph(initial_state) or build_graph()
 
         print(f"📋 Initial State Keys: {list(initial_state.keys())}\n")
 
@@ -234,7 +324,8 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
 
         
         print(f"⚙️  INVOKING LANGGRAPH WORKFLOW...\n")
-        result = app.invoke(initial_state)
+        with span("pipeline.run", run_id=run_id):
+            result = app.invoke(initial_state)
         
         print(f"\n✅ WORKFLOW COMPLETED SUCCESSFULLY")
         print(f"Result Type: {type(result)}")
@@ -244,6 +335,12 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
         # Update DB with result
         # Serialize result if needed (be careful with non-serializable objects)
         final_result = result if isinstance(result, dict) else {"raw": str(result)}
+        check_run(run_id)
+        if final_result.get("variants"):
+            final_result["variants"] = publish_variants(run_id, user_id, final_result, credits_used)
+            if not any(v["status"] == "completed" for v in final_result["variants"]):
+                # Each variant's credits were refunded above; the batch itself failed
+                raise RuntimeError(f"All {len(final_result['variants'])} variants failed")
         
         # --- UPLOAD TO CLOUD STORAGE ---
         # Find the final video in the result string or known path
@@ -286,7 +383,7 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
                     final_result["video_history"] = video_history
                     
                     # 4. Upload Log (God Mode)
-                    sys.stdout.flush() # Ensure logs are written
+                    run_log.flush() # Ensure logs are written
                     log_url = storage_service.upload_log(log_file, f"runs/{run_id}/run.log")
                     if log_url:
                         print(f"Uploaded run log to: {log_url}")
@@ -297,7 +394,12 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
             # Don't fail the run, just log it
             
         cogs = calculate_estimated_cogs(final_result.get("config", {}))
-        db_service.save_run(run_id, user_id, "completed", final_result, cost=cogs)
+        check_run(run_id)  # Fenced: only the run's current owner writes its result
+        try:
+            run_state.save(run_id, user_id, "completed", final_result, cost=cogs)
+        except RunStateWriteError as e:
+            # The video is rendered and uploaded: still notify, and never render it again
+            state_error = e
         print("--- Run Completed ---")
         
         # --- SEND EMAIL NOTIFICATION (Completion) ---
@@ -384,20 +486,26 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
             print(f"Error sending push notification: {notif_err}")
             # Don't fail the run if notification fails
         
+    except RunAbortedException as e:
+        # Another worker owns the run now; its status, refunds and notifications are its own
+        print(f"🛑 {e}. Leaving the run to its new owner.")
     except Exception as e:
         print(f"Pipeline failed: {e}")
         error_data = {"error": str(e)}
         
         # Upload Log on Failure too
         try:
-             sys.stdout.flush()
+             if run_log: run_log.flush()
              log_url = storage_service.upload_log(log_file, f"runs/{run_id}/run.log")
              if log_url:
                  error_data["log_url"] = log_url
         except:
             pass
             
-        db_service.save_run(run_id, user_id, "failed", error_data)
+        try:
+            run_state.save(run_id, user_id, "failed", error_data)
+        except RunStateWriteError as write_err:
+            state_error = write_err  # Still email and refund below
         logger.error(f"Run {run_id} failed: {e}")
         
         # --- SEND EMAIL NOTIFICATION (Failure) ---
@@ -440,15 +548,43 @@ def run_pipeline_task(run_id: str, request: GenerateRequest, user_id: str = None
             db_service.track_event(user_id, "regeneration_refunded", {"run_id": run_id, "reason": str(e)})
 
     finally:
+        # Drop decoded reference images held for this run
+        try:
+            from execution.reference_assets import release_reference_store
+            release_reference_store(run_id)
+        except Exception:
+            pass
+        try:
+            from execution.veo_planner import veo_planner
+            veo_planner.release_run(run_id)
+        except Exception:
+            pass
+        try:
+            from execution.workflow import release_background
+            release_background(run_id)
+        except Exception:
+            pass
+        try:
+            from execution.provider_files import provider_files
+            provider_files.release_run(run_id)
+        except Exception:
+            pass
+        try:
+            from projects.backend.services.admission_scheduler import admission_scheduler
+            admission_scheduler.release(run_id)
+        except Exception:
+            pass
 
-        # Restore streams
-        sys.stdout = original_stdout
-        sys.stderr = original_stderr
+        # Detach the run log
         try:
-            file_logger.close()
-        except:
+            from execution.run_logging import close_run_log
+            close_run_log(run_log)
+        except Exception:
             pass
 
+    if state_error is not None:
+        raise state_error  # Caller records it without re-running the graph
+
 
 @router.post("/upload")
 async def upload_asset(file: UploadFile = File(...), user: dict = Depends(get_current_user)):
@@ -489,7 +625,7 @@ async def upload_asset(file: UploadFile = File(...), user: dict = Depends(get_cu
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/generate", response_model=GenerateResponse)
-async def trigger_generation(request: GenerateRequest, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
+async def trigger_generation(request: GenerateRequest, user: dict = Depends(get_current_user)):
     # Use provided run_id (from upload) or create new
     if request.config and "run_id" in request.config:
         run_id = request.config["run_id"]
@@ -514,16 +650,9 @@ async def trigger_generation(request: GenerateRequest, background_tasks: Backgro
             detail=f"Please wait {minutes}m {seconds}s before starting another generation. This prevents system overload."
         )
     
-    # 2. Check global throttle (30 seconds between ANY generation)
-    global_throttle = throttling_service.check_global_throttle()
-    if global_throttle is not None:
-        raise HTTPException(
-            status_code=429,
-            detail=f"System is processing another request. Please wait {global_throttle} seconds. This ensures API compliance."
-        )
-    
     # --- PRODUCTION SECURITY: CREDIT CHECK ---
-    COST_PER_GEN = calculate_credit_cost(request.config or {})
+    variant_count = max(1, min(request.variants or 1, MAX_VARIANTS))
+    COST_PER_GEN = calculate_credit_cost(request.config or {}) * variant_count
     
     # Check if user is an admin
     is_admin = db_service.get_user_role(user_email) == "admin"
@@ -562,6 +691,16 @@ async def trigger_generation(request: GenerateRequest, background_tasks: Backgro
     # --- START GENERATION ---
     # Store initial status
     db_service.save_run(run_id, user_id, "queued", request_data=request.dict(), credits_used=COST_PER_GEN)
+    progress.publish(run_id, "status", status="queued")
+    
+    # Batch mode: one child run per variant; this run holds the shared stages and the summary
+    variant_run_ids = None
+    if variant_count > 1:
+        variant_run_ids = [f"{run_id}_v{i + 1}" for i in range(variant_count)]
+        for variant_id in variant_run_ids:
+            db_service.save_run(variant_id, user_id, "queued", request_data=request.dict(),
+                                result={"variant_of": run_id})
+        request.config = {**(request.config or {}), "variant_run_ids": variant_run_ids}
     
     # --- SEND EMAIL NOTIFICATION (Generation Started) ---
     try:
@@ -614,13 +753,17 @@ async def trigger_generation(request: GenerateRequest, background_tasks: Backgro
         print(f"Error sending start notification: {notif_err}")
         # Don't fail the generation if notification fails
     
-    # Start background task
-    background_tasks.add_task(run_pipeline_task, run_id, request, user_id, COST_PER_GEN)
+    # Admit through the fair scheduler (starts now, or when capacity frees up)
+    ticket = dispatch_pipeline(run_id, request, user_id, COST_PER_GEN)
+    queued_note = f" Queue position {ticket['queue_position']}, starting in ~{ticket['eta_seconds'] // 60 + 1} min." if ticket["queue_position"] else ""
     
     return GenerateResponse(
         run_id=run_id, 
         status="queued", 
-        message=f"{msg_prefix}Generation started."
+        message=f"{msg_prefix}Generation started.{queued_note}",
+        queue_position=ticket["queue_position"],
+        eta_seconds=ticket["eta_seconds"],
+        variant_run_ids=variant_run_ids
     )
 
 @router.get("/status/{run_id}")
@@ -686,6 +829,7 @@ async def get_status(run_id: str):
             db_run["result"] = final_result
 
             db_service.save_run(run_id, db_run.get("user_id"), "failed", result=final_result, failure_reason=failure_reason)
+            progress.publish(run_id, "status", status="failed", failure_reason=failure_reason)
             
             # Continue to return failed status so frontend stops polling
             
@@ -724,12 +868,20 @@ async def get_status(run_id: str):
                 elif "Lifestyle" in filename and "Lifestyle" not in assets: assets["Lifestyle"] = f"/outputs/{run_id}/{filename}"
                 elif "CTA" in filename and "CTA" not in assets: assets["CTA"] = f"/outputs/{run_id}/{filename}"
 
-    return {
+    response = {
         "run_id": run_id,
         "status": current_status,
         "result": current_result,
         "assets": assets
     }
+    if current_status == "queued":
+        from projects.backend.services.admission_scheduler import admission_scheduler, DEFAULT_RUN_SECONDS
+        if PIPELINE_EXECUTION_MODE == "queue":
+            from projects.backend.services.job_queue import job_queue
+            response.update(job_queue.ticket(run_id, DEFAULT_RUN_SECONDS))
+        else:
+            response.update(admission_scheduler.ticket(run_id))
+    return response
 
 @router.get("/history")
 async def get_history(user: dict = Depends(get_current_user)):
@@ -739,6 +891,55 @@ async def get_history(user: dict = Depends(get_current_user)):
     history = db_service.get_user_history(user['uid'])
     return history
 
+def follow_run_progress(run_id: str):
+    """Feeds the run's progress channel from run.log/Firestore if it executes in another process."""
+    def get_status():
+        db_run = db_service.get_run(run_id)
+        return db_run.get("status") if db_run else None
+    progress.follow(run_id, f"tmp/{run_id}/run.log", get_status)
+
+@router.get("/events/{run_id}")
+async def stream_run_events(run_id: str, request: Request, token: str = None):
+    """
+    Server-sent progress events for a run: node started/finished, scene completed (with
+    asset URLs), log lines and status, each with percent and ETA. The stream ends after
+    the terminal status. EventSource can't set headers, so the Firebase token may be
+    passed as ?token=; reconnects resume after the Last-Event-ID header.
+    """
+    from projects.backend.firebase_setup import verify_token
+    auth_header = request.headers.get("authorization", "")
+    token = token or (auth_header[7:] if auth_header.lower().startswith("bearer ") else None)
+    if not token:
+        raise HTTPException(status_code=401, detail="Authentication token required")
+    try:
+        user = verify_token(token)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=f"Invalid authentication credentials: {str(e)}")
+
+    # AUTHORIZATION: Verify user owns this run
+    db_run = db_service.get_run(run_id)
+    if not db_run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if db_run.get("user_id") != user.get("uid"):
+        logger.warning(f"Unauthorized event stream attempt: User {user.get('uid')} tried to access run {run_id} owned by {db_run.get('user_id')}")
+        raise HTTPException(status_code=403, detail="Unauthorized access to this run")
+
+    try:
+        after_seq = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        after_seq = 0
+    follow_run_progress(run_id)
+
+    async def event_stream():
+        async for event in progress.subscribe(run_id, after_seq=after_seq, heartbeat=15):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.websocket("/ws/logs/{run_id}")
 async def websocket_logs(websocket: WebSocket, run_id: str):
     # WebSocket authentication - extract token from query params
@@ -775,43 +976,13 @@ async def websocket_logs(websocket: WebSocket, run_id: str):
             logger.warning(f"Unauthorized log access attempt: User {user.get('uid')} tried to access run {run_id} owned by {db_run.get('user_id')}")
             return
         
-        log_path = f"tmp/{run_id}/run.log"
-        
-        # Wait for file to exist
-        retries = 0
-        while not os.path.exists(log_path):
-            if retries > 20: # 10 seconds timeout
-                await websocket.close()
-                return
-            await asyncio.sleep(0.5)
-            retries += 1
-            
-        with open(log_path, "r") as f:
-            # Go to end of file? Or start? Start is better.
-            f.seek(0, 0)
-            
-            while True:
-                line = f.readline()
-                if line:
-                    await websocket.send_text(line)
-                else:
-                    # Check if run is done
-                    # First check memory
-                    status = run_status.get(run_id)
-                    
-                    # If not in memory or unknown, check disk (persistence recovery)
-                    if not status or status == "unknown":
-                         db_run = db_service.get_run(run_id)
-                         if db_run:
-                             status = db_run.get("status")
-                    
-                    if status in ["completed", "failed"]:
-                        # Send remaining buffer
-                        remaining = f.read()
-                        if remaining:
-                            await websocket.send_text(remaining)
-                        break
-                    await asyncio.sleep(0.1)
+        # One shared feed per run: the pipeline's own events, or a single tailer when the run
+        # executes in another process. Terminal status is pushed, not polled.
+        follow_run_progress(run_id)
+        async for event in progress.subscribe(run_id):
+            if event["type"] == "log":
+                await websocket.send_text(event["line"])
+        await websocket.close()
     except WebSocketDisconnect:
         logger.info(f"Client disconnected from logs {run_id}")
     except Exception as e:
@@ -863,7 +1034,7 @@ async def download_run_assets(run_id: str, user: dict = Depends(get_current_user
         media_type='application/zip'
     )
 @router.post("/regenerate-scene/{run_id}/{scene_id}")
-async def regenerate_scene(run_id: str, scene_id: str, request: RegenerateSceneRequest, background_tasks: BackgroundTasks, user: dict = Depends(get_current_user)):
+async def regenerate_scene(run_id: str, scene_id: str, request: RegenerateSceneRequest, user: dict = Depends(get_current_user)):
     user_id = user.get("uid")
     REGEN_COST = 3  # Ensures 76% margin ($1.98 revenue vs $0.94 COGS)
     
@@ -878,14 +1049,6 @@ async def regenerate_scene(run_id: str, scene_id: str, request: RegenerateSceneR
             detail=f"Please wait {minutes}m {seconds}s before regenerating. This prevents system overload."
         )
     
-    # 2. Check global throttle (30 seconds)
-    global_throttle = throttling_service.check_global_throttle()
-    if global_throttle is not None:
-        raise HTTPException(
-            status_code=429,
-            detail=f"System is processing another request. Please wait {global_throttle} seconds."
-        )
-    
     # 1. Fetch existing run
     db_run = db_service.get_run(run_id)
     if not db_run:
@@ -958,6 +1121,9 @@ async def regenerate_scene(run_id: str, scene_id: str, request: RegenerateSceneR
     regen_request.config["scenes_list"] = scenes_list
     regen_request.config["remote_assets"] = remote_assets
     regen_request.config["history"] = history
+    regen_request.config["reuse_state"] = {
+        key: previous_result[key] for key in REGEN_REUSED_STATE if previous_result.get(key) is not None
+    }
 
     
     # --- RECORD GENERATION START (for throttling) ---
@@ -966,11 +1132,11 @@ async def regenerate_scene(run_id: str, scene_id: str, request: RegenerateSceneR
     db_service.save_run(run_id, user_id, "running")
 
 
-    background_tasks.add_task(run_pipeline_task, run_id, regen_request, user_id)
+    ticket = dispatch_pipeline(run_id, regen_request, user_id, cost=REGEN_COST)
     
     db_service.track_event(user_id, "scene_regenerated", {"run_id": run_id, "scene_id": scene_id})
 
-    return {"status": "started", "message": f"Regenerating {scene_id}. {REGEN_COST} credits deducted."}
+    return {"status": "started", "message": f"Regenerating {scene_id}. {REGEN_COST} credits deducted.", **ticket}
 
 @router.post("/pre-flight-check")
 async def pre_flight_check_endpoint(
@@ -984,13 +1150,15 @@ async def pre_flight_check_endpoint(
     """
     try:
         from execution.person_detection import pre_flight_check
+        from execution.cpu_pool import cpu_pool
         
         print(f"\n=== PRE-FLIGHT CHECK ===" )
         print(f"User: {user.get('uid')}")
         print(f"Input data: {input_data[:100] if input_data else 'None'}...")
         print(f"Image path: {image_path}")
         
-        result = pre_flight_check(input_data or "", image_path)
+        # OpenCV/NumPy face detection runs in a CPU-pool worker, off the event loop
+        result = await cpu_pool.run_async(pre_flight_check, input_data or "", image_path)
         
         print(f"Pre-flight result: safe={result.get('safe_to_proceed')}, requires_confirmation={result.get('requires_confirmation')}")
         print(f"Warnings: {len(result.get('warnings', []))}")
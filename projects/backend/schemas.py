@@ -1,15 +1,19 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class GenerateRequest(BaseModel):
     prompt: str
     product_image_path: Optional[str] = None
     config: Optional[Dict[str, Any]] = {}
+    variants: Optional[int] = None      # Batch mode: N ad variants sharing DNA, anchor, BGM and end card
 
 class GenerateResponse(BaseModel):
     run_id: str
     status: str
     message: str
+    queue_position: Optional[int] = 0   # 0 = started immediately
+    eta_seconds: Optional[int] = 0      # Estimated wait before the run starts
+    variant_run_ids: Optional[List[str]] = None  # Batch mode: one run per variant
 
 class RegenerateSceneRequest(BaseModel):
     prompt: Optional[str] = None
@@ -0,0 +1,214 @@
+"""
+Admission scheduler: weighted fair queuing of pipeline runs across users and tiers.
+
+Replaces the global "one start per 30 seconds" throttle. Every accepted run is
+queued, and runs are dispatched as soon as pipeline capacity frees up, so throughput
+follows the capacity we provision instead of a fixed 120 starts/hour.
+
+This scheduler admits runs executed in this API process (PIPELINE_EXECUTION_MODE=inline),
+so its state and capacity are per process. In queue mode runs go straight to the
+durable job queue. The same fair ordering is applied there when render workers lease
+(services/job_queue.py), and capacity is the workers' slots.
+
+Ordering is weighted fair queuing (WFQ): each run gets a virtual finish tag
+    finish = max(virtual_time, user's last finish) + cost / tier_weight
+and the smallest tag is dispatched first. A user submitting ten runs does not starve
+the others, and paid tiers get proportionally more of the capacity. The cost is the
+run's credit cost, so a regeneration weighs less than a full run. Finish tags that
+virtual time has passed are dropped when a run is admitted, and all of them once the
+scheduler goes idle, so per-user state does not grow with the number of users.
+
+Dispatch also waits while every provider circuit is open (see execution/provider_control.py).
+ETAs come from a moving average of run durations, simulated over the free slots.
+
+Capacity defaults to the Veo controller's concurrency ceiling (VEO_MAX_CONCURRENCY),
+so it scales with the provider limit we configure. 8 slots with ~4-minute runs match
+the old throttle's 120 starts/hour.
+
+Config (env):
+    PIPELINE_CONCURRENCY   - Runs executed at once in this process (default: VEO_MAX_CONCURRENCY, 8)
+    PIPELINE_RUN_SECONDS   - Initial average run duration for ETAs (default 240)
+
+Usage:
+    from projects.backend.services.admission_scheduler import admission_scheduler
+
+    ticket = admission_scheduler.submit(run_id, user_id, tier, cost=6, start=lambda: ...)
+    ticket["queue_position"], ticket["eta_seconds"]
+
+    # When the run finishes (success or failure)
+    admission_scheduler.release(run_id)
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+PIPELINE_CONCURRENCY = os.getenv("PIPELINE_CONCURRENCY")
+DEFAULT_RUN_SECONDS = float(os.getenv("PIPELINE_RUN_SECONDS", "240"))
+TIER_WEIGHTS = {"agency": 4.0, "growth": 2.0, "starter": 1.5, None: 1.0}
+DURATION_ALPHA = 0.2        # EWMA weight of the latest run duration
+RECHECK_SECONDS = 5.0       # Re-check dispatches held by open provider circuits
+
+
+def default_capacity() -> int:
+    """PIPELINE_CONCURRENCY, else the Veo controller's concurrency ceiling."""
+    if PIPELINE_CONCURRENCY:
+        return int(PIPELINE_CONCURRENCY)
+    try:
+        from execution.provider_control import CONCURRENCY_DEFAULTS
+        return int(CONCURRENCY_DEFAULTS["video"][1])
+    except Exception:
+        return 8
+
+
+def _providers_available() -> bool:
+    """False only while every provider circuit we know of is open."""
+    try:
+        from execution.provider_control import all_controller_stats, open_controllers
+        known = len(all_controller_stats())
+        return not known or len(open_controllers()) < known
+    except Exception:
+        return True
+
+
+class Admission:
+    """A run waiting for, or holding, a pipeline slot."""
+
+    def __init__(self, run_id: str, user_id: Optional[str], tier: Optional[str], cost: float,
+                 start: Callable[[], None], start_tag: float, finish_tag: float, seq: int):
+        self.run_id = run_id
+        self.user_id = user_id
+        self.tier = tier
+        self.cost = cost
+        self.start = start
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+
+
+class AdmissionScheduler:
+    def __init__(self, capacity: Optional[int] = None, provider_check: Callable[[], bool] = _providers_available,
+                 run_seconds: float = DEFAULT_RUN_SECONDS):
+        self.capacity = max(1, capacity or default_capacity())
+        self.provider_check = provider_check
+        self.avg_run_seconds = run_seconds
+        self._waiting: Dict[str, Admission] = {}
+        self._running: Dict[str, Admission] = {}
+        self._user_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._ticker: Optional[threading.Thread] = None
+
+    # --- Queue ---
+
+    def submit(self, run_id: str, user_id: Optional[str], tier: Optional[str], cost: float,
+               start: Callable[[], None]) -> Dict[str, int]:
+        """
+        Queues a run; `start` is called once it is admitted. Call release() when it finishes.
+        Returns {"queue_position", "eta_seconds"} (position 0 = started).
+        """
+        with self._lock:
+            weight = TIER_WEIGHTS.get(tier, TIER_WEIGHTS[None])
+            user_key = user_id or run_id
+            start_tag = max(self._virtual_time, self._user_finish.get(user_key, 0.0))
+            finish_tag = start_tag + max(cost, 1.0) / weight
+            self._user_finish[user_key] = finish_tag
+            self._waiting[run_id] = Admission(run_id, user_id, tier, cost, start, start_tag, finish_tag, next(self._seq))
+        self._dispatch()
+        ticket = self.ticket(run_id)
+        if ticket["queue_position"]:
+            print(f"🧾 Run {run_id} queued at position {ticket['queue_position']} (ETA {ticket['eta_seconds']}s, tier {tier or 'payg'})")
+        return ticket
+
+    def release(self, run_id: str):
+        """Frees the run's slot (call when the pipeline finishes) and dispatches the next run."""
+        with self._lock:
+            admission = self._running.pop(run_id, None) or self._waiting.pop(run_id, None)
+            if admission and admission.started_at:
+                duration = time.time() - admission.started_at
+                self.avg_run_seconds = (1 - DURATION_ALPHA) * self.avg_run_seconds + DURATION_ALPHA * duration
+            if not self._waiting and not self._running and self._user_finish:
+                # Idle: the busy period is over, every tag issued so far has been served
+                self._virtual_time = max(self._virtual_time, max(self._user_finish.values()))
+                self._user_finish.clear()
+        self._dispatch()
+
+    def _dispatch(self):
+        to_start: List[Admission] = []
+        with self._lock:
+            while self._waiting and len(self._running) < self.capacity:
+                if not self.provider_check():
+                    break
+                admission = min(self._waiting.values(), key=lambda a: (a.finish_tag, a.seq))
+                del self._waiting[admission.run_id]
+                # Virtual time advances to the start tag of the run being served
+                self._virtual_time = max(self._virtual_time, admission.start_tag)
+                # Users whose last finish tag is behind it start from virtual time anyway
+                for user_key in [k for k, tag in self._user_finish.items() if tag <= self._virtual_time]:
+                    del self._user_finish[user_key]
+                admission.started_at = time.time()
+                self._running[admission.run_id] = admission
+                to_start.append(admission)
+            if self._waiting:
+                self._ensure_ticker()
+
+        for admission in to_start:
+            wait = admission.started_at - admission.submitted_at
+            print(f"▶️ Admitting run {admission.run_id} (waited {wait:.0f}s, {len(self._running)}/{self.capacity} slots)")
+            try:
+                admission.start()
+            except Exception as e:
+                print(f"❌ Failed to start run {admission.run_id}: {e}")
+                self.release(admission.run_id)
+
+    def _ensure_ticker(self):
+        if self._ticker is not None and self._ticker.is_alive():
+            return
+        self._ticker = threading.Thread(target=self._tick, name="admission-ticker", daemon=True)
+        self._ticker.start()
+
+    def _tick(self):
+        while True:
+            time.sleep(RECHECK_SECONDS)
+            self._dispatch()
+            with self._lock:
+                if not self._waiting:
+                    self._ticker = None
+                    return
+
+    # --- Position / ETA ---
+
+    def ticket(self, run_id: str) -> Dict[str, int]:
+        with self._lock:
+            if run_id in self._running or run_id not in self._waiting:
+                return {"queue_position": 0, "eta_seconds": 0}
+            order = sorted(self._waiting.values(), key=lambda a: (a.finish_tag, a.seq))
+            position = next(i for i, a in enumerate(order) if a.run_id == run_id) + 1
+
+            # Slot-free times: remaining time of running runs, 0 for idle slots
+            now = time.time()
+            slots = [max(0.0, self.avg_run_seconds - (now - a.started_at)) for a in self._running.values()]
+            slots += [0.0] * (self.capacity - len(slots))
+            heapq.heapify(slots)
+            for _ in range(position - 1):
+                heapq.heappush(slots, heapq.heappop(slots) + self.avg_run_seconds)
+            eta = slots[0] if slots else 0.0
+            return {"queue_position": position, "eta_seconds": int(round(eta))}
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "running": len(self._running),
+                "waiting": len(self._waiting),
+                "avg_run_seconds": round(self.avg_run_seconds, 1),
+            }
+
+
+admission_scheduler = AdmissionScheduler()
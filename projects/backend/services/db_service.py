@@ -1,6 +1,7 @@
 import time
 from projects.backend.firebase_setup import get_firestore_client
 from google.cloud import firestore
+from google.api_core.exceptions import NotFound
 
 
 class FirestoreService:
@@ -8,10 +9,9 @@ class FirestoreService:
         self.db = get_firestore_client()
         self.collection = self.db.collection('executions')
 
-    def save_run(self, run_id: str, user_id: str, status: str, result: dict = None, request_data: dict = None, cost: float = None, credits_used: int = None, failure_reason: str = None):
-        """Creates or updates a run document."""
-        doc_ref = self.collection.document(run_id)
-        
+    @staticmethod
+    def run_fields(run_id: str, user_id: str, status: str, result: dict = None, request_data: dict = None, cost: float = None, credits_used: int = None, failure_reason: str = None) -> dict:
+        """Fields a save_run call writes (shared with the coalescing run-state writer)."""
         data = {
             "run_id": run_id,
             "user_id": user_id,
@@ -35,9 +35,36 @@ class FirestoreService:
 
         if failure_reason:
             data["failure_reason"] = failure_reason
-            
+        return data
+
+    def save_run(self, run_id: str, user_id: str, status: str, result: dict = None, request_data: dict = None, cost: float = None, credits_used: int = None, failure_reason: str = None):
+        """Creates or updates a run document."""
+        doc_ref = self.collection.document(run_id)
+        data = self.run_fields(run_id, user_id, status, result, request_data, cost, credits_used, failure_reason)
         doc_ref.set(data, merge=True)
 
+    def update_run_fields(self, run_id: str, fields: dict):
+        """
+        Updates only the given fields of a run document.
+        
+        Args:
+            fields: {("result", "remote_assets", "Hook_image"): url, ...} - path tuples, so keys
+                    containing dots or spaces are quoted correctly.
+        """
+        doc_ref = self.collection.document(run_id)
+        updates = {firestore.FieldPath(*path).to_api_repr(): value for path, value in fields.items()}
+        try:
+            doc_ref.update(updates)
+        except NotFound:
+            # Document not created yet: write the same fields as nested maps
+            nested = {}
+            for path, value in fields.items():
+                node = nested
+                for key in path[:-1]:
+                    node = node.setdefault(key, {})
+                node[path[-1]] = value
+            doc_ref.set(nested, merge=True)
+
 
     def get_user_history(self, user_id: str, limit: int = 20):
         """Fetch history for a user."""
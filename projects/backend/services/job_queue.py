@@ -0,0 +1,385 @@
+"""
+Durable job queue for pipeline runs (API enqueues, render workers execute).
+
+Jobs are leased, not popped: a worker takes a lease for LEASE_SECONDS and extends it
+with heartbeats while the pipeline runs. If the worker dies (instance recycled, OOM),
+the lease expires and another worker picks the job up again, up to `max_attempts`.
+
+Leasing is weighted fair across users. Each job carries the submitting user, its cost
+(credits) and the user's tier weight, and a worker gets the available job with the
+smallest finish tag:
+    finish = (user's cost in service + cost of the user's older queued jobs + job cost) / weight
+The tag is computed from the queue itself, so fairness holds across API pods and
+restarts. A burst from one user interleaves with other users' runs. Paid tiers get a
+proportionally larger share. Ties go to the oldest job.
+
+Backends:
+- SQLiteJobBackend: persistent, shared by processes on one host (default). The file must
+  sit on a local disk or a volume with working POSIX locks (not NFS); API pods and workers
+  on several hosts need a networked backend with the same interface.
+- InMemoryJobBackend: local stand-in for tests and single-process dev (JOB_QUEUE_BACKEND=memory)
+
+Config (env):
+    JOB_QUEUE_BACKEND   - "sqlite" (default) or "memory"
+    JOB_QUEUE_DB        - SQLite path (default tmp/job_queue.db)
+    JOB_LEASE_SECONDS   - Lease length (default 120); heartbeats run every third of it
+
+Usage:
+    from projects.backend.services.job_queue import job_queue
+
+    job_id = job_queue.enqueue("pipeline", {"run_id": run_id, ...}, user_key=user_id, cost=6, weight=2.0)
+    job_queue.ticket(job_id, run_seconds=240)     # {"queue_position", "eta_seconds"}
+
+    # Worker
+    job = job_queue.lease("worker-1", kinds=["pipeline"])
+    job_queue.heartbeat(job.job_id, "worker-1")
+    job_queue.complete(job.job_id, "worker-1")   # or job_queue.fail(job.job_id, "worker-1", str(e))
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+DEFAULT_MAX_ATTEMPTS = 3
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+
+class Job:
+    """A unit of work plus its lease state."""
+
+    def __init__(self, job_id: str, kind: str, payload: Dict[str, Any], status: str = QUEUED,
+                 attempts: int = 0, max_attempts: int = DEFAULT_MAX_ATTEMPTS, lease_owner: Optional[str] = None,
+                 lease_expires_at: float = 0.0, created_at: Optional[float] = None,
+                 updated_at: Optional[float] = None, error: Optional[str] = None,
+                 user_key: Optional[str] = None, cost: float = 1.0, weight: float = 1.0):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.status = status
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.lease_owner = lease_owner
+        self.lease_expires_at = lease_expires_at
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+        self.error = error
+        self.user_key = user_key or job_id
+        self.cost = cost
+        self.weight = weight
+
+    def is_available(self, now: float) -> bool:
+        """Queued, or leased by a worker that stopped heartbeating."""
+        return self.status == QUEUED or (self.status == LEASED and self.lease_expires_at <= now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return f"Job({self.job_id} {self.kind} {self.status} attempt {self.attempts}/{self.max_attempts})"
+
+
+def fair_order(available: List[Job], leased: List[Job]) -> List[Job]:
+    """Available jobs by weighted fair finish tag (see module docstring), oldest first on ties."""
+    backlog: Dict[str, float] = {}
+    for job in leased:
+        backlog[job.user_key] = backlog.get(job.user_key, 0.0) + job.cost
+    tagged = []
+    for job in sorted(available, key=lambda j: j.created_at):
+        backlog[job.user_key] = backlog.get(job.user_key, 0.0) + job.cost
+        tagged.append((backlog[job.user_key] / (job.weight or 1.0), job.created_at, job))
+    return [job for _, _, job in sorted(tagged, key=lambda t: (t[0], t[1]))]
+
+
+class InMemoryJobBackend:
+    """Process-local stand-in: same semantics as SQLite, nothing survives a restart."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def insert(self, job: Job) -> bool:
+        with self._lock:
+            existing = self._jobs.get(job.job_id)
+            if existing is not None and existing.status not in (DONE, FAILED):
+                return False
+            self._jobs[job.job_id] = job
+            return True
+
+    def _snapshot(self, kinds: Optional[List[str]], now: float) -> Tuple[List[Job], List[Job]]:
+        jobs = [j for j in self._jobs.values() if not kinds or j.kind in kinds]
+        return ([j for j in jobs if j.is_available(now)],
+                [j for j in jobs if j.status == LEASED and j.lease_expires_at > now])
+
+    def snapshot(self, kinds: Optional[List[str]]) -> Tuple[List[Job], List[Job]]:
+        """(available jobs, jobs under a live lease) of the given kinds."""
+        with self._lock:
+            available, leased = self._snapshot(kinds, time.time())
+            return [Job(**j.to_dict()) for j in available], [Job(**j.to_dict()) for j in leased]
+
+    def lease(self, worker_id: str, kinds: Optional[List[str]], lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            for job in fair_order(*self._snapshot(kinds, now)):
+                if job.attempts >= job.max_attempts:
+                    # Died on its last lease
+                    job.status, job.error, job.updated_at = FAILED, job.error or "Lease expired", now
+                    continue
+                job.status, job.lease_owner = LEASED, worker_id
+                job.lease_expires_at = now + lease_seconds
+                job.attempts += 1
+                job.updated_at = now
+                return Job(**job.to_dict())
+            return None
+
+    def update(self, job_id: str, worker_id: Optional[str], **fields) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (worker_id is not None and (job.status != LEASED or job.lease_owner != worker_id)):
+                return False
+            for k, v in fields.items():
+                setattr(job, k, v)
+            job.updated_at = time.time()
+            return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return Job(**job.to_dict()) if job else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            out: Dict[str, int] = {}
+            for job in self._jobs.values():
+                out[job.status] = out.get(job.status, 0) + 1
+            return out
+
+
+class SQLiteJobBackend:
+    """Persistent queue in a SQLite file; leases are taken in a write transaction."""
+
+    COLUMNS = ("job_id", "kind", "payload", "status", "attempts", "max_attempts", "lease_owner",
+               "lease_expires_at", "created_at", "updated_at", "error", "user_key", "cost", "weight")
+    FAIR_SHARE_COLUMNS = {"user_key": "TEXT", "cost": "REAL NOT NULL DEFAULT 1", "weight": "REAL NOT NULL DEFAULT 1"}
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at REAL NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    error TEXT
+                )
+            """)
+            # Queues created before fair leasing get the fair-share columns
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in self.FAIR_SHARE_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _row_to_job(self, row) -> Job:
+        data = dict(zip(self.COLUMNS, row))
+        data["payload"] = json.loads(data["payload"])
+        return Job(**data)
+
+    def insert(self, job: Job) -> bool:
+        # A finished job id can be enqueued again (a scene regeneration reuses its run id)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in self.COLUMNS if c != "job_id")
+        with self._lock, self._connection() as conn:
+            cur = conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))}) "
+                f"ON CONFLICT(job_id) DO UPDATE SET {updates} WHERE jobs.status IN ('done', 'failed')",
+                (job.job_id, job.kind, json.dumps(job.payload), job.status, job.attempts, job.max_attempts,
+                 job.lease_owner, job.lease_expires_at, job.created_at, job.updated_at, job.error,
+                 job.user_key, job.cost, job.weight)
+            )
+            return cur.rowcount == 1
+
+    def _snapshot(self, conn: sqlite3.Connection, kinds: Optional[List[str]], now: float) -> Tuple[List[Job], List[Job]]:
+        kind_filter, kind_params = "", []
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            kind_params = list(kinds)
+        select = f"SELECT {', '.join(self.COLUMNS)} FROM jobs "
+        available = conn.execute(
+            select + f"WHERE (status = 'queued' OR (status = 'leased' AND lease_expires_at <= ?)){kind_filter}",
+            [now] + kind_params
+        ).fetchall()
+        leased = conn.execute(
+            select + f"WHERE status = 'leased' AND lease_expires_at > ?{kind_filter}", [now] + kind_params
+        ).fetchall()
+        return [self._row_to_job(r) for r in available], [self._row_to_job(r) for r in leased]
+
+    def snapshot(self, kinds: Optional[List[str]]) -> Tuple[List[Job], List[Job]]:
+        """(available jobs, jobs under a live lease) of the given kinds."""
+        with self._connection() as conn:
+            return self._snapshot(conn, kinds, time.time())
+
+    def lease(self, worker_id: str, kinds: Optional[List[str]], lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                # IMMEDIATE takes the write lock up front: two workers never lease the same row
+                conn.execute("BEGIN IMMEDIATE")
+                for job in fair_order(*self._snapshot(conn, kinds, now)):
+                    if job.attempts >= job.max_attempts:
+                        conn.execute("UPDATE jobs SET status = 'failed', error = COALESCE(error, 'Lease expired'), "
+                                     "updated_at = ? WHERE job_id = ?", (now, job.job_id))
+                        continue
+                    job.status, job.lease_owner = LEASED, worker_id
+                    job.lease_expires_at = now + lease_seconds
+                    job.attempts += 1
+                    job.updated_at = now
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires_at = ?, attempts = ?, updated_at = ? "
+                        "WHERE job_id = ?",
+                        (job.status, worker_id, job.lease_expires_at, job.attempts, now, job.job_id)
+                    )
+                    conn.execute("COMMIT")
+                    return job
+                conn.execute("COMMIT")
+                return None
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def update(self, job_id: str, worker_id: Optional[str], **fields) -> bool:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        params = list(fields.values()) + [job_id]
+        where = "job_id = ?"
+        if worker_id is not None:
+            where += " AND status = 'leased' AND lease_owner = ?"
+            params.append(worker_id)
+        with self._lock, self._connection() as conn:
+            cur = conn.execute(f"UPDATE jobs SET {assignments} WHERE {where}", params)
+            return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._connection() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def _default_backend():
+    if os.getenv("JOB_QUEUE_BACKEND", "sqlite").lower() == "memory":
+        return InMemoryJobBackend()
+    return SQLiteJobBackend(os.getenv("JOB_QUEUE_DB", os.path.join("tmp", "job_queue.db")))
+
+
+class JobQueue:
+    """Enqueue / lease / heartbeat / complete / fail on top of a backend."""
+
+    def __init__(self, backend=None, lease_seconds: float = LEASE_SECONDS):
+        self._backend = backend
+        self.lease_seconds = lease_seconds
+        self._init_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        # Created on first use so importing the module never touches the filesystem
+        if self._backend is None:
+            with self._init_lock:
+                if self._backend is None:
+                    self._backend = _default_backend()
+        return self._backend
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                max_attempts: int = DEFAULT_MAX_ATTEMPTS, user_key: Optional[str] = None,
+                cost: float = 1.0, weight: float = 1.0) -> str:
+        """
+        Adds a job and returns its id. Idempotent on `job_id` while the job is pending;
+        a finished job id is queued again. `user_key`, `cost` and `weight` set its fair share.
+        """
+        job = Job(job_id or uuid.uuid4().hex, kind, payload, max_attempts=max_attempts,
+                  user_key=user_key, cost=cost, weight=weight)
+        if self.backend.insert(job):
+            print(f"📥 Job enqueued: {job.job_id} ({kind})")
+        return job.job_id
+
+    def lease(self, worker_id: str, kinds: Optional[Iterable[str]] = None,
+              lease_seconds: Optional[float] = None) -> Optional[Job]:
+        """Next available job in fair order (queued, or whose lease expired), leased to `worker_id`."""
+        return self.backend.lease(worker_id, list(kinds) if kinds else None, lease_seconds or self.lease_seconds)
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: Optional[float] = None) -> bool:
+        """Extends the lease. False means the lease was lost (expired and re-leased)."""
+        expires = time.time() + (lease_seconds or self.lease_seconds)
+        return self.backend.update(job_id, worker_id, lease_expires_at=expires)
+
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        return self.backend.update(job_id, worker_id, status=DONE, lease_owner=None, lease_expires_at=0.0)
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """Records a failure; the job is queued again while attempts remain (and `retry`)."""
+        job = self.backend.get(job_id)
+        if job is None:
+            return False
+        requeue = retry and job.attempts < job.max_attempts
+        return self.backend.update(
+            job_id, worker_id, status=QUEUED if requeue else FAILED,
+            lease_owner=None, lease_expires_at=0.0, error=str(error)[:2000]
+        )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.backend.get(job_id)
+
+    def ticket(self, job_id: str, run_seconds: float) -> Dict[str, int]:
+        """
+        Position of a waiting job in lease order, and an upper-bound ETA assuming the
+        workers currently holding leases free up every `run_seconds`. Position 0 = started.
+        """
+        job = self.backend.get(job_id)
+        if job is None or not job.is_available(time.time()):
+            return {"queue_position": 0, "eta_seconds": 0}
+        available, leased = self.backend.snapshot([job.kind])
+        order = [j.job_id for j in fair_order(available, leased)]
+        position = order.index(job_id) + 1 if job_id in order else 1
+        slots = max(1, len(leased))
+        return {"queue_position": position, "eta_seconds": int(math.ceil(position / slots) * run_seconds)}
+
+    def stats(self) -> Dict[str, int]:
+        return self.backend.counts()
+
+
+job_queue = JobQueue()
@@ -1,7 +1,7 @@
 import os
 import json
 import time
-from typing import Dict, TypedDict, List
+from typing import Dict, TypedDict, List, Optional, Tuple
 from datetime import datetime
 
 import tempfile
@@ -98,10 +98,46 @@ class RateLimitService:
             
         return state
 
-    def check_and_wait(self, model_name: str):
+    @staticmethod
+    def _state_key(model_name: str, key_id: str = None) -> str:
+        # Each pooled API key has its own quota, tracked as "model@key_id"
+        return f"{model_name}@{key_id}" if key_id else model_name
+
+    def get_headroom(self, model_name: str, key_id: str = None) -> Optional[Tuple[int, int]]:
+        """
+        Returns (rpm_remaining, rpd_remaining) for a model (and API key), or None if the
+        model has no configured limits.
+        """
+        limits = self.LIMITS.get(model_name)
+        if not limits:
+            return None
+
+        # Read a private snapshot under the shared file lock: self._state is replaced and
+        # mutated by check_and_wait in other threads
+        state = {}
+        if os.path.exists(STATE_FILE):
+            try:
+                with open(STATE_FILE, 'r') as f:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                    try:
+                        content = f.read()
+                    finally:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+                state = (json.loads(content) if content else {}).get(self._state_key(model_name, key_id), {})
+            except Exception as e:
+                print(f"Warning: Failed to read rate limit state: {e}")
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        daily_count = state.get("daily_count", 0) if state.get("last_reset_date") == today else 0
+        now = time.time()
+        recent = [t for t in state.get("request_timestamps", []) if now - t < 60]
+        return max(0, limits["rpm"] - len(recent)), max(0, limits["rpd"] - daily_count)
+
+    def check_and_wait(self, model_name: str, key_id: str = None):
         """
         Checks daily limit and enforces RPM limit thread-safely via file locking.
         Holds an exclusive lock on the state file during the entire check-update cycle.
+        `key_id` scopes the quota to one pooled API key.
         """
         limits = self.LIMITS.get(model_name)
         if not limits:
@@ -127,7 +163,7 @@ class RateLimitService:
                 except json.JSONDecodeError:
                     self._state = {}
                 
-                state = self._get_model_state(model_name)
+                state = self._get_model_state(self._state_key(model_name, key_id))
 
                 # 3. Check Daily Limit
                 if state["daily_count"] >= limits["rpd"]:
@@ -175,7 +211,7 @@ class RateLimitService:
         # RE-IMPLEMENTATION TO HANDLE WAIT CORRECTLY
         # We need a loop *outside* the file lock context
         while True:
-             wait_needed, wait_time = self._check_throttle_locked(model_name)
+             wait_needed, wait_time = self._check_throttle_locked(model_name, key_id)
              if not wait_needed:
                  break
              
@@ -183,7 +219,7 @@ class RateLimitService:
              time.sleep(wait_time)
              # Loop validates again
 
-    def _check_throttle_locked(self, model_name: str) -> tuple[bool, float]:
+    def _check_throttle_locked(self, model_name: str, key_id: str = None) -> tuple[bool, float]:
         """
         Internal helper: Acquires lock, checks limits.
         Returns (wait_needed, wait_seconds).
@@ -203,7 +239,8 @@ class RateLimitService:
                 content = f.read()
                 self._state = json.loads(content) if content else {}
                 
-                state = self._get_model_state(model_name)
+                state_key = self._state_key(model_name, key_id)
+                state = self._get_model_state(state_key)
                 
                 # Daily Check - Raise QuotaExceededException for immediate fallback
                 if state["daily_count"] >= limits["rpd"]:
@@ -234,12 +271,12 @@ class RateLimitService:
                     except Exception:
                         reset_time_str = "08:00 AM UTC"
 
-                    print(f"🚫 DAILY QUOTA EXHAUSTED for {model_name}")
+                    print(f"🚫 DAILY QUOTA EXHAUSTED for {state_key}")
                     print(f"   Used: {state['daily_count']}/{limits['rpd']} requests")
                     print(f"   Reset: {reset_time_str} (Midnight PT)")
                     print(f"   ⚡ Triggering Ken Burns fallback immediately")
                     raise QuotaExceededException(
-                        f"Daily Rate Limit Exceeded for {model_name} "
+                        f"Daily Rate Limit Exceeded for {state_key} "
                         f"({state['daily_count']}/{limits['rpd']}). "
                         f"Resets at {reset_time_str}"
                     )
@@ -265,7 +302,7 @@ class RateLimitService:
                 f.flush()
                 
                 remaining_daily = limits["rpd"] - state["daily_count"]
-                print(f"✅ Rate Limit Check Passed: {model_name}")
+                print(f"✅ Rate Limit Check Passed: {state_key}")
                 print(f"   RPM: {len(state['request_timestamps'])}/{limits['rpm']}")
                 print(f"   Daily: {state['daily_count']}/{limits['rpd']} ({remaining_daily} remaining)")
                 return False, 0.0
@@ -282,6 +319,10 @@ class RateLimitService:
         today = datetime.now().strftime("%Y-%m-%d")
         
         for model_name in self.LIMITS.keys():
+            # Per-key quota buckets ("model@key_id") are reported alongside the model
+            for state_key, state in self._state.items():
+                if state_key.startswith(f"{model_name}@"):
+                    merged_stats[state_key] = state
             if model_name in self._state:
                 merged_stats[model_name] = self._state[model_name]
             else:
@@ -0,0 +1,241 @@
+"""
+Coalescing run-state writer: batches a run's Firestore updates off the pipeline threads.
+
+`save_run` is a synchronous `set(merge=True)` of the whole accumulated dict. The scene
+loop called it after every scene (re-sending every remote asset URL so far) and the
+pipeline called it at every status change, so each scene waited on a Firestore round
+trip and most bytes written were unchanged.
+
+The writer instead:
+- Flattens each update into field paths (("result", "remote_assets", "Hook_image"), ...)
+  and drops the ones whose value was already written (or is already queued).
+- Merges what is left into the run's pending batch. A background thread writes the batch
+  with one `update()` once the coalescing window has passed since the first pending change.
+- Flushes terminal states ("completed", "failed", "cancelled") at once, and waits until
+  that write is done, so the status is durable before notifications go out. A failed or
+  timed-out terminal write is retried synchronously (with the fields of the failed batch);
+  if it still fails, RunStateWriteError is raised instead of reporting a finished run
+  that Firestore never recorded.
+
+Only this process's writes are diffed; API-side writes (queued, draft, zombie recovery)
+still go straight through db_service.save_run.
+
+Config (env):
+    RUN_STATE_WINDOW_MS - Coalescing window (default 750)
+    RUN_STATE_TERMINAL_RETRIES - Synchronous retries of a failed terminal write (default 3)
+
+Usage:
+    from projects.backend.services.run_state_writer import run_state
+
+    run_state.update(run_id, {"result": {"remote_assets": assets, "cost_usd": 0.42}})   # Returns at once
+    run_state.save(run_id, user_id, "completed", final_result, cost=cogs)                # Flushed and waited for
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from execution.progress_events import progress
+
+WINDOW_SECONDS = float(os.getenv("RUN_STATE_WINDOW_MS", "750")) / 1000.0
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+FLUSH_TIMEOUT = 15.0
+TERMINAL_RETRIES = int(os.getenv("RUN_STATE_TERMINAL_RETRIES", "3"))
+RETRY_BACKOFF_SECONDS = 1.0  # Doubled after each failed retry
+MAX_TRACKED_RUNS = 200      # Runs whose written fields are remembered for diffing
+
+FieldPath = Tuple[str, ...]
+
+
+class RunStateWriteError(Exception):
+    """A terminal run state could not be written."""
+    pass
+
+
+def flatten(data: Dict[str, Any], prefix: FieldPath = ()) -> Dict[FieldPath, Any]:
+    """Nested dict -> {path tuple: leaf}. Lists and empty dicts are leaves."""
+    out: Dict[FieldPath, Any] = {}
+    for key, value in data.items():
+        path = prefix + (str(key),)
+        if isinstance(value, dict) and value:
+            out.update(flatten(value, path))
+        else:
+            out[path] = value
+    return out
+
+
+def _overlaps(a: FieldPath, b: FieldPath) -> bool:
+    """True if one path is a prefix of the other (Firestore rejects both in one update)."""
+    n = min(len(a), len(b))
+    return a[:n] == b[:n]
+
+
+class RunStateWriter:
+    def __init__(self, db=None, window: float = WINDOW_SECONDS):
+        self._db = db
+        self.window = window
+        self._pending: Dict[str, Dict[FieldPath, Any]] = {}
+        self._due: Dict[str, float] = {}
+        self._waiters: Dict[str, List[threading.Event]] = {}
+        # Last value written or queued per path, per run (for diffing)
+        self._known: "OrderedDict[str, Dict[FieldPath, Any]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"updates": 0, "writes": 0, "fields_written": 0, "fields_skipped": 0, "errors": 0}
+
+    @property
+    def db(self):
+        if self._db is None:
+            from projects.backend.services.db_service import db_service
+            self._db = db_service
+        return self._db
+
+    # --- Public API ---
+
+    def update(self, run_id: str, data: Dict[str, Any], terminal: bool = False) -> bool:
+        """
+        Queues the changed fields of `data` for the run. Non-terminal updates return at once;
+        terminal ones flush the run and wait for the write, retrying it if it failed or timed
+        out (raises RunStateWriteError once the retries are exhausted).
+        """
+        with self._cond:
+            self._stats["updates"] += 1
+            known = self._known.setdefault(run_id, {})
+            self._known.move_to_end(run_id)
+            pending = self._pending.setdefault(run_id, {})
+            for path, value in flatten(data).items():
+                if path in known and known[path] == value:
+                    self._stats["fields_skipped"] += 1
+                    continue
+                for queued in [p for p in pending if p != path and _overlaps(p, path)]:
+                    del pending[queued]
+                for stale in [p for p in known if p != path and _overlaps(p, path)]:
+                    del known[stale]
+                value = copy.deepcopy(value)  # Callers keep mutating their dicts
+                pending[path] = value
+                known[path] = value
+
+            if not pending:
+                del self._pending[run_id]
+                return True
+            self._due.setdefault(run_id, time.time() + self.window)
+            done = None
+            if terminal:
+                self._due[run_id] = 0.0
+                done = threading.Event()
+                done.ok = False
+                self._waiters.setdefault(run_id, []).append(done)
+            while len(self._known) > MAX_TRACKED_RUNS:
+                self._known.popitem(last=False)
+            self._ensure_thread()
+            self._cond.notify()
+
+        if done is None:
+            return True
+        done.wait(FLUSH_TIMEOUT)
+        with self._cond:
+            self._known.pop(run_id, None)  # Run is over; later writes start fresh
+        if not done.ok:
+            self._retry_terminal(run_id, data, getattr(done, "failed_fields", {}))
+        return True
+
+    def _retry_terminal(self, run_id: str, data: Dict[str, Any], failed_fields: Dict[FieldPath, Any]):
+        """Writes the terminal state (plus the fields of its failed batch) from the calling thread."""
+        fields = flatten(data)
+        fields.update({p: v for p, v in failed_fields.items() if not any(_overlaps(p, q) for q in fields)})
+        delay = RETRY_BACKOFF_SECONDS
+        for attempt in range(1, TERMINAL_RETRIES + 1):
+            time.sleep(delay)
+            if self._write(run_id, fields):
+                print(f"✅ Run state for {run_id} written on retry {attempt}")
+                return
+            delay *= 2
+        raise RunStateWriteError(f"Terminal run state for {run_id} not written after {TERMINAL_RETRIES} retries")
+
+    def save(self, run_id: str, user_id: str, status: str, result: dict = None, cost: float = None,
+             credits_used: int = None, failure_reason: str = None) -> bool:
+        """Same fields as db_service.save_run, coalesced; terminal statuses are flushed."""
+        from projects.backend.services.db_service import FirestoreService
+        data = FirestoreService.run_fields(run_id, user_id, status, result, None, cost, credits_used, failure_reason)
+        self.update(run_id, data, terminal=status in TERMINAL_STATUSES)
+        # Pushed to live viewers once durable (terminal), so they can fetch the final run
+        progress.publish(run_id, "status", status=status, failure_reason=failure_reason)
+        return True
+
+    def flush(self, run_id: Optional[str] = None, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """Writes pending batches now (one run, or all) and waits for them."""
+        events = []
+        with self._cond:
+            for rid in ([run_id] if run_id else list(self._pending)):
+                if rid in self._pending:
+                    event = threading.Event()
+                    event.ok = False
+                    self._waiters.setdefault(rid, []).append(event)
+                    self._due[rid] = 0.0
+                    events.append(event)
+            if events:
+                self._ensure_thread()
+                self._cond.notify()
+        for event in events:
+            event.wait(timeout)
+        return all(e.ok for e in events)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._stats, pending_runs=len(self._pending))
+
+    # --- Writer thread ---
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="run-state-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    ready = [rid for rid, due in self._due.items() if due <= now]
+                    if ready:
+                        break
+                    timeout = min(self._due.values()) - now if self._due else None
+                    self._cond.wait(timeout)
+                batches = []
+                for rid in ready:
+                    batches.append((rid, self._pending.pop(rid, {}), self._waiters.pop(rid, [])))
+                    del self._due[rid]
+
+            for run_id, fields, waiters in batches:
+                ok = self._write(run_id, fields)
+                for event in waiters:
+                    event.ok = ok
+                    if not ok:
+                        event.failed_fields = fields
+                    event.set()
+
+    def _write(self, run_id: str, fields: Dict[FieldPath, Any]) -> bool:
+        if not fields:
+            return True
+        try:
+            self.db.update_run_fields(run_id, fields)
+            with self._cond:
+                self._stats["writes"] += 1
+                self._stats["fields_written"] += len(fields)
+            return True
+        except Exception as e:
+            print(f"⚠️ Run state write failed for {run_id} ({len(fields)} fields): {e}")
+            with self._cond:
+                self._stats["errors"] += 1
+                # Forget them so the next update re-sends these fields
+                known = self._known.get(run_id, {})
+                for path, value in fields.items():
+                    if known.get(path) is value:
+                        del known[path]
+            return False
+
+
+run_state = RunStateWriter()
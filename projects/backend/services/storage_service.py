@@ -1,10 +1,22 @@
 import os
 import datetime
 from projects.backend.firebase_setup import get_storage_bucket
+from execution.tracing import span
+from execution.simulation import SIMULATION_MODE
+
+# Files above this size are uploaded as a chunked resumable upload streamed from disk,
+# so peak memory per upload is one chunk rather than the whole file.
+STREAM_UPLOAD_THRESHOLD = 4 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Must be a multiple of 256 KB
 
 class StorageService:
     def __init__(self):
-        self.bucket = get_storage_bucket()
+        if SIMULATION_MODE:
+            # Load tests: "uploads" land in a local directory (file:// URLs)
+            from execution.simulation import SimulatedBucket
+            self.bucket = SimulatedBucket()
+        else:
+            self.bucket = get_storage_bucket()
 
     def upload_file(self, local_path: str, destination_path: str) -> str:
         """
@@ -23,16 +35,40 @@ class StorageService:
             # Set metadata for caching (optional)
             blob.cache_control = 'public, max-age=31536000'
             
-            blob.upload_from_filename(local_path)
+            if os.path.getsize(local_path) > STREAM_UPLOAD_THRESHOLD:
+                blob.chunk_size = UPLOAD_CHUNK_SIZE
             
-            # Make public
-            blob.make_public()
+            with span("storage.upload", destination=destination_path, bytes=os.path.getsize(local_path)):
+                blob.upload_from_filename(local_path)
+                
+                # Make public
+                blob.make_public()
             
             return blob.public_url
         except Exception as e:
             print(f"Error uploading file to storage: {e}")
             raise e
 
+    def upload_bytes(self, data: bytes, destination_path: str, content_type: str) -> str:
+        """
+        Uploads in-memory bytes (e.g. an already-encoded image) without touching disk.
+        
+        Returns:
+            str: The public URL of the uploaded file.
+        """
+        try:
+            blob = self.bucket.blob(destination_path)
+            blob.cache_control = 'public, max-age=31536000'
+            if len(data) > STREAM_UPLOAD_THRESHOLD:
+                blob.chunk_size = UPLOAD_CHUNK_SIZE
+            with span("storage.upload", destination=destination_path, bytes=len(data)):
+                blob.upload_from_string(data, content_type=content_type)
+                blob.make_public()
+            return blob.public_url
+        except Exception as e:
+            print(f"Error uploading bytes to storage: {e}")
+            raise e
+
     def upload_log(self, local_path: str, destination_path: str) -> str:
         """
         Uploads a log file to Firebase Storage (text/plain).
@@ -40,8 +76,9 @@ class StorageService:
         try:
             blob = self.bucket.blob(destination_path)
             blob.cache_control = 'no-cache' # Logs change, don't cache
-            blob.upload_from_filename(local_path, content_type='text/plain')
-            blob.make_public()
+            with span("storage.upload", destination=destination_path):
+                blob.upload_from_filename(local_path, content_type='text/plain')
+                blob.make_public()
             return blob.public_url
         except Exception as e:
             print(f"Error uploading log to storage: {e}")
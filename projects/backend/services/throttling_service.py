@@ -90,6 +90,9 @@ class ThrottlingService:
         """
         Check global throttle across all users.
         
+        No longer used for admission: runs are queued by the admission scheduler
+        (admission_scheduler.py) instead of being rejected.
+        
         Returns:
             None if allowed, or remaining throttle seconds if blocked
         """
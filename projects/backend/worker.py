@@ -0,0 +1,131 @@
+"""
+Render worker: executes pipeline jobs from the durable job queue, outside the API process.
+
+The API (PIPELINE_EXECUTION_MODE=queue) only enqueues runs; any number of workers lease
+them, so API pods and render workers scale independently. While a run executes, a
+heartbeat thread keeps the lease alive. If the worker is killed, the lease expires and
+another worker takes the run over. A worker whose heartbeat finds the lease gone (it
+stalled past the lease and the job was re-leased) aborts its copy of the run at the next
+node or scene (execution/run_control.py) and leaves the run's result to the new owner.
+
+The default SQLite queue is a file: API and workers must share one host (or one volume
+with working file locks; not NFS). Workers on other hosts need a networked backend.
+
+Config (env):
+    WORKER_CONCURRENCY  - Pipelines run in parallel by this worker (default 1)
+    WORKER_ID           - Lease owner name (default hostname-pid)
+    WORKER_POLL_SECONDS - Idle poll interval (default 2)
+    plus JOB_QUEUE_BACKEND / JOB_QUEUE_DB / JOB_LEASE_SECONDS (see services/job_queue.py)
+
+Usage:
+    python -m projects.backend.worker
+"""
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# Project root (for `execution.*` imports in the pipeline)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from projects.backend.services.job_queue import job_queue
+from projects.backend.services.run_state_writer import RunStateWriteError
+from execution.run_control import abort_run, release_run
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
+POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+
+_stop = threading.Event()
+
+
+def _heartbeat_loop(job_id: str, run_id: str, worker_id: str, done: threading.Event):
+    interval = max(1.0, job_queue.lease_seconds / 3)
+    while not done.wait(interval):
+        try:
+            alive = job_queue.heartbeat(job_id, worker_id)
+        except Exception as e:
+            print(f"⚠️ Heartbeat failed for job {job_id}: {e}")  # Transient; the lease has slack
+            continue
+        if not alive:
+            print(f"⚠️ Lost lease on job {job_id}; another worker owns it now")
+            abort_run(run_id, f"lease on job {job_id} lost by {worker_id}")
+            return
+
+
+def run_job(job, worker_id: str):
+    """Runs one leased pipeline job, heartbeating until it finishes."""
+    from projects.backend.schemas import GenerateRequest
+    from projects.backend.routers.generation import run_pipeline_task
+
+    payload = job.payload
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(job.job_id, payload["run_id"], worker_id, done),
+                                 daemon=True)
+    heartbeat.start()
+    try:
+        print(f"🛠️ [{worker_id}] Running job {job.job_id} (run {payload.get('run_id')}, attempt {job.attempts})")
+        run_pipeline_task(
+            payload["run_id"],
+            GenerateRequest(**payload["request"]),
+            payload.get("user_id"),
+            payload.get("credits_used", 0)
+        )
+        done.set()
+        if job_queue.complete(job.job_id, worker_id):
+            print(f"✅ [{worker_id}] Job {job.job_id} done")
+        else:
+            print(f"⚠️ [{worker_id}] Job {job.job_id} ended without its lease; the new owner finishes it")
+    except RunStateWriteError as e:
+        # The run finished (video uploaded, user notified); only its status write failed.
+        # Re-queuing would render it again from scratch.
+        done.set()
+        job_queue.fail(job.job_id, worker_id, str(e), retry=False)
+        print(f"❌ [{worker_id}] Job {job.job_id} finished but its status was not saved: {e}")
+    except Exception as e:
+        # run_pipeline_task records pipeline failures itself; this is a worker-level crash
+        done.set()
+        job_queue.fail(job.job_id, worker_id, str(e))
+        print(f"❌ [{worker_id}] Job {job.job_id} crashed: {e}")
+    finally:
+        done.set()
+        heartbeat.join()
+        release_run(payload["run_id"])
+
+
+def _worker_loop(slot: int):
+    worker_id = f"{WORKER_ID}/{slot}"
+    while not _stop.is_set():
+        try:
+            job = job_queue.lease(worker_id, kinds=["pipeline"])
+        except Exception as e:
+            print(f"⚠️ [{worker_id}] Lease failed: {e}")
+            job = None
+        if job is None:
+            _stop.wait(POLL_SECONDS)
+            continue
+        run_job(job, worker_id)
+
+
+def main():
+    def _shutdown(signum, frame):
+        # Finish the current job; unfinished ones are re-leased after their lease expires
+        print(f"🛑 Worker {WORKER_ID} stopping (signal {signum})")
+        _stop.set()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    print(f"🚀 Render worker {WORKER_ID} started ({WORKER_CONCURRENCY} slot(s), queue: {job_queue.stats()})")
+    threads = [threading.Thread(target=_worker_loop, args=(i,), daemon=True) for i in range(WORKER_CONCURRENCY)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -925,7 +925,10 @@ export class EditorComponent implements OnInit {
     }
 
     getSceneThumbnailUrl(scene: string): string | null {
-        // prioritizing specific image key first, then generic key
+        // prioritizing compact rendition, then specific image key, then generic key
+        if (this.sceneAssets[scene + '_image_540w_webp']) {
+            return this.getAssetUrl(this.sceneAssets[scene + '_image_540w_webp']);
+        }
         if (this.sceneAssets[scene + '_image']) {
             return this.getAssetUrl(this.sceneAssets[scene + '_image']);
         }
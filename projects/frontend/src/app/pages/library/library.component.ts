@@ -800,6 +800,10 @@ export class LibraryComponent implements OnInit {
         if (!url || typeof url !== 'string' || url.trim() === '' || key.toLowerCase().includes('end_card') || key.toLowerCase().includes('endcard')) {
           return;
         }
+        // Skip delivery renditions (e.g. "Hook_image_540w_webp"); the original is listed
+        if (/_\d+w_(webp|jpeg|avif)$/.test(key)) {
+          return;
+        }
 
         const isImage = key.includes('_image') || key.includes('image');
         // Clean up label: remove 'Generated Asset' prefix and clean key
@@ -0,0 +1,154 @@
+"""
+Tests for the admission scheduler (projects/backend/services/admission_scheduler.py).
+
+These tests verify (no pipeline; `start` callbacks only record the order):
+1. Runs beyond capacity are queued, not rejected, and start as slots free up
+2. Weighted fair queuing interleaves users instead of serving one user's burst first
+3. Higher tiers get a larger share; ETAs grow with queue position
+4. Dispatch waits while every provider circuit is open
+5. Default capacity follows the Veo concurrency limit, not a fixed 2
+6. Per-user finish tags are dropped once virtual time passes them (no growth per user)
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from projects.backend.services import admission_scheduler as admission_module
+from projects.backend.services.admission_scheduler import AdmissionScheduler
+
+
+def _scheduler(capacity=1, **kwargs):
+    started = []
+    scheduler = AdmissionScheduler(capacity=capacity, run_seconds=100, **kwargs)
+
+    def submit(run_id, user_id, tier=None, cost=6):
+        return scheduler.submit(run_id, user_id, tier, cost, start=lambda: started.append(run_id))
+    return scheduler, submit, started
+
+
+def test_queue_instead_of_reject():
+    """Two slots: the third run waits and starts when one finishes."""
+    print("\n=== Test 1: Queue Instead of Reject ===")
+    scheduler, submit, started = _scheduler(capacity=2)
+    assert submit("run_1", "u1")["queue_position"] == 0
+    assert submit("run_2", "u2")["queue_position"] == 0
+    ticket = submit("run_3", "u3")
+    print(f"Ticket: {ticket}")
+    assert ticket["queue_position"] == 1 and 0 < ticket["eta_seconds"] <= 100
+    scheduler.release("run_1")
+    assert started == ["run_1", "run_2", "run_3"]
+    print("✅ PASS: Burst queued and drained")
+
+
+def test_fair_across_users():
+    """A burst from one user is interleaved with a later user's run."""
+    print("\n=== Test 2: Fair Across Users ===")
+    scheduler, submit, started = _scheduler(capacity=1)
+    submit("a1", "alice")
+    for i in range(2, 5):
+        submit(f"a{i}", "alice")
+    submit("b1", "bob")
+    for _ in range(4):
+        scheduler.release(started[-1])
+    print(f"Start order: {started}")
+    assert started == ["a1", "b1", "a2", "a3", "a4"], "Bob must not wait behind Alice's whole burst"
+    print("✅ PASS: Users interleaved")
+
+
+def test_tier_weights_and_eta():
+    """An agency run overtakes earlier pay-as-you-go runs; ETAs increase down the queue."""
+    print("\n=== Test 3: Tier Weights and ETA ===")
+    scheduler, submit, started = _scheduler(capacity=1)
+    submit("busy", "x")
+    submit("p1", "payg_1")
+    submit("p2", "payg_2")
+    submit("g1", "agency_1", tier="agency")
+    assert scheduler.ticket("g1")["queue_position"] == 1
+    etas = [scheduler.ticket(r)["eta_seconds"] for r in ("g1", "p1", "p2")]
+    print(f"ETAs: {etas}")
+    assert etas == sorted(etas) and etas[0] < etas[-1]
+    scheduler.release("busy")
+    assert started[1] == "g1"
+    print("✅ PASS: Weighted order and ETAs")
+
+
+def test_provider_gate():
+    """Nothing is dispatched while providers are unavailable."""
+    print("\n=== Test 4: Provider Gate ===")
+    available = {"ok": False}
+    scheduler, submit, started = _scheduler(capacity=2, provider_check=lambda: available["ok"])
+    assert submit("run_1", "u1")["queue_position"] == 1
+    assert started == []
+    available["ok"] = True
+    scheduler._dispatch()
+    assert started == ["run_1"]
+    print("✅ PASS: Dispatch held while providers are down")
+
+
+def test_default_capacity():
+    """Without PIPELINE_CONCURRENCY the capacity is VEO_MAX_CONCURRENCY."""
+    print("\n=== Test 5: Default Capacity ===")
+    from execution.provider_control import CONCURRENCY_DEFAULTS
+    configured = admission_module.PIPELINE_CONCURRENCY
+    try:
+        admission_module.PIPELINE_CONCURRENCY = None
+        assert AdmissionScheduler().capacity == int(CONCURRENCY_DEFAULTS["video"][1])
+        admission_module.PIPELINE_CONCURRENCY = "3"
+        assert AdmissionScheduler().capacity == 3
+    finally:
+        admission_module.PIPELINE_CONCURRENCY = configured
+    print("✅ PASS: Capacity sized from the provider")
+
+
+def test_user_tags_pruned():
+    """A hundred one-off users leave no per-user state behind once served."""
+    print("\n=== Test 6: User Tags Pruned ===")
+    scheduler, submit, started = _scheduler(capacity=1)
+    for i in range(100):
+        submit(f"run_{i}", f"user_{i}")
+        scheduler.release(f"run_{i}")
+    print(f"Tracked users: {len(scheduler._user_finish)}")
+    assert len(started) == 100
+    assert len(scheduler._user_finish) <= 1, "Finish tags of served users are kept forever"
+    print("✅ PASS: Finish tags pruned")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Admission Scheduler Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Queue Instead of Reject": test_queue_instead_of_reject,
+        "Fair Across Users": test_fair_across_users,
+        "Tier Weights and ETA": test_tier_weights_and_eta,
+        "Provider Gate": test_provider_gate,
+        "Default Capacity": test_default_capacity,
+        "User Tags Pruned": test_user_tags_pruned,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -192,7 +192,7 @@ def test_assembly_with_remote_fallback():
     checks = [
         "remote_assets" in source,
         "Local file missing" in source or "Falling back to remote" in source,
-        "requests.get" in source
+        "download_manager" in source
     ]
     
     if all(checks):
@@ -0,0 +1,117 @@
+"""
+Tests for the provider client registry (execution/client_registry.py).
+
+These tests verify (fake client builder, no SDKs):
+1. One client per (provider, API key), shared by every thread
+2. Consecutive failures drop the client so the next `get` rebuilds it
+3. Rate-limit errors are counted as throttles and never trigger a rebuild
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import client_registry as registry_module
+from execution.client_registry import ClientRegistry, REBUILD_AFTER_FAILURES, key_id
+from execution.exceptions import ProviderThrottledException
+
+built = []
+
+
+def _build_fake(api_key):
+    client = object()
+    built.append((api_key, client))
+    return client
+
+
+registry_module.PROVIDER_BUILDERS["fake"] = _build_fake
+registry_module.PROVIDER_KEY_ENV["fake"] = "FAKE_API_KEY"
+
+
+def test_shared_clients():
+    """Eight threads asking for the same key get one client; another key gets its own."""
+    print("\n=== Test 1: Shared Clients ===")
+    registry = ClientRegistry()
+    built.clear()
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(registry.get("fake", "key-a"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(built) == 1 and all(c is clients[0] for c in clients), built
+    assert registry.get("fake", "key-b") is not clients[0]
+    assert f"fake:{key_id('key-a')}" in registry.health()
+    print("✅ PASS: One client per key")
+
+
+def test_rebuild_after_failures():
+    """REBUILD_AFTER_FAILURES errors in a row drop the client; a success in between resets the count."""
+    print("\n=== Test 2: Rebuild After Failures ===")
+    registry = ClientRegistry()
+    first = registry.get("fake", "key-a")
+    for _ in range(REBUILD_AFTER_FAILURES - 1):
+        registry.record_failure("fake", ConnectionError("connection reset by peer"), "key-a")
+    registry.record_success("fake", "key-a")
+    for _ in range(REBUILD_AFTER_FAILURES - 1):
+        registry.record_failure("fake", ConnectionError("connection reset by peer"), "key-a")
+    assert registry.get("fake", "key-a") is first, "A success should reset the failure streak"
+
+    registry.record_failure("fake", ConnectionError("connection reset by peer"), "key-a")
+    assert registry.get("fake", "key-a") is not first, "The failing client was not rebuilt"
+    print("✅ PASS: Failing client rebuilt")
+
+
+def test_throttles_do_not_rebuild():
+    """429s and open circuits say nothing about the client: it is kept."""
+    print("\n=== Test 3: Throttles Do Not Rebuild ===")
+    registry = ClientRegistry()
+    first = registry.get("fake", "key-a")
+    for _ in range(REBUILD_AFTER_FAILURES * 2):
+        registry.record_failure("fake", RuntimeError("429 RESOURCE_EXHAUSTED: rate limit (retryDelay: 30s)"), "key-a")
+        registry.record_failure("fake", ProviderThrottledException("Circuit open for veo"), "key-a")
+
+    health = registry.health()[f"fake:{key_id('key-a')}"]
+    print(f"Health: failures={health['failures']}, throttles={health['throttles']}")
+    assert registry.get("fake", "key-a") is first, "A throttled client was rebuilt"
+    assert health["failures"] == 0 and health["throttles"] == REBUILD_AFTER_FAILURES * 4 and health["healthy"]
+    print("✅ PASS: Throttles counted separately")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Client Registry Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Shared Clients": test_shared_clients,
+        "Rebuild After Failures": test_rebuild_after_failures,
+        "Throttles Do Not Rebuild": test_throttles_do_not_rebuild,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,152 @@
+"""
+Tests for the CPU process pool (execution/cpu_pool.py).
+
+These tests verify (stdlib tasks, temp files, no PIL/MoviePy):
+1. The pool size follows the cgroup v2 / v1 CPU quota
+2. Tasks run in worker processes; results and errors come back to the caller
+3. Lines a task prints land in the submitting run's log
+4. Unpicklable tasks and a disabled pool run inline; run_async works from the event loop
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import run_logging
+from execution.cpu_pool import CPUPool, container_cpus
+from execution.run_logging import RunStreamRouter, close_run_log, current_run_id
+
+_tmp = tempfile.mkdtemp()
+
+
+def _cgroup(name, files):
+    root = os.path.join(_tmp, name)
+    for rel, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(root, rel)), exist_ok=True)
+        with open(os.path.join(root, rel), "w") as f:
+            f.write(content)
+    return root
+
+
+def test_container_cpus():
+    """A 1.5 CPU quota gives 2 workers; no quota falls back to the visible CPUs."""
+    print("\n=== Test 1: Container CPUs ===")
+    visible = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    v2 = _cgroup("v2", {"cpu.max": "150000 100000\n"})
+    assert container_cpus(v2) == min(visible, 2)
+    assert container_cpus(_cgroup("v2_unlimited", {"cpu.max": "max 100000\n"})) == visible
+
+    v1 = _cgroup("v1", {"cpu,cpuacct/cpu.cfs_quota_us": "100000\n", "cpu,cpuacct/cpu.cfs_period_us": "100000\n"})
+    assert container_cpus(v1) == 1
+    assert container_cpus(_cgroup("v1_unlimited", {"cpu/cpu.cfs_quota_us": "-1\n",
+                                                   "cpu/cpu.cfs_period_us": "100000\n"})) == visible
+    print("✅ PASS: Sized to the CPU quota")
+
+
+def test_worker_processes():
+    """Results come from another process; the task's exception is re-raised."""
+    print("\n=== Test 2: Worker Processes ===")
+    pool = CPUPool(workers=2)
+    try:
+        assert pool.run(os.getpid) != os.getpid()
+        assert pool.run(sorted, [3, 1, 2], reverse=True) == [3, 2, 1]
+        try:
+            pool.run(int, "not a number")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected the worker's ValueError")
+        stats = pool.stats()
+        assert stats["completed"] == 2 and stats["failed"] == 1 and stats["inline"] == 0, stats
+    finally:
+        pool.shutdown()
+    print("✅ PASS: Tasks run out of process")
+
+
+def test_log_forwarding():
+    """A worker's print reaches the run.log of the thread that submitted the task."""
+    print("\n=== Test 3: Log Forwarding ===")
+    pool = CPUPool(workers=1)
+    path = os.path.join(_tmp, "run_cpu.log")
+    original = sys.stdout
+    sys.stdout = RunStreamRouter(io.StringIO())
+
+    def run():
+        sink = run_logging.RunLogSink("run_cpu", path)
+        run_logging._sinks["run_cpu"] = sink
+        sink.token = current_run_id.set("run_cpu")
+        pool.run(print, "🖼️ Rendered end card in worker")
+        close_run_log(sink)
+
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(30)
+    finally:
+        sys.stdout = original
+        pool.shutdown()
+
+    with open(path) as f:
+        assert "🖼️ Rendered end card in worker\n" in f.read()
+    print("✅ PASS: Worker output in the run log")
+
+
+def test_inline_fallbacks():
+    """Unpicklable arguments and a disabled pool run inline; run_async awaits the worker."""
+    print("\n=== Test 4: Inline Fallbacks ===")
+    pool = CPUPool(workers=1)
+    try:
+        lock = threading.Lock()
+        assert pool.run(repr, lock) == repr(lock)  # A lock cannot be pickled
+        assert asyncio.run(pool.run_async(os.getpid)) != os.getpid()
+        assert pool.stats()["inline"] == 1
+    finally:
+        pool.shutdown()
+
+    disabled = CPUPool(workers=4, enabled=False)
+    assert disabled.run(os.getpid) == os.getpid()
+    assert not disabled.stats()["started"]
+    print("✅ PASS: Inline when the pool cannot be used")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running CPU Pool Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Container CPUs": test_container_cpus,
+        "Worker Processes": test_worker_processes,
+        "Log Forwarding": test_log_forwarding,
+        "Inline Fallbacks": test_inline_fallbacks,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
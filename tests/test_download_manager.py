@@ -0,0 +1,211 @@
+"""
+Tests for the shared download manager (execution/download_manager.py).
+
+These tests verify (local HTTP server, temp cache directory):
+1. A destination is a private copy: writing to it does not change the cache
+2. `link=True` hard-links read-only destinations to the cached file
+3. The cache is evicted least recently used first once it exceeds its size bound
+4. fetch verifies the Cloud Storage MD5 (x-goog-hash) and sha256; a mismatch leaves nothing cached
+5. stream_to_file verifies the MD5; a mismatch or truncated body leaves no destination file
+"""
+
+import base64
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import download_manager as download_module
+from execution.download_manager import DownloadManager, ChecksumMismatchError
+
+_tmp = tempfile.mkdtemp()
+
+# path -> (body, extra headers)
+ROUTES = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body, headers = ROUTES.get(self.path, (None, {}))
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if "Content-Length" not in headers:  # Routes may advertise a different length (truncation)
+            self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+
+
+def _url(path, body, headers=None):
+    ROUTES[path] = (body, headers or {})
+    return f"http://127.0.0.1:{_server.server_port}{path}"
+
+
+def _manager(name, **kwargs):
+    return DownloadManager(cache_dir=os.path.join(_tmp, name), **kwargs)
+
+
+def _goog_hash(body):
+    """x-goog-hash header value as Cloud Storage sends it (crc32c first, then md5)."""
+    return f"crc32c=AAAAAA==, md5={base64.b64encode(hashlib.md5(body).digest()).decode()}"
+
+
+def _expect_mismatch(call):
+    try:
+        call()
+    except ChecksumMismatchError as e:
+        print(f"Rejected: {e}")
+    else:
+        raise AssertionError("Expected a ChecksumMismatchError")
+
+
+def test_destination_is_a_copy():
+    """Watermarking a fetched file in place leaves the cached copy intact."""
+    print("\n=== Test 1: Destination Is a Copy ===")
+    manager = _manager("copy")
+    url = _url("/scene_Hook.png", b"original image")
+    first = manager.fetch(url, dest=os.path.join(_tmp, "run_1", "hook.png"))
+    with open(first, "wb") as f:
+        f.write(b"watermarked")
+
+    second = manager.fetch(url, dest=os.path.join(_tmp, "run_2", "hook.png"))
+    with open(second, "rb") as f:
+        assert f.read() == b"original image", "The cache was modified through a run's file"
+    print("✅ PASS: Runs get private copies")
+
+
+def test_link_for_read_only():
+    """link=True shares the cached file's inode (no copy for large clips)."""
+    print("\n=== Test 2: Link for Read-Only ===")
+    manager = _manager("link")
+    url = _url("/scene_Feature.mp4", b"clip bytes")
+    dest = manager.fetch(url, dest=os.path.join(_tmp, "run_3", "feature.mp4"), link=True)
+    cached, _ = manager._cache_paths(url)
+    assert os.stat(dest).st_ino == os.stat(cached).st_ino and os.stat(dest).st_nlink == 2
+    print("✅ PASS: Read-only destinations are linked")
+
+
+def test_lru_eviction():
+    """Past the size bound, the least recently used entries are removed."""
+    print("\n=== Test 3: LRU Eviction ===")
+    grace = download_module.EVICT_GRACE_SECONDS
+    download_module.EVICT_GRACE_SECONDS = 0
+    try:
+        manager = _manager("evict", max_bytes=2500)
+        urls = [_url(f"/asset_{i}.bin", bytes([i]) * 1000) for i in range(3)]
+        paths = []
+        for i, url in enumerate(urls):
+            paths.append(manager.fetch(url))
+            os.utime(paths[-1], (1000 + i, 1000 + i))  # Distinct, ordered last-use times
+
+        manager.fetch(_url("/asset_3.bin", b"x" * 1000))
+        remaining = [os.path.exists(p) for p in paths]
+        print(f"Remaining after eviction: {remaining}")
+        assert remaining == [False, False, True], "The two oldest entries should be evicted"
+        assert not os.path.exists(f"{paths[0]}.json"), "Metadata is evicted with its entry"
+        size = sum(os.path.getsize(os.path.join(manager.cache_dir, n)) for n in os.listdir(manager.cache_dir)
+                   if not n.endswith(".json"))
+        assert size <= 2500
+    finally:
+        download_module.EVICT_GRACE_SECONDS = grace
+    print("✅ PASS: Cache bounded")
+
+
+def test_fetch_checksums():
+    """A matching MD5 is cached; a corrupted body or wrong sha256 raises and caches nothing."""
+    print("\n=== Test 4: Fetch Checksums ===")
+    manager = _manager("md5_fetch")
+    body = b"scene clip bytes"
+    good = _url("/md5_good.mp4", body, {"x-goog-hash": _goog_hash(body)})
+    with open(manager.fetch(good), "rb") as f:
+        assert f.read() == body
+
+    bad = _url("/md5_bad.mp4", b"corrupted in transit", {"x-goog-hash": _goog_hash(body)})
+    _expect_mismatch(lambda: manager.fetch(bad, dest=os.path.join(_tmp, "run_4", "bad.mp4")))
+    cached, meta = manager._cache_paths(bad)
+    assert not os.path.exists(cached) and not os.path.exists(meta), "A corrupt body was cached"
+    assert not os.path.exists(os.path.join(_tmp, "run_4", "bad.mp4"))
+
+    sha = _url("/sha.png", body)
+    _expect_mismatch(lambda: manager.fetch(sha, expected_sha256="0" * 64))
+    assert manager.fetch(sha, expected_sha256=hashlib.sha256(body).hexdigest())
+    assert not [n for n in os.listdir(manager.cache_dir) if n.endswith(".part")], "Partial files left behind"
+    print("✅ PASS: Checksums enforced on fetch")
+
+
+def test_stream_checksums():
+    """stream_to_file keeps a verified body and removes a corrupt or truncated one."""
+    print("\n=== Test 5: Stream Checksums ===")
+    manager = _manager("md5_stream")
+    body = b"veo video bytes" * 1000
+    dest = os.path.join(_tmp, "run_5", "hook.mp4")
+    manager.stream_to_file(_url("/veo_good.mp4", body, {"x-goog-hash": _goog_hash(body)}), dest)
+    with open(dest, "rb") as f:
+        assert f.read() == body
+
+    bad_dest = os.path.join(_tmp, "run_5", "feature.mp4")
+    corrupt = _url("/veo_bad.mp4", body[::-1], {"x-goog-hash": _goog_hash(body)})
+    _expect_mismatch(lambda: manager.stream_to_file(corrupt, bad_dest))
+    truncated = _url("/veo_short.mp4", body[:100], {"Content-Length": str(len(body))})
+    try:
+        manager.stream_to_file(truncated, bad_dest)
+    except Exception as e:  # ChecksumMismatchError, or the HTTP client's own incomplete-read error
+        print(f"Rejected: {e}")
+    else:
+        raise AssertionError("A truncated body was accepted")
+    assert not os.path.exists(bad_dest) and not os.path.exists(f"{bad_dest}.part")
+    print("✅ PASS: Checksums enforced on streams")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Download Manager Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Destination Is a Copy": test_destination_is_a_copy,
+        "Link for Read-Only": test_link_for_read_only,
+        "LRU Eviction": test_lru_eviction,
+        "Fetch Checksums": test_fetch_checksums,
+        "Stream Checksums": test_stream_checksums,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
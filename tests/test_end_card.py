@@ -0,0 +1,134 @@
+"""
+Tests for the end card compositor (execution/end_card.py).
+
+These tests verify (no network; brands without a logo):
+1. The vectorized gradient matches the per-row interpolation it replaced
+2. The brand layer is rendered once per brand version
+3. Cards with and without a hero background have the video size
+4. The CPU-pool task draws the logo it is given and never fetches it itself
+5. A layer rendered after a failed logo fetch is not cached for the brand version
+"""
+
+import io
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from execution.end_card import (vertical_gradient, compose_end_card, render_end_card_png, brand_layers,
+                                BrandLayerCache, CARD_SIZE, LOGO_TOP)
+
+
+def test_gradient():
+    """Row colors follow the old int(top + (bottom - top) * y / height) formula."""
+    print("\n=== Test 1: Gradient ===")
+    img = vertical_gradient((4, 100), (20, 30, 60), (60, 20, 80))
+    for y in (0, 37, 99):
+        ratio = y / 100
+        expected = (int(20 + 40 * ratio), int(30 - 10 * ratio), int(60 + 20 * ratio), 255)
+        assert img.getpixel((2, y)) == expected, (y, img.getpixel((2, y)), expected)
+    print("✅ PASS: Gradient rows match")
+
+
+def test_brand_layer_cached():
+    """Same brand version -> one render; an updated brand renders again."""
+    print("\n=== Test 2: Brand Layer Cache ===")
+    cache = BrandLayerCache()
+    brand = {"name": "Acme", "updated_at": 1}
+    first = cache.get(brand, with_background=True)
+    assert cache.get(dict(brand), with_background=True) is first
+    assert cache.renders == 1
+    cache.get({"name": "Acme", "updated_at": 2}, with_background=True)
+    assert cache.renders == 2
+    print("✅ PASS: Brand layer rendered once per version")
+
+
+def test_compose():
+    """Both background paths produce a full-size RGB card."""
+    print("\n=== Test 3: Compose ===")
+    fallback = compose_end_card(None, "Shop Now", "www.example.com", brand={})
+    hero = compose_end_card(Image.new("RGB", (768, 1024), (250, 250, 250)), "Shop Now", "www.example.com", brand={})
+    assert fallback.size == CARD_SIZE and hero.size == CARD_SIZE
+    assert fallback.mode == "RGB" and hero.mode == "RGB"
+    print("✅ PASS: End cards composed")
+
+
+def test_worker_task_logo():
+    """Logo bytes come from the caller; without them the worker draws no logo instead of fetching."""
+    print("\n=== Test 4: Worker Task Logo ===")
+    from execution.download_manager import download_manager
+    fetches = []
+    original = download_manager.fetch_bytes
+    download_manager.fetch_bytes = lambda url, **kwargs: fetches.append(url)
+    logo = io.BytesIO()
+    Image.new("RGBA", (200, 100), (255, 0, 0, 255)).save(logo, format="PNG")
+    try:
+        brand_layers.clear()
+        card = Image.open(io.BytesIO(render_end_card_png(None, "Shop Now", "", {"logo_url": "https://cdn/logo.png"},
+                                                         logo=logo.getvalue())))
+        assert card.getpixel((CARD_SIZE[0] // 2, LOGO_TOP + 50))[:3] == (255, 0, 0)
+
+        brand_layers.clear()
+        render_end_card_png(None, "Shop Now", "", {"logo_url": "https://cdn/other.png"})
+        assert fetches == [], fetches
+    finally:
+        download_manager.fetch_bytes = original
+        brand_layers.clear()
+    print("✅ PASS: Logo passed in, no fetch in the worker")
+
+
+def test_failed_logo_not_cached():
+    """A transient logo failure costs one logo-less card, not every card of the brand version."""
+    print("\n=== Test 5: Failed Logo Not Cached ===")
+    cache = BrandLayerCache()
+    brand = {"logo_url": "https://cdn/logo.png", "updated_at": 1}
+    logo = io.BytesIO()
+    Image.new("RGBA", (200, 100), (255, 0, 0, 255)).save(logo, format="PNG")
+
+    without = cache.get(brand, with_background=True, logo=b"")  # Fetch failed
+    assert without.getpixel((CARD_SIZE[0] // 2, LOGO_TOP + 50))[:3] != (255, 0, 0)
+    with_logo = cache.get(brand, with_background=True, logo=logo.getvalue())
+    assert with_logo.getpixel((CARD_SIZE[0] // 2, LOGO_TOP + 50))[:3] == (255, 0, 0)
+    assert cache.get(brand, with_background=True, logo=b"") is with_logo  # Complete layer is cached
+    assert cache.renders == 2
+    print("✅ PASS: Logo-less layer not cached")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running End Card Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Gradient": test_gradient,
+        "Brand Layer Cache": test_brand_layer_cached,
+        "Compose": test_compose,
+        "Worker Task Logo": test_worker_task_logo,
+        "Failed Logo Not Cached": test_failed_logo_not_cached,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
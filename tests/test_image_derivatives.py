@@ -0,0 +1,140 @@
+"""
+Tests for delivery renditions (execution/image_derivatives.py).
+
+These tests verify (in memory, no uploads):
+1. Rendition keys and bucket paths are stable
+2. Every (width, format) rendition is produced, never upscaled, and smaller than the PNG
+3. Renditions upload concurrently; a failed upload drops only that rendition
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from execution.cpu_pool import cpu_pool
+from execution.image_derivatives import (
+    render_derivatives, derivative_key, derivative_destination, is_derivative_key, publish_derivatives
+)
+
+
+def _photo_png(size=(768, 1365)):
+    """PNG with photo-like detail (a flat colour compresses better as PNG than as JPEG)."""
+    img = Image.merge("RGB", (Image.effect_noise(size, 40), Image.linear_gradient("L").resize(size),
+                              Image.effect_mandelbrot(size, (-2, -1.5, 1, 1.5), 64)))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_keys_and_paths():
+    """Keys sit next to the original key, files next to the original file."""
+    print("\n=== Test 1: Keys and Paths ===")
+    assert derivative_key("Hook_image", 540, "webp") == "Hook_image_540w_webp"
+    assert is_derivative_key("Hook_image_540w_webp")
+    assert not is_derivative_key("Hook_image")
+    assert derivative_destination("runs/run_1/Hook.png", 270, "jpeg") == "runs/run_1/Hook_270w.jpg"
+    print("✅ PASS: Stable keys and paths")
+
+
+def test_renditions():
+    """A 768px source yields three widths per format, the largest capped at 768px."""
+    print("\n=== Test 2: Renditions ===")
+    source = _photo_png()
+
+    renditions = render_derivatives(source, widths=(270, 540, 1080), formats=("webp", "jpeg"))
+    assert set(renditions) == {(w, f) for w in (270, 540, 1080) for f in ("webp", "jpeg")}
+
+    data, mime = renditions[(540, "webp")]
+    assert mime == "image/webp"
+    assert Image.open(io.BytesIO(data)).size == (540, 960)
+    assert Image.open(io.BytesIO(renditions[(1080, "jpeg")][0])).width == 768
+    assert all(len(d) < len(source) for d, _ in renditions.values())
+    print("✅ PASS: Renditions encoded")
+
+
+def test_concurrent_uploads():
+    """Six renditions uploading at 0.2s each finish in well under the serial 1.2s."""
+    print("\n=== Test 3: Concurrent Uploads ===")
+    path = os.path.join(tempfile.mkdtemp(), "Hook.png")
+    with open(path, "wb") as f:
+        f.write(_photo_png())
+    uploaded, active, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def upload_bytes(data, destination, mime):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.2)
+        with lock:
+            active[0] -= 1
+        if destination.endswith("_270w.jpg"):
+            raise RuntimeError("503 from the bucket")
+        uploaded.append(destination)
+        return f"https://cdn/{destination}"
+
+    fake = types.ModuleType("projects.backend.services.storage_service")
+    fake.storage_service = types.SimpleNamespace(upload_bytes=upload_bytes)
+    previous = sys.modules.get("projects.backend.services.storage_service")
+    sys.modules["projects.backend.services.storage_service"] = fake
+    enabled, cpu_pool.enabled = cpu_pool.enabled, False
+    try:
+        started = time.time()
+        urls = publish_derivatives(path, "Hook_image", "runs/run_1/Hook.png")
+        elapsed = time.time() - started
+    finally:
+        cpu_pool.enabled = enabled
+        if previous is not None:
+            sys.modules["projects.backend.services.storage_service"] = previous
+        else:
+            sys.modules.pop("projects.backend.services.storage_service", None)
+    print(f"Uploaded {len(urls)} renditions in {elapsed:.2f}s (peak {peak[0]} concurrent)")
+    assert peak[0] > 1 and elapsed < 1.0, "Renditions were uploaded one at a time"
+    assert len(urls) == 5 and "Hook_image_270w_jpeg" not in urls
+    assert urls["Hook_image_540w_webp"] == "https://cdn/runs/run_1/Hook_540w.webp"
+    print("✅ PASS: Uploads overlap")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Image Derivatives Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Keys and Paths": test_keys_and_paths,
+        "Renditions": test_renditions,
+        "Concurrent Uploads": test_concurrent_uploads,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
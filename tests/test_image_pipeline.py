@@ -0,0 +1,99 @@
+"""
+Tests for the single-encode image pipeline (execution/image_pipeline.py).
+
+These tests verify (in memory, no providers):
+1. Unchanged images keep the provider's bytes (zero re-encodes)
+2. Watermark + aspect crop happen in one decode and one encode
+3. Encoded bytes are shared through the LRU instead of re-reading the file
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from execution import image_pipeline
+from execution.image_pipeline import process_image, encoded_bytes, cached_bytes
+
+
+def _png(width, height):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (40, 80, 120)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_passthrough():
+    """No watermark and the right aspect: the provider's bytes are written as-is."""
+    print("\n=== Test 1: Passthrough ===")
+    raw = _png(90, 160)
+    processed = process_image(raw, aspect_ratio="9:16")
+    assert processed.encode("PNG") is raw
+    print("✅ PASS: Provider bytes reused")
+
+
+def test_watermark_and_crop():
+    """A square image is cropped to 9:16 and watermarked in memory."""
+    print("\n=== Test 2: Watermark + Crop ===")
+    processed = process_image(_png(200, 200), watermark_text="IGNITE AI", aspect_ratio="9:16")
+    data = processed.encode("PNG")
+    assert processed.encode("PNG") is data, "Each format is encoded once"
+    img = Image.open(io.BytesIO(data))
+    print(f"Output size: {img.size}")
+    assert img.size == (112, 200)
+    print("✅ PASS: Post-processing applied with a single encode")
+
+
+def test_shared_bytes():
+    """Bytes written by the pipeline are served from the cache."""
+    print("\n=== Test 3: Shared Bytes ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Hook_image.png")
+        processed = process_image(_png(90, 160))
+        processed.save(path)
+        os.remove(path)  # Cache hit must not need the file
+        data, mime = encoded_bytes(path)
+        assert data == processed.encode("PNG") and mime == "image/png"
+        image_pipeline.forget(path)
+        assert cached_bytes(path) is None
+    print("✅ PASS: Encoded bytes shared via cache")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Image Pipeline Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Passthrough": test_passthrough,
+        "Watermark + Crop": test_watermark_and_crop,
+        "Shared Bytes": test_shared_bytes,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
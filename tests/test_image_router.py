@@ -0,0 +1,159 @@
+"""
+Tests for latency-aware image routing (execution/image_router.py).
+
+These tests verify, with synthetic latency samples (no network, no API keys):
+1. In "fastest" mode, requests go to the model with the lowest EWMA latency
+2. A reference image restricts routing to multimodal models
+3. A model with a degraded p95 or error rate drops to the back of the list
+4. A failing model fails over to the next candidate
+5. By default the selected model's provider is kept, and the model that ran is reported
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution.image_router import ImageRouter, P95_BUDGET
+
+GEMINI = "gemini-2.5-flash-image"
+IMAGEN = "imagen-4.0-generate-001"
+DALLE = "dall-e-3"
+
+
+def _router():
+    return ImageRouter(candidates=[GEMINI, IMAGEN, DALLE])
+
+
+def test_fastest_model_first():
+    """With fresh samples for every model, the lowest EWMA latency wins."""
+    print("\n=== Test 1: Fastest Model First ===")
+    router = _router()
+    for _ in range(5):
+        router.record(IMAGEN, 12.0, ok=True)
+        router.record(DALLE, 6.0, ok=True)
+    order = router.rank(IMAGEN, mode="fastest")
+    print(f"Order: {order}")
+    assert order == [DALLE, IMAGEN], "Faster model should be tried first"
+    assert router.rank(IMAGEN, mode="pinned")[0] == IMAGEN, "Pinned mode keeps the selected model first"
+    assert router.rank(IMAGEN, mode="off") == [IMAGEN]
+    print("✅ PASS: Fastest healthy model is selected")
+
+
+def test_reference_constraint():
+    """Requests with a reference image only route to multimodal models."""
+    print("\n=== Test 2: Reference Image Constraint ===")
+    router = _router()
+    for _ in range(5):
+        router.record(DALLE, 1.0, ok=True)
+    order = router.rank(GEMINI, needs_reference=True)
+    print(f"Order: {order}")
+    assert order == [GEMINI], "Text-to-image models cannot take a reference image"
+    print("✅ PASS: Reference constraint respected")
+
+
+def test_degraded_model_demoted():
+    """A model whose p95 exceeds the budget, or that keeps failing, is tried last."""
+    print("\n=== Test 3: Degraded Model Demoted ===")
+    router = _router()
+    for _ in range(10):
+        router.record(IMAGEN, 5.0, ok=True)
+        router.record(DALLE, 8.0, ok=True)
+    # Tail latency blows up on the (otherwise faster) Imagen
+    for _ in range(3):
+        router.record(IMAGEN, P95_BUDGET * 3, ok=True)
+    print(f"Stats: {router.stats()[IMAGEN]}")
+    assert router.rank(IMAGEN, mode="fastest")[-1] == IMAGEN, "Model with degraded p95 should be demoted"
+
+    router = _router()
+    for _ in range(5):
+        router.record(DALLE, 1.0, ok=False)
+    assert router.rank(DALLE, mode="pinned")[-1] == DALLE, "Failing model should be demoted"
+    print("✅ PASS: Degraded models fail over proactively")
+
+
+def test_failover_on_error():
+    """generate() falls through to the next candidate when a call fails."""
+    print("\n=== Test 4: Failover On Error ===")
+    router = _router()
+    calls = []
+
+    def attempt(model):
+        calls.append(model)
+        if model == IMAGEN:
+            raise RuntimeError("503 Service Unavailable")
+        return f"out_{model}.png"
+
+    result = router.generate({"image_routing": "pinned"}, attempt, preferred=IMAGEN)
+    print(f"Calls: {calls} -> {result}")
+    assert calls == [IMAGEN, DALLE] and result == f"out_{DALLE}.png"
+    assert router.stats()[IMAGEN]["error_rate"] > 0
+
+    try:
+        router.generate({"image_routing": "off"}, attempt, preferred=IMAGEN)
+        assert False, "Expected the error to propagate with routing off"
+    except RuntimeError:
+        pass
+    print("✅ PASS: Failed calls fail over to the next model")
+
+
+def test_default_keeps_provider():
+    """The default mode never sends a request to another provider; the routed model is reported."""
+    print("\n=== Test 5: Default Keeps Provider ===")
+    router = _router()
+    for _ in range(5):
+        router.record(IMAGEN, 30.0, ok=True)
+        router.record(DALLE, 1.0, ok=True)
+    assert router.rank(IMAGEN) == [IMAGEN], "A faster model on another provider must not be probed"
+    assert router.rank("imagen-4.0-fast-generate-001")[1:] == [IMAGEN], "Failover stays on the provider"
+
+    calls, route = [], {}
+
+    def attempt(model):
+        calls.append(model)
+        if model == "imagen-4.0-fast-generate-001":
+            raise RuntimeError("503 Service Unavailable")
+        return f"out_{model}.png"
+
+    router.generate({"image_route": route}, attempt, preferred="imagen-4.0-fast-generate-001")
+    print(f"Calls: {calls}, route: {route}")
+    assert calls == ["imagen-4.0-fast-generate-001", IMAGEN] and route == {"model": IMAGEN}
+    print("✅ PASS: Provider choice respected, routed model reported")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Image Router Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Fastest Model First": test_fastest_model_first,
+        "Reference Image Constraint": test_reference_constraint,
+        "Degraded Model Demoted": test_degraded_model_demoted,
+        "Failover On Error": test_failover_on_error,
+        "Default Keeps Provider": test_default_keeps_provider,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,190 @@
+"""
+Tests for the durable job queue (projects/backend/services/job_queue.py).
+
+These tests verify, for both the SQLite and the in-memory backend:
+1. Jobs are leased oldest first and only once
+2. Heartbeats keep a lease; an expired lease is taken over by another worker
+3. Failures are retried until max_attempts, then marked failed
+4. SQLite jobs survive a new queue instance (process restart)
+5. Leasing is weighted fair across users; tickets follow lease order; finished ids can be re-queued
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from projects.backend.services.job_queue import JobQueue, SQLiteJobBackend, InMemoryJobBackend
+
+_tmp = tempfile.mkdtemp()
+
+
+def _queues(lease_seconds=60):
+    db = os.path.join(_tmp, f"jobs_{time.time_ns()}.db")
+    return {
+        "sqlite": JobQueue(SQLiteJobBackend(db), lease_seconds=lease_seconds),
+        "memory": JobQueue(InMemoryJobBackend(), lease_seconds=lease_seconds),
+    }
+
+
+def test_lease_once_in_order():
+    """Concurrent workers each get a different job, oldest first."""
+    print("\n=== Test 1: Lease Once, In Order ===")
+    for name, queue in _queues().items():
+        ids = [queue.enqueue("pipeline", {"run_id": f"run_{i}"}) for i in range(5)]
+        assert queue.enqueue("pipeline", {}, job_id=ids[0]) == ids[0]  # Idempotent
+
+        first = queue.lease("w-0")
+        assert first.job_id == ids[0] and first.attempts == 1
+
+        leased = []
+        def worker(i):
+            job = queue.lease(f"w-{i + 1}")
+            if job:
+                leased.append(job.job_id)
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        print(f"[{name}] leased: {len(leased)}")
+        assert sorted(leased) == sorted(ids[1:]), "Each remaining job leased exactly once"
+        assert queue.lease("w-late") is None
+    print("✅ PASS: Jobs leased exactly once")
+
+
+def test_heartbeat_and_takeover():
+    """A live lease is extended; an expired one moves to another worker."""
+    print("\n=== Test 2: Heartbeat and Takeover ===")
+    for name, queue in _queues(lease_seconds=0.2).items():
+        job_id = queue.enqueue("pipeline", {"run_id": "run_1"})
+        queue.lease("w-1")
+        time.sleep(0.1)
+        assert queue.heartbeat(job_id, "w-1")
+        time.sleep(0.15)
+        assert queue.lease("w-2") is None, "Heartbeat kept the lease"
+
+        time.sleep(0.3)  # w-1 stops heartbeating
+        taken = queue.lease("w-2")
+        assert taken is not None and taken.job_id == job_id and taken.attempts == 2
+        assert not queue.heartbeat(job_id, "w-1"), "Old owner lost the lease"
+        assert not queue.complete(job_id, "w-1")
+        assert queue.complete(job_id, "w-2")
+        assert queue.get(job_id).status == "done"
+        print(f"[{name}] stats: {queue.stats()}")
+    print("✅ PASS: Expired leases are taken over")
+
+
+def test_retry_then_fail():
+    """fail() re-queues until attempts are used up."""
+    print("\n=== Test 3: Retry Then Fail ===")
+    for name, queue in _queues().items():
+        job_id = queue.enqueue("pipeline", {"run_id": "run_1"}, max_attempts=2)
+        queue.lease("w-1")
+        queue.fail(job_id, "w-1", "boom")
+        assert queue.get(job_id).status == "queued"
+        queue.lease("w-1")
+        queue.fail(job_id, "w-1", "boom again")
+        job = queue.get(job_id)
+        assert job.status == "failed" and job.error == "boom again"
+        assert queue.lease("w-1") is None
+    print("✅ PASS: Failures retried, then failed")
+
+
+def test_sqlite_durable():
+    """Queued jobs are still there for a new queue on the same file."""
+    print("\n=== Test 4: SQLite Durability ===")
+    db = os.path.join(_tmp, "durable.db")
+    job_id = JobQueue(SQLiteJobBackend(db)).enqueue("pipeline", {"run_id": "run_9", "request": {"prompt": "x"}})
+
+    restarted = JobQueue(SQLiteJobBackend(db))
+    job = restarted.lease("w-1", kinds=["pipeline"])
+    assert job.job_id == job_id and job.payload["request"]["prompt"] == "x"
+    print("✅ PASS: Jobs survive a restart")
+
+
+def test_fair_leasing():
+    """One user's burst interleaves with others; a heavier tier is served first."""
+    print("\n=== Test 5: Fair Leasing ===")
+    for name, queue in _queues().items():
+        for i in range(1, 5):
+            queue.enqueue("pipeline", {}, job_id=f"a{i}", user_key="alice", cost=6)
+        queue.enqueue("pipeline", {}, job_id="b1", user_key="bob", cost=6)
+        queue.enqueue("pipeline", {}, job_id="g1", user_key="gina", cost=6, weight=4.0)
+        assert queue.ticket("a4", run_seconds=100)["queue_position"] == 6
+
+        first = queue.lease("w-1")
+        assert first.job_id == "g1", first
+        ticket = queue.ticket("a4", run_seconds=100)
+        assert ticket == {"queue_position": 5, "eta_seconds": 500}, ticket
+        queue.complete("g1", "w-1")
+        order = [queue.lease(f"w-{i}").job_id for i in range(2, 7)]
+        print(f"[{name}] lease order: g1 {order}")
+        assert order[:2] in (["a1", "b1"], ["b1", "a1"]) and order[2:] == ["a2", "a3", "a4"]
+
+        assert queue.enqueue("pipeline", {"regen": True}, job_id="g1", user_key="gina") == "g1"
+        assert queue.get("g1").status == "queued" and queue.get("g1").payload == {"regen": True}
+    print("✅ PASS: Fair leasing")
+
+
+def test_sqlite_migration():
+    """A queue file from before fair leasing gains the fair-share columns."""
+    print("\n=== Test 6: SQLite Migration ===")
+    import sqlite3
+    db = os.path.join(_tmp, "legacy.db")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                 "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+                 "lease_owner TEXT, lease_expires_at REAL NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                 "updated_at REAL NOT NULL, error TEXT)")
+    conn.execute("INSERT INTO jobs VALUES ('old', 'pipeline', '{}', 'queued', 0, 3, NULL, 0, 1, 1, NULL)")
+    conn.commit()
+    conn.close()
+
+    job = JobQueue(SQLiteJobBackend(db)).lease("w-1")
+    assert job.job_id == "old" and job.user_key == "old" and job.cost == 1
+    print("✅ PASS: Legacy queue migrated")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Job Queue Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Lease Once, In Order": test_lease_once_in_order,
+        "Heartbeat and Takeover": test_heartbeat_and_takeover,
+        "Retry Then Fail": test_retry_then_fail,
+        "SQLite Durability": test_sqlite_durable,
+        "Fair Leasing": test_fair_leasing,
+        "SQLite Migration": test_sqlite_migration,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
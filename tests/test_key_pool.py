@@ -0,0 +1,132 @@
+"""
+Tests for the multi-key quota pool (execution/key_pool.py).
+
+These tests verify, using the in-memory fake quota backend (no network, no files):
+1. Requests are routed to the key with the most headroom
+2. A key that hits QuotaExceededException drains out of rotation
+3. QuotaExceededException is raised once every key is exhausted
+4. Capacity scales linearly with the number of keys
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution.key_pool import KeyPool, InMemoryQuotaBackend
+from execution.exceptions import QuotaExceededException
+
+MODEL = "veo-test"
+
+
+def _pool(num_keys, rpm=2, rpd=4):
+    backend = InMemoryQuotaBackend({MODEL: {"rpm": rpm, "rpd": rpd}})
+    pool = KeyPool([f"fake-key-{i}" for i in range(num_keys)], backend=backend)
+    return pool, backend
+
+
+def test_routes_to_most_headroom():
+    """The key with the most remaining quota is selected."""
+    print("\n=== Test 1: Route To Most Headroom ===")
+    pool, backend = _pool(2)
+    first, second = pool.keys
+
+    # Use up part of the first key's quota
+    backend.check_and_wait(MODEL, first.key_id)
+    chosen = pool.select(MODEL)
+    print(f"Chosen: {chosen.label}")
+    assert chosen.key_id == second.key_id, "Expected the untouched key to be selected"
+    print("✅ PASS: Routed to key with most headroom")
+
+
+def test_drains_key_on_quota_exceeded():
+    """A key out of daily quota is drained and requests move to the next key."""
+    print("\n=== Test 2: Drain On Quota Exceeded ===")
+    pool, backend = _pool(2, rpm=10, rpd=1)
+    first, second = pool.keys
+
+    backend.check_and_wait(MODEL, first.key_id)  # first key now at its daily limit
+
+    reserved = pool.reserve(MODEL)
+    print(f"Reserved: {reserved.label}")
+    assert reserved.key_id == second.key_id
+
+    # Both keys are now at their limit: reserving drains each in turn, then gives up
+    try:
+        pool.reserve(MODEL)
+        assert False, "Expected QuotaExceededException"
+    except QuotaExceededException as e:
+        print(f"Raised as expected: {e}")
+
+    assert pool.is_drained(first, MODEL) and pool.is_drained(second, MODEL), "Exhausted keys should be out of rotation"
+    print("✅ PASS: Exhausted keys drain out of rotation")
+
+
+def test_all_keys_exhausted():
+    """select() raises QuotaExceededException when every key is drained."""
+    print("\n=== Test 3: All Keys Exhausted ===")
+    pool, _ = _pool(3)
+    for key in pool.keys:
+        pool.drain(key, MODEL)
+    try:
+        pool.select(MODEL)
+        assert False, "Expected QuotaExceededException"
+    except QuotaExceededException:
+        pass
+    # Other models are unaffected
+    assert pool.select("other-model") is not None
+    print("✅ PASS: Fully drained pool raises QuotaExceededException")
+
+
+def test_capacity_scales_with_keys():
+    """N keys serve N x RPM requests per minute without waiting."""
+    print("\n=== Test 4: Linear Capacity Scaling ===")
+    rpm = 2
+    for num_keys in (1, 2, 4):
+        pool, backend = _pool(num_keys, rpm=rpm, rpd=100)
+        for _ in range(num_keys * rpm):
+            pool.reserve(MODEL)
+        print(f"{num_keys} key(s): {num_keys * rpm} requests, waited {backend.waited:.0f}s")
+        assert backend.waited == 0, "No RPM wait expected within pooled capacity"
+
+        # One more request has to wait for an RPM window
+        pool.reserve(MODEL)
+        assert backend.waited > 0
+    print("✅ PASS: Capacity scales linearly with key count")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Key Pool Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Route To Most Headroom": test_routes_to_most_headroom,
+        "Drain On Quota Exceeded": test_drains_key_on_quota_exceeded,
+        "All Keys Exhausted": test_all_keys_exhausted,
+        "Linear Capacity Scaling": test_capacity_scales_with_keys,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
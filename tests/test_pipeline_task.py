@@ -0,0 +1,249 @@
+"""
+Tests for the pipeline entry point (projects/backend/routers/generation.py: run_pipeline_task).
+
+These tests verify (stubbed graph, in-memory run state, no providers):
+1. A run whose graph succeeds is traced as "pipeline.run" and saved "completed"
+2. A run whose graph raises is saved "failed" with the error
+3. A batch refunds each failed variant's credits; a batch whose variants all failed is failed
+4. A worker that loses its lease aborts the run and writes no terminal status
+5. A rendered run whose final status cannot be saved is failed without a retry (never re-rendered)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from projects.backend import firebase_setup
+from projects.backend.routers import generation
+from projects.backend.schemas import GenerateRequest
+
+
+class _Graph:
+    def __init__(self, result=None, error=None):
+        self.result, self.error = result, error
+        self.states = []
+
+    def invoke(self, state):
+        self.states.append(state)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class _RunState:
+    def __init__(self, fail_status=None):
+        self.saves = []
+        self.fail_status = fail_status
+
+    def save(self, run_id, user_id, status, data=None, cost=None):
+        if status == self.fail_status:
+            from projects.backend.services.run_state_writer import RunStateWriteError
+            raise RunStateWriteError(f"Terminal run state for {run_id} not written after 3 retries")
+        self.saves.append((run_id, status, data or {}))
+        return True
+
+
+class _Nothing:
+    """Stands in for the Firestore / storage / email services: every call returns None."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _Credits(_Nothing):
+    """db_service stand-in that records refunds."""
+
+    def __init__(self):
+        self.refunds = []
+
+    def refund_credits(self, user_id, amount, reason, run_id):
+        self.refunds.append((run_id, amount))
+        return True
+
+
+def _run(graph, run_id, request=None, user_id=None, credits_used=0, db=None, state=None, task=None):
+    """Runs run_pipeline_task (or `task`) against `graph`; returns the recorded run-state saves."""
+    workflow = types.ModuleType("execution.workflow")
+    workflow.build_graph = lambda: graph
+    workflow.build_regeneration_graph = lambda state: None
+    workflow.build_variants_graph = lambda: graph
+    previous_workflow = sys.modules.get("execution.workflow")
+    sys.modules["execution.workflow"] = workflow
+    patched = {name: getattr(generation, name) for name in ("run_state", "db_service", "storage_service", "email_service")}
+    send_notification = firebase_setup.send_notification
+    state = state or _RunState()
+    generation.run_state = state
+    generation.db_service = generation.storage_service = generation.email_service = _Nothing()
+    if db is not None:
+        generation.db_service = db
+    firebase_setup.send_notification = lambda **kwargs: None
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())  # The task writes its session dir under ./tmp
+    try:
+        if task:
+            task()
+        else:
+            generation.run_pipeline_task(run_id, request or GenerateRequest(prompt="Tea Tee launch ad"),
+                                         user_id=user_id, credits_used=credits_used)
+    finally:
+        os.chdir(cwd)
+        firebase_setup.send_notification = send_notification
+        for name, value in patched.items():
+            setattr(generation, name, value)
+        if previous_workflow is not None:
+            sys.modules["execution.workflow"] = previous_workflow
+        else:
+            sys.modules.pop("execution.workflow", None)
+    return state.saves
+
+
+def test_completed_run():
+    """The graph is invoked inside the pipeline.run span and the run completes."""
+    print("\n=== Test 1: Completed Run ===")
+    from execution.tracing import latency_stats
+
+    before = latency_stats().get("pipeline.run", {}).get("count", 0)
+    graph = _Graph(result={"result": "Final Video Available: tmp/run_task_ok/final.mp4"})
+    saves = _run(graph, "run_task_ok")
+
+    assert len(graph.states) == 1 and graph.states[0]["run_id"] == "run_task_ok"
+    assert [status for _, status, _ in saves] == ["running", "completed"], saves
+    assert latency_stats()["pipeline.run"]["count"] == before + 1
+    print("✅ PASS: Run traced and completed")
+
+
+def test_failed_run():
+    """A graph error marks the run failed instead of escaping the task."""
+    print("\n=== Test 2: Failed Run ===")
+    saves = _run(_Graph(error=RuntimeError("Veo quota exceeded")), "run_task_failed")
+    run_id, status, data = saves[-1]
+    assert status == "failed" and "Veo quota exceeded" in data["error"], saves
+    print("✅ PASS: Failure recorded")
+
+
+def test_variant_refunds():
+    """Failed variants get their share back; all variants failing fails the batch."""
+    print("\n=== Test 3: Variant Refunds ===")
+    request = GenerateRequest(prompt="Tea Tee launch ad", config={"variant_run_ids": ["batch_v1", "batch_v2"]})
+    partial = {"variants": [
+        {"run_id": "batch_v1", "index": 0, "status": "completed", "state": {"cost_usd": 1.2}},
+        {"run_id": "batch_v2", "index": 1, "status": "failed", "error": "Veo unavailable"},
+    ]}
+    db = _Credits()
+    saves = _run(_Graph(result=partial), "batch", request, user_id="user_1", credits_used=20, db=db)
+    assert db.refunds == [("batch_v2", 10)], db.refunds
+    assert saves[-1][:2] == ("batch", "completed"), saves
+
+    failed = {"variants": [
+        {"run_id": "batch_v1", "index": 0, "status": "failed", "error": "Veo unavailable"},
+        {"run_id": "batch_v2", "index": 1, "status": "failed", "error": "Veo unavailable"},
+    ]}
+    db = _Credits()
+    saves = _run(_Graph(result=failed), "batch", request, user_id="user_1", credits_used=20, db=db)
+    assert sorted(db.refunds) == [("batch_v1", 10), ("batch_v2", 10)], db.refunds
+    assert saves[-1][:2] == ("batch", "failed") and "All 2 variants failed" in saves[-1][2]["error"], saves[-1]
+    print("✅ PASS: Failed variants refunded")
+
+
+def test_lease_lost():
+    """Once the job is re-leased elsewhere, the old worker's run stops without writing a result."""
+    print("\n=== Test 4: Lease Lost ===")
+    from execution.run_control import aborted_reason, release_run
+    from projects.backend import worker
+    from projects.backend.services.job_queue import JobQueue, InMemoryJobBackend
+
+    queue = JobQueue(InMemoryJobBackend(), lease_seconds=0.3)
+    job_id = queue.enqueue("pipeline", {"run_id": "run_lease"})
+    assert queue.lease("worker-a").job_id == job_id
+    time.sleep(0.4)  # worker-a stalled past its lease
+    assert queue.lease("worker-b").job_id == job_id
+
+    previous, worker.job_queue = worker.job_queue, queue
+    done = threading.Event()
+    try:
+        heartbeat = threading.Thread(target=worker._heartbeat_loop, args=(job_id, "run_lease", "worker-a", done))
+        heartbeat.start()
+        heartbeat.join(5)
+    finally:
+        done.set()
+        worker.job_queue = previous
+    assert aborted_reason("run_lease"), "Losing the lease should abort the run"
+
+    try:
+        saves = _run(_Graph(result={"result": "Final Video Available"}), "run_lease")
+    finally:
+        release_run("run_lease")
+    assert [status for _, status, _ in saves] == ["running"], saves
+    print("✅ PASS: Aborted run left to the new owner")
+
+
+def test_status_write_failed():
+    """The worker fails the job for good instead of queueing a finished render again."""
+    print("\n=== Test 5: Status Write Failed ===")
+    from projects.backend import worker
+    from projects.backend.services.job_queue import JobQueue, InMemoryJobBackend, FAILED
+
+    queue = JobQueue(InMemoryJobBackend(), lease_seconds=30)
+    payload = {"run_id": "run_unsaved", "request": GenerateRequest(prompt="Tea Tee launch ad").dict(),
+               "user_id": None, "credits_used": 0}
+    queue.enqueue("pipeline", payload, job_id="run_unsaved")
+    job = queue.lease("worker-a")
+    graph = _Graph(result={"result": "Final Video Available: tmp/run_unsaved/final.mp4"})
+
+    previous, worker.job_queue = worker.job_queue, queue
+    try:
+        saves = _run(graph, "run_unsaved", state=_RunState(fail_status="completed"),
+                     task=lambda: worker.run_job(job, "worker-a"))
+    finally:
+        worker.job_queue = previous
+    stored = queue.get(job.job_id)
+    print(f"Job after the failed write: {stored}")
+    assert len(graph.states) == 1
+    assert [status for _, status, _ in saves] == ["running"], "A rendered run was marked failed"
+    assert stored.status == FAILED and stored.attempts < stored.max_attempts, "The render would be repeated"
+    assert queue.lease("worker-b") is None
+    print("✅ PASS: Finished render not re-queued")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Pipeline Task Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Completed Run": test_completed_run,
+        "Failed Run": test_failed_run,
+        "Variant Refunds": test_variant_refunds,
+        "Lease Lost": test_lease_lost,
+        "Status Write Failed": test_status_write_failed,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+"""
+Tests for in-process progress events (execution/progress_events.py).
+
+These tests verify (no providers, no Firestore):
+1. Every subscriber gets the same events, and a terminal status ends the streams
+2. Late subscribers get the buffered replay; reconnects resume after their last seq
+3. Percent and ETA follow the graph's node and scene progress
+4. A run executing elsewhere is fed by one tailer with a throttled status check
+5. Unfinished runs with no activity, subscribers or tailer are evicted after the idle TTL
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import progress_events
+from execution.progress_events import ProgressBus
+
+GRAPH = {"extract_dna": [], "generate_script": ["extract_dna"], "generate_scenes": ["generate_script"]}
+
+
+async def _collect(bus, run_id, **kwargs):
+    return [event async for event in bus.subscribe(run_id, **kwargs)]
+
+
+def test_fan_out_and_terminal_push():
+    """Two viewers see the same events; the completed status ends both streams."""
+    print("\n=== Test 1: Fan-out and Terminal Push ===")
+    bus = ProgressBus()
+
+    async def main():
+        viewers = [asyncio.ensure_future(_collect(bus, "run_fan")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+
+        def pipeline():
+            bus.publish("run_fan", "status", status="running")
+            bus.publish("run_fan", "log", line="--- Starting Run ---\n")
+            bus.publish("run_fan", "status", status="completed")
+            bus.publish("run_fan", "node_finished", node="assembly")  # After the terminal status: dropped
+
+        threading.Thread(target=pipeline).start()
+        return await asyncio.wait_for(asyncio.gather(*viewers), 2.0)
+
+    first, second = asyncio.run(main())
+    assert [e["type"] for e in first] == ["status", "log", "status"], first
+    assert first == second
+    assert first[-1]["status"] == "completed" and first[-1]["percent"] == 100.0
+    assert bus.stats()["subscribers"] == 0
+    print("✅ PASS: Same events for every viewer, pushed completion")
+
+
+def test_replay_and_resume():
+    """A late viewer gets the buffer; a reconnect with its last seq gets only newer events."""
+    print("\n=== Test 2: Replay and Resume ===")
+    bus = ProgressBus()
+    for i in range(5):
+        bus.publish("run_replay", "log", line=f"line {i}\n")
+    bus.publish("run_replay", "status", status="failed", failure_reason="Veo quota exceeded")
+
+    events = asyncio.run(_collect(bus, "run_replay"))
+    assert [e["seq"] for e in events] == [1, 2, 3, 4, 5, 6]
+    resumed = asyncio.run(_collect(bus, "run_replay", after_seq=4))
+    assert [e["seq"] for e in resumed] == [5, 6]
+
+    # Regenerating the same run reopens its channel
+    bus.publish("run_replay", "status", status="running")
+    assert bus.stats()["active_runs"] == 1
+    print("✅ PASS: Replay from the buffer")
+
+
+def test_percent_and_eta():
+    """ETA shrinks as nodes finish and scenes complete."""
+    print("\n=== Test 3: Percent and ETA ===")
+    bus = ProgressBus()
+    bus.plan("run_eta", GRAPH)
+    start = bus.publish("run_eta", "node_started", node="extract_dna")
+    defaults = progress_events.DEFAULT_NODE_SECONDS
+    expected = defaults["extract_dna"] + defaults["generate_script"] + defaults["generate_scenes"]
+    assert abs(start["eta_seconds"] - expected) < 1.0, start
+
+    bus.publish("run_eta", "node_finished", node="extract_dna")
+    bus.publish("run_eta", "node_finished", node="generate_script")
+    bus.publish("run_eta", "node_started", node="generate_scenes")
+    half = bus.publish("run_eta", "scene_completed", scene_id="Hook", completed=2, total=4,
+                       assets={"Hook_video": "https://cdn/hook.mp4"})
+    assert abs(half["eta_seconds"] - defaults["generate_scenes"] / 2) < 1.0, half
+    assert 0.0 < half["percent"] < 100.0
+    assert half["assets"]["Hook_video"] == "https://cdn/hook.mp4"
+    print("✅ PASS: Percent/ETA from the graph")
+
+
+def test_single_tailer():
+    """Three viewers of a remote run share one tailer; status is checked on the poll interval."""
+    print("\n=== Test 4: Single Tailer ===")
+    bus = ProgressBus()
+    log_path = os.path.join(tempfile.mkdtemp(), "run.log")
+    with open(log_path, "w") as f:
+        f.write("--- Starting Run ---\n")
+    status = {"value": "running", "checks": 0}
+
+    def get_status():
+        status["checks"] += 1
+        return status["value"]
+
+    progress_events.STATUS_POLL_SECONDS = 0.2
+
+    async def main():
+        viewers = [asyncio.ensure_future(_collect(bus, "run_remote")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        for _ in range(3):
+            bus.follow("run_remote", log_path, get_status)
+        assert bus.stats()["tailers"] == 1
+        await asyncio.sleep(0.3)
+        with open(log_path, "a") as f:
+            f.write("--- Run Completed ---\n")
+        status["value"] = "completed"
+        return await asyncio.wait_for(asyncio.gather(*viewers), 3.0)
+
+    started = time.time()
+    results = asyncio.run(main())
+    elapsed = time.time() - started
+    for events in results:
+        lines = [e["line"] for e in events if e["type"] == "log"]
+        assert lines == ["--- Starting Run ---\n", "--- Run Completed ---\n"], events
+        assert events[-1]["status"] == "completed"
+    assert status["checks"] <= elapsed / 0.2 + 2, status
+    print("✅ PASS: One tailer, throttled status checks")
+
+
+def test_idle_eviction():
+    """A run that never finished is dropped once idle; active and watched runs are kept."""
+    print("\n=== Test 5: Idle Eviction ===")
+    bus = ProgressBus()
+    ttl, sweep = progress_events.IDLE_TTL_SECONDS, progress_events.IDLE_SWEEP_SECONDS
+    progress_events.IDLE_TTL_SECONDS, progress_events.IDLE_SWEEP_SECONDS = 0.2, 0
+    try:
+        for i in range(100):
+            bus.publish("run_crashed", "log", line=f"line {i}\n")  # Its process died mid-run
+        bus.publish("run_active", "status", status="running")
+
+        async def main():
+            viewer = asyncio.ensure_future(_collect(bus, "run_watched"))
+            await asyncio.sleep(0.3)
+            bus.publish("run_active", "log", line="still rendering\n")
+            runs = set(bus._channels)
+            assert len(bus._channels["run_active"].events) == 2, "An active run lost its buffer"
+            bus.publish("run_watched", "status", status="completed")
+            await asyncio.wait_for(viewer, 3.0)
+            return runs
+
+        runs = asyncio.run(main())
+    finally:
+        progress_events.IDLE_TTL_SECONDS, progress_events.IDLE_SWEEP_SECONDS = ttl, sweep
+    print(f"Runs after the sweep: {sorted(runs)}")
+    assert runs == {"run_active", "run_watched"}, runs
+    print("✅ PASS: Idle runs evicted")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Progress Events Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Fan-out and Terminal Push": test_fan_out_and_terminal_push,
+        "Replay and Resume": test_replay_and_resume,
+        "Percent and ETA": test_percent_and_eta,
+        "Single Tailer": test_single_tailer,
+        "Idle Eviction": test_idle_eviction,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,112 @@
+"""
+Tests for upload-once reference media (execution/provider_files.py).
+
+These tests verify, using the local file backend (no network, no API keys):
+1. Concurrent scenes referencing the same asset share a single upload
+2. Each API key (project) gets its own upload
+3. Releasing a run deletes its provider files
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution.key_pool import PooledKey
+from execution.provider_files import ProviderFileCache, LocalFileBackend
+
+PRODUCT = b"\xff\xd8" + b"product" * 20000
+ANCHOR = b"\xff\xd8" + b"anchor" * 20000
+
+
+def test_single_upload_per_run():
+    """Five scene threads asking for the same two references upload each once."""
+    print("\n=== Test 1: Single Upload Per Run ===")
+    backend = LocalFileBackend()
+    cache = ProviderFileCache(backend=backend)
+    key = PooledKey("fake-key-0", 0)
+    handles = []
+
+    def scene():
+        handles.append(cache.get_or_upload("run_1", key, "product.png", PRODUCT, "image/jpeg"))
+        handles.append(cache.get_or_upload("run_1", key, "anchor.png", ANCHOR, "image/jpeg"))
+
+    threads = [threading.Thread(target=scene) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"Uploads: {backend.uploads}, handles: {len(handles)}")
+    assert backend.uploads == 2, "Each reference should be uploaded once"
+    assert len({h.uri for h in handles}) == 2
+    print("✅ PASS: References uploaded once and shared")
+
+
+def test_upload_per_key():
+    """Files live in the key's project, so another key needs its own upload."""
+    print("\n=== Test 2: Upload Per Key ===")
+    backend = LocalFileBackend()
+    cache = ProviderFileCache(backend=backend)
+    first, second = PooledKey("fake-key-0", 0), PooledKey("fake-key-1", 1)
+    a = cache.get_or_upload("run_1", first, "product.png", PRODUCT, "image/jpeg")
+    b = cache.get_or_upload("run_1", second, "product.png", PRODUCT, "image/jpeg")
+    assert a.uri != b.uri and backend.uploads == 2
+    print("✅ PASS: Handles are scoped per API key")
+
+
+def test_release_run():
+    """Releasing a run deletes only that run's files."""
+    print("\n=== Test 3: Release Run ===")
+    backend = LocalFileBackend()
+    cache = ProviderFileCache(backend=backend)
+    key = PooledKey("fake-key-0", 0)
+    cache.get_or_upload("run_1", key, "product.png", PRODUCT, "image/jpeg")
+    cache.get_or_upload("run_2", key, "anchor.png", ANCHOR, "image/jpeg")
+
+    cache.release_run("run_1")
+    print(f"Stats after release: {cache.stats()}")
+    assert backend.deletes == 1
+    assert cache.stats() == {"handles": 1, "runs": 1}
+
+    # A new request for the released run uploads again
+    cache.get_or_upload("run_1", key, "product.png", PRODUCT, "image/jpeg")
+    assert backend.uploads == 3
+    print("✅ PASS: Released runs clean up their files")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Provider Files Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Single Upload Per Run": test_single_upload_per_run,
+        "Upload Per Key": test_upload_per_key,
+        "Release Run": test_release_run,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
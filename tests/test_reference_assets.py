@@ -0,0 +1,168 @@
+"""
+Tests for the per-run reference asset store (execution/reference_assets.py).
+
+These tests verify (temp files, stubbed download manager):
+1. Model names map to their largest useful input edge (prefix match, default otherwise)
+2. Oversized references are downscaled to the model's edge and re-encoded as JPEG
+3. References with transparency are re-encoded as WebP with their alpha channel
+4. Concurrent scene threads share one download and one prepared asset per model edge
+5. A store keeps a bounded number of originals and prepared assets (the standalone store is never released)
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from execution.reference_assets import (
+    ReferenceAssetStore, get_reference_store, release_reference_store, max_edge_for_model, DEFAULT_MAX_INPUT_EDGE
+)
+
+_tmp = tempfile.mkdtemp()
+
+
+def _png(name, size, mode="RGB", color=(40, 120, 200)):
+    path = os.path.join(_tmp, name)
+    Image.new(mode, size, color).save(path, format="PNG")
+    return path
+
+
+def test_model_edges():
+    """Versioned model names match their family's edge."""
+    print("\n=== Test 1: Model Edges ===")
+    assert max_edge_for_model("gemini-2.5-flash-image") == 1536
+    assert max_edge_for_model("gemini-3-pro-image-preview") == 2048
+    assert max_edge_for_model("veo-3.1-fast-generate-preview") == 1920
+    assert max_edge_for_model(None) == DEFAULT_MAX_INPUT_EDGE
+    assert max_edge_for_model("imagen-4.0-generate-001") == DEFAULT_MAX_INPUT_EDGE
+    print("✅ PASS: Edges per model")
+
+
+def test_downscale_and_reencode():
+    """A 3000x2000 PNG product shot becomes a 1536x1024 JPEG for Gemini image models."""
+    print("\n=== Test 2: Downscale and Re-encode ===")
+    source = _png("product.png", (3000, 2000))
+    store = ReferenceAssetStore("run_ref")
+    asset = store.get(source, model_name="gemini-2.5-flash-image")
+
+    assert asset.size == (1536, 1024) and asset.mime_type == "image/jpeg"
+    decoded = Image.open(io.BytesIO(asset.data))
+    assert decoded.format == "JPEG" and decoded.size == (1536, 1024)
+    assert len(asset.data) < os.path.getsize(source)
+
+    small = store.get(_png("small.png", (800, 600)), model_name="gemini-2.5-flash-image")
+    assert small.size == (800, 600), "References below the edge are never upscaled"
+
+    copy = store.get_image(source, model_name="gemini-2.5-flash-image")
+    copy.paste((255, 0, 0), (0, 0, 10, 10))
+    assert store.get_image(source, model_name="gemini-2.5-flash-image").getpixel((0, 0)) != (255, 0, 0)
+    print("✅ PASS: Downscaled and re-encoded")
+
+
+def test_alpha_kept():
+    """A transparent logo-style reference keeps its alpha as WebP."""
+    print("\n=== Test 3: Alpha Kept ===")
+    source = _png("logo.png", (2400, 1200), mode="RGBA", color=(255, 255, 255, 0))
+    asset = ReferenceAssetStore("run_alpha").get(source, model_name="gemini-2.5-flash")
+    decoded = Image.open(io.BytesIO(asset.data))
+    assert asset.mime_type == "image/webp" and decoded.format == "WEBP"
+    assert decoded.size == (1024, 512) and decoded.mode == "RGBA"
+    assert decoded.getpixel((10, 10))[3] == 0
+    print("✅ PASS: Transparency preserved")
+
+
+def test_shared_across_threads():
+    """Eight scene threads: one fetch, one prepared asset; another model re-encodes without refetching."""
+    print("\n=== Test 4: Shared Across Threads ===")
+    from execution.download_manager import download_manager
+    buf = io.BytesIO()
+    Image.new("RGB", (2000, 2000), (10, 200, 90)).save(buf, format="PNG")
+    fetches = []
+    original = download_manager.fetch_bytes
+
+    def fetch_bytes(url, **kwargs):
+        fetches.append(url)
+        return buf.getvalue()
+
+    download_manager.fetch_bytes = fetch_bytes
+    url = "https://storage.example.com/anchor.png"
+    assets = []
+    try:
+        store = get_reference_store("run_shared")
+        threads = [threading.Thread(target=lambda: assets.append(store.get(url, "gemini-2.5-flash-image")))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        pro = store.get(url, "gemini-3-pro-image-preview")
+        assert get_reference_store("run_shared") is store
+    finally:
+        download_manager.fetch_bytes = original
+        release_reference_store("run_shared")
+
+    assert fetches == [url], fetches
+    assert len(assets) == 8 and all(a is assets[0] for a in assets)
+    assert assets[0].size == (1536, 1536) and pro.size == (2000, 2000)
+    assert get_reference_store("run_shared") is not store, "Released stores are dropped"
+    release_reference_store("run_shared")
+    print("✅ PASS: One fetch per run")
+
+
+def test_bounded_store():
+    """Past its bounds the store drops the least recently used entries and can still re-prepare them."""
+    print("\n=== Test 5: Bounded Store ===")
+    store = ReferenceAssetStore("standalone", max_originals=2, max_assets=3)
+    sources = [_png(f"bound_{i}.png", (1600, 900), color=(i * 40, 80, 120)) for i in range(5)]
+    for source in sources:
+        store.get(source, model_name="gemini-2.5-flash")
+    store.get(sources[-1], model_name="gemini-2.5-flash-image")
+    print(f"Originals kept: {len(store._raw)}, assets kept: {len(store._assets)}")
+    assert list(store._raw) == sources[-2:]
+    assert len(store._assets) == 3
+    assert store.get(sources[0], model_name="gemini-2.5-flash").size == (1024, 576)
+    print("✅ PASS: Store bounded")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Reference Assets Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Model Edges": test_model_edges,
+        "Downscale and Re-encode": test_downscale_and_reencode,
+        "Alpha Kept": test_alpha_kept,
+        "Shared Across Threads": test_shared_across_threads,
+        "Bounded Store": test_bounded_store,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,109 @@
+"""
+Tests for targeted scene regeneration (execution/workflow.py, execution/ffmpeg_rendering.py).
+
+These tests verify:
+1. Encoded segments are keyed by source file and trim (unchanged scenes hit the cache)
+2. A regeneration compiles only restore → timeline → scenes → assembly (plus the end card for CTA)
+3. Runs without a persisted script/DNA fall back to the full graph
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution.ffmpeg_rendering import segment_cache_key
+
+_tmp = tempfile.mkdtemp()
+
+PERSISTED_STATE = {
+    "regenerate_scene_id": "Problem",
+    "visual_dna": {"product_name": "Tea Tee"},
+    "script": "Hook. Problem. Solution. CTA.",
+    "scenes_list": [{"id": "Hook"}, {"id": "Problem"}, {"id": "Solution"}, {"id": "CTA"}],
+}
+
+
+def _clip(name, content=b"clip"):
+    path = os.path.join(_tmp, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_segment_cache_key():
+    """Same clip and trim -> same key; a re-rendered clip or new trim -> new key."""
+    print("\n=== Test 1: Segment Cache Key ===")
+    hook = _clip("scene_Hook_1.mp4")
+    key = segment_cache_key(hook, [0.0, 3.2])
+    assert key == segment_cache_key(hook, [0.0, 3.2])
+    assert key != segment_cache_key(hook, [0.0, 2.8])
+    assert key != segment_cache_key(_clip("scene_Problem_1.mp4"), [0.0, 3.2])
+
+    time.sleep(0.01)
+    _clip("scene_Hook_1.mp4", b"regenerated clip")
+    assert key != segment_cache_key(hook, [0.0, 3.2])
+    print("✅ PASS: Segments keyed by source and trim")
+
+
+def test_regeneration_graph_nodes():
+    """Only the nodes a regeneration needs are compiled."""
+    print("\n=== Test 2: Regeneration Graph ===")
+    from execution.workflow import build_regeneration_graph
+
+    app = build_regeneration_graph(PERSISTED_STATE)
+    nodes = set(app.get_graph().nodes) - {"__start__", "__end__"}
+    assert nodes == {"restore_assets", "plan_timeline", "generate_scenes", "assembly"}, nodes
+
+    cta = build_regeneration_graph(dict(PERSISTED_STATE, regenerate_scene_id="CTA"))
+    assert "generate_end_card" in set(cta.get_graph().nodes)
+    print("✅ PASS: Minimal subgraph compiled")
+
+
+def test_legacy_run_fallback():
+    """Without the persisted script/DNA the caller must use the full graph."""
+    print("\n=== Test 3: Legacy Fallback ===")
+    from execution.workflow import build_regeneration_graph
+
+    assert build_regeneration_graph(dict(PERSISTED_STATE, visual_dna=None)) is None
+    assert build_regeneration_graph(dict(PERSISTED_STATE, regenerate_scene_id=None)) is None
+    print("✅ PASS: Falls back to build_graph()")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Regeneration Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Segment Cache Key": test_segment_cache_key,
+        "Regeneration Graph": test_regeneration_graph_nodes,
+        "Legacy Fallback": test_legacy_run_fallback,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
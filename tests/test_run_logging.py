@@ -0,0 +1,152 @@
+"""
+Tests for context-local run logging (execution/run_logging.py).
+
+These tests verify (temp files, no pipeline):
+1. Two concurrent runs each log only their own lines
+2. Threads started through ContextThreadPoolExecutor log to their run
+3. Lines below the run's level are dropped; output outside a run passes through
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import run_logging
+from execution.run_logging import (
+    RunStreamRouter, ContextThreadPoolExecutor, close_run_log, current_run_id, INFO
+)
+
+_tmp = tempfile.mkdtemp()
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _open_sink(run_id, level=INFO):
+    """open_run_log without installing the sys.stdout wrapper (the test writes to its own router)."""
+    sink = run_logging.RunLogSink(run_id, os.path.join(_tmp, f"{run_id}.log"), level)
+    run_logging._sinks[run_id] = sink
+    sink.token = current_run_id.set(run_id)
+    return sink
+
+
+def test_concurrent_runs():
+    """Interleaved prints from two runs land in the right files."""
+    print("\n=== Test 1: Concurrent Runs ===")
+    router = RunStreamRouter(io.StringIO())
+    barrier = threading.Barrier(2)
+    sinks = {}
+
+    def run(run_id):
+        sinks[run_id] = _open_sink(run_id)
+        barrier.wait()
+        for i in range(50):
+            print(f"{run_id} line {i}", file=router)
+        close_run_log(sinks[run_id])
+
+    threads = [threading.Thread(target=run, args=(r,)) for r in ("run_a", "run_b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for run_id, other in (("run_a", "run_b"), ("run_b", "run_a")):
+        content = _read(sinks[run_id].path)
+        assert content.count(f"{run_id} line") == 50, content[:200]
+        assert other not in content
+    print("✅ PASS: Each run logs only its own lines")
+
+
+def test_spawned_threads():
+    """Scene threads inherit the run through the context copy."""
+    print("\n=== Test 2: Spawned Threads ===")
+    router = RunStreamRouter(io.StringIO())
+
+    def scene(i):
+        print(f"scene {i} done", file=router)
+
+    def run():
+        sink = _open_sink("run_threads")
+        with ContextThreadPoolExecutor(max_workers=3) as ex:
+            list(ex.map(scene, range(6)))
+        close_run_log(sink)
+        return sink.path
+
+    result = []
+    t = threading.Thread(target=lambda: result.append(run()))
+    t.start()
+    t.join()
+    content = _read(result[0])
+    assert all(f"scene {i} done" in content for i in range(6)), content
+    print("✅ PASS: Worker threads log to their run")
+
+
+def test_levels_and_passthrough():
+    """DEBUG lines are dropped at INFO; lines outside a run reach the console untouched."""
+    print("\n=== Test 3: Levels and Passthrough ===")
+    console = io.StringIO()
+    router = RunStreamRouter(console)
+    result = []
+
+    def run():
+        sink = _open_sink("run_levels", level=INFO)
+        print("====== DEBUG: remote_assets keys", file=router)
+        print("⚠️ Upload Skipped", file=router)
+        print("Scene Hook Complete.", file=router)
+        close_run_log(sink)
+        result.append(sink.path)
+
+    t = threading.Thread(target=run)
+    t.start()
+    t.join()
+    print("DEBUG outside any run", file=router)
+
+    content = _read(result[0])
+    assert "DEBUG" not in content
+    assert "Upload Skipped" in content and "Scene Hook Complete." in content
+    assert "DEBUG outside any run" in console.getvalue()
+    assert "remote_assets keys" not in console.getvalue()
+    print("✅ PASS: Level filtering applied to runs only")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Run Logging Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Concurrent Runs": test_concurrent_runs,
+        "Spawned Threads": test_spawned_threads,
+        "Levels and Passthrough": test_levels_and_passthrough,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,185 @@
+"""
+Tests for the coalescing run-state writer (projects/backend/services/run_state_writer.py).
+
+These tests verify (recording db stand-in, no Firestore):
+1. Updates within the window are coalesced into one write with the latest values
+2. Only changed field paths are written
+3. Terminal flushes write pending fields at once and wait for the write
+4. Overlapping paths (a map replaced by a leaf) never end up in the same write
+5. A failed terminal write is retried with its batch; exhausted retries raise
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from projects.backend.services import run_state_writer
+from projects.backend.services.run_state_writer import RunStateWriter, RunStateWriteError, flatten
+
+
+class RecordingDB:
+    """Records update_run_fields calls."""
+
+    def __init__(self, delay: float = 0.0):
+        self.writes = []
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def update_run_fields(self, run_id, fields):
+        time.sleep(self.delay)
+        with self._lock:
+            self.writes.append((run_id, dict(fields)))
+
+
+class FlakyDB(RecordingDB):
+    """Fails the first `failures` writes (e.g. Firestore DEADLINE_EXCEEDED)."""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    def update_run_fields(self, run_id, fields):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("504 Deadline Exceeded")
+        super().update_run_fields(run_id, fields)
+
+
+def test_coalescing():
+    """Five scene updates inside the window become one write."""
+    print("\n=== Test 1: Coalescing ===")
+    db = RecordingDB()
+    writer = RunStateWriter(db=db, window=0.2)
+    assets = {}
+    for i, scene in enumerate(["Hook", "Problem", "Solution", "Proof", "CTA"]):
+        assets[f"{scene}_video"] = f"https://cdn/{scene}.mp4"
+        writer.update("run_1", {"result": {"remote_assets": assets, "cost_usd": 0.5 * (i + 1)}})
+
+    assert db.writes == []  # Nothing written on the caller's thread
+    time.sleep(0.5)
+    assert len(db.writes) == 1, db.writes
+    _, fields = db.writes[0]
+    assert fields[("result", "cost_usd")] == 2.5
+    assert fields[("result", "remote_assets", "CTA_video")] == "https://cdn/CTA.mp4"
+    assert len(fields) == 6
+    print("✅ PASS: One write per window")
+
+
+def test_only_changed_fields():
+    """Re-sending the accumulated dict writes only the new asset."""
+    print("\n=== Test 2: Only Changed Fields ===")
+    db = RecordingDB()
+    writer = RunStateWriter(db=db, window=0.05)
+    assets = {"Hook_image": "https://cdn/hook.png", "Hook_video": "https://cdn/hook.mp4"}
+    writer.update("run_2", {"result": {"remote_assets": assets}})
+    writer.flush("run_2")
+
+    assets = dict(assets, Problem_video="https://cdn/problem.mp4")
+    writer.update("run_2", {"result": {"remote_assets": assets}})
+    writer.flush("run_2")
+
+    assert len(db.writes) == 2
+    assert list(db.writes[1][1]) == [("result", "remote_assets", "Problem_video")], db.writes[1]
+    assert writer.stats()["fields_skipped"] == 2
+    print("✅ PASS: Unchanged paths skipped")
+
+
+def test_terminal_flush():
+    """A terminal update carries the pending fields and returns after the write."""
+    print("\n=== Test 3: Terminal Flush ===")
+    db = RecordingDB(delay=0.1)
+    writer = RunStateWriter(db=db, window=10.0)
+    writer.update("run_3", {"result": {"remote_assets": {"CTA_video": "https://cdn/cta.mp4"}}})
+
+    started = time.time()
+    ok = writer.update("run_3", {"status": "completed", "result": {"video_url": "https://cdn/final.mp4"}}, terminal=True)
+    assert ok
+    assert time.time() - started >= 0.1  # Waited for the write
+    assert len(db.writes) == 1
+    fields = db.writes[0][1]
+    assert fields[("status",)] == "completed"
+    assert ("result", "remote_assets", "CTA_video") in fields
+    print("✅ PASS: Terminal state flushed synchronously")
+
+
+def test_overlapping_paths():
+    """Replacing a map with a leaf drops the queued child paths."""
+    print("\n=== Test 4: Overlapping Paths ===")
+    assert flatten({"a": {"b": 1, "c": {}}, "d": [1, 2]}) == {("a", "b"): 1, ("a", "c"): {}, ("d",): [1, 2]}
+
+    db = RecordingDB()
+    writer = RunStateWriter(db=db, window=10.0)
+    writer.update("run_4", {"result": {"error": {"stage": "scenes"}}})
+    writer.update("run_4", {"result": {"error": "Scene Hook failed"}})
+    writer.flush("run_4")
+
+    assert db.writes[0][1] == {("result", "error"): "Scene Hook failed"}, db.writes
+    print("✅ PASS: No prefix conflicts in a write")
+
+
+def test_terminal_retry():
+    """The completed status is retried with the batch it failed in, then raises once retries run out."""
+    print("\n=== Test 5: Terminal Retry ===")
+    backoff = run_state_writer.RETRY_BACKOFF_SECONDS
+    run_state_writer.RETRY_BACKOFF_SECONDS = 0.01
+    try:
+        db = FlakyDB(failures=2)
+        writer = RunStateWriter(db=db, window=10.0)
+        writer.update("run_5", {"result": {"remote_assets": {"CTA_video": "https://cdn/cta.mp4"}}})
+        assert writer.update("run_5", {"status": "completed"}, terminal=True)
+        assert len(db.writes) == 1, db.writes
+        fields = db.writes[0][1]
+        assert fields[("status",)] == "completed"
+        assert fields[("result", "remote_assets", "CTA_video")] == "https://cdn/cta.mp4"
+
+        writer = RunStateWriter(db=FlakyDB(failures=100), window=10.0)
+        try:
+            writer.update("run_6", {"status": "failed"}, terminal=True)
+        except RunStateWriteError as e:
+            print(f"Raised: {e}")
+        else:
+            raise AssertionError("An unwritten terminal state was reported as saved")
+    finally:
+        run_state_writer.RETRY_BACKOFF_SECONDS = backoff
+    print("✅ PASS: Terminal writes retried, then raised")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Run State Writer Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Coalescing": test_coalescing,
+        "Only Changed Fields": test_only_changed_fields,
+        "Terminal Flush": test_terminal_flush,
+        "Overlapping Paths": test_overlapping_paths,
+        "Terminal Retry": test_terminal_retry,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
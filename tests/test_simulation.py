@@ -0,0 +1,187 @@
+"""
+Tests for the local simulation providers (execution/simulation.py).
+
+These tests verify (no providers, no FFmpeg, no sleeping):
+1. Latency and 429/failure outcomes follow the profile; 429s look like real throttles
+2. Recorded trace latencies are replayed per operation
+3. Simulated LLM JSON matches what the script / DNA / music prompts ask for
+4. Synthetic images are valid PNGs and Veo operations complete (or fail) after their latency
+5. Simulated storage writes locally and returns file:// URLs
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution.simulation import (Simulator, SimulatedBucket, SimulatedGenaiClient, simulated_completion,
+                                  simulated_json, synthetic_png)
+from execution.provider_control import is_throttle_error, parse_retry_after
+
+_tmp = tempfile.mkdtemp()
+
+
+def _constant(seconds, failure_rate=0.0, throttle_rate=0.0, **extra):
+    return {"latency": {"dist": "constant", "value": seconds}, "failure_rate": failure_rate,
+            "throttle_rate": throttle_rate, **extra}
+
+
+def test_profile_outcomes():
+    """Sleeps the drawn latency; 429s carry a Retry delay the controllers understand."""
+    print("\n=== Test 1: Profile Outcomes ===")
+    slept = []
+    sim = Simulator(profile={"image": _constant(8.0), "video": _constant(60.0, throttle_rate=1.0, retry_after=30)},
+                    time_scale=0.5, seed=7, sleep=slept.append)
+    assert sim.call("image", "imagen-4.0-fast-generate-001") == 4.0
+    assert slept == [4.0]
+
+    try:
+        sim.call("video", "veo-3.1-fast-generate-preview")
+    except Exception as e:
+        assert is_throttle_error(e), e
+        assert parse_retry_after(e) == 30.0, e
+    else:
+        raise AssertionError("Expected a simulated 429")
+
+    flaky = Simulator(profile={"tts": _constant(1.0, failure_rate=0.25)}, seed=1, sleep=lambda s: None)
+    failures = 0
+    for _ in range(400):
+        try:
+            flaky.call("tts")
+        except Exception:
+            failures += 1
+    assert 70 <= failures <= 130, failures
+    assert flaky.stats()["tts"]["failures"] == failures
+    print("✅ PASS: Latency and error rates from the profile")
+
+
+def test_trace_replay():
+    """Latencies come from the recorded spans of the matching stage."""
+    print("\n=== Test 2: Trace Replay ===")
+    trace_path = os.path.join(_tmp, "traces.jsonl")
+    with open(trace_path, "w") as f:
+        for name, seconds, outcome in [("image.generate", 2.0, "ok"), ("image.generate", 4.0, "ok"),
+                                       ("image.generate", 90.0, "error"), ("node.assembly", 30.0, "ok")]:
+            f.write(json.dumps({
+                "name": name, "startTimeUnixNano": "1000000000",
+                "endTimeUnixNano": str(int(1e9 + seconds * 1e9)),
+                "attributes": [{"key": "outcome", "value": {"stringValue": outcome}}],
+            }) + "\n")
+
+    sim = Simulator(profile={"image": _constant(99.0)}, trace_path=trace_path, seed=3, sleep=lambda s: None)
+    drawn = {sim.draw("image")[1] for _ in range(50)}
+    assert drawn == {2.0, 4.0}, drawn
+    assert sim.draw("tts")[1] > 0  # No trace for TTS: profile distribution
+    print("✅ PASS: Recorded latencies replayed")
+
+
+def test_simulated_json():
+    """Script prompts get their scene ids and durations back; DNA and music prompts their fields."""
+    print("\n=== Test 3: Simulated JSON ===")
+    script_prompt = '''{ "scenes": [
+        { "id": "Hook", "description": "...", "duration_seconds": 5.0, "scene_script": "..." },
+        { "id": "Feature", "description": "...", "duration_seconds": 5.0, "scene_script": "..." },
+        { "id": "CTA", "description": "...", "duration_seconds": 5.0, "scene_script": "..." }
+    ] }'''
+    scenes = simulated_json(script_prompt)["scenes"]
+    assert [s["id"] for s in scenes] == ["Hook", "Feature", "CTA"]
+    assert all(s["duration_seconds"] == 5.0 and s["scene_script"] for s in scenes)
+
+    dna = simulated_json('Output JSON: { "character": {...}, "product": {...}, "visual_style": {...} }')
+    assert dna["character"]["description"] and dna["visual_style"]["camera_angle"]
+    assert "music_prompt" in simulated_json('Output JSON: { "music_prompt": "..." }')
+
+    import execution.simulation as simulation
+    previous, simulation._simulator = simulation._simulator, Simulator(profile={"llm": _constant(0.0)}, sleep=lambda s: None)
+    try:
+        response = simulated_completion("gemini/gemini-2.5-flash", [
+            {"role": "system", "content": script_prompt}, {"role": "user", "content": "Tea Tee"}])
+    finally:
+        simulation._simulator = previous
+    assert json.loads(response.choices[0].message.content)["scenes"][0]["id"] == "Hook"
+    assert response.usage.prompt_tokens > 0
+    print("✅ PASS: Prompt-shaped JSON")
+
+
+def test_media_and_operations():
+    """PNG headers are valid; a Veo operation is pending until its latency has passed."""
+    print("\n=== Test 4: Media and Operations ===")
+    png = synthetic_png(720, 1280, "Hook: creator holds the product")
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    assert struct.unpack(">II", png[16:24]) == (720, 1280)
+
+    class Config:
+        aspect_ratio = "9:16"
+        duration_seconds = 6
+
+    client = SimulatedGenaiClient(Simulator(profile={"image": _constant(0.0), "video": _constant(0.2, failure_rate=1.0)},
+                                            sleep=lambda s: None))
+    images = client.models.generate_images(model="imagen-4.0-generate-001", prompt="Hook", config=Config())
+    assert images.generated_images[0].image.image_bytes[:4] == b"\x89PNG"
+
+    operation = client.models.generate_videos(model="veo-3.1-fast-generate-preview", prompt="Hook", config=Config())
+    assert not operation.done
+    time.sleep(0.25)
+    operation = client.operations.get(operation)
+    assert operation.done and operation.response is None and operation.error
+    print("✅ PASS: Synthetic media and Veo operation lifecycle")
+
+
+def test_simulated_storage():
+    """Uploads are copied under the storage root and addressed by file:// URL."""
+    print("\n=== Test 5: Simulated Storage ===")
+    source = os.path.join(_tmp, "final.mp4")
+    with open(source, "wb") as f:
+        f.write(b"video")
+    bucket = SimulatedBucket(root=os.path.join(_tmp, "storage"), sim=Simulator(profile={"upload": _constant(0.0)},
+                                                                              sleep=lambda s: None))
+    blob = bucket.blob("runs/run_sim/final.mp4")
+    blob.upload_from_filename(source)
+    blob.make_public()
+    assert blob.public_url.startswith("file://")
+    with open(blob.public_url[len("file://"):], "rb") as f:
+        assert f.read() == b"video"
+    print("✅ PASS: Local storage backend")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Simulation Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Profile Outcomes": test_profile_outcomes,
+        "Trace Replay": test_trace_replay,
+        "Simulated JSON": test_simulated_json,
+        "Media and Operations": test_media_and_operations,
+        "Simulated Storage": test_simulated_storage,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+"""
+Tests for pipeline tracing and latency histograms (execution/tracing.py).
+
+These tests verify (no providers, no exporter):
+1. Nested spans share the trace and inherit run_id / scene_id / model, also across scene threads
+2. Outcomes (ok / error) are recorded and exceptions still propagate
+3. Histograms report percentiles per stage and per stage[model]
+4. Exported spans follow the OTLP/JSON span shape
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import tracing
+from execution.tracing import span, current_span, LatencyHistograms
+from execution.run_logging import ContextThreadPoolExecutor
+
+
+def test_nesting_and_inheritance():
+    """Child spans link to their parent and inherit its run/scene/model attributes."""
+    print("\n=== Test 1: Nesting and Inheritance ===")
+    seen = {}
+
+    def scene(scene_id):
+        with span("scene.generate", scene_id=scene_id) as s:
+            with span("image.generate", model="imagen-4.0-fast-generate-001") as child:
+                seen[scene_id] = (s, child)
+
+    def run():
+        with span("pipeline.run", run_id="run_trace") as root:
+            with ContextThreadPoolExecutor(max_workers=2) as ex:
+                list(ex.map(scene, ["Hook", "CTA"]))
+        seen["root"] = root
+
+    t = threading.Thread(target=run)
+    t.start()
+    t.join()
+
+    root = seen["root"]
+    for scene_id in ("Hook", "CTA"):
+        parent, child = seen[scene_id]
+        assert parent.parent_id == root.span_id
+        assert child.parent_id == parent.span_id
+        assert child.trace_id == root.trace_id
+        assert child.attributes["run_id"] == "run_trace"
+        assert child.attributes["scene_id"] == scene_id
+        assert child.attributes["model"] == "imagen-4.0-fast-generate-001"
+    assert current_span() is None
+    print("✅ PASS: Scene threads attach to the run's trace")
+
+
+def test_outcomes():
+    """A raising block is recorded as an error and the exception propagates."""
+    print("\n=== Test 2: Outcomes ===")
+    tracing.histograms.clear()
+    with span("veo.poll"):
+        pass
+    try:
+        with span("veo.poll") as s:
+            raise TimeoutError("Veo operation timed out")
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError("Exception was swallowed")
+
+    assert s.outcome == "error" and "TimeoutError" in s.error
+    stats = tracing.latency_stats()["veo.poll"]
+    assert stats["count"] == 2
+    assert stats["outcomes"] == {"ok": 1, "error": 1}, stats
+    print("✅ PASS: ok/error outcomes recorded")
+
+
+def test_percentiles():
+    """p50/p95/p99 come from the stage's samples; stage[model] is kept separately."""
+    print("\n=== Test 3: Percentiles ===")
+    h = LatencyHistograms(reservoir=100)
+    for i in range(1, 101):
+        h.record("llm.completion", float(i), "ok")
+        h.record("llm.completion[gemini-2.5-flash]", float(i) / 10, "ok")
+
+    stats = h.stats()
+    assert stats["llm.completion"]["p50"] == 51.0, stats
+    assert stats["llm.completion"]["p95"] == 95.0, stats
+    assert stats["llm.completion"]["p99"] == 99.0, stats
+    assert stats["llm.completion[gemini-2.5-flash]"]["p95"] == 9.5
+    assert stats["llm.completion"]["count"] == 100
+
+    # Reservoir keeps only the latest samples
+    for _ in range(100):
+        h.record("llm.completion", 1.0, "ok")
+    assert h.stats()["llm.completion"]["p99"] == 1.0
+    print("✅ PASS: Percentiles per stage and per model")
+
+
+def test_otlp_shape():
+    """Exported spans carry OTLP/JSON ids, timestamps, attributes and status."""
+    print("\n=== Test 4: OTLP Shape ===")
+    with span("pipeline.run", run_id="run_otlp"):
+        with span("storage.upload", destination="runs/run_otlp/Hook.png", bytes=1024) as s:
+            pass
+    out = s.to_otlp()
+
+    assert len(out["traceId"]) == 32 and len(out["spanId"]) == 16
+    assert out["parentSpanId"]
+    assert int(out["endTimeUnixNano"]) >= int(out["startTimeUnixNano"])
+    attrs = {a["key"]: a["value"] for a in out["attributes"]}
+    assert attrs["bytes"] == {"intValue": "1024"}
+    assert attrs["run_id"] == {"stringValue": "run_otlp"}
+    assert attrs["outcome"] == {"stringValue": "ok"}
+    assert out["status"] == {"code": 1}
+    print("✅ PASS: OTLP/JSON span shape")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Tracing Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Nesting and Inheritance": test_nesting_and_inheritance,
+        "Outcomes": test_outcomes,
+        "Percentiles": test_percentiles,
+        "OTLP Shape": test_otlp_shape,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,216 @@
+"""
+Tests for Veo video generation (execution/media_factory.py: GoogleMediaProvider.generate_video).
+
+These tests verify (fake genai client, in-memory key pool, no network):
+1. The concurrency slot covers the submit call only: it is free while the operation is polled
+2. Every finished operation reports its latency, including one the caller abandoned (hedge)
+3. Daily quota is recorded only once a slot is held: an abandoned wait for a slot spends none
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution import media_factory
+from execution.key_pool import KeyPool, InMemoryQuotaBackend
+from execution.media_factory import GoogleMediaProvider
+
+_tmp = tempfile.mkdtemp()
+
+
+class _NoWait(threading.Event):
+    """Cancel event whose poll-interval wait returns at once (unless set)."""
+
+    def wait(self, timeout=None):
+        return self.is_set()
+
+
+class _Operation:
+    def __init__(self, polls_left):
+        self.name = "operations/fake"
+        self.polls_left = polls_left
+        self.error = None
+        self.response = None
+
+    @property
+    def done(self):
+        return self.polls_left <= 0
+
+
+class _Client:
+    """Fake genai client: the operation finishes after `polls` polls."""
+
+    def __init__(self, polls=2, on_poll=None):
+        class Models:
+            def generate_videos(self, model, source, config):
+                return _Operation(polls)
+
+        class Operations:
+            def get(self, operation):
+                if on_poll:
+                    on_poll()
+                operation.polls_left -= 1
+                if operation.done:
+                    video = type("Video", (), {"video_bytes": b"fake mp4"})()
+                    operation.response = type("Response", (), {"generated_videos": [type("Generated", (), {"video": video})()]})()
+                return operation
+
+        self.models, self.operations = Models(), Operations()
+
+
+def _provider(client):
+    """A provider over one fake key; `client` serves every request."""
+    provider = GoogleMediaProvider.__new__(GoogleMediaProvider)
+    provider._client = lambda pooled: client
+    return provider
+
+
+def _with_pool(test):
+    def run():
+        pool = media_factory.key_pool
+        media_factory.key_pool = KeyPool(["fake-key"], backend=InMemoryQuotaBackend({}))
+        try:
+            test()
+        finally:
+            media_factory.key_pool = pool
+    run.__name__, run.__doc__ = test.__name__, test.__doc__
+    return run
+
+
+@_with_pool
+def test_slot_released_while_polling():
+    """Polling happens with the slot released; the submitted event fires after submission."""
+    print("\n=== Test 1: Slot Released While Polling ===")
+    model = "veo-test-slot"
+    pooled = media_factory.key_pool.keys[0]
+    controller = GoogleMediaProvider._controller(model, pooled)
+    in_flight = []
+    provider = _provider(_Client(polls=2, on_poll=lambda: in_flight.append(controller.in_flight)))
+    submitted = threading.Event()
+
+    path = os.path.join(_tmp, "slot.mp4")
+    result = provider.generate_video("Hook scene", path, None, {
+        "video_model": model, "duration": 6, "cancel_event": _NoWait(), "submitted_event": submitted
+    })
+    print(f"In flight while polling: {in_flight}")
+    assert result == (path, 6.0, model)
+    assert in_flight == [0, 0], "The slot must be released before polling"
+    assert submitted.is_set()
+    print("✅ PASS: Slot held for submission only")
+
+
+@_with_pool
+def test_latency_after_abandon():
+    """An operation abandoned mid-poll is still observed until it finishes."""
+    print("\n=== Test 2: Latency After Abandon ===")
+    from execution.exceptions import GenerationCancelledException
+    poll_seconds = media_factory.VEO_POLL_SECONDS
+    media_factory.VEO_POLL_SECONDS = 0.01
+    cancel = threading.Event()
+    observed, finished = [], threading.Event()
+
+    def observe(model, seconds):
+        observed.append((model, seconds))
+        finished.set()
+
+    try:
+        # Completed operation: one sample under the model that ran
+        _provider(_Client(polls=1)).generate_video("Hook scene", os.path.join(_tmp, "done.mp4"), None, {
+            "video_model": "veo-test-observe", "duration": 6, "veo_latency_observer": observe
+        })
+        assert [m for m, _ in observed] == ["veo-test-observe"]
+        finished.clear()
+
+        # Hedged: the caller stops waiting after the first poll; the operation finishes 3 polls later
+        submission = {}
+        try:
+            _provider(_Client(polls=4, on_poll=cancel.set)).generate_video("Hook scene", os.path.join(_tmp, "hedged.mp4"), None, {
+                "video_model": "veo-test-backup", "duration": 6, "cancel_event": cancel,
+                "veo_latency_observer": observe, "veo_submission": submission
+            })
+        except GenerationCancelledException:
+            pass
+        else:
+            raise AssertionError("Expected the caller to be released at once")
+        assert submission["model"] == "veo-test-backup"
+        assert finished.wait(5), "The abandoned operation was not observed to completion"
+        assert observed[-1][0] == "veo-test-backup"
+        assert not os.path.exists(os.path.join(_tmp, "hedged.mp4")), "Abandoned clips are not downloaded"
+    finally:
+        media_factory.VEO_POLL_SECONDS = poll_seconds
+    print(f"Observed: {observed}")
+    print("✅ PASS: Every finished operation is sampled")
+
+
+@_with_pool
+def test_quota_recorded_in_slot():
+    """A request abandoned while waiting for a slot does not count against daily quota."""
+    print("\n=== Test 3: Quota Recorded In Slot ===")
+    from execution.exceptions import GenerationCancelledException
+    model = "veo-test-quota"
+    backend = InMemoryQuotaBackend({model: {"rpm": 10, "rpd": 5}})
+    media_factory.key_pool = KeyPool(["fake-key"], backend=backend)
+    pooled = media_factory.key_pool.keys[0]
+    controller = GoogleMediaProvider._controller(model, pooled)
+    controller.blocked_until = time.time() + 60  # No slot for a minute (Retry-After)
+    cancel, reserved = threading.Event(), []
+    threading.Timer(0.2, cancel.set).start()
+    try:
+        _provider(_Client()).generate_video("Hook scene", os.path.join(_tmp, "quota.mp4"), None, {
+            "video_model": model, "duration": 6, "cancel_event": cancel, "veo_reserved": lambda: reserved.append(1)
+        })
+    except GenerationCancelledException:
+        pass
+    else:
+        raise AssertionError("Expected the caller to abandon the wait for a slot")
+    finally:
+        controller.blocked_until = 0.0
+    print(f"Daily counts: {backend.daily}")
+    assert backend.daily == {} and reserved == [], "Quota was spent without a slot"
+
+    _provider(_Client(polls=1)).generate_video("Hook scene", os.path.join(_tmp, "quota.mp4"), None, {
+        "video_model": model, "duration": 6, "cancel_event": _NoWait(), "veo_reserved": lambda: reserved.append(1)
+    })
+    assert backend.daily == {(model, pooled.key_id): 1} and reserved == [1]
+    print("✅ PASS: Quota recorded with the slot held")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Veo Generation Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Slot Released While Polling": test_slot_released_while_polling,
+        "Latency After Abandon": test_latency_after_abandon,
+        "Quota Recorded In Slot": test_quota_recorded_in_slot,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
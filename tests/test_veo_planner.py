@@ -0,0 +1,149 @@
+"""
+Tests for the quota-aware Veo planner (execution/veo_planner.py).
+
+These tests verify, using the in-memory fake quota backend (no network, no files):
+1. Without configured limits every scene gets Veo
+2. Hook scenes are served before other scenes when quota is scarce
+3. Paid tiers and runs closer to completion are served first
+4. A decision is made once per scene and finished scenes release their claim
+5. Granted scenes hold budget until their quota is reserved
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from execution.key_pool import KeyPool, InMemoryQuotaBackend
+from execution.veo_planner import VeoPlanner
+
+MODEL = "veo-test"
+
+
+def _planner(rpd, num_keys=1):
+    backend = InMemoryQuotaBackend({MODEL: {"rpm": 10, "rpd": rpd}})
+    pool = KeyPool([f"fake-key-{i}" for i in range(num_keys)], backend=backend)
+    return VeoPlanner(pool=pool), backend
+
+
+def test_unlimited_quota_allows_all():
+    """Models without limits are never restricted."""
+    print("\n=== Test 1: Unlimited Quota ===")
+    backend = InMemoryQuotaBackend({})
+    planner = VeoPlanner(pool=KeyPool(["fake-key"], backend=backend))
+    planner.register_run("run_a", status="running", scene_ids=["Hook", "Feature", "CTA"])
+    assert all(planner.should_use_veo("run_a", sid, MODEL) for sid in ("Hook", "Feature", "CTA"))
+    # Runs the planner has never seen are left to the rate limiter
+    assert planner.should_use_veo("unknown_run", "Hook", MODEL)
+    print("✅ PASS: Unlimited quota allows every scene")
+
+
+def test_hook_scenes_first():
+    """With quota for two scenes, both runs' Hooks get Veo ahead of earlier non-Hook scenes."""
+    print("\n=== Test 2: Hook Scenes First ===")
+    planner, _ = _planner(rpd=2)
+    planner.register_run("run_a", status="running", scene_ids=["Feature", "Hook"])
+    planner.register_run("run_b", status="running", scene_ids=["Hook", "CTA"])
+
+    assert not planner.should_use_veo("run_a", "Feature", MODEL), "Feature should yield to Hook scenes"
+    assert planner.should_use_veo("run_a", "Hook", MODEL)
+    assert planner.should_use_veo("run_b", "Hook", MODEL)
+    print("✅ PASS: Hook scenes are prioritized")
+
+
+def test_tier_and_progress_priority():
+    """Paid tiers beat free runs; among equals, the run closest to completion wins."""
+    print("\n=== Test 3: Tier And Progress Priority ===")
+    planner, _ = _planner(rpd=1, num_keys=1)
+    planner.register_run("free_run", status="running", scene_ids=["Feature"])
+    planner.register_run("agency_run", tier="agency", status="running", scene_ids=["Feature"])
+    plan = planner.plan(MODEL)
+    print(f"Plan: {plan}")
+    assert plan[("agency_run", "Feature")] and not plan[("free_run", "Feature")]
+
+    planner, _ = _planner(rpd=1)
+    planner.register_run("early_run", status="running", scene_ids=["Feature", "Lifestyle", "CTA"])
+    planner.register_run("late_run", status="running", scene_ids=["Feature", "Lifestyle", "CTA"])
+    planner.mark_scene_done("late_run", "Feature")
+    planner.mark_scene_done("late_run", "Lifestyle")
+    planner.register_run("queued_run", scene_ids=["Feature"])  # Not started yet
+    plan = planner.plan(MODEL)
+    assert plan[("late_run", "CTA")], "Run closest to completion should get the last Veo request"
+    assert sum(plan.values()) == 1
+    print("✅ PASS: Tier and progress decide among non-Hook scenes")
+
+
+def test_decisions_are_sticky():
+    """A scene keeps its decision; consumed quota and released runs update the plan."""
+    print("\n=== Test 4: Sticky Decisions ===")
+    planner, backend = _planner(rpd=1)
+    planner.register_run("run_a", status="running", scene_ids=["Feature", "CTA"])
+
+    assert planner.should_use_veo("run_a", "Feature", MODEL)
+    backend.check_and_wait(MODEL, planner.pool.keys[0].key_id)  # The Veo request is recorded
+    assert planner.should_use_veo("run_a", "Feature", MODEL), "Decision should not change on retry"
+    assert not planner.should_use_veo("run_a", "CTA", MODEL), "Daily quota is used up"
+    assert planner.remaining_budget(MODEL) == 0
+
+    planner.release_run("run_a")
+    assert planner.stats() == {}
+    print("✅ PASS: Decisions are made once per scene")
+
+
+def test_outstanding_grants():
+    """A grant not yet reserved counts against the budget; reservation hands it to the key pool."""
+    print("\n=== Test 5: Outstanding Grants ===")
+    planner, backend = _planner(rpd=2)
+    planner.register_run("run_a", status="running", scene_ids=["Hook"])
+    planner.register_run("run_b", status="running", scene_ids=["Hook"])
+    planner.register_run("run_c", status="running", scene_ids=["Hook"])
+
+    assert planner.should_use_veo("run_a", "Hook", MODEL)
+    assert planner.should_use_veo("run_b", "Hook", MODEL)
+    # Neither request has reserved quota yet: the headroom still shows 2
+    assert planner.remaining_budget(MODEL) == 2
+    assert not planner.should_use_veo("run_c", "Hook", MODEL), "Both remaining requests are promised"
+
+    planner.mark_scene_reserved("run_a", "Hook")
+    backend.check_and_wait(MODEL, planner.pool.keys[0].key_id)
+    assert planner.should_use_veo("run_a", "Hook", MODEL), "Reserved scenes keep their grant"
+    assert planner.plan(MODEL) == {}
+    print("✅ PASS: Outstanding grants are not re-allocated")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    print("=" * 60)
+    print("Running Veo Planner Test Suite")
+    print("=" * 60)
+
+    tests = {
+        "Unlimited Quota": test_unlimited_quota_allows_all,
+        "Hook Scenes First": test_hook_scenes_first,
+        "Tier And Progress Priority": test_tier_and_progress_priority,
+        "Sticky Decisions": test_decisions_are_sticky,
+        "Outstanding Grants": test_outstanding_grants,
+    }
+    results = {}
+    for name, test in tests.items():
+        try:
+            test()
+            results[name] = True
+        except AssertionError as e:
+            print(f"❌ FAIL: {name}: {e}")
+            results[name] = False
+
+    print("\n" + "=" * 60)
+    print("Test Results Summary")
+    print("=" * 60)
+    for test_name, result in results.items():
+        print(f"{'✅ PASS' if result else '❌ FAIL'}: {test_name}")
+
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)